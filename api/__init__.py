@@ -7,10 +7,12 @@ from .models import router as models_router
 from .tasks import router as tasks_router
 from .datasets import router as datasets_router
 from .evaluations import router as evaluations_router
+from .distributed import router as distributed_router
 
 __all__ = [
     'models_router',
     'tasks_router', 
     'datasets_router',
-    'evaluations_router'
+    'evaluations_router',
+    'distributed_router'
 ]
@@ -6,6 +6,7 @@ API依赖注入模块
 from models.model_manager import ModelManager
 from core.evaluator import Evaluator
 from core.task_manager import TaskManager
+from core.distributed import DistributedCoordinator
 from utils.data_loader import DataLoader
 from utils.prompt_loader import PromptLoader
 from utils.model_evaluation_history import ModelEvaluationHistory
@@ -17,17 +18,21 @@ _data_loader = None
 _prompt_loader = None
 _evaluator = None
 _evaluation_history = None
+_distributed_coordinator = None
 
 def init_dependencies():
     """初始化所有依赖组件"""
     global _model_manager, _task_manager, _data_loader, _prompt_loader, _evaluator, _evaluation_history
+    global _distributed_coordinator
     
     _model_manager = ModelManager()
     _task_manager = TaskManager()
+    _task_manager.fail_orphaned_distributed_tasks()
     _data_loader = DataLoader()
     _prompt_loader = PromptLoader()
     _evaluator = Evaluator(_model_manager, _prompt_loader)
     _evaluation_history = ModelEvaluationHistory()
+    _distributed_coordinator = DistributedCoordinator(_evaluator)
 
 def get_model_manager() -> ModelManager:
     """获取模型管理器实例"""
@@ -63,4 +68,10 @@ def get_evaluation_history() -> ModelEvaluationHistory:
     """获取评估历史实例"""
     if _evaluation_history is None:
         raise RuntimeError("Dependencies not initialized. Call init_dependencies() first.")
-    return _evaluation_history 
\ No newline at end of file
+    return _evaluation_history
+
+def get_distributed_coordinator() -> DistributedCoordinator:
+    """获取分布式评估协调器实例"""
+    if _distributed_coordinator is None:
+        raise RuntimeError("Dependencies not initialized. Call init_dependencies() first.")
+    return _distributed_coordinator
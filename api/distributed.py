@@ -0,0 +1,164 @@
+"""
+分布式评估API路由
+协调节点接口：创建分布式任务，工作节点领取分片（租约）、心跳续约和回传结果项
+"""
+
+from fastapi import APIRouter, HTTPException, Depends
+from typing import Dict, Any
+import uuid
+from datetime import datetime
+
+from .dependencies import (
+    get_task_manager, get_evaluator, get_evaluation_history, get_data_loader, get_distributed_coordinator
+)
+from .datasets import get_matching_answer_file
+from .schemas import DistributedTaskRequest, LeaseRequest, WorkerRequest, ShardResultRequest
+from .tasks import load_task_dataset
+from core.distributed import DistributedCoordinator
+from core.evaluator import Evaluator
+from core.task_manager import TaskManager
+from utils.data_loader import DataLoader
+from utils.model_evaluation_history import ModelEvaluationHistory
+
+router = APIRouter(prefix="/api/distributed", tags=["distributed"])
+
+@router.post("/tasks")
+async def create_distributed_task(
+    request: DistributedTaskRequest,
+    task_manager: TaskManager = Depends(get_task_manager),
+    evaluator: Evaluator = Depends(get_evaluator),
+    data_loader: DataLoader = Depends(get_data_loader),
+    evaluation_history: ModelEvaluationHistory = Depends(get_evaluation_history),
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
+) -> Dict[str, Any]:
+    """创建分布式评估任务，问题分片等待工作节点领取"""
+    try:
+        questions, answers = load_task_dataset(request, data_loader)
+        task_id = str(uuid.uuid4())[:8]
+        task_data = {
+            "task_id": task_id,
+            "target_model_name": request.target_model_name,
+            "evaluator_model_name": request.evaluator_model_name,
+            "question_file": request.question_file,
+            "answer_file": get_matching_answer_file(request.question_file),
+            "config": request.config or {},
+            "distributed": True,
+            "status": "running",
+            "created_at": datetime.now().isoformat(),
+            "progress": 0
+        }
+        if not task_manager.create_task(task_id, task_data):
+            raise HTTPException(status_code=500, detail="创建任务失败")
+
+        def on_complete(results: Dict[str, Any]):
+            """所有分片完成或超出预算：保存合并的结果，完整完成的任务计入评估历史"""
+            status = "budget_exceeded" if results.get("budget_exceeded") else "completed"
+            task_manager.update_task_results(task_id, results)
+            task_manager.update_task_progress(task_id, 100)
+            task_manager.update_task_status(task_id, status)
+            completed_task = task_manager.get_task(task_id)
+            if completed_task and status == "completed":
+                evaluation_history.update_model_evaluation(completed_task)
+            coordinator.remove_task(task_id)
+
+        progress = coordinator.create_task(
+            task_id, request.target_model_name, request.evaluator_model_name,
+            questions, answers, request.config or {}, dataset_file=request.question_file,
+            shard_size=request.shard_size, lease_seconds=request.lease_seconds, on_complete=on_complete
+        )
+        return {
+            "success": True,
+            "data": progress,
+            "message": f"分布式任务创建成功，共 {progress['total_shards']} 个分片等待工作节点领取"
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"创建分布式任务失败: {str(e)}")
+
+@router.get("/tasks/{task_id}")
+async def get_distributed_task(
+    task_id: str,
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
+) -> Dict[str, Any]:
+    """获取分布式任务的分片进度"""
+    try:
+        progress = coordinator.get_progress(task_id)
+        if progress is None:
+            raise HTTPException(status_code=404, detail=f"分布式任务 {task_id} 不存在")
+        return {
+            "success": True,
+            "data": progress,
+            "message": "分布式任务进度获取成功"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取分布式任务进度失败: {str(e)}")
+
+@router.post("/lease")
+async def lease_shard(
+    request: LeaseRequest,
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
+) -> Dict[str, Any]:
+    """工作节点领取一个分片，没有可领取的分片时 data 为 null"""
+    try:
+        lease = coordinator.lease(request.worker_id, request.task_id)
+        return {
+            "success": True,
+            "data": lease,
+            "message": f"已领取分片 {lease['shard_index']}" if lease else "暂无可领取的分片"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"领取分片失败: {str(e)}")
+
+@router.post("/leases/{lease_id}/heartbeat")
+async def heartbeat_lease(
+    lease_id: str,
+    request: WorkerRequest,
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
+) -> Dict[str, Any]:
+    """续约；租约已失效时返回 409，工作节点应放弃该分片"""
+    try:
+        lease = coordinator.heartbeat(lease_id, request.worker_id)
+        if lease is None:
+            raise HTTPException(status_code=409, detail=f"租约 {lease_id} 已失效")
+        return {
+            "success": True,
+            "data": lease,
+            "message": "续约成功"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"续约失败: {str(e)}")
+
+@router.post("/leases/{lease_id}/results")
+async def submit_shard_results(
+    lease_id: str,
+    request: ShardResultRequest,
+    task_manager: TaskManager = Depends(get_task_manager),
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
+) -> Dict[str, Any]:
+    """回传分片的结果项"""
+    try:
+        progress = coordinator.submit(lease_id, request.worker_id, request.items)
+        if progress is None:
+            raise HTTPException(status_code=404, detail=f"租约 {lease_id} 不存在")
+        if not progress["completed"] and not progress["budget_exceeded"]:
+            task_manager.update_task_progress(
+                progress["task_id"],
+                int(99 * progress["completed_questions"] / progress["total_questions"]),
+                progress["completed_questions"], progress["total_questions"]
+            )
+        return {
+            "success": True,
+            "data": progress,
+            "message": f"已接收 {progress['accepted']} 个结果项"
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"回传结果失败: {str(e)}")
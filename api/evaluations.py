@@ -3,8 +3,8 @@
 处理模型评估历史的查询操作
 """
 
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Query
+from typing import Dict, Any, Optional
 
 from .dependencies import get_evaluation_history
 from utils.model_evaluation_history import ModelEvaluationHistory
@@ -24,4 +24,68 @@ async def get_model_evaluations(
             "message": "评估历史获取成功"
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"获取评估历史失败: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"获取评估历史失败: {str(e)}") 
+
+@router.get("/model-evaluations/history")
+async def get_model_evaluation_runs(
+    model_name: Optional[str] = None,
+    dataset: Optional[str] = None,
+    evaluator_model: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = Query(500, ge=1, le=5000),
+    offset: int = Query(0, ge=0),
+    evaluation_history: ModelEvaluationHistory = Depends(get_evaluation_history)
+) -> Dict[str, Any]:
+    """按模型、数据集、评估模型和时间范围查询每次运行的评估记录"""
+    try:
+        runs = evaluation_history.get_evaluation_runs(
+            model_name=model_name,
+            dataset=dataset,
+            evaluator_model=evaluator_model,
+            start=start,
+            end=end,
+            limit=limit,
+            offset=offset
+        )
+        return {
+            "success": True,
+            "data": runs,
+            "message": "评估运行记录获取成功"
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取评估运行记录失败: {str(e)}")
+
+@router.get("/model-evaluations/trend")
+async def get_model_evaluation_trend(
+    model_name: Optional[str] = None,
+    dataset: Optional[str] = None,
+    evaluator_model: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    bucket: str = "day",
+    max_points: Optional[int] = Query(None, ge=1, le=2000),
+    evaluation_history: ModelEvaluationHistory = Depends(get_evaluation_history)
+) -> Dict[str, Any]:
+    """获取降采样后的分数和耗时趋势，用于绘制长期趋势图"""
+    try:
+        trend = evaluation_history.get_evaluation_trend(
+            model_name=model_name,
+            dataset=dataset,
+            evaluator_model=evaluator_model,
+            start=start,
+            end=end,
+            bucket=bucket,
+            max_points=max_points
+        )
+        return {
+            "success": True,
+            "data": trend,
+            "message": "评估趋势获取成功"
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取评估趋势失败: {str(e)}")
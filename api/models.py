@@ -9,6 +9,8 @@ from typing import Dict, Any
 from .dependencies import get_model_manager
 from .schemas import ModelConfig, APIResponse
 from models.model_manager import ModelManager
+from models.adaptive_limiter import list_limiter_metrics
+from models.resilience import list_resilience_metrics
 
 router = APIRouter(prefix="/api/models", tags=["models"])
 
@@ -25,6 +27,30 @@ async def get_models(model_manager: ModelManager = Depends(get_model_manager)) -
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"获取模型列表失败: {str(e)}")
 
+@router.get("/concurrency")
+async def get_concurrency_metrics() -> Dict[str, Any]:
+    """获取各模型端点的自适应并发限制指标"""
+    try:
+        return {
+            "success": True,
+            "data": list_limiter_metrics(),
+            "message": "并发限制指标获取成功"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取并发限制指标失败: {str(e)}")
+
+@router.get("/resilience")
+async def get_resilience_metrics() -> Dict[str, Any]:
+    """获取各模型端点的重试和熔断状态"""
+    try:
+        return {
+            "success": True,
+            "data": list_resilience_metrics(),
+            "message": "弹性层指标获取成功"
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"获取弹性层指标失败: {str(e)}")
+
 @router.post("")
 async def add_model(
     config: ModelConfig, 
@@ -13,6 +13,31 @@ class TaskCreateRequest(BaseModel):
     question_file: str = "sample_questions.json"
     config: Optional[Dict[str, Any]] = None
 
+class DistributedTaskRequest(TaskCreateRequest):
+    """创建分布式评估任务请求模型"""
+    shard_size: Optional[int] = None  # 每个分片的问题数
+    lease_seconds: Optional[float] = None  # 租约有效期（秒）
+
+class LeaseRequest(BaseModel):
+    """工作节点领取分片请求模型"""
+    worker_id: str
+    task_id: Optional[str] = None  # 只领取指定任务的分片
+
+class WorkerRequest(BaseModel):
+    """工作节点心跳请求模型"""
+    worker_id: str
+
+class ShardResultRequest(BaseModel):
+    """工作节点回传分片结果请求模型"""
+    worker_id: str
+    items: List[Dict[str, Any]]  # [{"index": 问题序号, "item": 结果项}]
+
+class PairwiseCompareRequest(BaseModel):
+    """成对比较请求模型"""
+    task_ids: List[str]  # 参与比较的已完成任务（每个任务代表一个模型的回答）
+    evaluator_model_name: str  # 判定胜负的评估模型
+    config: Optional[Dict[str, Any]] = None  # max_comparisons、batch_size、seed、swap_positions
+
 class ModelConfig(BaseModel):
     """模型配置模型"""
     name: str
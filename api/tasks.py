@@ -8,14 +8,91 @@ from typing import Dict, Any
 import uuid
 from datetime import datetime
 
-from .dependencies import get_task_manager, get_evaluator, get_evaluation_history
-from .schemas import TaskCreateRequest
+from .dependencies import (
+    get_task_manager, get_evaluator, get_evaluation_history, get_data_loader, get_distributed_coordinator
+)
+from .datasets import get_matching_answer_file
+from .schemas import TaskCreateRequest, PairwiseCompareRequest
 from core.task_manager import TaskManager
+from core.distributed import DistributedCoordinator
 from core.evaluator import Evaluator
+from core.task_planner import TaskPlanner
+from core.pairwise_comparison import PairwiseComparator, collect_task_answers
+from core.task_control import register_task_control, get_task_control, remove_task_control
+from utils.data_loader import DataLoader
 from utils.model_evaluation_history import ModelEvaluationHistory
 
 router = APIRouter(prefix="/api/tasks", tags=["tasks"])
 
+def load_task_dataset(request: TaskCreateRequest, data_loader: DataLoader):
+    """加载任务的问题集和匹配的答案集"""
+    questions = data_loader.load_questions_sync(request.question_file)
+    if not questions:
+        raise ValueError(f"问题集 {request.question_file} 不存在或为空")
+    answers = data_loader.load_answers_sync(get_matching_answer_file(request.question_file))
+    return questions, answers
+
+def task_run_config(request: TaskCreateRequest) -> Dict[str, Any]:
+    """任务的运行配置：附带问题集文件名（混合数据集使用结构化提示），不修改共享的评估器状态"""
+    return dict(request.config or {}, dataset_file=request.question_file)
+
+@router.post("/plan")
+async def plan_task(
+    request: TaskCreateRequest,
+    evaluator: Evaluator = Depends(get_evaluator),
+    data_loader: DataLoader = Depends(get_data_loader)
+) -> Dict[str, Any]:
+    """预估评估任务的 token、费用和耗时（只渲染提示和计数，不调用模型）"""
+    try:
+        questions, answers = load_task_dataset(request, data_loader)
+        plan = TaskPlanner(evaluator).plan(
+            request.target_model_name, request.evaluator_model_name,
+            questions, answers, task_run_config(request)
+        )
+        return {
+            "success": True,
+            "data": plan,
+            "message": "任务预估完成"
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"任务预估失败: {str(e)}")
+
+@router.post("/compare")
+async def compare_tasks(
+    request: PairwiseCompareRequest,
+    task_manager: TaskManager = Depends(get_task_manager),
+    evaluator: Evaluator = Depends(get_evaluator)
+) -> Dict[str, Any]:
+    """在已完成任务的结果上成对比较模型，返回 Bradley-Terry / Elo 排名"""
+    try:
+        tasks = []
+        for task_id in request.task_ids:
+            task = task_manager.get_task(task_id)
+            if not task:
+                raise HTTPException(status_code=404, detail=f"任务 {task_id} 不存在")
+            tasks.append(task)
+        judge_model = evaluator.model_manager.get_model(request.evaluator_model_name)
+        if not judge_model:
+            raise ValueError(f"评估模型 {request.evaluator_model_name} 不存在")
+
+        comparator = PairwiseComparator(judge_model, evaluator.prompt_loader, request.config)
+        comparison = await comparator.compare(collect_task_answers(tasks))
+        comparison["task_ids"] = request.task_ids
+        comparison["evaluator_model_name"] = request.evaluator_model_name
+        return {
+            "success": True,
+            "data": comparison,
+            "message": "成对比较完成"
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"成对比较失败: {str(e)}")
+
 @router.post("")
 async def create_task(
     request: TaskCreateRequest, 
@@ -36,6 +113,7 @@ async def create_task(
             "target_model_name": request.target_model_name,
             "evaluator_model_name": request.evaluator_model_name,
             "question_file": request.question_file,
+            "answer_file": get_matching_answer_file(request.question_file),
             "config": request.config or {},
             "status": "pending",
             "created_at": datetime.now().isoformat(),
@@ -102,10 +180,15 @@ async def list_tasks(
 @router.delete("/{task_id}")
 async def delete_task(
     task_id: str,
-    task_manager: TaskManager = Depends(get_task_manager)
+    task_manager: TaskManager = Depends(get_task_manager),
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
 ) -> Dict[str, Any]:
-    """删除指定任务"""
+    """删除指定任务（运行中的任务先取消，分布式任务的分片不再分配）"""
     try:
+        control = get_task_control(task_id)
+        if control is not None:
+            control.cancel()
+        coordinator.remove_task(task_id)
         success = task_manager.delete_task(task_id)
         if not success:
             raise HTTPException(status_code=404, detail=f"任务 {task_id} 不存在或删除失败")
@@ -120,13 +203,103 @@ async def delete_task(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"删除任务失败: {str(e)}")
 
+ACTION_NAMES = {"cancel": "取消", "pause": "暂停", "resume": "恢复"}
+
+def _control_task(task_id: str, action: str, task_manager: TaskManager,
+                  coordinator: DistributedCoordinator) -> Dict[str, Any]:
+    """对运行中的任务执行 cancel / pause / resume"""
+    task = task_manager.get_task(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail=f"任务 {task_id} 不存在")
+    if task.get("distributed"):
+        return _control_distributed_task(task_id, action, task_manager, coordinator)
+    control = get_task_control(task_id)
+    if control is None:
+        raise HTTPException(status_code=409, detail=f"任务 {task_id} 未在运行")
+    if not getattr(control, action)():
+        raise HTTPException(status_code=409, detail=f"任务 {task_id} 当前状态为 {control.state}，无法{ACTION_NAMES[action]}")
+    
+    # 取消后的最终状态由 run_evaluation 在评估返回后写入
+    status = {"pause": "paused", "resume": "running", "cancel": "cancelling"}[action]
+    task_manager.update_task_status(task_id, status)
+    return {
+        "success": True,
+        "data": control.snapshot(),
+        "message": f"任务 {task_id} 已{ACTION_NAMES[action]}"
+    }
+
+def _control_distributed_task(task_id: str, action: str, task_manager: TaskManager,
+                              coordinator: DistributedCoordinator) -> Dict[str, Any]:
+    """分布式任务的控制：暂停时不再分配分片，取消时移除任务并保存已回收的结果"""
+    if action == "cancel":
+        results = coordinator.cancel_task(task_id)
+        if results is None:
+            raise HTTPException(status_code=409, detail=f"任务 {task_id} 未在运行")
+        task_manager.update_task_results(task_id, results)
+        task_manager.update_task_status(task_id, "cancelled")
+        data = {"state": "cancelled", "completed_questions": results["completed_questions"]}
+    else:
+        if not getattr(coordinator, f"{action}_task")(task_id):
+            raise HTTPException(status_code=409, detail=f"任务 {task_id} 当前状态无法{ACTION_NAMES[action]}")
+        task_manager.update_task_status(task_id, "paused" if action == "pause" else "running")
+        data = coordinator.get_progress(task_id)
+    return {
+        "success": True,
+        "data": data,
+        "message": f"任务 {task_id} 已{ACTION_NAMES[action]}"
+    }
+
+@router.post("/{task_id}/cancel")
+async def cancel_task(
+    task_id: str,
+    task_manager: TaskManager = Depends(get_task_manager),
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
+) -> Dict[str, Any]:
+    """取消运行中的任务：中断进行中的模型请求，保存已完成部分的结果"""
+    try:
+        return _control_task(task_id, "cancel", task_manager, coordinator)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"取消任务失败: {str(e)}")
+
+@router.post("/{task_id}/pause")
+async def pause_task(
+    task_id: str,
+    task_manager: TaskManager = Depends(get_task_manager),
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
+) -> Dict[str, Any]:
+    """暂停运行中的任务：中断进行中的问题并释放并发槽位，恢复后重新执行这些问题"""
+    try:
+        return _control_task(task_id, "pause", task_manager, coordinator)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"暂停任务失败: {str(e)}")
+
+@router.post("/{task_id}/resume")
+async def resume_task(
+    task_id: str,
+    task_manager: TaskManager = Depends(get_task_manager),
+    coordinator: DistributedCoordinator = Depends(get_distributed_coordinator)
+) -> Dict[str, Any]:
+    """恢复暂停的任务"""
+    try:
+        return _control_task(task_id, "resume", task_manager, coordinator)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"恢复任务失败: {str(e)}")
+
 async def run_evaluation(task_id: str, request: TaskCreateRequest):
     """运行评估任务的后台函数"""
-    from .dependencies import get_task_manager, get_evaluator, get_evaluation_history
+    from .dependencies import get_task_manager, get_evaluator, get_evaluation_history, get_data_loader
     
     task_manager = get_task_manager()
     evaluator = get_evaluator()
     evaluation_history = get_evaluation_history()
+    data_loader = get_data_loader()
+    control = register_task_control(task_id)
     
     try:
         print(f"=== 开始执行任务 {task_id} ===")
@@ -146,25 +319,37 @@ async def run_evaluation(task_id: str, request: TaskCreateRequest):
                 print(f"更新进度失败: {e}")
         
         # 执行评估
+        questions, answers = load_task_dataset(request, data_loader)
         results = await evaluator.evaluate_model(
             target_model_name=request.target_model_name,
             evaluator_model_name=request.evaluator_model_name,
-            question_file=request.question_file,
-            config=request.config or {},
-            progress_callback=progress_callback
+            questions=questions,
+            answers=answers,
+            config=task_run_config(request),
+            progress_callback=progress_callback,
+            control=control
         )
         
         print(f"任务 {task_id} 评估完成，结果: {type(results)}")
+        if results.get("budget_exceeded"):
+            print(f"任务 {task_id} 超出预算（{results['budget']['exceeded']}），保存已完成的 "
+                  f"{results['completed_questions']}/{results['questions_count']} 个问题的结果")
         
         # 更新任务结果
         task_manager.update_task_results(task_id, results)
         
-        # 更新任务状态为完成
-        task_manager.update_task_status(task_id, "completed")
+        # 更新任务状态（取消或超出预算的任务保留已完成部分的结果）
+        if results.get("cancelled"):
+            status = "cancelled"
+        elif results.get("budget_exceeded"):
+            status = "budget_exceeded"
+        else:
+            status = "completed"
+        task_manager.update_task_status(task_id, status)
         
-        # 更新评估历史
+        # 更新评估历史（提前结束的任务只有部分结果，不计入历史）
         task_data = task_manager.get_task(task_id)
-        if task_data:
+        if task_data and status == "completed":
             evaluation_history.update_model_evaluation(task_data)
         
         print(f"任务 {task_id} 执行成功")
@@ -175,6 +360,9 @@ async def run_evaluation(task_id: str, request: TaskCreateRequest):
         traceback.print_exc()
         
         # 更新任务状态为失败
-        task_manager.update_task_status(task_id, "failed", str(e))
+        task_manager.update_task_error(task_id, str(e))
+        task_manager.update_task_status(task_id, "failed")
         
-        print(f"任务 {task_id} 状态已更新为失败") 
\ No newline at end of file
+        print(f"任务 {task_id} 状态已更新为失败")
+    finally:
+        remove_task_control(task_id)
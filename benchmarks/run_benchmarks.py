@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端性能基准测试
+功能：基于模拟模型测量评估吞吐量、任务存储、数据加载、提示渲染和任务轮询接口延迟，
+      输出机器可读的JSON，便于对比不同版本的运行结果
+
+使用示例：
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --quick --only evaluator_throughput
+    python benchmarks/run_benchmarks.py --output new.json --baseline old.json --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Callable
+
+# 添加项目根目录到Python路径
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from models.model_manager import ModelManager, MockModel
+from core.evaluator import Evaluator
+from core.task_manager import TaskManager
+from core.evaluation.logger import EvaluationLogger
+from utils.data_loader import DataLoader
+from utils.prompt_loader import PromptLoader
+
+QUESTIONS_FILE = os.path.join(ROOT_DIR, "data/questions/programming_questions_mixed.json")
+ANSWERS_FILE = os.path.join(ROOT_DIR, "data/answers/programming_answers_mixed.json")
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测代码的控制台输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+@contextlib.contextmanager
+def project_cwd():
+    """切换到项目根目录（评估模板等资源使用相对路径）"""
+    previous = os.getcwd()
+    os.chdir(ROOT_DIR)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """计算百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def timing_stats(samples: List[float]) -> Dict[str, float]:
+    """汇总耗时样本（秒）"""
+    return {
+        "mean": statistics.mean(samples) if samples else 0.0,
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+        "min": min(samples) if samples else 0.0,
+        "max": max(samples) if samples else 0.0
+    }
+
+
+def load_dataset() -> Dict[str, List[Dict]]:
+    """加载用作模板的编程数据集"""
+    with open(QUESTIONS_FILE, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    with open(ANSWERS_FILE, 'r', encoding='utf-8') as f:
+        answers = json.load(f)
+    return {"questions": questions, "answers": answers}
+
+
+def scale_dataset(dataset: Dict[str, List[Dict]], size: int) -> Dict[str, List[Dict]]:
+    """复制数据集到指定题目数，题目ID保持唯一"""
+    questions, answers = [], []
+    base_questions = dataset["questions"]
+    answer_map = {str(a["question_id"]): a for a in dataset["answers"]}
+    for i in range(size):
+        template = base_questions[i % len(base_questions)]
+        question = dict(template, id=i + 1)
+        questions.append(question)
+        answer = answer_map.get(str(template["id"]))
+        if answer:
+            answers.append(dict(answer, question_id=i + 1))
+    return {"questions": questions, "answers": answers}
+
+
+def bench_evaluator_throughput(args) -> Dict[str, Any]:
+    """Evaluator.evaluate_model 在不同并发度下的吞吐量（题/秒）"""
+    dataset = scale_dataset(load_dataset(), args.questions)
+    mock_config = {"seed": 1, "latency": {"distribution": "fixed", "mean": args.mock_latency}}
+    levels = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir, project_cwd():
+        model_manager = ModelManager(os.path.join(tmp_dir, "models.json"))
+        model_manager.models["bench-target"] = MockModel("bench-target", "mock-1", mock=mock_config)
+        model_manager.models["bench-judge"] = MockModel("bench-judge", "mock-1", mock=mock_config)
+
+        with quiet():
+            prompt_loader = PromptLoader()
+        evaluator = Evaluator(model_manager, prompt_loader)
+        evaluator.logger = EvaluationLogger(log_dir=os.path.join(tmp_dir, "logs"))
+
+        for concurrency in args.concurrency:
+            config = {"concurrency": concurrency, "request_interval": 0, "judge_interval": 0,
+                      "dataset_file": os.path.basename(QUESTIONS_FILE)}
+            start = time.perf_counter()
+            with quiet():
+                results = asyncio.run(evaluator.evaluate_model(
+                    "bench-target", "bench-judge",
+                    dataset["questions"], dataset["answers"], config
+                ))
+            elapsed = time.perf_counter() - start
+            levels.append({
+                "concurrency": concurrency,
+                "questions": len(dataset["questions"]),
+                "seconds": elapsed,
+                "questions_per_second": len(results["results"]) / elapsed if elapsed > 0 else 0.0,
+                # 模拟模型延迟之外的评估器自身开销
+                "overhead_seconds_per_question": max(
+                    0.0, elapsed * concurrency / len(dataset["questions"]) - 2 * args.mock_latency
+                )
+            })
+
+    return {"mock_latency_seconds": args.mock_latency, "levels": levels}
+
+
+def make_task_record(task_id: str, result_count: int) -> Dict[str, Any]:
+    """构造带有结果的任务记录"""
+    return {
+        "task_id": task_id,
+        "target_model_name": "bench-target",
+        "evaluator_model_name": "bench-judge",
+        "question_file": "programming_questions_mixed.json",
+        "config": {},
+        "status": "completed",
+        "created_at": datetime.now().isoformat(),
+        "progress": 100,
+        "results": {
+            "results": [
+                {
+                    "question_id": i,
+                    "question": "题目" * 50,
+                    "model_response": "回答" * 200,
+                    "reference_answer": "参考" * 200,
+                    "evaluation": {"scores": {"overall": 80}, "feedback": "反馈" * 50},
+                    "tokens_used": 500
+                }
+                for i in range(result_count)
+            ]
+        }
+    }
+
+
+def bench_task_manager(args) -> Dict[str, Any]:
+    """TaskManager 保存/加载耗时随任务数量的变化"""
+    points = []
+    for task_count in args.task_counts:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with quiet():
+                manager = TaskManager(data_dir=tmp_dir)
+
+            records = [make_task_record(f"bench{i:05d}", args.results_per_task) for i in range(task_count)]
+            save_samples = []
+            for record in records:
+                manager.tasks[record["task_id"]] = record
+                start = time.perf_counter()
+                manager.save_task(record["task_id"])
+                save_samples.append(time.perf_counter() - start)
+
+            # 进度更新会重写整个任务文件
+            progress_samples = []
+            for i in range(min(50, task_count)):
+                start = time.perf_counter()
+                manager.update_task_progress(records[i]["task_id"], 50)
+                progress_samples.append(time.perf_counter() - start)
+
+            manager.tasks = {}
+            start = time.perf_counter()
+            with quiet():
+                manager.load_tasks()
+            load_seconds = time.perf_counter() - start
+
+            points.append({
+                "task_count": task_count,
+                "results_per_task": args.results_per_task,
+                "save_seconds": timing_stats(save_samples),
+                "progress_update_seconds": timing_stats(progress_samples),
+                "load_all_seconds": load_seconds
+            })
+    return {"points": points}
+
+
+def bench_data_loader(args) -> Dict[str, Any]:
+    """DataLoader 加载耗时随数据集规模的变化"""
+    base = load_dataset()
+    points = []
+    for size in args.dataset_sizes:
+        dataset = scale_dataset(base, size)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            questions_dir = os.path.join(tmp_dir, "questions")
+            answers_dir = os.path.join(tmp_dir, "answers")
+            loader = DataLoader(questions_dir, answers_dir)
+            with open(os.path.join(questions_dir, "bench_questions.json"), 'w', encoding='utf-8') as f:
+                json.dump(dataset["questions"], f, ensure_ascii=False)
+            with open(os.path.join(answers_dir, "bench_answers.json"), 'w', encoding='utf-8') as f:
+                json.dump(dataset["answers"], f, ensure_ascii=False)
+
+            start = time.perf_counter()
+            questions = loader.load_questions_sync("bench_questions.json")
+            questions_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            answers = loader.load_answers_sync("bench_answers.json")
+            answers_seconds = time.perf_counter() - start
+
+            points.append({
+                "dataset_size": size,
+                "questions_loaded": len(questions),
+                "answers_loaded": len(answers),
+                "load_questions_seconds": questions_seconds,
+                "load_answers_seconds": answers_seconds
+            })
+    return {"points": points}
+
+
+def bench_prompt_render(args) -> Dict[str, Any]:
+    """目标模型提示和评估提示的渲染耗时"""
+    dataset = load_dataset()
+    answer_map = {str(a["question_id"]): a for a in dataset["answers"]}
+    target_samples, judge_samples = [], []
+
+    with project_cwd():
+        with quiet():
+            prompt_loader = PromptLoader()
+        dataset_file = os.path.basename(QUESTIONS_FILE)
+
+        model_answer = "<answer>\nprint('hello')\n</answer>" * 20
+        for _ in range(args.render_rounds):
+            for question in dataset["questions"]:
+                start = time.perf_counter()
+                with quiet():
+                    prompt_loader.create_model_prompt_with_answer_format(question)
+                target_samples.append(time.perf_counter() - start)
+
+                standard_answer = answer_map.get(str(question["id"]), {}).get("standard_answer", "")
+                start = time.perf_counter()
+                with quiet():
+                    prompt_loader.create_programming_evaluation_prompt(
+                        question, model_answer, standard_answer, question.get("type", "standard_answer"), dataset_file
+                    )
+                judge_samples.append(time.perf_counter() - start)
+
+    return {
+        "renders": len(target_samples),
+        "target_prompt_seconds": timing_stats(target_samples),
+        "judge_prompt_seconds": timing_stats(judge_samples)
+    }
+
+
+def bench_api_tasks(args) -> Dict[str, Any]:
+    """并发轮询 /api/tasks 的延迟"""
+    import httpx
+    from fastapi import FastAPI
+    from api.tasks import router as tasks_router
+    from api.dependencies import get_task_manager
+
+    async def run(manager: TaskManager, pollers: int) -> Dict[str, Any]:
+        app = FastAPI()
+        app.include_router(tasks_router)
+        app.dependency_overrides[get_task_manager] = lambda: manager
+
+        latencies: List[float] = []
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def poller():
+                for _ in range(args.polls_per_client):
+                    start = time.perf_counter()
+                    response = await client.get("/api/tasks")
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(poller() for _ in range(pollers)))
+            elapsed = time.perf_counter() - start
+
+        return {
+            "pollers": pollers,
+            "requests": len(latencies),
+            "requests_per_second": len(latencies) / elapsed if elapsed > 0 else 0.0,
+            "latency_seconds": timing_stats(latencies)
+        }
+
+    points = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        with quiet():
+            manager = TaskManager(data_dir=tmp_dir)
+        # 直接写入内存，避免自动清理只保留最近的任务
+        for i in range(args.api_tasks):
+            record = make_task_record(f"poll{i:05d}", args.results_per_task)
+            manager.tasks[record["task_id"]] = record
+
+        for pollers in args.pollers:
+            point = asyncio.run(run(manager, pollers))
+            point["tasks"] = args.api_tasks
+            points.append(point)
+    return {"points": points}
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "evaluator_throughput": bench_evaluator_throughput,
+    "task_manager": bench_task_manager,
+    "data_loader": bench_data_loader,
+    "prompt_render": bench_prompt_render,
+    "api_tasks": bench_api_tasks,
+}
+
+
+def git_commit() -> str:
+    """获取当前提交号"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return "unknown"
+
+
+def flatten_metrics(data: Any, prefix: str = "") -> Dict[str, float]:
+    """把嵌套结果展开为 路径 -> 数值，用于对比两次运行"""
+    flat = {}
+    if isinstance(data, dict):
+        for key, value in data.items():
+            flat.update(flatten_metrics(value, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(data, list):
+        for i, value in enumerate(data):
+            flat.update(flatten_metrics(value, f"{prefix}[{i}]"))
+    elif isinstance(data, (int, float)) and not isinstance(data, bool):
+        flat[prefix] = float(data)
+    return flat
+
+
+def compare_runs(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[Dict[str, Any]]:
+    """对比两次运行，返回超过阈值的退化项
+
+    名称包含 per_second 的指标越大越好，其余耗时指标越小越好
+    """
+    regressions = []
+    current_flat = flatten_metrics(current.get("benchmarks", {}))
+    baseline_flat = flatten_metrics(baseline.get("benchmarks", {}))
+    for key, value in current_flat.items():
+        old = baseline_flat.get(key)
+        if old is None or old == 0:
+            continue
+        if "seconds" not in key and "per_second" not in key:
+            continue
+        higher_is_better = "per_second" in key
+        change = (value - old) / abs(old)
+        worse = -change if higher_is_better else change
+        if worse > threshold:
+            regressions.append({"metric": key, "baseline": old, "current": value, "change": change})
+    return regressions
+
+
+def parse_int_list(value: str) -> List[int]:
+    return [int(x) for x in value.split(",") if x.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大模型测评系统性能基准测试")
+    parser.add_argument("--output", help="结果JSON输出路径（默认输出到标准输出）")
+    parser.add_argument("--only", help="只运行指定的基准，逗号分隔: " + ",".join(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="使用较小的规模快速运行")
+    parser.add_argument("--baseline", help="用于对比的历史结果JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定退化的相对变化阈值")
+    parser.add_argument("--questions", type=int, default=80)
+    parser.add_argument("--concurrency", type=parse_int_list, default=[1, 2, 4, 8, 16])
+    parser.add_argument("--mock-latency", type=float, default=0.02)
+    parser.add_argument("--task-counts", type=parse_int_list, default=[10, 100, 500])
+    parser.add_argument("--results-per-task", type=int, default=20)
+    parser.add_argument("--dataset-sizes", type=parse_int_list, default=[10, 100, 1000, 5000])
+    parser.add_argument("--render-rounds", type=int, default=20)
+    parser.add_argument("--api-tasks", type=int, default=50)
+    parser.add_argument("--pollers", type=parse_int_list, default=[1, 8, 32])
+    parser.add_argument("--polls-per-client", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.quick:
+        args.questions = 20
+        args.concurrency = [1, 4]
+        args.task_counts = [10, 50]
+        args.dataset_sizes = [10, 100]
+        args.render_rounds = 2
+        args.api_tasks = 10
+        args.pollers = [1, 4]
+        args.polls_per_client = 5
+
+    selected = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in selected if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知的基准: {', '.join(unknown)}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick
+        },
+        "benchmarks": {}
+    }
+    for name in selected:
+        print(f"⏱️ 运行基准: {name}", file=sys.stderr)
+        start = time.perf_counter()
+        report["benchmarks"][name] = BENCHMARKS[name](args)
+        print(f"   完成，用时 {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        report["regressions"] = compare_runs(report, baseline, args.threshold)
+        if report["regressions"]:
+            print(f"⚠️ 发现 {len(report['regressions'])} 项性能退化", file=sys.stderr)
+            exit_code = 1
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式评估协调模块
+功能：把一个评估任务的问题切成分片，由多台机器上的工作节点通过 HTTP 领取（租约）、心跳续约并回传结果项；
+      租约到期未续约的分片重新排队，所有分片完成后按原始顺序合并结果并计算汇总。
+      任务配置了 budget 时由协调节点在每次回收分片结果和分配分片时检查，超出后停止分配并以部分结果结束任务。
+      工作节点见 core/distributed_worker.py，HTTP 接口见 api/distributed.py
+"""
+
+import threading
+import time
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+from .evaluation.budget import TaskBudget
+from .sharded_runner import summarize_result_items
+
+# 每个分片的问题数
+DEFAULT_SHARD_SIZE = 10
+# 租约有效期（秒），工作节点需在到期前发送心跳
+DEFAULT_LEASE_SECONDS = 60.0
+
+
+class ShardLease:
+    """一个分片的租约"""
+
+    def __init__(self, task_id: str, shard_index: int, worker_id: str, lease_seconds: float):
+        self.lease_id = uuid.uuid4().hex[:12]
+        self.task_id = task_id
+        self.shard_index = shard_index
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.expires_at = time.monotonic() + lease_seconds
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def renew(self):
+        self.expires_at = time.monotonic() + self.lease_seconds
+
+
+class DistributedTask:
+    """协调节点上的一个分布式评估任务"""
+
+    def __init__(self, task_id: str, target_model_name: str, evaluator_model_name: str,
+                 questions: List[Dict], answers: List[Dict], config: Dict[str, Any],
+                 dataset_file: Optional[str], shard_size: int, lease_seconds: float,
+                 on_complete: Optional[Callable] = None, budget: Optional[TaskBudget] = None):
+        self.task_id = task_id
+        self.target_model_name = target_model_name
+        self.evaluator_model_name = evaluator_model_name
+        # 没有ID的问题按全局序号补上，工作节点按ID匹配参考答案
+        self.questions = [
+            question if question.get('id') or question.get('question_id') else dict(question, id=index + 1)
+            for index, question in enumerate(questions)
+        ]
+        self.answers = answers
+        self.config = config
+        self.dataset_file = dataset_file
+        self.lease_seconds = lease_seconds
+        self.on_complete = on_complete
+        shard_size = max(1, int(shard_size))
+        self.shards = [
+            list(range(start, min(start + shard_size, len(self.questions))))
+            for start in range(0, len(self.questions), shard_size)
+        ]
+        self.pending = deque(range(len(self.shards)))
+        self.leases: Dict[str, ShardLease] = {}
+        self.expired_leases: Dict[str, ShardLease] = {}  # 到期被回收的租约，其结果仍可提交
+        self.done_shards = set()
+        self.items: Dict[int, Dict[str, Any]] = {}
+        self.requeued = 0
+        self.workers: Dict[str, int] = {}  # 工作节点 -> 完成的分片数
+        self.start_time = datetime.now()
+        self.results: Optional[Dict[str, Any]] = None
+        self.paused = False  # 暂停时不再分配分片，已领取的分片继续完成
+        self.budget = budget or TaskBudget()  # 按回收的结果项累计消耗
+
+    @property
+    def completed(self) -> bool:
+        return len(self.done_shards) == len(self.shards)
+
+    def shard_answers(self, indices: List[int]) -> List[Dict]:
+        """分片中问题对应的参考答案（按问题ID匹配，找不到时退回按序号匹配）"""
+        question_ids = {
+            str(self.questions[i].get('id') or self.questions[i].get('question_id')) for i in indices
+        }
+        matched = [
+            answer for answer in self.answers
+            if str(answer.get('question_id') or answer.get('id')) in question_ids
+        ]
+        if matched:
+            return matched
+        return [self.answers[i] for i in indices if i < len(self.answers)]
+
+
+class DistributedCoordinator:
+    """分布式评估的任务存储：分片排队、租约、心跳、结果回收和合并"""
+
+    def __init__(self, evaluator, shard_size: int = DEFAULT_SHARD_SIZE,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        self.evaluator = evaluator
+        self.shard_size = shard_size
+        self.lease_seconds = lease_seconds
+        self.tasks: Dict[str, DistributedTask] = {}
+        self.lock = threading.Lock()
+
+    def create_task(self, task_id: str, target_model_name: str, evaluator_model_name: str,
+                    questions: List[Dict], answers: List[Dict], config: Optional[Dict[str, Any]] = None,
+                    dataset_file: Optional[str] = None, shard_size: Optional[int] = None,
+                    lease_seconds: Optional[float] = None,
+                    on_complete: Optional[Callable] = None) -> Dict[str, Any]:
+        """登记分布式任务；所有分片完成（或超出预算）后以合并的结果调用 on_complete(results)"""
+        if not questions:
+            raise ValueError("问题集为空")
+        config = config or {}
+        budget = None
+        if config.get("budget"):
+            model_manager = self.evaluator.model_manager
+            budget = TaskBudget(config["budget"], model_manager.get_model_pricing(target_model_name),
+                                model_manager.get_model_pricing(evaluator_model_name))
+        task = DistributedTask(
+            task_id, target_model_name, evaluator_model_name, questions, answers, config,
+            dataset_file, shard_size or self.shard_size, lease_seconds or self.lease_seconds, on_complete, budget
+        )
+        with self.lock:
+            if task_id in self.tasks:
+                raise ValueError(f"分布式任务 {task_id} 已存在")
+            self.tasks[task_id] = task
+        print(f"🌐 分布式任务 {task_id}：{len(task.questions)} 个问题分为 {len(task.shards)} 个分片")
+        return self._progress(task)
+
+    def lease(self, worker_id: str, task_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """为工作节点分配一个待评估的分片，没有可领取的分片时返回 None"""
+        payload = None
+        finished = []
+        with self.lock:
+            candidates = [self.tasks[task_id]] if task_id in self.tasks else (
+                [] if task_id else list(self.tasks.values())
+            )
+            for task in candidates:
+                if task.paused or task.results is not None:
+                    continue
+                if self._finish_if_over_budget(task):  # 运行时间超出预算
+                    finished.append(task)
+                    continue
+                self._requeue_expired(task)
+                while task.pending and payload is None:
+                    shard_index = task.pending.popleft()
+                    if shard_index in task.done_shards:
+                        continue
+                    lease = ShardLease(task.task_id, shard_index, worker_id, task.lease_seconds)
+                    task.leases[lease.lease_id] = lease
+                    payload = self._lease_payload(task, lease)
+                if payload is not None:
+                    break
+        for task in finished:
+            self._notify_finished(task)
+        return payload
+
+    def heartbeat(self, lease_id: str, worker_id: str) -> Optional[Dict[str, Any]]:
+        """续约；租约已到期被回收、分片已完成或租约不属于该节点时返回 None"""
+        with self.lock:
+            lease = self._find_lease(lease_id)
+            if lease is None or lease.worker_id != worker_id:
+                return None
+            task = self.tasks[lease.task_id]
+            if lease_id not in task.leases or lease.expired:
+                self._requeue_expired(task)
+                return None
+            lease.renew()
+            return {"lease_id": lease_id, "lease_seconds": lease.lease_seconds}
+
+    def submit(self, lease_id: str, worker_id: str, items: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """回收分片的结果项（每项为 {"index": 问题序号, "item": 结果项}）；租约未知时返回 None
+
+        租约到期后提交的结果只要分片尚未由其他节点完成仍然有效；分片已完成时忽略重复的结果。
+        接收的结果项计入任务预算，超出预算时任务以已回收的结果结束，其余租约随任务移除而失效
+        """
+        with self.lock:
+            lease = self._find_lease(lease_id)
+            if lease is None or lease.worker_id != worker_id:
+                return None
+            task = self.tasks[lease.task_id]
+            task.leases.pop(lease_id, None)
+            task.expired_leases.pop(lease_id, None)
+            accepted = 0
+            if lease.shard_index not in task.done_shards:
+                shard = set(task.shards[lease.shard_index])
+                for entry in items:
+                    index = int(entry["index"])
+                    if index in shard and index not in task.items:
+                        task.items[index] = entry["item"]
+                        task.budget.record(entry["item"])
+                        accepted += 1
+                if shard.issubset(task.items):
+                    task.done_shards.add(lease.shard_index)
+                    task.workers[worker_id] = task.workers.get(worker_id, 0) + 1
+                    # 分片可能因租约到期已重新排队或被其他节点领取，作废这些重复的租约（其结果提交时被忽略）
+                    for other_id in [k for k, v in task.leases.items() if v.shard_index == lease.shard_index]:
+                        task.expired_leases[other_id] = task.leases.pop(other_id)
+                else:
+                    task.pending.appendleft(lease.shard_index)  # 结果不完整，分片重新排队
+            just_finished = False
+            if task.results is None:
+                if task.completed:
+                    task.results = self._merge(task)
+                    just_finished = True
+                else:
+                    just_finished = self._finish_if_over_budget(task)
+            progress = self._progress(task)
+            progress["accepted"] = accepted
+
+        if just_finished:
+            self._notify_finished(task)
+        return progress
+
+    def get_progress(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None:
+                return None
+            self._requeue_expired(task)
+            return self._progress(task)
+
+    def pause_task(self, task_id: str) -> bool:
+        """暂停分配分片；任务不存在或已暂停时返回 False"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None or task.paused:
+                return False
+            task.paused = True
+            return True
+
+    def resume_task(self, task_id: str) -> bool:
+        """恢复分配分片；任务不存在或未暂停时返回 False"""
+        with self.lock:
+            task = self.tasks.get(task_id)
+            if task is None or not task.paused:
+                return False
+            task.paused = False
+            return True
+
+    def cancel_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """取消任务并返回已完成问题的合并结果（cancelled 为 True）；任务不存在时返回 None
+
+        任务移除后工作节点的心跳和结果回传都会失败，工作节点随即放弃正在处理的分片
+        """
+        with self.lock:
+            task = self.tasks.pop(task_id, None)
+            if task is None:
+                return None
+            results = self._merge(task)
+        results["cancelled"] = True
+        results["completed_questions"] = len(task.items)
+        print(f"🛑 分布式任务 {task_id} 已取消，保留 {len(task.items)}/{len(task.questions)} 个问题的结果")
+        return results
+
+    def remove_task(self, task_id: str) -> bool:
+        """移除任务（完成、取消或删除后释放内存）；任务不存在时返回 False"""
+        with self.lock:
+            return self.tasks.pop(task_id, None) is not None
+
+    def _finish_if_over_budget(self, task: DistributedTask) -> bool:
+        """检查任务预算，超出时合并已回收的结果并返回 True（调用方持有锁）"""
+        if not task.budget.enabled or task.budget.check() is None:
+            return False
+        task.results = self._merge(task)
+        return True
+
+    def _notify_finished(self, task: DistributedTask):
+        """任务结束（全部完成或超出预算）后调用 on_complete（不持有锁）"""
+        if task.results.get("budget_exceeded"):
+            print(f"⛔ 分布式任务 {task.task_id} 超出预算，保留 {len(task.items)}/{len(task.questions)} 个问题的结果")
+        else:
+            print(f"✅ 分布式任务 {task.task_id} 的 {len(task.shards)} 个分片全部完成")
+        if task.on_complete:
+            task.on_complete(task.results)
+
+    def _find_lease(self, lease_id: str) -> Optional[ShardLease]:
+        for task in self.tasks.values():
+            lease = task.leases.get(lease_id) or task.expired_leases.get(lease_id)
+            if lease is not None:
+                return lease
+        return None
+
+    def _requeue_expired(self, task: DistributedTask):
+        """到期未续约的租约作废，分片放回队首优先重新分配"""
+        for lease_id, lease in list(task.leases.items()):
+            if lease.expired:
+                del task.leases[lease_id]
+                task.expired_leases[lease_id] = lease
+                if lease.shard_index not in task.done_shards:
+                    task.pending.appendleft(lease.shard_index)
+                    task.requeued += 1
+                    print(f"⏰ 分片 {lease.shard_index} 的租约已到期（节点 {lease.worker_id}），重新排队")
+
+    def _lease_payload(self, task: DistributedTask, lease: ShardLease) -> Dict[str, Any]:
+        indices = task.shards[lease.shard_index]
+        return {
+            "lease_id": lease.lease_id,
+            "lease_seconds": lease.lease_seconds,
+            "task_id": task.task_id,
+            "shard_index": lease.shard_index,
+            "total_questions": len(task.questions),
+            "target_model_name": task.target_model_name,
+            "evaluator_model_name": task.evaluator_model_name,
+            "config": task.config,
+            "dataset_file": task.dataset_file,
+            "questions": [{"index": i, "question": task.questions[i]} for i in indices],
+            "answers": task.shard_answers(indices)
+        }
+
+    def _merge(self, task: DistributedTask) -> Dict[str, Any]:
+        """按原始问题顺序合并已回收的结果项（取消的任务只包含已完成的问题）"""
+        items = [task.items[i] for i in sorted(task.items)]
+        results = summarize_result_items(
+            self.evaluator, task.target_model_name, task.evaluator_model_name,
+            len(task.questions), items, task.start_time
+        )
+        results["distributed"] = {
+            "shards": len(task.shards),
+            "requeued": task.requeued,
+            "workers": dict(task.workers)
+        }
+        if task.budget.enabled:
+            results["budget"] = task.budget.snapshot()
+            results["budget_exceeded"] = task.budget.exceeded is not None
+            results["completed_questions"] = len(task.items)
+        return results
+
+    def _progress(self, task: DistributedTask) -> Dict[str, Any]:
+        return {
+            "task_id": task.task_id,
+            "total_questions": len(task.questions),
+            "completed_questions": len(task.items),
+            "total_shards": len(task.shards),
+            "completed_shards": len(task.done_shards),
+            "pending_shards": len(task.pending),
+            "active_leases": len(task.leases),
+            "requeued": task.requeued,
+            "workers": dict(task.workers),
+            "paused": task.paused,
+            "budget_exceeded": task.budget.exceeded is not None,
+            "completed": task.completed
+        }
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式评估工作节点
+功能：从协调节点（api/distributed.py）领取问题分片，用本机的模型配置逐题生成并评估
+      （Evaluator._generate_model_response + evaluate_response），处理期间定时心跳续约，完成后回传结果项
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import uuid
+from typing import Dict, Any, Optional
+
+import httpx
+
+# 没有待领取的分片时的轮询间隔（秒）
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class LeaseLostError(Exception):
+    """租约已被协调节点回收（到期或分片已由其他节点完成）"""
+
+
+class DistributedWorker:
+    """分布式评估工作节点"""
+
+    def __init__(self, evaluator, coordinator_url: Optional[str] = None, worker_id: Optional[str] = None,
+                 client: Optional[httpx.AsyncClient] = None, poll_interval: float = DEFAULT_POLL_INTERVAL):
+        self.evaluator = evaluator
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}"
+        self.client = client or httpx.AsyncClient(base_url=coordinator_url, timeout=30.0)
+        self.poll_interval = poll_interval
+        self.stats = {"shards": 0, "questions": 0, "lost_leases": 0, "failed_shards": 0}
+
+    async def run(self, task_id: Optional[str] = None, wait: bool = False) -> Dict[str, Any]:
+        """循环领取并处理分片；wait 为 False 时没有可领取的分片即退出"""
+        print(f"🛠️ 工作节点 {self.worker_id} 启动")
+        while True:
+            lease = await self._post("/api/distributed/lease", {"worker_id": self.worker_id, "task_id": task_id})
+            if lease is None:
+                if not wait:
+                    break
+                await asyncio.sleep(self.poll_interval)
+                continue
+            try:
+                await self.process_lease(lease)
+            except LeaseLostError:
+                self.stats["lost_leases"] += 1
+                print(f"⚠️ 分片 {lease['shard_index']} 的租约已失效，放弃该分片")
+            except Exception as e:
+                # 不再续约，租约到期后协调节点把分片重新分配给其他节点
+                self.stats["failed_shards"] += 1
+                print(f"❌ 分片 {lease['shard_index']} 评估失败，等待租约到期后重新分配: {e}")
+                await asyncio.sleep(self.poll_interval)
+        print(f"工作节点 {self.worker_id} 结束: {self.stats}")
+        return self.stats
+
+    async def process_lease(self, lease: Dict[str, Any]):
+        """评估一个分片并回传结果项"""
+        heartbeat = asyncio.create_task(self._heartbeat(lease))
+        work = asyncio.create_task(self._evaluate_shard(lease))
+        done, _ = await asyncio.wait({heartbeat, work}, return_when=asyncio.FIRST_COMPLETED)
+        if work not in done:
+            # 心跳失败说明租约已被回收，停止该分片的模型请求
+            work.cancel()
+            await asyncio.gather(work, return_exceptions=True)
+            heartbeat.result()
+        heartbeat.cancel()
+        await asyncio.gather(heartbeat, return_exceptions=True)
+        items = work.result()
+
+        try:
+            await self._post(f"/api/distributed/leases/{lease['lease_id']}/results",
+                             {"worker_id": self.worker_id, "items": items})
+        except httpx.HTTPStatusError as e:
+            # 任务已完成、取消或删除时租约不再存在
+            if e.response.status_code in (404, 409):
+                raise LeaseLostError(lease["lease_id"])
+            raise
+        self.stats["shards"] += 1
+        self.stats["questions"] += len(items)
+
+    async def _evaluate_shard(self, lease: Dict[str, Any]):
+        evaluator = self.evaluator
+        target_model = evaluator.model_manager.get_model(lease["target_model_name"])
+        evaluator_model = evaluator.model_manager.get_model(lease["evaluator_model_name"])
+        if not target_model:
+            raise ValueError(f"待评估模型 {lease['target_model_name']} 在本节点不存在")
+        if not evaluator_model:
+            raise ValueError(f"评估模型 {lease['evaluator_model_name']} 在本节点不存在")
+
+        config = dict(lease["config"], dataset_file=lease.get("dataset_file"))
+        answer_map = evaluator._create_answer_mapping(lease["answers"])
+        semaphore = asyncio.Semaphore(max(1, int(config.get("concurrency", 1))))
+        progress_state = {"completed": 0, "reported": 0}
+
+        async def run_question(entry: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                item = await evaluator._evaluate_question(
+                    entry["index"], entry["question"], lease["total_questions"], answer_map,
+                    target_model, evaluator_model, config, progress_state, None
+                )
+            return {"index": entry["index"], "item": item}
+
+        dataset_name = (lease.get("dataset_file") or "unknown").split('/')[-1].replace('.json', '')
+        evaluator.logger.start_evaluation_session(target_model.name, evaluator_model.name, dataset_name)
+        try:
+            return await asyncio.gather(*(run_question(entry) for entry in lease["questions"]))
+        finally:
+            evaluator.logger.log_session_end()
+
+    async def _heartbeat(self, lease: Dict[str, Any]):
+        """每三分之一租约期续约一次，续约失败时抛出 LeaseLostError"""
+        while True:
+            await asyncio.sleep(lease["lease_seconds"] / 3)
+            try:
+                await self._post(f"/api/distributed/leases/{lease['lease_id']}/heartbeat",
+                                 {"worker_id": self.worker_id})
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 409:
+                    raise LeaseLostError(lease["lease_id"])
+                print(f"心跳失败，稍后重试: {e}")
+            except httpx.HTTPError as e:
+                print(f"心跳失败，稍后重试: {e}")
+
+    async def _post(self, path: str, payload: Dict[str, Any]) -> Any:
+        response = await self.client.post(path, json=payload)
+        response.raise_for_status()
+        return response.json().get("data")
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def main():
+    """命令行入口：启动一个工作节点"""
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from models.model_manager import ModelManager
+    from utils.prompt_loader import PromptLoader
+    from core.evaluator import Evaluator
+
+    parser = argparse.ArgumentParser(description="分布式评估工作节点")
+    parser.add_argument("--coordinator", required=True, help="协调节点地址，如 http://10.0.0.1:8000")
+    parser.add_argument("--config", default="config/models.json", help="本节点的模型配置文件")
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--task-id", default=None, help="只处理指定任务的分片")
+    parser.add_argument("--wait", action="store_true", help="没有可领取的分片时继续等待")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL)
+    args = parser.parse_args()
+
+    async def run():
+        evaluator = Evaluator(ModelManager(args.config), PromptLoader())
+        worker = DistributedWorker(evaluator, args.coordinator, args.worker_id, poll_interval=args.poll_interval)
+        try:
+            return await worker.run(args.task_id, wait=args.wait)
+        finally:
+            await worker.close()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,14 @@ from .evaluation_types import (
 )
 from .score_calculator import ScoreCalculator
 from .text_analyzer import TextAnalyzer
+from .tokenizer import get_tokenizer
 from .programming_evaluator import ProgrammingEvaluator
+from .execution_grader import ExecutionGrader
+from .grading_router import GradingRouter
+from .batch_judge import BatchJudge
+from .judge_ensemble import JudgeEnsemble
+from .budget import TaskBudget
+from .judge_parser import JudgeOutputParser
 from .logger import EvaluationLogger
 
 __all__ = [
@@ -29,6 +36,13 @@ __all__ = [
     'ReferenceAnswer',
     'ScoreCalculator',
     'TextAnalyzer',
+    'get_tokenizer',
     'ProgrammingEvaluator',
+    'ExecutionGrader',
+    'GradingRouter',
+    'BatchJudge',
+    'JudgeEnsemble',
+    'TaskBudget',
+    'JudgeOutputParser',
     'EvaluationLogger'
 ] 
\ No newline at end of file
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量评估模块
+把评估规则相同的多个问题/回答合并到一个评估模型请求中，要求返回JSON数组并按 index 拆分，
+分摊评分规则和输出格式说明等重复内容；解析失败的条目回退为逐题评估
+"""
+
+import asyncio
+from typing import Dict, List, Any, Optional
+
+from .programming_evaluator import ProgrammingEvaluator
+from .judge_parser import validate_evaluation, build_evaluation_response_format
+
+
+class BatchJudge:
+    """评估请求的微批处理器
+
+    并发的评估任务调用 evaluate() 提交条目，同一规则的条目攒够 batch_size 个
+    或等待超过 max_wait 秒后合并发送；batch_size <= 1 时等同于逐题评估
+    """
+
+    def __init__(self, programming_evaluator: ProgrammingEvaluator, evaluator_model,
+                 batch_size: int = 4, max_wait: float = 0.5, request_interval: float = 0,
+                 logger=None, repair_retries: int = 1, dataset_file: Optional[str] = None):
+        self.programming_evaluator = programming_evaluator
+        self.prompt_loader = programming_evaluator.prompt_loader
+        self.evaluator_model = evaluator_model
+        self.batch_size = max(1, int(batch_size))
+        self.max_wait = max_wait
+        self.request_interval = request_interval
+        self.logger = logger
+        self.repair_retries = repair_retries
+        self.dataset_file = dataset_file  # 问题集文件名，决定评估模板的查找
+
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._timers: Dict[str, asyncio.Task] = {}
+        self._flushes = set()
+
+        self.batches = 0            # 合并发送的批量请求数
+        self.batched_items = 0      # 通过批量请求得到结果的条目数
+        self.single_requests = 0    # 逐题评估的请求数（不可合并、批内只有一项或回退）
+        self.fallback_items = 0     # 批量结果缺失或无法解析而回退逐题评估的条目数
+
+    async def evaluate(self, question_data: dict, model_answer: str,
+                       standard_answer: str) -> Dict[str, Any]:
+        """评估一个回答，返回值与 ProgrammingEvaluator.evaluate_programming_response 相同"""
+        rubric_key = self.prompt_loader.get_evaluation_rubric_key(question_data, self.dataset_file) \
+            if self.batch_size > 1 else None
+        if rubric_key is None:
+            return await self._evaluate_single(question_data, model_answer, standard_answer, self.logger)
+
+        future = asyncio.get_running_loop().create_future()
+        items = self._pending.setdefault(rubric_key, [])
+        items.append({
+            "question_data": question_data,
+            "model_answer": model_answer,
+            "standard_answer": standard_answer,
+            "future": future
+        })
+        if len(items) >= self.batch_size:
+            self._start_flush(rubric_key)
+        elif rubric_key not in self._timers:
+            self._timers[rubric_key] = asyncio.create_task(self._flush_later(rubric_key))
+        return await future
+
+    async def _flush_later(self, rubric_key: str):
+        """等待 max_wait 秒后发送未攒满的批次"""
+        await asyncio.sleep(self.max_wait)
+        self._timers.pop(rubric_key, None)
+        self._start_flush(rubric_key)
+
+    def _start_flush(self, rubric_key: str):
+        """取出待发送的条目并在独立任务中发送，避免某个提交方被取消时影响整批"""
+        timer = self._timers.pop(rubric_key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        items = self._pending.pop(rubric_key, [])
+        if not items:
+            return
+        task = asyncio.create_task(self._flush(items))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, items: List[Dict[str, Any]]):
+        """发送一个批次并把结果分发给各条目"""
+        if len(items) == 1:
+            await self._resolve_single(items[0])
+            return
+
+        results = await self._evaluate_batch(items)
+        retry = []
+        for index, item in enumerate(items):
+            result = results.get(index)
+            if result is None:
+                retry.append(item)
+            elif not item["future"].done():
+                item["future"].set_result(result)
+
+        if retry:
+            self.fallback_items += len(retry)
+            print(f"批量评估有 {len(retry)}/{len(items)} 个条目未得到有效结果，回退逐题评估")
+            await asyncio.gather(*(self._resolve_single(item) for item in retry))
+
+    async def _evaluate_batch(self, items: List[Dict[str, Any]]) -> Dict[int, Dict[str, Any]]:
+        """发送批量评估请求，返回 {条目序号: 评估结果}；请求失败或无法解析时返回空字典"""
+        prompt = self.prompt_loader.create_batch_programming_evaluation_prompt(items)
+        print(f"📦 批量评估 {len(items)} 个条目")
+        try:
+            if self.request_interval > 0:
+                await asyncio.sleep(self.request_interval)
+            self.batches += 1
+            generate_kwargs = {"max_tokens": min(5000 * len(items), 16000), "temperature": 0.7}
+            if getattr(self.evaluator_model, 'structured_output', None) == "json_schema":
+                # JSON 模式要求根节点为对象，与提示中的数组格式冲突，只在支持 json_schema 时请求结构化输出
+                sub_count = len(items[0]['question_data'].get('sub_questions', []))
+                generate_kwargs["response_format"] = build_evaluation_response_format(sub_count, batch=True)
+            response = await self.evaluator_model.generate(prompt, **generate_kwargs)
+        except Exception as e:
+            print(f"批量评估请求失败: {e}")
+            return {}
+        if response.get('error'):
+            print(f"批量评估请求失败: {response['error']}")
+            return {}
+
+        entries, parse_path = self.programming_evaluator.judge_parser.parse_array(response.get('content', ''))
+        if not entries:
+            print(f"批量评估结果中没有找到JSON数组")
+            return {}
+
+        # 评估模型的 token 消耗（含缓存命中的输入 token）平均分摊到各条目
+        total_tokens = response.get('usage', {}).get('total_tokens', 0)
+        share, remainder = divmod(total_tokens, len(items))
+        cached_share, cached_remainder = divmod(response.get('cached_tokens', 0), len(items))
+        prompt_share, prompt_remainder = divmod(response.get('usage', {}).get('prompt_tokens', 0), len(items))
+
+        results = {}
+        for position, entry in enumerate(entries):
+            index = entry.get('index', position)
+            if not isinstance(index, int) or not 0 <= index < len(items) or index in results:
+                continue
+            question_data = items[index]["question_data"]
+            error = validate_evaluation(entry, len(question_data.get('sub_questions', [])) or None)
+            if error:
+                print(f"批量评估条目 {index} 无效: {error}")
+                continue
+            tokens = share + (remainder if index == 0 else 0)
+            cached_tokens = cached_share + (cached_remainder if index == 0 else 0)
+            prompt_tokens = prompt_share + (prompt_remainder if index == 0 else 0)
+            results[index] = self.programming_evaluator.build_evaluation_result(
+                question_data, entry, tokens, cached_tokens, prompt_tokens
+            )
+            results[index]['parse_path'] = parse_path
+        self.batched_items += len(results)
+        return results
+
+    async def _resolve_single(self, item: Dict[str, Any]):
+        """逐题评估一个条目并设置其结果"""
+        future = item["future"]
+        try:
+            result = await self._evaluate_single(
+                item["question_data"], item["model_answer"], item["standard_answer"]
+            )
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+            return
+        if not future.done():
+            future.set_result(result)
+
+    async def _evaluate_single(self, question_data: dict, model_answer: str,
+                               standard_answer: str, logger=None) -> Dict[str, Any]:
+        """逐题评估（批处理任务中回退时不记录到问题日志，避免记到触发批次的问题下）"""
+        self.single_requests += 1
+        return await self.programming_evaluator.evaluate_programming_response(
+            question_data, model_answer, standard_answer, self.evaluator_model, logger,
+            request_interval=self.request_interval, repair_retries=self.repair_retries,
+            dataset_file=self.dataset_file
+        )
+
+    def close(self):
+        """取消未发送的批次和进行中的批量请求（评估提前结束时调用）"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        for items in self._pending.values():
+            for item in items:
+                item["future"].cancel()
+        self._pending.clear()
+        for task in list(self._flushes):
+            task.cancel()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """获取批量评估统计"""
+        return {
+            "batch_size": self.batch_size,
+            "batches": self.batches,
+            "batched_items": self.batched_items,
+            "single_requests": self.single_requests,
+            "fallback_items": self.fallback_items,
+            "judge_requests": self.batches + self.single_requests
+        }
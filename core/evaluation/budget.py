@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务预算模块
+功能：按任务配置中的 budget（最大 token 数、最大费用、最长运行时间）在每个问题完成时检查消耗，
+      超出预算时由评估器取消尚未完成的请求并返回部分结果
+"""
+
+import time
+from typing import Dict, List, Any, Optional, Tuple
+
+# 预算项：配置键 -> 说明
+BUDGET_LIMITS = {
+    "max_tokens": "token 数",
+    "max_cost": "费用",
+    "max_seconds": "运行时间",
+}
+
+
+def split_item_tokens(result_item: Dict[str, Any]) -> Dict[str, Tuple[int, int]]:
+    """把一个结果项的 token 拆成 {"target": (输入, 输出), "judge": (输入, 输出)}
+
+    结果项记录了总 token（tokens_used）和输入 token（prompt_tokens / evaluation_prompt_tokens）；
+    旧结果没有输入 token 时全部按输出计（偏保守）
+    """
+    if result_item.get("samples"):
+        judge_tokens = sum(sample["evaluation_tokens"] for sample in result_item["samples"])
+        judge_prompt = sum(sample.get("evaluation_prompt_tokens", 0) for sample in result_item["samples"])
+    else:
+        evaluation = result_item.get("evaluation", {})
+        judge_tokens = evaluation.get("evaluation_tokens", 0)
+        judge_prompt = evaluation.get("evaluation_prompt_tokens", 0)
+    target_tokens = result_item.get("tokens_used", 0) - judge_tokens
+    target_prompt = min(result_item.get("prompt_tokens", 0), target_tokens)
+    judge_prompt = min(judge_prompt, judge_tokens)
+    return {
+        "target": (target_prompt, target_tokens - target_prompt),
+        "judge": (judge_prompt, judge_tokens - judge_prompt),
+    }
+
+
+def _rates(pricing: Optional[Dict[str, float]]) -> Tuple[float, float]:
+    """(输入单价, 输出单价)"""
+    pricing = pricing or {}
+    return pricing.get("input_cost_per_token", 0), pricing.get("output_cost_per_token", 0)
+
+
+def _item_cost(result_item: Dict[str, Any], target_rates: Tuple[float, float],
+               judge_rates: Tuple[float, float]) -> float:
+    """一个结果项的费用：输入 token 按输入单价、输出 token 按输出单价计"""
+    tokens = split_item_tokens(result_item)
+    cost = 0.0
+    for (prompt, completion), (input_rate, output_rate) in (
+            (tokens["target"], target_rates), (tokens["judge"], judge_rates)):
+        cost += prompt * input_rate + completion * output_rate
+    return cost
+
+
+def calculate_items_cost(result_items: List[Dict[str, Any]], target_pricing: Dict[str, float],
+                         judge_pricing: Dict[str, float]) -> float:
+    """按模型价格（ModelManager.get_model_pricing）计算一组结果项的费用，计价方式与预算检查相同"""
+    target_rates, judge_rates = _rates(target_pricing), _rates(judge_pricing)
+    return sum(_item_cost(item, target_rates, judge_rates) for item in result_items)
+
+
+class TaskBudget:
+    """单个评估任务的预算
+
+    费用按每个问题的待评估模型 token 和评估模型 token 分别计价，
+    输入 token 按输入单价、输出 token 按输出单价计算
+    """
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None,
+                 target_pricing: Optional[Dict[str, float]] = None,
+                 judge_pricing: Optional[Dict[str, float]] = None):
+        settings = settings or {}
+        self.limits = {key: settings[key] for key in BUDGET_LIMITS if settings.get(key) is not None}
+        self.target_rates = _rates(target_pricing)
+        self.judge_rates = _rates(judge_pricing)
+        self.start_time = time.monotonic()
+        self.tokens = 0
+        self.cost = 0.0
+        self.completed = 0
+        self.exceeded: Optional[str] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.limits)
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def remaining_seconds(self) -> Optional[float]:
+        """距离运行时间上限的秒数，没有设置时返回 None"""
+        if "max_seconds" not in self.limits:
+            return None
+        return max(0.0, self.limits["max_seconds"] - self.elapsed())
+
+    def record(self, result_item: Dict[str, Any]):
+        """记录一个已完成问题的消耗"""
+        self.tokens += result_item.get("tokens_used", 0)
+        self.cost += _item_cost(result_item, self.target_rates, self.judge_rates)
+        self.completed += 1
+
+    def check(self) -> Optional[str]:
+        """检查是否超出预算，返回超出的预算项（只记录第一次超出的项）"""
+        if self.exceeded is None:
+            used = {"max_tokens": self.tokens, "max_cost": self.cost, "max_seconds": self.elapsed()}
+            for key, limit in self.limits.items():
+                if used[key] >= limit:
+                    self.exceeded = key
+                    print(f"⛔ 任务超出{BUDGET_LIMITS[key]}预算: {used[key]:.4g} / {limit}")
+                    break
+        return self.exceeded
+
+    def snapshot(self) -> Dict[str, Any]:
+        """预算使用情况"""
+        return {
+            "limits": dict(self.limits),
+            "used": {
+                "tokens": self.tokens,
+                "cost": round(self.cost, 6),
+                "seconds": round(self.elapsed(), 2)
+            },
+            "completed_questions": self.completed,
+            "exceeded": self.exceeded
+        }
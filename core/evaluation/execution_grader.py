@@ -0,0 +1,449 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+执行评分模块
+在受限子进程中运行候选代码和标准答案（CPU/内存/时间限制、独立网络命名空间），
+比较两者的输出并换算为子问题得分，避免每道编程题都调用评估模型
+"""
+
+import asyncio
+import hashlib
+import io
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tokenize
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+
+from .reference_cache import ReferenceOutputCache
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块，只保留超时限制
+    resource = None
+
+
+# 沙箱启动代码：禁用网络后以 __main__ 身份运行待测脚本
+# 审计钩子拒绝所有 socket.* 事件（包括直接使用 _socket 创建的套接字和域名解析），且装上后无法移除；
+# 替换 socket/_socket 的入口只是为了给出更明确的报错。能创建网络命名空间时还会在操作系统层面断网
+SANDBOX_PRELUDE = """
+import runpy, socket, sys, _socket
+
+def _network_disabled(*args, **kwargs):
+    raise PermissionError("沙箱内禁止网络访问")
+
+def _audit(event, args):
+    if event.startswith("socket."):
+        _network_disabled()
+
+for _module in (socket, _socket):
+    for _name in ("socket", "socketpair", "fromfd", "create_connection", "create_server",
+                  "getaddrinfo", "gethostbyname", "gethostbyname_ex", "gethostbyaddr"):
+        if hasattr(_module, _name):
+            setattr(_module, _name, _network_disabled)
+sys.addaudithook(_audit)
+sys.argv = sys.argv[1:]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+# 在独立的网络命名空间（只有未启用的回环接口）中运行子进程，非 root 用户借助用户命名空间
+UNSHARE_COMMAND = ["unshare", "--net", "--map-root-user"]
+
+DEFAULT_LIMITS = {
+    "timeout": 10.0,          # 墙钟时间限制（秒）
+    "cpu_seconds": 10,        # CPU时间限制（秒）
+    "memory_mb": 512,         # 地址空间限制（MB）
+    "max_output_bytes": 1 << 20,  # 保留的最大输出字节数
+}
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+LABEL_SEPARATOR_PATTERN = re.compile(r'[:：]')
+# 标准答案中的子任务标记注释，例如 "# 任务1：..."、"# 子问题 2"、"# Task 3"
+SUB_TASK_MARKER_PATTERN = re.compile(r'#\s*(?:任务|子任务|子问题|问题|Task|task|Part|part)\s*(\d+)')
+SEGMENT_SENTINEL = "<<<llmeval-subquestion>>>"
+CODE_FENCE_PATTERN = re.compile(r'```(?:python|py|python3)?[ \t]*\n(.*?)```', re.DOTALL | re.IGNORECASE)
+
+
+def _apply_rlimits(cpu_seconds: Optional[int], memory_mb: Optional[int]):
+    """在子进程中设置资源限制（preexec_fn）"""
+    if resource is None:
+        return
+    if cpu_seconds:
+        resource.setrlimit(resource.RLIMIT_CPU, (int(cpu_seconds), int(cpu_seconds) + 1))
+    if memory_mb:
+        limit = int(memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    # 禁止写入大文件和生成core文件
+    resource.setrlimit(resource.RLIMIT_FSIZE, (1 << 20, 1 << 20))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+
+
+@lru_cache(maxsize=1)
+def network_namespace_available() -> bool:
+    """当前系统能否用 unshare 创建网络命名空间（容器内或禁用用户命名空间时不可用）"""
+    if shutil.which(UNSHARE_COMMAND[0]) is None:
+        return False
+    try:
+        return subprocess.run(UNSHARE_COMMAND + ["true"], stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, timeout=5).returncode == 0
+    except (OSError, subprocess.SubprocessError):
+        return False
+
+
+def run_code_sandboxed(code: str, limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """在受限子进程中运行一段Python代码
+
+    该函数在进程池的工作进程中执行，只接收和返回可序列化的数据。
+    隔离措施：独立临时工作目录、`python -I`（忽略环境变量和用户site）、
+    精简的环境变量、CPU/内存/文件大小限制以及超时后终止整个进程组。
+    网络：系统支持时在独立的网络命名空间中运行；否则只有解释器内的审计钩子拦截套接字，
+    无法阻止通过 ctypes 或启动其他程序访问网络。
+    """
+    limits = {**DEFAULT_LIMITS, **(limits or {})}
+    max_output = int(limits["max_output_bytes"])
+
+    with tempfile.TemporaryDirectory(prefix="llmeval_sandbox_") as workdir:
+        script_path = os.path.join(workdir, "solution.py")
+        with open(script_path, 'w', encoding='utf-8') as f:
+            f.write(code)
+
+        env = {
+            "PATH": os.environ.get("PATH", "/usr/bin:/bin"),
+            "HOME": workdir,
+            "LANG": "C.UTF-8",
+            "PYTHONIOENCODING": "utf-8",
+            "PYTHONDONTWRITEBYTECODE": "1",
+        }
+        preexec = None
+        if resource is not None:
+            def preexec():
+                _apply_rlimits(limits.get("cpu_seconds"), limits.get("memory_mb"))
+
+        start = time.perf_counter()
+        command = [sys.executable, "-I", "-c", SANDBOX_PRELUDE, script_path]
+        if network_namespace_available():
+            command = UNSHARE_COMMAND + command
+        process = subprocess.Popen(
+            command,
+            cwd=workdir,
+            env=env,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            preexec_fn=preexec,
+            start_new_session=True
+        )
+        status = "ok"
+        try:
+            stdout, stderr = process.communicate(timeout=float(limits["timeout"]))
+        except subprocess.TimeoutExpired:
+            status = "timeout"
+            _kill_process_group(process)
+            stdout, stderr = process.communicate()
+        duration = time.perf_counter() - start
+
+        if status == "ok" and process.returncode != 0:
+            status = "error"
+
+        return {
+            "status": status,
+            "returncode": process.returncode,
+            "stdout": stdout[:max_output].decode('utf-8', errors='replace'),
+            "stderr": stderr[-max_output:].decode('utf-8', errors='replace'),
+            "duration_seconds": round(duration, 4)
+        }
+
+
+def _kill_process_group(process: subprocess.Popen):
+    """终止超时进程及其创建的子进程"""
+    try:
+        os.killpg(process.pid, 9)
+    except (AttributeError, ProcessLookupError, PermissionError):
+        process.kill()
+
+
+def extract_code_block(answer: str) -> str:
+    """从回答中提取可执行代码：有 Markdown 代码块时拼接各代码块，否则原样返回"""
+    blocks = CODE_FENCE_PATTERN.findall(answer or '')
+    if blocks:
+        return "\n\n".join(block.strip('\n') for block in blocks)
+    return answer or ''
+
+
+def normalize_output_lines(output: str) -> List[str]:
+    """规范化输出：去掉空行，合并空白"""
+    lines = []
+    for line in output.splitlines():
+        line = WHITESPACE_PATTERN.sub(' ', line).strip()
+        if line:
+            lines.append(line)
+    return lines
+
+
+def _split_label(line: str):
+    """把输出行拆成 (标签, 值)；没有 "标签:" 前缀时标签为 None"""
+    parts = LABEL_SEPARATOR_PATTERN.split(line, maxsplit=1)
+    if len(parts) == 2 and parts[0].strip() and parts[1].strip():
+        return parts[0].strip().casefold(), parts[1].strip()
+    return None, line
+
+
+def _line_matches(reference_line: str, candidate_line: str) -> bool:
+    """输出行是否匹配：整行相同；或值相同且标签不冲突（一侧没有标签时只比较值）"""
+    if reference_line == candidate_line:
+        return True
+    reference_label, reference_value = _split_label(reference_line)
+    candidate_label, candidate_value = _split_label(candidate_line)
+    if reference_label is not None and candidate_label is not None:
+        return reference_label == candidate_label and reference_value == candidate_value
+    return reference_value == candidate_value
+
+
+def instrument_reference(code: str, sub_count: int) -> Optional[str]:
+    """在标准答案的子任务标记注释（如 "# 任务1："）前插入分段输出
+
+    只处理顶层语句之间的注释（借助 tokenize 排除字符串和括号内部），
+    标记编号必须恰好依次为 1..sub_count，否则返回 None
+    """
+    marker_lines = []
+    depth = 0
+    try:
+        tokens = list(tokenize.generate_tokens(io.StringIO(code).readline))
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return None
+    for token in tokens:
+        if token.type == tokenize.OP and token.string in "([{":
+            depth += 1
+        elif token.type == tokenize.OP and token.string in ")]}":
+            depth -= 1
+        elif token.type == tokenize.COMMENT and depth == 0 and token.start[1] == 0:
+            match = SUB_TASK_MARKER_PATTERN.match(token.string)
+            if match:
+                marker_lines.append((token.start[0], int(match.group(1))))
+
+    if [number for _, number in marker_lines] != list(range(1, sub_count + 1)):
+        return None
+
+    lines = code.splitlines()
+    for line_number, number in reversed(marker_lines):
+        lines.insert(line_number - 1, f'print("{SEGMENT_SENTINEL}{number}", flush=True)')
+    return "\n".join(lines) + "\n"
+
+
+def _split_segments(lines: List[str]) -> List[List[str]]:
+    """按 instrument_reference 插入的分段标记划分输出行（第一个标记之前的输出忽略）"""
+    groups: List[List[str]] = []
+    current = None
+    for line in lines:
+        if line.startswith(SEGMENT_SENTINEL):
+            current = []
+            groups.append(current)
+        elif current is not None:
+            current.append(line)
+    return groups
+
+
+def split_reference_output(stdout: str, sub_count: int) -> Optional[List[List[str]]]:
+    """把标准答案的输出划分到各个子问题
+
+    优先使用 instrument_reference 插入的分段标记；没有标记时，
+    只有输出行数恰好等于子问题数才按行一一对应，否则无法判定
+    """
+    lines = normalize_output_lines(stdout)
+    if any(line.startswith(SEGMENT_SENTINEL) for line in lines):
+        groups = _split_segments(lines)
+        if len(groups) != sub_count or not all(groups):
+            return None
+        return groups
+    if sub_count > 0 and len(lines) == sub_count:
+        return [[line] for line in lines]
+    return None
+
+
+def _match_in_order(group: List[str], lines: List[str], cursor: int = 0):
+    """按顺序在 lines[cursor:] 中查找 group 的各行，返回 (匹配行数, 最后匹配位置之后的游标)"""
+    matched = 0
+    for reference_line in group:
+        for position in range(cursor, len(lines)):
+            if _line_matches(reference_line, lines[position]):
+                matched += 1
+                cursor = position + 1
+                break
+    return matched, cursor
+
+
+def compare_outputs(reference_groups: List[List[str]], candidate_stdout: str,
+                    match_threshold: float = 1.0) -> Dict[str, Any]:
+    """比较各子问题的标准输出与候选代码的输出，换算为子问题得分
+
+    候选输出带有分段标记（候选代码也按 "# 任务N" 注释插入了分段输出）时，每个子问题只与自己的分段比较；
+    否则各子问题依次在整个输出中按顺序匹配，后一个子问题只能匹配前一个子问题已匹配行之后的输出。
+    标准输出的行带 "标签:" 前缀时，候选行的标签也必须相同（候选行没有标签时只比较值），
+    子问题的匹配比例达到 match_threshold 记1分，否则记0分
+    """
+    lines = normalize_output_lines(candidate_stdout)
+    segments = None
+    if any(line.startswith(SEGMENT_SENTINEL) for line in lines):
+        segments = _split_segments(lines)
+        if len(segments) != len(reference_groups):
+            segments = None
+            lines = [line for line in lines if not line.startswith(SEGMENT_SENTINEL)]
+
+    sub_scores = []
+    match_ratios = []
+    cursor = 0
+    for index, group in enumerate(reference_groups):
+        if segments is not None:
+            matched, _ = _match_in_order(group, segments[index])
+        else:
+            matched, cursor = _match_in_order(group, lines, cursor)
+        ratio = matched / len(group) if group else 0.0
+        match_ratios.append(round(ratio, 4))
+        sub_scores.append(1 if ratio >= match_threshold else 0)
+
+    return {
+        "sub_question_scores": sub_scores,
+        "match_ratios": match_ratios
+    }
+
+
+class ExecutionGrader:
+    """基于代码执行的编程题评分器
+
+    标准答案和候选代码在进程池中并行执行；标准答案的输出无法对应到子问题、
+    或候选代码没有输出等无法得出确定结论的情况返回 None，由调用方回退到评估模型评分
+    """
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 reference_cache: Optional[ReferenceOutputCache] = None):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.reference_cache = reference_cache
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # 正在运行的标准答案（同一份代码只运行一次）
+        self._reference_runs: Dict[str, asyncio.Future] = {}
+        self.reference_executions = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    async def run(self, code: str, limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """在进程池中运行一段代码"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), run_code_sandboxed, code, limits)
+
+    async def run_reference(self, reference_code: str, limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """运行标准答案，优先使用磁盘缓存，并合并同一代码的并发运行"""
+        key = (self.reference_cache.make_key(reference_code, limits) if self.reference_cache
+               else hashlib.sha256(reference_code.encode('utf-8')).hexdigest())
+        if self.reference_cache:
+            cached = self.reference_cache.get(key)
+            if cached is not None:
+                return dict(cached, cached=True)
+
+        running = self._reference_runs.get(key)
+        if running is not None:
+            return dict(await asyncio.shield(running), cached=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._reference_runs[key] = future
+        try:
+            result = await self.run(reference_code, limits)
+            self.reference_executions += 1
+            # 超时可能受机器负载影响，不写入缓存
+            if self.reference_cache and result["status"] != "timeout":
+                self.reference_cache.put(key, result)
+            future.set_result(result)
+        except BaseException as e:
+            future.set_exception(e)
+            # 避免无人等待时出现 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            self._reference_runs.pop(key, None)
+        return dict(result, cached=False)
+
+    def prepare_reference(self, question: Dict[str, Any], reference_code: str) -> str:
+        """标准答案（或候选代码）的实际运行代码（按子任务标记插入分段输出）"""
+        sub_count = len(question.get('sub_questions', []))
+        return instrument_reference(reference_code, sub_count) or reference_code
+
+    async def precompute_references(self, questions: List[Dict[str, Any]], answers: List[Dict[str, Any]],
+                                    limits: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """预先运行数据集中所有标准答案，结果写入缓存，返回统计信息"""
+        answer_map = {}
+        for answer in answers:
+            question_id = answer.get('question_id') or answer.get('id')
+            answer_map[str(question_id)] = answer
+
+        jobs = []
+        for question in questions:
+            question_id = question.get('id') or question.get('question_id')
+            answer = answer_map.get(str(question_id)) or {}
+            reference_code = answer.get('standard_answer')
+            if question.get('type', 'standard_answer') != 'standard_answer' or not reference_code:
+                continue
+            jobs.append(self.run_reference(self.prepare_reference(question, reference_code), limits))
+
+        start = time.perf_counter()
+        results = await asyncio.gather(*jobs)
+        return {
+            "references": len(results),
+            "cached": sum(1 for r in results if r.get("cached")),
+            "executed": sum(1 for r in results if not r.get("cached")),
+            "failed": sum(1 for r in results if r["status"] != "ok"),
+            "seconds": round(time.perf_counter() - start, 4)
+        }
+
+    async def grade(self, question: Dict[str, Any], candidate_code: str, reference_code: str,
+                    limits: Optional[Dict[str, Any]] = None,
+                    match_threshold: float = 1.0) -> Optional[Dict[str, Any]]:
+        """执行评分，返回子问题得分和执行详情；无法判定时返回 None"""
+        sub_count = len(question.get('sub_questions', []))
+        if sub_count == 0 or not candidate_code.strip() or not (reference_code or '').strip():
+            return None
+
+        reference_code = self.prepare_reference(question, reference_code)
+        reference_run, candidate_run = await asyncio.gather(
+            self.run_reference(reference_code, limits),
+            # 候选代码同样带有子任务标记时插入分段输出，各子问题只比较自己的分段
+            self.run(self.prepare_reference(question, candidate_code), limits)
+        )
+
+        # 标准答案本身无法运行，或输出无法对应到子问题时，执行结果没有参考价值
+        if reference_run["status"] != "ok":
+            return None
+        reference_groups = split_reference_output(reference_run["stdout"], sub_count)
+        if reference_groups is None:
+            return None
+        # 候选代码正常结束但没有任何输出（例如只定义了函数），交给评估模型判断
+        candidate_lines = [
+            line for line in normalize_output_lines(candidate_run["stdout"]) if not line.startswith(SEGMENT_SENTINEL)
+        ]
+        if candidate_run["status"] == "ok" and not candidate_lines:
+            return None
+
+        comparison = compare_outputs(reference_groups, candidate_run["stdout"], match_threshold)
+
+        return {
+            "sub_question_scores": comparison["sub_question_scores"],
+            "match_ratios": comparison["match_ratios"],
+            "candidate_status": candidate_run["status"],
+            "candidate_stderr": candidate_run["stderr"][-2000:],
+            "candidate_seconds": candidate_run["duration_seconds"],
+            "reference_seconds": reference_run["duration_seconds"],
+            "reference_cached": reference_run.get("cached", False)
+        }
+
+    def shutdown(self):
+        """关闭进程池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分层评分路由模块
+按配置的顺序先运行本地确定性检查（空回答、规范化精确匹配、正则、代码执行、文本相似度），
+能得出确定结论时直接给分，只有无法确定的回答才交给评估模型
+"""
+
+import re
+from typing import Dict, List, Any, Optional, Pattern, Tuple
+
+from .execution_grader import ExecutionGrader, extract_code_block
+from .text_analyzer import TextAnalyzer
+
+
+# 混合评分的默认检查顺序（由便宜到昂贵）
+DEFAULT_TIERS = ["empty", "exact", "regex", "execution", "similarity"]
+
+DEFAULT_GRADING_SETTINGS = {
+    "tiers": DEFAULT_TIERS,
+    "similarity_high": 95.0,        # 相似度不低于该值判满分
+    "similarity_low": None,         # 相似度不高于该值判零分（默认不启用）
+    "similarity_method": "lcs",     # 相似度算法：lcs、jaccard、minhash、ngram_cosine
+    "max_similarity_chars": 20000,  # 超过该长度的文本不做相似度检查
+    "execution_trust_partial": False,  # 是否直接采用未全部通过的执行结果
+}
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def normalize_answer(text: str) -> str:
+    """规范化回答：去掉代码块标记、合并空白、统一小写"""
+    text = extract_code_block(text or '')
+    return WHITESPACE_PATTERN.sub(' ', text).strip().lower()
+
+
+class GradingRouter:
+    """分层评分路由
+
+    每个检查返回评分决定（包含 tier、sub_question_scores、score_ratio、feedback、details），
+    或返回 None 表示无法确定，继续下一层；所有层都无法确定时由调用方交给评估模型
+    """
+
+    def __init__(self, execution_grader: Optional[ExecutionGrader] = None,
+                 text_analyzer: Optional[TextAnalyzer] = None):
+        self.execution_grader = execution_grader or ExecutionGrader()
+        self.text_analyzer = text_analyzer or TextAnalyzer()
+        # (reject_patterns, accept_patterns) -> 编译后的正则；规则无效时为 None
+        self._pattern_cache: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]],
+                                  Optional[Tuple[List[Pattern], List[Pattern]]]] = {}
+
+    @staticmethod
+    def resolve_settings(config: Dict[str, Any]) -> Dict[str, Any]:
+        """合并任务配置中的 grading 设置；execution 模式只运行执行检查并采用全部执行结果"""
+        settings = dict(DEFAULT_GRADING_SETTINGS)
+        settings.update(config.get("grading") or {})
+        if config.get("grading_mode") == "execution":
+            settings["tiers"] = ["execution"]
+            settings["execution_trust_partial"] = True
+        return settings
+
+    async def route(self, question: Dict[str, Any], extracted_answer: str,
+                    reference_answer: Dict[str, Any], reference: str,
+                    config: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """依次运行各层检查，返回第一个确定的评分决定"""
+        settings = self.resolve_settings(config)
+        for tier in settings["tiers"]:
+            check = getattr(self, f"_check_{tier}", None)
+            if check is None:
+                print(f"未知的评分检查: {tier}，已跳过")
+                continue
+            decision = await check(question, extracted_answer, reference_answer, reference, settings, config)
+            if decision is not None:
+                decision["tier"] = tier
+                return decision
+        return None
+
+    def _decision(self, question: Dict[str, Any], passed: bool, feedback: str,
+                  details: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """构造全对或全错的评分决定"""
+        sub_count = len(question.get('sub_questions', []))
+        return {
+            "sub_question_scores": [1 if passed else 0] * sub_count,
+            "score_ratio": 1.0 if passed else 0.0,
+            "feedback": feedback,
+            "details": details or {}
+        }
+
+    async def _check_empty(self, question, extracted_answer, reference_answer, reference, settings, config):
+        """空回答直接判零分"""
+        if not (extracted_answer or '').strip():
+            return self._decision(question, False, "本地评分：回答为空")
+        return None
+
+    async def _check_exact(self, question, extracted_answer, reference_answer, reference, settings, config):
+        """与标准答案规范化后完全一致判满分"""
+        if not reference:
+            return None
+        if normalize_answer(extracted_answer) == normalize_answer(reference):
+            return self._decision(question, True, "本地评分：与标准答案规范化后一致")
+        return None
+
+    def _compile_patterns(self, question, reference_answer) -> Optional[Tuple[List[Pattern], List[Pattern]]]:
+        """编译答案集中的正则规则（每个答案只编译一次）；规则无效时记录错误并返回 None"""
+        key = (tuple(reference_answer.get('reject_patterns') or []),
+               tuple(reference_answer.get('accept_patterns') or []))
+        if key not in self._pattern_cache:
+            try:
+                self._pattern_cache[key] = (
+                    [re.compile(pattern, re.MULTILINE) for pattern in key[0]],
+                    [re.compile(pattern, re.MULTILINE) for pattern in key[1]]
+                )
+            except re.error as e:
+                print(f"问题 {question.get('id')} 的正则规则无效（{e}），跳过正则检查")
+                self._pattern_cache[key] = None
+        return self._pattern_cache[key]
+
+    async def _check_regex(self, question, extracted_answer, reference_answer, reference, settings, config):
+        """答案集中配置的 reject_patterns 任一命中判零分，accept_patterns 全部命中判满分；规则无效时交给下一层"""
+        compiled = self._compile_patterns(question, reference_answer)
+        if compiled is None:
+            return None
+        reject_patterns, accept_patterns = compiled
+        for pattern in reject_patterns:
+            if pattern.search(extracted_answer):
+                return self._decision(question, False, f"本地评分：命中拒绝规则 {pattern.pattern}",
+                                      {"pattern": pattern.pattern})
+        if accept_patterns and all(pattern.search(extracted_answer) for pattern in accept_patterns):
+            return self._decision(question, True, "本地评分：满足全部接受规则",
+                                  {"patterns": [pattern.pattern for pattern in accept_patterns]})
+        return None
+
+    async def _check_execution(self, question, extracted_answer, reference_answer, reference, settings, config):
+        """运行候选代码和标准答案比较输出"""
+        standard_answer = reference_answer.get('standard_answer')
+        if question.get('type', 'standard_answer') != 'standard_answer' or not standard_answer:
+            return None
+
+        execution_config = dict(config.get("execution") or {})
+        match_threshold = execution_config.pop("match_threshold", 1.0)
+        result = await self.execution_grader.grade(
+            question, extract_code_block(extracted_answer), standard_answer, execution_config, match_threshold
+        )
+        if result is None:
+            return None
+
+        sub_scores = result["sub_question_scores"]
+        if not settings["execution_trust_partial"] and not all(score == 1 for score in sub_scores):
+            # 输出格式不同也会导致不匹配，未全部通过的结果交给评估模型复核
+            return None
+
+        feedback = f"执行评分：通过 {sum(sub_scores)}/{len(sub_scores)} 个子问题（候选代码状态: {result['candidate_status']}）"
+        if result["candidate_status"] != "ok" and result["candidate_stderr"]:
+            feedback += f"\n错误输出: {result['candidate_stderr'][-500:]}"
+        return {
+            "sub_question_scores": sub_scores,
+            "score_ratio": sum(sub_scores) / len(sub_scores),
+            "feedback": feedback,
+            "details": {
+                "match_ratios": result["match_ratios"],
+                "candidate_seconds": result["candidate_seconds"],
+                "reference_seconds": result["reference_seconds"],
+                "reference_cached": result["reference_cached"]
+            }
+        }
+
+    async def _check_similarity(self, question, extracted_answer, reference_answer, reference, settings, config):
+        """与标准答案的文本相似度足够高判满分，足够低判零分"""
+        if not reference or not extracted_answer:
+            return None
+        max_chars = settings["max_similarity_chars"]
+        if len(reference) > max_chars or len(extracted_answer) > max_chars:
+            return None
+
+        # 标准答案的特征按问题ID缓存，多个模型评估同一数据集时只处理一次
+        scores = self.text_analyzer.score_reference(
+            question.get('id'), normalize_answer(extracted_answer), normalize_answer(reference),
+            settings["similarity_method"]
+        )
+        similarity = scores["similarity"]
+        details = {key: round(value, 4 if key == "coverage" else 2) for key, value in scores.items()}
+        if similarity >= settings["similarity_high"]:
+            return self._decision(question, True, f"本地评分：与标准答案相似度 {similarity:.1f}%", details)
+        low = settings.get("similarity_low")
+        if low is not None and similarity <= low:
+            return self._decision(question, False, f"本地评分：与标准答案相似度仅 {similarity:.1f}%", details)
+        return None
+
+
+def calculate_grading_stats(result_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """统计各评分层的使用次数和避免的评估模型调用比例
+
+    待评估模型生成失败（generation_error）的问题既没有本地评分也没有调用评估模型，单独计数，不计入比例
+    """
+    by_tier: Dict[str, int] = {}
+    for item in result_items:
+        tier = item.get("evaluation", {}).get("details", {}).get("grading_tier", "judge")
+        by_tier[tier] = by_tier.get(tier, 0) + 1
+
+    total = len(result_items)
+    generation_errors = by_tier.get("generation_error", 0)
+    graded = total - generation_errors
+    # fallback 表示调用了评估模型但解析/请求失败
+    judged = by_tier.get("judge", 0) + by_tier.get("fallback", 0)
+    return {
+        "total": total,
+        "judged": judged,
+        "local": graded - judged,
+        "generation_errors": generation_errors,
+        "by_tier": by_tier,
+        "judge_avoided_ratio": round((graded - judged) / graded, 4) if graded else 0.0
+    }
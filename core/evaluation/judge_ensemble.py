@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多评估模型集成模块
+把同一个回答同时发给多个评估模型，按均值或中位数合并分数，requirement_completed 按多数投票，
+并报告评估模型之间的一致性；开启提前停止时先并发请求前两个评估模型，两者一致（overall 相差不超过容差且
+requirement_completed 相同）就跳过其余评估模型
+"""
+
+import asyncio
+import statistics
+from typing import Dict, List, Any, Callable, Awaitable, Tuple
+
+AGGREGATORS = {
+    "mean": statistics.mean,
+    "median": statistics.median
+}
+# 提前停止时判定两个评估模型一致的 overall 分数差
+DEFAULT_AGREEMENT_TOLERANCE = 10.0
+
+
+class JudgeEnsemble:
+    """评估模型集成
+
+    settings 对应任务配置中的 judge_ensemble，例如
+    {"judges": ["judge-b", "judge-c"], "aggregate": "median", "early_stop": true, "tolerance": 10}；
+    judges 是在任务的评估模型之外追加的评估模型
+    """
+
+    def __init__(self, judges: List[Tuple[str, Any]], settings: Dict[str, Any]):
+        self.judges = judges
+        self.aggregate = settings.get("aggregate", "mean")
+        if self.aggregate not in AGGREGATORS:
+            raise ValueError(f"不支持的集成方式: {self.aggregate}，可选 {list(AGGREGATORS)}")
+        self.early_stop = bool(settings.get("early_stop", False))
+        self.tolerance = float(settings.get("tolerance", DEFAULT_AGREEMENT_TOLERANCE))
+
+    async def evaluate(self, judge_call: Callable[[Any], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        """用各评估模型评估同一个回答，judge_call(model) 返回 ProgrammingEvaluator 的评估结果"""
+        early_stopped = False
+        if self.early_stop and len(self.judges) > 2:
+            verdicts = await self._run(self.judges[:2], judge_call)
+            if len(verdicts) == 2 and self._agree(verdicts[0][1], verdicts[1][1]):
+                early_stopped = True
+            else:
+                verdicts += await self._run(self.judges[2:], judge_call)
+        else:
+            verdicts = await self._run(self.judges, judge_call)
+
+        if not verdicts:
+            raise RuntimeError("所有评估模型都评估失败")
+        return self._combine(verdicts, early_stopped)
+
+    async def _run(self, judges: List[Tuple[str, Any]], judge_call) -> List[Tuple[str, Dict[str, Any]]]:
+        """并发请求一组评估模型，失败的评估模型不参与合并"""
+        outcomes = await asyncio.gather(*(judge_call(model) for _, model in judges), return_exceptions=True)
+        verdicts = []
+        for (name, _), outcome in zip(judges, outcomes):
+            if isinstance(outcome, Exception):
+                print(f"评估模型 {name} 评估失败，不参与集成: {outcome}")
+                continue
+            verdicts.append((name, outcome))
+        return verdicts
+
+    def _agree(self, first: Dict[str, Any], second: Dict[str, Any]) -> bool:
+        return abs(first["scores"].get("overall", 0) - second["scores"].get("overall", 0)) <= self.tolerance \
+            and bool(first.get("requirement_completed")) == bool(second.get("requirement_completed"))
+
+    def _combine(self, verdicts: List[Tuple[str, Dict[str, Any]]], early_stopped: bool) -> Dict[str, Any]:
+        """合并各评估模型的结果，返回值与单个评估模型的结果结构相同，另含 ensemble 字段"""
+        aggregate = AGGREGATORS[self.aggregate]
+        results = [verdict for _, verdict in verdicts]
+        scores = {
+            metric: round(aggregate([r["scores"][metric] for r in results if metric in r["scores"]]), 2)
+            for metric in results[0]["scores"]
+        }
+        votes = [bool(r.get("requirement_completed")) for r in results]
+        requirement_completed = votes.count(True) > len(votes) / 2
+
+        sub_score_lists = [r.get("sub_question_scores") or [] for r in results]
+        sub_count = max(len(sub_scores) for sub_scores in sub_score_lists)
+        sub_question_scores = [
+            aggregate([sub_scores[i] for sub_scores in sub_score_lists if i < len(sub_scores)])
+            for i in range(sub_count)
+        ]
+
+        overall_scores = [r["scores"].get("overall", 0) for r in results]
+        return {
+            "scores": scores,
+            "feedback": "\n".join(f"[{name}] {verdict.get('feedback', '')}" for name, verdict in verdicts),
+            "tokens_used": sum(r.get("tokens_used", 0) for r in results),
+            "prompt_tokens": sum(r.get("prompt_tokens", 0) for r in results),
+            "cached_tokens": sum(r.get("cached_tokens", 0) for r in results),
+            "requirement_completed": requirement_completed,
+            "sub_question_scores": sub_question_scores,
+            "parse_path": results[0].get("parse_path"),
+            "ensemble": {
+                "aggregate": self.aggregate,
+                "judges": [name for name, _ in verdicts],
+                "skipped": len(self.judges) - len(verdicts) if early_stopped else 0,
+                "early_stopped": early_stopped,
+                "individual": [
+                    {
+                        "judge": name,
+                        "overall": verdict["scores"].get("overall", 0),
+                        "requirement_completed": bool(verdict.get("requirement_completed"))
+                    }
+                    for name, verdict in verdicts
+                ],
+                "overall_spread": round(max(overall_scores) - min(overall_scores), 2),
+                "requirement_agreement": round(
+                    max(votes.count(True), votes.count(False)) / len(votes), 4
+                )
+            }
+        }
+
+
+def calculate_ensemble_stats(result_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """统计集成评估的一致性：overall 分差、requirement_completed 的一致比例以及提前停止节省的评估请求"""
+    ensembles = [
+        item["evaluation"]["details"]["ensemble"] for item in result_items
+        if item.get("evaluation", {}).get("details", {}).get("ensemble")
+    ]
+    if not ensembles:
+        return {}
+    spreads = [ensemble["overall_spread"] for ensemble in ensembles]
+    return {
+        "evaluated": len(ensembles),
+        "judge_requests": sum(len(ensemble["judges"]) for ensemble in ensembles),
+        "skipped_requests": sum(ensemble["skipped"] for ensemble in ensembles),
+        "early_stop_ratio": round(sum(1 for e in ensembles if e["early_stopped"]) / len(ensembles), 4),
+        "mean_overall_spread": round(statistics.mean(spreads), 2),
+        "max_overall_spread": max(spreads),
+        "full_agreement_ratio": round(
+            sum(1 for e in ensembles if e["requirement_agreement"] == 1.0) / len(ensembles), 4
+        )
+    }
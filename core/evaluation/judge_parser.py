@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估模型输出解析模块
+从评估模型的回答中提取评估JSON：先尝试 ```json 代码块，再从各个候选起始位置用
+json.JSONDecoder.raw_decode 解码，必要时去掉注释、尾逗号和 Python 风格字面量后重试；
+解析结果按评估结构校验，并统计各解析路径的使用次数
+"""
+
+import json
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+
+# 解析路径：fenced（代码块）、raw_decode（正文中的JSON）、repaired（修复注释等后解析）、
+# unparsed（没有可用JSON，由调用方回退：单题先请求修正再按关键词猜测，批量改为逐题评估）
+# 评估结果中的 judge_parse_path 另有 repair_retry，表示结果来自修正请求
+PARSE_PATHS = ["fenced", "raw_decode", "repaired", "unparsed"]
+
+# 评估结果中的分数字段
+SCORE_FIELDS = ("accuracy", "completeness", "clarity")
+
+# 修复时需要处理的记号：字符串（原样保留）、注释、尾逗号、Python 风格的字面量
+REPAIR_TOKEN_PATTERN = re.compile(
+    r'"(?:\\.|[^"\\])*"'
+    r'|//[^\n]*'
+    r'|/\*.*?\*/'
+    r'|,(?=\s*[}\]])'
+    r'|\b(?:True|False|None)\b',
+    re.DOTALL
+)
+REPAIR_LITERALS = {"True": "true", "False": "false", "None": "null"}
+LEADING_WHITESPACE_PATTERN = re.compile(r'\s*')
+# 解码窗口的初始长度（字符），窗口内因截断失败时加倍重试
+DECODE_WINDOW = 512
+# 错误位置距窗口末尾不超过该长度时视为可能被截断（字面量、数字、\u 转义没有读完）
+TRUNCATION_MARGIN = 16
+
+
+def build_evaluation_schema(sub_question_count: int = 0, with_index: bool = False) -> Dict[str, Any]:
+    """评估结果的严格 JSON Schema（所有字段必填、不允许额外字段）"""
+    properties: Dict[str, Any] = {}
+    if with_index:
+        properties["index"] = {"type": "integer"}
+    if sub_question_count:
+        properties["sub_question_scores"] = {
+            "type": "array",
+            "items": {"type": "integer", "enum": [0, 1]},
+            "description": "按顺序给出每个子问题的完成情况，完成为1，未完成为0"
+        }
+    properties["requirement_completed"] = {"type": "boolean"}
+    for key in SCORE_FIELDS:
+        properties[key] = {"type": "integer", "description": "0-100 分"}
+    properties["feedback"] = {"type": "string"}
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+def build_evaluation_response_format(sub_question_count: int = 0, batch: bool = False) -> Dict[str, Any]:
+    """构造请求评估模型结构化输出的 response_format
+
+    批量评估的结果放在 evaluations 数组中（结构化输出的根节点必须是对象）
+    """
+    schema = build_evaluation_schema(sub_question_count, with_index=batch)
+    if batch:
+        schema = {
+            "type": "object",
+            "properties": {"evaluations": {"type": "array", "items": schema}},
+            "required": ["evaluations"],
+            "additionalProperties": False
+        }
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "programming_batch_evaluation" if batch else "programming_evaluation",
+            "strict": True,
+            "schema": schema
+        }
+    }
+
+
+def validate_evaluation(value: Any, sub_question_count: Optional[int] = None) -> Optional[str]:
+    """按评估结构校验解析结果，通过时返回 None，否则返回错误说明
+
+    sub_question_count 不为 None 时要求 sub_question_scores 的长度与之一致
+    """
+    if not isinstance(value, dict):
+        return "评估结果不是JSON对象"
+    if not any(key in value for key in ("sub_question_scores", "requirement_completed") + SCORE_FIELDS):
+        return "缺少评估字段"
+
+    for key in SCORE_FIELDS:
+        score = value.get(key)
+        if score is not None and (isinstance(score, bool) or not isinstance(score, (int, float))
+                                  or not 0 <= score <= 100):
+            return f"{key} 必须是 0-100 的数字"
+
+    completed = value.get("requirement_completed")
+    if completed is not None and not isinstance(completed, bool):
+        return "requirement_completed 必须是布尔值"
+
+    scores = value.get("sub_question_scores")
+    if scores is not None:
+        if not isinstance(scores, list) or \
+                not all(isinstance(s, (int, float)) and not isinstance(s, bool) for s in scores):
+            return "sub_question_scores 必须是数字数组"
+        if sub_question_count is not None and len(scores) != sub_question_count:
+            return f"sub_question_scores 应有 {sub_question_count} 项，实际 {len(scores)} 项"
+    elif sub_question_count:
+        return "缺少 sub_question_scores"
+
+    feedback = value.get("feedback")
+    if feedback is not None and not isinstance(feedback, str):
+        return "feedback 必须是字符串"
+    return None
+
+
+def repair_json_text(text: str) -> str:
+    """去掉 // 和 /* */ 注释、尾逗号，把 True/False/None 换成 JSON 字面量（字符串内容不变）"""
+    def replace(match):
+        token = match.group(0)
+        if token.startswith('"'):
+            return token
+        return REPAIR_LITERALS.get(token, "")
+    return REPAIR_TOKEN_PATTERN.sub(replace, text)
+
+
+class JudgeOutputParser:
+    """评估模型输出解析器（累计各解析路径的使用次数）"""
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.path_counts = {path: 0 for path in PARSE_PATHS}
+
+    def parse_object(self, text: str, sub_question_count: Optional[int] = None
+                     ) -> Tuple[Optional[Dict[str, Any]], str]:
+        """提取第一个通过校验的评估对象，返回 (对象, 解析路径)；没有时返回 (None, "unparsed")"""
+        return self._parse(text, dict, lambda value: validate_evaluation(value, sub_question_count) is None)
+
+    def parse_array(self, text: str) -> Tuple[Optional[List[Dict[str, Any]]], str]:
+        """提取第一个由对象组成的JSON数组（批量评估结果），返回 (数组, 解析路径)"""
+        def is_entry_list(value):
+            return isinstance(value, list) and bool(value) and all(isinstance(v, dict) for v in value)
+        return self._parse(text, list, is_entry_list)
+
+    def record(self, path: str):
+        """记录一次解析路径的使用"""
+        self.path_counts[path] = self.path_counts.get(path, 0) + 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取各解析路径的使用次数"""
+        total = sum(self.path_counts.values())
+        unparsed = self.path_counts.get("unparsed", 0)
+        return {
+            "total": total,
+            "by_path": dict(self.path_counts),
+            "json_ratio": round((total - unparsed) / total, 4) if total else 0.0
+        }
+
+    def _parse(self, text: str, expected_type: type, accept) -> Tuple[Any, str]:
+        text = text or ''
+        opener = '{' if expected_type is dict else '['
+
+        # 1. ```json 代码块（内容需以 { 或 [ 开头）
+        for start in self._fence_offsets(text):
+            start = LEADING_WHITESPACE_PATTERN.match(text, start).end()
+            if text.startswith(opener, start):
+                value = self._decode_at(text, start)
+                if value is not None and accept(value):
+                    self.record("fenced")
+                    return value, "fenced"
+
+        # 2. 正文中的候选起始位置
+        value = self._scan(text, opener, accept)
+        if value is not None:
+            self.record("raw_decode")
+            return value, "raw_decode"
+
+        # 3. 修复注释、尾逗号、Python 字面量后重试
+        if opener in text:
+            repaired = repair_json_text(text)
+            if repaired != text:
+                value = self._scan(repaired, opener, accept)
+                if value is not None:
+                    self.record("repaired")
+                    return value, "repaired"
+
+        self.record("unparsed")
+        return None, "unparsed"
+
+    @staticmethod
+    def _fence_offsets(text: str):
+        """返回每个代码块内容的起始位置"""
+        index = text.find('```')
+        while index != -1:
+            line_end = text.find('\n', index)
+            if line_end == -1:
+                return
+            yield line_end + 1
+            closing = text.find('```', line_end + 1)
+            if closing == -1:
+                return
+            index = text.find('```', closing + 3)
+
+    def _decode_at(self, text: str, index: int):
+        return self._decode(text, index)[0]
+
+    def _decode(self, text: str, index: int) -> Tuple[Any, int]:
+        """从 index 处解码一个JSON值，返回 (值, 结束位置)；失败时返回 (None, 出错位置)
+
+        只把 index 之后的一段窗口交给 raw_decode，窗口内因截断失败时加倍重试。
+        JSONDecodeError 会统计出错位置之前的行号，在整段文本上解码时每次失败都要从头扫描，
+        限定在窗口内后一次解码的开销只与实际读过的长度成正比
+        """
+        window = DECODE_WINDOW
+        while True:
+            chunk = text[index:index + window]
+            try:
+                value, end = self.decoder.raw_decode(chunk)
+                return value, index + end
+            except json.JSONDecodeError as e:
+                truncated = index + window < len(text) and (
+                    e.pos >= len(chunk) - TRUNCATION_MARGIN or e.msg.startswith("Unterminated string"))
+                if not truncated:
+                    return None, index + max(e.pos, 1)
+                window *= 2
+            except RecursionError:
+                # 嵌套过深的括号
+                return None, index + 1
+
+    def _scan(self, text: str, opener: str, accept):
+        """在每个 opener 处尝试解码，返回第一个满足 accept 的值
+
+        解码成功但不满足条件时跳过整个值，解码失败时跳到出错位置，
+        已经读过的括号不再重复尝试，整体只扫描一遍
+        """
+        index = text.find(opener)
+        while index != -1:
+            value, end = self._decode(text, index)
+            if value is not None and accept(value):
+                return value
+            index = text.find(opener, end)
+        return None
+
+
+def calculate_parse_stats(result_items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """统计一次评估中各评估模型回答的解析路径"""
+    by_path: Dict[str, int] = {}
+    for item in result_items:
+        path = item.get("evaluation", {}).get("details", {}).get("judge_parse_path")
+        if path:
+            by_path[path] = by_path.get(path, 0) + 1
+    total = sum(by_path.values())
+    return {
+        "total": total,
+        "by_path": by_path,
+        "json_ratio": round((total - by_path.get("unparsed", 0)) / total, 4) if total else 0.0
+    }
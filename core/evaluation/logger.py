@@ -8,11 +8,16 @@
 import os
 import json
 import logging
+import contextvars
 from datetime import datetime
 from typing import Dict, Any, Optional, List
 from pathlib import Path
 
 
+# 当前协程正在处理的问题记录（并发评估时每个问题在独立的任务中运行）
+_current_question_entry = contextvars.ContextVar("current_question_entry", default=None)
+
+
 class EvaluationLogger:
     """评估日志器"""
     
@@ -37,6 +42,8 @@ class EvaluationLogger:
         self.current_log_file = self.log_dir / log_filename
         self.current_json_file = self.log_dir / json_filename
         
+        _current_question_entry.set(None)
+        
         # 初始化会话数据
         self.session_data = {
             "session_info": {
@@ -122,6 +129,16 @@ class EvaluationLogger:
         }
         
         self.session_data["questions_and_answers"].append(question_entry)
+        _current_question_entry.set(question_entry)
+    
+    def _current_question(self) -> Optional[Dict[str, Any]]:
+        """获取当前问题记录，并发时优先使用当前协程上下文中的问题"""
+        entry = _current_question_entry.get()
+        if entry is not None:
+            return entry
+        if self.session_data.get("questions_and_answers"):
+            return self.session_data["questions_and_answers"][-1]
+        return None
     
     def log_model_request(self, model_name: str, prompt: str, config: Dict[str, Any] = None):
         """记录模型请求"""
@@ -134,8 +151,8 @@ class EvaluationLogger:
         self.logger.debug(f"完整提示词:\n{prompt}")
         
         # 保存到JSON结构
-        if self.session_data["questions_and_answers"]:
-            current_question = self.session_data["questions_and_answers"][-1]
+        current_question = self._current_question()
+        if current_question is not None:
             request_data = {
                 "type": "request",
                 "model_name": model_name,
@@ -169,8 +186,8 @@ class EvaluationLogger:
             self.logger.info(f"错误详情: {error}")
         
         # 保存到JSON结构
-        if self.session_data["questions_and_answers"]:
-            current_question = self.session_data["questions_and_answers"][-1]
+        current_question = self._current_question()
+        if current_question is not None:
             response_data = {
                 "type": "response",
                 "model_name": model_name,
@@ -209,8 +226,8 @@ class EvaluationLogger:
             self.logger.info(f"子问题分数: {sub_scores}")
         
         # 保存到JSON结构
-        if self.session_data["questions_and_answers"]:
-            current_question = self.session_data["questions_and_answers"][-1]
+        current_question = self._current_question()
+        if current_question is not None:
             evaluation_data = {
                 "question_id": question_id,
                 "timestamp": datetime.now().isoformat(),
@@ -6,11 +6,11 @@
 """
 
 import asyncio
-import json
 import re
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from .evaluation_types import EvaluationResult, EvaluationScores, QuestionType
 from .score_calculator import ScoreCalculator
+from .judge_parser import JudgeOutputParser, validate_evaluation, build_evaluation_response_format
 
 
 class ProgrammingEvaluator:
@@ -19,32 +19,46 @@ class ProgrammingEvaluator:
     def __init__(self, prompt_loader):
         self.prompt_loader = prompt_loader
         self.score_calculator = ScoreCalculator()
+        self.judge_parser = JudgeOutputParser()
     
     
     async def evaluate_programming_response(self, question_data: dict, model_answer: str,
-                                          standard_answer: str, evaluator_model, logger=None) -> Dict[str, Any]:
-        """使用评估模型评估编程题"""
+                                          standard_answer: str, evaluator_model, logger=None,
+                                          request_interval: float = 1,
+                                          repair_retries: int = 1,
+                                          dataset_file: Optional[str] = None) -> Dict[str, Any]:
+        """使用评估模型评估编程题
+
+        评估模型支持结构化输出时按严格的评估结构请求；结果无法解析或不符合结构时，
+        把错误原因反馈给评估模型重试（最多 repair_retries 次），仍失败才按关键词解析
+        """
         question_type = question_data.get('type', 'standard_answer')
+        sub_question_count = len(question_data.get('sub_questions', []))
         
         # 创建编程评估提示
         print(f"📝 开始调用 create_programming_evaluation_prompt 函数")
         print(f"   问题ID: {question_data.get('id')}, 类型: {question_type}")
         prompt = self.prompt_loader.create_programming_evaluation_prompt(
-            question_data, model_answer, standard_answer, question_type
+            question_data, model_answer, standard_answer, question_type, dataset_file
         )
         print(f"📝 create_programming_evaluation_prompt 函数调用完成")
         
         print(f"🎯 使用编程评估模板 - 问题ID: {question_data.get('id')}, 类型: {question_type}")
         
+        generate_kwargs = {"max_tokens": 5000, "temperature": 0.7}
+        if getattr(evaluator_model, 'structured_output', None):
+            generate_kwargs["response_format"] = build_evaluation_response_format(sub_question_count)
+        
         try:
-            await asyncio.sleep(1)  # 避免API限制
+            if request_interval > 0:
+                await asyncio.sleep(request_interval)  # 避免API限制
             
             # 记录评估模型请求
             if logger:
                 logger.log_model_request(evaluator_model.__class__.__name__, prompt, 
                                        {"max_tokens": 5000, "temperature": 0.7})
             
-            response = await evaluator_model.generate(prompt, max_tokens=5000, temperature=0.7)
+            response = await evaluator_model.generate(prompt, **generate_kwargs)
             
             if response.get('error'):
                 raise Exception(response['error'])
@@ -56,40 +70,87 @@ class ProgrammingEvaluator:
             if logger:
                 logger.log_model_response(evaluator_model.__class__.__name__, response, "编程评估结果")
             
-            # 解析JSON格式的评估结果
-            try:
-                eval_result = self._extract_json_from_text(content)
-                if not eval_result:
-                    # 如果没有找到JSON，使用默认解析
-                    eval_result = self._parse_evaluation_response(content)
-                
-                # 计算总分
-                total_score = self.score_calculator.calculate_programming_score(question_data, eval_result)
-                
-                return {
-                    'scores': {
-                        'accuracy': eval_result.get('accuracy', 0),
-                        'completeness': eval_result.get('completeness', 0),
-                        'clarity': eval_result.get('clarity', 0),
-                        'overall': total_score
-                    },
-                    'requirement_completed': eval_result.get('requirement_completed', False),
-                    'sub_question_scores': eval_result.get('sub_question_scores', []),
-                    'feedback': eval_result.get('feedback', '无详细反馈'),
-                    'tokens_used': response.get('usage', {}).get('total_tokens', 0)
-                }
+            tokens_used = response.get('usage', {}).get('total_tokens', 0)
+            prompt_tokens = response.get('usage', {}).get('prompt_tokens', 0)
+            cached_tokens = response.get('cached_tokens', 0)
+            
+            # 解析JSON格式的评估结果（代码块 → 正文JSON → 修复后解析）并校验结构
+            eval_result, parse_path = self.judge_parser.parse_object(content)
+            error = self._evaluation_error(eval_result, sub_question_count)
+            
+            for attempt in range(repair_retries):
+                if not error:
+                    break
+                print(f"评估结果无效（{error}），请求评估模型修正（第 {attempt + 1} 次）")
+                repair_response = await evaluator_model.generate(
+                    self._build_repair_prompt(prompt, content, error), **generate_kwargs
+                )
+                if repair_response.get('error'):
+                    print(f"修正请求失败: {repair_response['error']}")
+                    break
+                tokens_used += repair_response.get('usage', {}).get('total_tokens', 0)
+                prompt_tokens += repair_response.get('usage', {}).get('prompt_tokens', 0)
+                cached_tokens += repair_response.get('cached_tokens', 0)
                 
-            except (json.JSONDecodeError, KeyError) as e:
-                print(f"解析评估结果失败: {e}")
-                print(f"原始评估内容: {content}")
-                # 使用备用解析方法
-                return self._parse_evaluation_response(content)
+                repaired_content = repair_response.get('content', '').strip()
+                repaired_result, _ = self.judge_parser.parse_object(repaired_content)
+                repaired_error = self._evaluation_error(repaired_result, sub_question_count)
+                if repaired_result is not None and (not repaired_error or eval_result is None):
+                    eval_result, parse_path, content = repaired_result, "repair_retry", repaired_content
+                error = repaired_error
+            
+            if eval_result is None:
+                print(f"未找到有效的评估JSON，使用关键词解析")
+                eval_result = self._parse_evaluation_response(content)
+            
+            result = self.build_evaluation_result(question_data, eval_result, tokens_used, cached_tokens, prompt_tokens)
+            result['parse_path'] = parse_path
+            return result
                 
         except Exception as e:
             print(f"编程评估失败，回退到通用评估: {e}")
             # 这里不返回错误，而是抛出异常让上层处理
             raise e
     
+    @staticmethod
+    def _evaluation_error(eval_result: Dict[str, Any], sub_question_count: int) -> str:
+        """返回评估结果的结构错误，没有错误时返回空字符串"""
+        if eval_result is None:
+            return "没有找到有效的评估JSON"
+        return validate_evaluation(eval_result, sub_question_count or None) or ""
+    
+    @staticmethod
+    def _build_repair_prompt(prompt: str, content: str, error: str) -> str:
+        """构造修正请求：保留原提示（前缀可命中缓存），附上上次的回答和具体错误"""
+        return f"""{prompt}
+
+你上一次的评估回答如下：
+{content[-4000:]}
+
+该回答无法通过校验：{error}。
+请只返回修正后的JSON评估结果，不要包含其他内容。"""
+    
+    def build_evaluation_result(self, question_data: dict, eval_result: Dict[str, Any],
+                                tokens_used: int = 0, cached_tokens: int = 0,
+                                prompt_tokens: int = 0) -> Dict[str, Any]:
+        """根据评估模型返回的JSON计算总分，构造编程评估结果（prompt_tokens 为 tokens_used 中的输入 token）"""
+        total_score = self.score_calculator.calculate_programming_score(question_data, eval_result)
+        
+        return {
+            'scores': {
+                'accuracy': eval_result.get('accuracy', 0),
+                'completeness': eval_result.get('completeness', 0),
+                'clarity': eval_result.get('clarity', 0),
+                'overall': total_score
+            },
+            'requirement_completed': eval_result.get('requirement_completed', False),
+            'sub_question_scores': eval_result.get('sub_question_scores', []),
+            'feedback': eval_result.get('feedback', '无详细反馈'),
+            'tokens_used': tokens_used,
+            'prompt_tokens': min(prompt_tokens, tokens_used),
+            'cached_tokens': cached_tokens
+        }
+    
     def extract_answer_from_response(self, model_answer: str) -> str:
         """从模型回答中提取答案部分"""
         # 首先尝试提取<answer>标签中的内容
@@ -105,42 +166,6 @@ class ProgrammingEvaluator:
         # 如果没有标签，使用全部内容
         return model_answer
     
-    def _extract_json_from_text(self, text: str) -> Dict[str, Any]:
-        """从文本中提取JSON对象"""
-        # 方法1：寻找完整的JSON对象（支持嵌套）
-        brace_count = 0
-        start_idx = -1
-        
-        for i, char in enumerate(text):
-            if char == '{':
-                if brace_count == 0:
-                    start_idx = i
-                brace_count += 1
-            elif char == '}':
-                brace_count -= 1
-                if brace_count == 0 and start_idx != -1:
-                    try:
-                        json_str = text[start_idx:i+1]
-                        return json.loads(json_str)
-                    except json.JSONDecodeError:
-                        continue
-        
-        # 方法2：使用更宽松的正则表达式
-        patterns = [
-            r'\{[^{}]*"requirement_completed"[^{}]*\}',  # 简单JSON
-            r'\{.*?"requirement_completed".*?\}',       # 包含换行的JSON
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.DOTALL)
-            if match:
-                try:
-                    return json.loads(match.group())
-                except json.JSONDecodeError:
-                    continue
-        
-        return None
-    
     def _parse_evaluation_response(self, response: str) -> Dict[str, Any]:
         """解析评估响应，提取分数和反馈"""
         # 尝试提取分数（支持多种格式）
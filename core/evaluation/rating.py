@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+成对比较评分模块
+功能：由模型两两比较的胜负矩阵拟合 Bradley-Terry 强度（向量化的 MM 迭代），换算为 Elo 分数，
+      并给出每对模型的胜率和比较的信息量（用于主动选择最值得比较的模型对）
+"""
+
+from typing import Dict, Any
+
+import numpy as np
+
+# Elo 分数 = ELO_BASE + ELO_SCALE * log10(强度)，强度按几何平均归一为 1
+ELO_BASE = 1000.0
+ELO_SCALE = 400.0
+# 每对模型之间加入的先验胜场（各胜一半），避免全胜或全负时强度发散
+DEFAULT_PRIOR_WINS = 0.5
+
+
+def bradley_terry(wins: np.ndarray, prior: float = DEFAULT_PRIOR_WINS,
+                  max_iterations: int = 200, tolerance: float = 1e-8) -> np.ndarray:
+    """拟合 Bradley-Terry 强度
+
+    wins[i, j] 是模型 i 胜模型 j 的次数（平局各记 0.5），返回按几何平均归一的强度 p，
+    模型 i 胜模型 j 的概率为 p_i / (p_i + p_j)
+    """
+    wins = np.asarray(wins, dtype=float)
+    count = wins.shape[0]
+    off_diagonal = 1.0 - np.eye(count)
+    wins = wins * off_diagonal + prior * off_diagonal
+    games = wins + wins.T
+    total_wins = wins.sum(axis=1)
+
+    strengths = np.ones(count)
+    for _ in range(max_iterations):
+        denominator = (games / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+        updated = total_wins / denominator
+        updated /= np.exp(np.log(updated).mean())
+        if np.max(np.abs(updated - strengths)) < tolerance:
+            strengths = updated
+            break
+        strengths = updated
+    return strengths
+
+
+def elo_scores(strengths: np.ndarray) -> np.ndarray:
+    """把 Bradley-Terry 强度换算为 Elo 分数"""
+    return ELO_BASE + ELO_SCALE * np.log10(strengths)
+
+
+def win_probabilities(strengths: np.ndarray) -> np.ndarray:
+    """每对模型的胜率矩阵 P[i, j] = p_i / (p_i + p_j)"""
+    return strengths[:, None] / (strengths[:, None] + strengths[None, :])
+
+
+def pair_information(strengths: np.ndarray, games: np.ndarray) -> np.ndarray:
+    """每对模型再比较一次的信息量：结果的不确定性 P(1-P)，按已比较次数衰减；对角线为 0"""
+    probabilities = win_probabilities(strengths)
+    information = probabilities * (1.0 - probabilities) / (1.0 + games)
+    np.fill_diagonal(information, 0.0)
+    return information
+
+
+def rating_table(names, wins: np.ndarray, ties: np.ndarray) -> Dict[str, Any]:
+    """拟合并整理评分结果，按 Elo 分数从高到低排列"""
+    strengths = bradley_terry(wins + ties / 2.0)
+    scores = elo_scores(strengths)
+    probabilities = win_probabilities(strengths)
+    order = np.argsort(-scores)
+    return {
+        "ratings": [
+            {
+                "model": names[i],
+                "rating": round(float(scores[i]), 1),
+                "strength": round(float(strengths[i]), 4),
+                "wins": int(wins[i].sum()),
+                "losses": int(wins[:, i].sum()),
+                "ties": int(ties[i].sum()),
+                "comparisons": int(wins[i].sum() + wins[:, i].sum() + ties[i].sum())
+            }
+            for i in order
+        ],
+        "win_probability": {
+            names[i]: {names[j]: round(float(probabilities[i, j]), 4) for j in range(len(names)) if j != i}
+            for i in range(len(names))
+        }
+    }
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+标准答案输出缓存
+按标准答案代码的内容哈希缓存其在沙箱中的运行结果（输出、返回码、耗时），
+同一版本的数据集只需运行一次标准答案，之后的任务和模型只运行候选代码
+
+预计算示例：
+    python core/evaluation/reference_cache.py \
+        --questions data/questions/programming_questions_mixed.json \
+        --answers data/answers/programming_answers_mixed.json
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+# 缓存格式版本，沙箱或分段方式变化时递增以使旧缓存失效
+CACHE_FORMAT_VERSION = 1
+
+
+class ReferenceOutputCache:
+    """标准答案运行结果的磁盘缓存（每个内容哈希一个JSON文件）"""
+
+    def __init__(self, cache_dir: str = "data/cache/reference_outputs"):
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    def make_key(self, code: str, limits: Optional[Dict[str, Any]] = None) -> str:
+        """根据代码内容、影响结果的资源限制和解释器版本计算缓存键"""
+        limits = limits or {}
+        payload = json.dumps({
+            "version": CACHE_FORMAT_VERSION,
+            "python": sys.version_info[:2],
+            "memory_mb": limits.get("memory_mb"),
+            "cpu_seconds": limits.get("cpu_seconds"),
+            "code": code
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取缓存的运行结果，不存在或损坏时返回 None"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.get("result")
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """写入运行结果（先写临时文件再原子替换，避免并发读到半个文件）"""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "key": key,
+                "created_at": datetime.now().isoformat(),
+                "result": result
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        self.writes += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存命中统计"""
+        lookups = self.hits + self.misses
+        return {
+            "cache_dir": self.cache_dir,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def main():
+    """命令行入口：预计算数据集中所有标准答案的输出"""
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+    from core.evaluation.execution_grader import ExecutionGrader
+
+    parser = argparse.ArgumentParser(description="预计算标准答案的运行输出")
+    parser.add_argument("--questions", required=True, help="问题集JSON文件")
+    parser.add_argument("--answers", required=True, help="答案集JSON文件")
+    parser.add_argument("--cache-dir", default="data/cache/reference_outputs")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with open(args.questions, 'r', encoding='utf-8') as f:
+        questions = json.load(f)
+    with open(args.answers, 'r', encoding='utf-8') as f:
+        answers = json.load(f)
+
+    grader = ExecutionGrader(max_workers=args.workers, reference_cache=ReferenceOutputCache(args.cache_dir))
+    try:
+        stats = asyncio.run(grader.precompute_references(questions, answers, {"timeout": args.timeout}))
+    finally:
+        grader.shutdown()
+    print(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,10 @@ import statistics
 from typing import Dict, List, Any, Optional
 from .evaluation_types import EvaluationScores
 
+# 候选回答的 overall 分数达到该值视为通过（用于 pass@k）
+DEFAULT_PASS_THRESHOLD = 60
+# 汇总中计算的 pass@k（只保留不超过每题候选数的 k）
+DEFAULT_PASS_AT_K = (1, 5, 10, 20, 50, 100)
 
 class ScoreCalculator:
     """分数计算器"""
@@ -147,22 +151,51 @@ class ScoreCalculator:
                     'max': max(scores)
                 }
         
+        sampling = self.calculate_sampling_statistics(results)
+        if sampling:
+            summary['sampling'] = sampling
+        
         return summary
     
-    def estimate_cost(self, total_tokens: int, model_name: str) -> float:
-        """估算使用成本"""
-        cost_per_token = {
-            'gpt-4': 0.00003,
-            'gpt-3.5-turbo': 0.000002,
-            'claude': 0.000015,
-            'default': 0.00001
-        }
+    @staticmethod
+    def pass_at_k(n: int, c: int, k: int) -> float:
+        """无偏 pass@k 估计：n 个候选中 c 个通过时，随机抽 k 个至少一个通过的概率 1 - C(n-c, k) / C(n, k)
+
+        用连乘计算，避免大组合数溢出
+        """
+        if n - c < k:
+            return 1.0
+        all_failed = 1.0
+        for i in range(n - c + 1, n + 1):
+            all_failed *= 1.0 - k / i
+        return 1.0 - all_failed
+    
+    def calculate_sampling_statistics(self, results: List[Dict]) -> Dict[str, Any]:
+        """多候选回答的统计：各 k 的平均 pass@k，以及每题候选分数的方差（衡量回答的稳定性）"""
+        sampled = [result['samples'] for result in results if result.get('samples')]
+        if not sampled:
+            return {}
         
-        # 根据模型名称匹配费率
-        rate = cost_per_token['default']
-        for model_key, model_rate in cost_per_token.items():
-            if model_key in model_name.lower():
-                rate = model_rate
-                break
+        min_samples = min(len(samples) for samples in sampled)
+        ks = sorted({k for k in DEFAULT_PASS_AT_K if k <= min_samples} | {min_samples})
+        pass_at_k = {}
+        for k in ks:
+            pass_at_k[f"pass@{k}"] = statistics.mean(
+                self.pass_at_k(len(samples), sum(1 for s in samples if s.get('passed')), k)
+                for samples in sampled
+            )
         
-        return total_tokens * rate 
\ No newline at end of file
+        variances = [
+            statistics.variance([s.get('overall', 0) for s in samples])
+            for samples in sampled if len(samples) > 1
+        ]
+        return {
+            'questions': len(sampled),
+            'samples_per_question': min_samples,
+            'pass_at_k': pass_at_k,
+            'score_variance': {
+                'mean': statistics.mean(variances) if variances else 0,
+                'max': max(variances) if variances else 0
+            },
+            'mean_score_std_dev': statistics.mean(v ** 0.5 for v in variances) if variances else 0
+        }
@@ -6,37 +6,343 @@
 """
 
 import re
-from typing import Dict, List, Set
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Set, Union
+
+import numpy as np
+
+from .tokenizer import BaseTokenizer, get_tokenizer
+
+
+# 可选的相似度算法：lcs（最长公共子序列，精确）、jaccard（字符片段集合的 Jaccard）、
+# minhash（MinHash 估计的 Jaccard）、ngram_cosine（字符 n-gram 频次向量的余弦相似度）
+SIMILARITY_METHODS = ("lcs", "jaccard", "minhash", "ngram_cosine")
+
+# 字符片段滚动哈希的基数（大于最大 Unicode 码位）和模数（素数 2^42-11，保证乘法不溢出 uint64）
+GRAM_HASH_BASE = np.uint64(0x110000)
+GRAM_HASH_MOD = np.uint64(4398046511093)
+# 预编译的文本结构/要点/关键词正则
+LIST_MARKER_PATTERN = re.compile(r'[1-9]\.|[1-9]、|[•\-\*]')
+HEADING_PATTERN = re.compile(r'[#\*]{1,3}|【.*?】')
+SENTENCE_SPLIT_PATTERN = re.compile(r'[。！？]')
+KEY_POINT_SPLIT_PATTERN = re.compile(r'[。！？；;\n]')
+ABBREVIATION_PATTERN = re.compile(r'[A-Z]{2,}')
+PERCENT_PATTERN = re.compile(r'\d+%')
+DECIMAL_PATTERN = re.compile(r'\d+\.\d+')
+CJK_CHAR_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+# 中文 n-gram 中含有这些助词的片段大多跨越词边界，不作为关键词
+PARTICLE_CHARS = ('的', '了')
+
+# MinHash 哈希函数的固定种子，保证签名在不同进程间一致
+MINHASH_SEED = 20240601
+
+
+def lcs_length(s1: str, s2: str) -> int:
+    """位并行计算最长公共子序列长度（Hyyrö 算法）
+
+    较长的字符串编码为位向量（Python 大整数），逐字符遍历较短的字符串，
+    时间 O(m·n/w)、内存 O(m)，代替完整的 (m+1)×(n+1) 动态规划表
+    """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    if not s2:
+        return 0
+    return lcs_length_with_masks(build_lcs_masks(s1), len(s1), s2)
+
+
+def build_lcs_masks(text: str) -> Dict[str, int]:
+    """每个字符在文本中出现位置的位掩码（可缓存后与多个文本比较）"""
+    positions: Dict[str, List[int]] = {}
+    for i, ch in enumerate(text):
+        positions.setdefault(ch, []).append(i)
+    masks = {}
+    for ch, indexes in positions.items():
+        mask = 0
+        for i in indexes:
+            mask |= 1 << i
+        masks[ch] = mask
+    return masks
+
+
+def lcs_length_with_masks(masks: Dict[str, int], length: int, other: str) -> int:
+    """用预先计算的位掩码（长度为 length 的文本）求与 other 的最长公共子序列长度"""
+    full = (1 << length) - 1
+    v = full
+    for ch in other:
+        u = v & masks.get(ch, 0)
+        v = ((v + u) | (v - u)) & full
+    return length - bin(v).count("1")
+
+
+def gram_hashes(text: str, n: int) -> np.ndarray:
+    """计算文本所有长度为 n 的字符片段的哈希（NumPy 向量化滚动哈希）
+
+    文本短于 n 时把整个文本作为一个片段
+    """
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) == 0:
+        return codes
+    n = min(n, len(codes))
+    count = len(codes) - n + 1
+    hashes = np.zeros(count, dtype=np.uint64)
+    for offset in range(n):
+        hashes = (hashes * GRAM_HASH_BASE + codes[offset:offset + count]) % GRAM_HASH_MOD
+    return hashes
+
+
+def ngram_profile(text: str, n: int = 3) -> tuple:
+    """字符 n-gram 频次向量的稀疏表示：(排序的 n-gram 哈希, 频次, 向量范数)"""
+    ids, counts = np.unique(gram_hashes(text, n), return_counts=True)
+    counts = counts.astype(np.float64)
+    return ids, counts, float(np.linalg.norm(counts))
+
+
+def profile_cosine(profile1: tuple, profile2: tuple) -> float:
+    """两个 n-gram 频次向量的余弦相似度（0-1）"""
+    ids1, counts1, norm1 = profile1
+    ids2, counts2, norm2 = profile2
+    if norm1 == 0 or norm2 == 0:
+        return 0.0
+    _, index1, index2 = np.intersect1d(ids1, ids2, assume_unique=True, return_indices=True)
+    return float(np.dot(counts1[index1], counts2[index2])) / (norm1 * norm2)
+
+
+def ngram_cosine_similarity(text1: str, text2: str, n: int = 3) -> float:
+    """字符 n-gram 频次向量的余弦相似度（0-1）"""
+    return profile_cosine(ngram_profile(text1, n), ngram_profile(text2, n))
+
+
+def set_jaccard(set1: np.ndarray, set2: np.ndarray) -> float:
+    """两个已去重排序的哈希数组的 Jaccard 相似度（0-1）"""
+    if len(set1) == 0 or len(set2) == 0:
+        return 0.0
+    common = len(np.intersect1d(set1, set2, assume_unique=True))
+    return common / (len(set1) + len(set2) - common)
+
+
+def shingle_jaccard_similarity(text1: str, text2: str, k: int = 5) -> float:
+    """长度为 k 的字符片段集合的 Jaccard 相似度（0-1）"""
+    return set_jaccard(np.unique(gram_hashes(text1, k)), np.unique(gram_hashes(text2, k)))
+
+
+_minhash_params: Dict[int, tuple] = {}
+
+
+def minhash_signature(text: str, k: int = 5, num_perm: int = 128) -> np.ndarray:
+    """计算文本字符片段集合的 MinHash 签名（num_perm 个最小哈希值）"""
+    if num_perm not in _minhash_params:
+        rng = np.random.default_rng(MINHASH_SEED)
+        _minhash_params[num_perm] = (
+            rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64) | np.uint64(1),
+            rng.integers(0, np.iinfo(np.uint64).max, size=num_perm, dtype=np.uint64)
+        )
+    a, b = _minhash_params[num_perm]
+    shingles = np.unique(gram_hashes(text, k))
+    if len(shingles) == 0:
+        return np.full(num_perm, np.iinfo(np.uint32).max, dtype=np.uint64)
+    # 乘移位哈希：(a·x + b) 按 2^64 回绕后取高 32 位，每组 (a, b) 相当于一个随机置换
+    permuted = (shingles[:, None] * a[None, :] + b[None, :]) >> np.uint64(32)
+    return permuted.min(axis=0)
+
+
+def minhash_similarity(signature1: np.ndarray, signature2: np.ndarray) -> float:
+    """两个 MinHash 签名估计的 Jaccard 相似度（0-1）"""
+    return float(np.mean(signature1 == signature2))
+
+
+class ReferenceFeatures:
+    """参考答案的可复用特征
+
+    关键词、要点、LCS 位掩码、n-gram 向量、片段集合和 MinHash 签名在第一次使用时计算并保存，
+    同一参考答案与多个回答比较时只处理一次
+    """
+
+    def __init__(self, text: str, analyzer: "TextAnalyzer"):
+        self.text = text
+        self.analyzer = analyzer
+        self._features: Dict[Any, Any] = {}
+
+    def _get(self, key, builder):
+        if key not in self._features:
+            self._features[key] = builder()
+        return self._features[key]
+
+    def keywords(self) -> Set[str]:
+        return self._get("keywords", lambda: self.analyzer._extract_keywords(self.text))
+
+    def key_point_keywords(self) -> List[Set[str]]:
+        """每个要点的关键词集合，用于计算覆盖度（没有关键词的要点不计入）"""
+        return self._get("key_points", lambda: [
+            keywords for keywords in (
+                self.analyzer._extract_keywords(point) for point in self.analyzer._extract_key_points(self.text)
+            ) if keywords
+        ])
+
+    def lcs_masks(self) -> Dict[str, int]:
+        return self._get("lcs_masks", lambda: build_lcs_masks(self.text))
+
+    def ngram_profile(self, n: int) -> tuple:
+        return self._get(("ngram", n), lambda: ngram_profile(self.text, n))
+
+    def shingles(self, k: int) -> np.ndarray:
+        return self._get(("shingles", k), lambda: np.unique(gram_hashes(self.text, k)))
+
+    def minhash(self, k: int, num_perm: int) -> np.ndarray:
+        return self._get(("minhash", k, num_perm), lambda: minhash_signature(self.text, k, num_perm))
 
 
 class TextAnalyzer:
     """文本分析器"""
     
-    def __init__(self):
+    def __init__(self, similarity_method: str = "lcs", max_lcs_chars: int = 20000,
+                 ngram_size: int = 3, shingle_size: int = 5, minhash_permutations: int = 128,
+                 tokenizer: Union[str, BaseTokenizer] = "auto", coverage_threshold: float = 0.3):
         # 常见停用词
         self.stop_words = {'的', '是', '和', '与', '或', '但是', '因为', '所以', '在', '了', '有', '这', '那'}
+        # 关键词和覆盖度使用的分词器：auto（有 jieba 用 jieba，否则中文按字符二元组）、ngram、jieba
+        self.tokenizer = get_tokenizer(tokenizer)
+        # 要点的关键词有至少这个比例出现在回答中时视为覆盖（中文二元组较碎，阈值不宜过高）
+        self.coverage_threshold = coverage_threshold
+        if similarity_method not in SIMILARITY_METHODS:
+            raise ValueError(f"不支持的相似度算法: {similarity_method}，可选: {', '.join(SIMILARITY_METHODS)}")
+        self.similarity_method = similarity_method
+        # 任一文本超过该长度时不做 LCS，改用 n-gram 余弦相似度
+        self.max_lcs_chars = max_lcs_chars
+        self.ngram_size = ngram_size
+        self.shingle_size = shingle_size
+        self.minhash_permutations = minhash_permutations
+        # 按问题ID缓存的参考答案特征（LRU）
+        self.max_cached_references = 4096
+        self._reference_features: "OrderedDict[Any, ReferenceFeatures]" = OrderedDict()
+        self.reference_hits = 0
+        self.reference_misses = 0
     
-    def calculate_keyword_match(self, text1: str, text2: str) -> float:
-        """计算关键词匹配度"""
-        keywords1 = self._extract_keywords(text1.lower())
-        keywords2 = self._extract_keywords(text2.lower())
-        
-        if not keywords2:
+    def calculate_keyword_match(self, text1: str, text2: str, question_id: Any = None) -> float:
+        """计算关键词匹配度（text2 为参考答案，其特征按问题ID缓存，没有问题ID时按内容缓存）"""
+        return self._keyword_match(text1, self.get_reference_features(question_id, text2))
+    
+    def calculate_semantic_similarity(self, text1: str, text2: str, method: Optional[str] = None) -> float:
+        """计算语义相似度（简化版，0-100）
+
+        method 为空时使用初始化时配置的算法；LCS 在任一文本超过 max_lcs_chars 时改用 n-gram 余弦相似度
+        """
+        if not text1 or not text2:
+            return 0.0
+        return self._similarity(text1, ReferenceFeatures(text2, self), method)
+    
+    def calculate_reference_similarity(self, question_id: Any, answer: str, reference: str,
+                                       method: Optional[str] = None) -> float:
+        """计算回答与某个问题参考答案的相似度（0-100），参考答案特征按问题ID缓存"""
+        if not answer or not reference:
             return 0.0
+        return self._similarity(answer, self.get_reference_features(question_id, reference), method)
+    
+    def get_reference_features(self, question_id: Any, reference: str) -> ReferenceFeatures:
+        """获取参考答案特征，按问题ID缓存；同一问题的参考答案内容变化时重新计算"""
+        key = question_id if question_id is not None else ("text", reference)
+        features = self._reference_features.get(key)
+        if features is not None and features.text == reference:
+            self._reference_features.move_to_end(key)
+            self.reference_hits += 1
+            return features
         
-        intersection = keywords1.intersection(keywords2)
-        return len(intersection) / len(keywords2) * 100
+        self.reference_misses += 1
+        features = ReferenceFeatures(reference, self)
+        self._reference_features[key] = features
+        if len(self._reference_features) > self.max_cached_references:
+            self._reference_features.popitem(last=False)
+        return features
     
-    def calculate_semantic_similarity(self, text1: str, text2: str) -> float:
-        """计算语义相似度（简化版）"""
-        if not text1 or not text2:
+    def score_reference(self, question_id: Any, answer: str, reference: str,
+                        method: Optional[str] = None) -> Dict[str, float]:
+        """计算回答相对某个问题参考答案的关键词匹配度、覆盖度和相似度，参考答案特征按问题ID缓存"""
+        return self._score(answer, self.get_reference_features(question_id, reference), method)
+    
+    def analyze_batch(self, pairs: List[Dict[str, Any]], method: Optional[str] = None) -> List[Dict[str, Any]]:
+        """批量评分一次运行（或多个模型）的全部 (回答, 参考答案) 对，按输入顺序返回
+
+        pairs 中每项包含 question_id、answer、reference；同一问题的回答归为一组，
+        每组只查找（首次时计算）一次参考答案特征，多模型对比时参考答案只处理一次
+        """
+        groups: "OrderedDict[tuple, List[int]]" = OrderedDict()
+        for index, pair in enumerate(pairs):
+            groups.setdefault((pair.get("question_id"), pair.get("reference") or ""), []).append(index)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(pairs)
+        for (question_id, reference), indices in groups.items():
+            features = self.get_reference_features(question_id, reference)
+            for index in indices:
+                scores = self._score(pairs[index].get("answer") or "", features, method)
+                results[index] = dict(scores, question_id=pairs[index].get("question_id"))
+        return results
+    
+    def _score(self, answer: str, features: ReferenceFeatures, method: Optional[str] = None) -> Dict[str, float]:
+        """回答的关键词匹配度、覆盖度和相似度（回答的关键词只提取一次）"""
+        answer_keywords = self._extract_keywords(answer)
+        return {
+            "keyword_match": self._keyword_match(answer, features, answer_keywords),
+            "coverage": self._coverage(answer, features, answer_keywords),
+            "similarity": self._similarity(answer, features, method) if answer and features.text else 0.0
+        }
+    
+    def get_reference_cache_stats(self) -> Dict[str, Any]:
+        """获取参考答案特征缓存的命中统计"""
+        lookups = self.reference_hits + self.reference_misses
+        return {
+            "cached_references": len(self._reference_features),
+            "hits": self.reference_hits,
+            "misses": self.reference_misses,
+            "hit_rate": round(self.reference_hits / lookups, 4) if lookups else 0.0
+        }
+    
+    def _keyword_match(self, answer: str, features: ReferenceFeatures,
+                       answer_keywords: Optional[Set[str]] = None) -> float:
+        """回答覆盖的参考答案关键词比例（0-100）"""
+        reference_keywords = features.keywords()
+        if not reference_keywords:
             return 0.0
         
-        # 计算最长公共子序列
-        lcs = self._lcs_length(text1, text2)
-        max_len = max(len(text1), len(text2))
+        if answer_keywords is None:
+            answer_keywords = self._extract_keywords(answer)
+        intersection = answer_keywords.intersection(reference_keywords)
+        return len(intersection) / len(reference_keywords) * 100
+    
+    def _coverage(self, answer: str, features: ReferenceFeatures,
+                  answer_keywords: Optional[Set[str]] = None) -> float:
+        """回答覆盖的参考答案要点比例（0-1）：要点关键词的命中比例达到 coverage_threshold 即视为覆盖"""
+        if not features.text:
+            return 1.0
+        
+        point_keywords = features.key_point_keywords()
+        if not point_keywords:
+            return 1.0
+        if answer_keywords is None:
+            answer_keywords = self._extract_keywords(answer)
+        covered_points = sum(1 for keywords in point_keywords
+                             if len(keywords & answer_keywords) >= self.coverage_threshold * len(keywords))
+        return covered_points / len(point_keywords)
+    
+    def _similarity(self, answer: str, features: ReferenceFeatures, method: Optional[str] = None) -> float:
+        """回答与参考答案的相似度（0-100），参考答案一侧使用缓存的特征"""
+        reference = features.text
+        method = method or self.similarity_method
+        if method == "lcs" and max(len(answer), len(reference)) > self.max_lcs_chars:
+            method = "ngram_cosine"
         
-        return (lcs / max_len) * 100 if max_len > 0 else 0.0
+        if method == "lcs":
+            # 计算最长公共子序列（LCS 对称，位掩码建在参考答案上）
+            lcs = lcs_length_with_masks(features.lcs_masks(), len(reference), answer)
+            return lcs / max(len(answer), len(reference)) * 100
+        if method == "jaccard":
+            k = self.shingle_size
+            return set_jaccard(np.unique(gram_hashes(answer, k)), features.shingles(k)) * 100
+        if method == "minhash":
+            k, num_perm = self.shingle_size, self.minhash_permutations
+            return minhash_similarity(minhash_signature(answer, k, num_perm), features.minhash(k, num_perm)) * 100
+        if method == "ngram_cosine":
+            n = self.ngram_size
+            return profile_cosine(ngram_profile(answer, n), features.ngram_profile(n)) * 100
+        raise ValueError(f"不支持的相似度算法: {method}，可选: {', '.join(SIMILARITY_METHODS)}")
     
     def evaluate_structure(self, text: str) -> float:
         """评估文本结构"""
@@ -48,15 +354,15 @@ class TextAnalyzer:
             score += 20
         
         # 检查是否有列表或编号
-        if re.search(r'[1-9]\.|[1-9]、|[•\-\*]', text):
+        if LIST_MARKER_PATTERN.search(text):
             score += 20
         
         # 检查是否有标题或小标题
-        if re.search(r'[#\*]{1,3}|【.*?】', text):
+        if HEADING_PATTERN.search(text):
             score += 15
         
         # 检查句子长度分布
-        sentences = re.split(r'[。！？]', text)
+        sentences = SENTENCE_SPLIT_PATTERN.split(text)
         if sentences:
             avg_length = sum(len(s) for s in sentences) / len(sentences)
             if 10 <= avg_length <= 50:  # 合适的句子长度
@@ -74,7 +380,7 @@ class TextAnalyzer:
         score += min(20, connector_count * 4)
         
         # 检查是否有重复内容
-        sentences = re.split(r'[。！？]', text)
+        sentences = SENTENCE_SPLIT_PATTERN.split(text)
         unique_sentences = set(sentences)
         if len(unique_sentences) == len(sentences):
             score += 10
@@ -87,29 +393,21 @@ class TextAnalyzer:
         
         # 检查专业词汇使用
         professional_indicators = [
-            len(re.findall(r'[A-Z]{2,}', text)),  # 缩写词
-            len(re.findall(r'\d+%', text)),  # 百分比
-            len(re.findall(r'\d+\.\d+', text)),  # 小数
+            len(ABBREVIATION_PATTERN.findall(text)),  # 缩写词
+            len(PERCENT_PATTERN.findall(text)),  # 百分比
+            len(DECIMAL_PATTERN.findall(text)),  # 小数
         ]
         
         score += min(30, sum(professional_indicators) * 3)
         
         return min(70.0, score)
     
-    def calculate_coverage(self, model_answer: str, reference: str) -> float:
-        """计算内容覆盖度"""
+    def calculate_coverage(self, model_answer: str, reference: str, question_id: Any = None) -> float:
+        """计算内容覆盖度（参考答案特征按问题ID缓存，没有问题ID时按内容缓存）"""
         if not reference:
             return 1.0
         
-        # 将参考答案分解为要点
-        reference_points = self._extract_key_points(reference)
-        covered_points = 0
-        
-        for point in reference_points:
-            if any(keyword in model_answer for keyword in point.split()[:3]):
-                covered_points += 1
-        
-        return covered_points / len(reference_points) if reference_points else 1.0
+        return self._coverage(model_answer, self.get_reference_features(question_id, reference))
     
     def evaluate_domain_specific(self, answer: str, question: Dict) -> float:
         """评估领域特定内容"""
@@ -130,30 +428,24 @@ class TextAnalyzer:
         return min(100.0, score)
     
     def _extract_keywords(self, text: str) -> Set[str]:
-        """提取关键词"""
-        # 移除标点符号，分词
-        text = re.sub(r'[^\w\s]', ' ', text)
-        words = text.split()
-        # 过滤短词和停用词
-        keywords = [w for w in words if len(w) > 2 and w not in self.stop_words]
-        return set(keywords)
+        """提取关键词：分词后过滤停用词、过短的英文词和跨词边界的中文片段"""
+        keywords = set()
+        for token in self.tokenizer.tokenize(text):
+            if token in self.stop_words:
+                continue
+            if CJK_CHAR_PATTERN.match(token):
+                if not any(ch in token for ch in PARTICLE_CHARS):
+                    keywords.add(token)
+            elif len(token) > 2:
+                keywords.add(token)
+        return keywords
     
     def _lcs_length(self, s1: str, s2: str) -> int:
         """计算最长公共子序列长度"""
-        m, n = len(s1), len(s2)
-        dp = [[0] * (n + 1) for _ in range(m + 1)]
-        
-        for i in range(1, m + 1):
-            for j in range(1, n + 1):
-                if s1[i-1] == s2[j-1]:
-                    dp[i][j] = dp[i-1][j-1] + 1
-                else:
-                    dp[i][j] = max(dp[i-1][j], dp[i][j-1])
-        
-        return dp[m][n]
+        return lcs_length(s1, s2)
     
     def _extract_key_points(self, text: str) -> List[str]:
         """提取关键要点"""
-        # 按句号分割，过滤短句
-        sentences = [s.strip() for s in text.split('。') if len(s.strip()) > 10]
-        return sentences[:5]  # 最多返回5个要点 
\ No newline at end of file
+        # 按句末标点和换行分割，过滤短句
+        sentences = [s.strip() for s in KEY_POINT_SPLIT_PATTERN.split(text) if len(s.strip()) > 10]
+        return sentences[:5]  # 最多返回5个要点
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分词模块
+为文本分析提供中英文混合的分词：英文/代码标识符和数字按词切分，中文按字符 n-gram 切分，
+安装了 jieba 时可改用 jieba 分词；分词结果按文本做 LRU 缓存，参考答案只需切分一次
+"""
+
+from abc import ABC, abstractmethod
+from functools import lru_cache
+import re
+from typing import Tuple, Union
+
+try:
+    import jieba
+except ImportError:  # 未安装 jieba 时使用字符 n-gram 分词
+    jieba = None
+
+
+# 英文单词/代码标识符、数字、连续的中文字符
+TOKEN_PATTERN = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+(?:\.\d+)?|[\u4e00-\u9fff]+')
+CJK_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+# jieba 结果中保留的词（过滤标点和空白）
+WORD_PATTERN = re.compile(r'[\w\u4e00-\u9fff]')
+
+
+class BaseTokenizer(ABC):
+    """分词器基类：子类实现 _tokenize，tokenize 带 LRU 缓存并返回不可变的元组"""
+
+    name = "base"
+
+    def __init__(self, cache_size: int = 4096):
+        self.tokenize = lru_cache(maxsize=cache_size)(self._tokenize)
+
+    @abstractmethod
+    def _tokenize(self, text: str) -> Tuple[str, ...]:
+        """把文本切分为词元组"""
+        pass
+
+    def cache_info(self):
+        """LRU 缓存命中统计"""
+        return self.tokenize.cache_info()
+
+
+class NgramTokenizer(BaseTokenizer):
+    """字符 n-gram 分词：英文和数字按词（转小写），每段连续中文切成长度为 n 的重叠片段
+
+    不足 n 个字的中文片段整体作为一个词
+    """
+
+    name = "ngram"
+
+    def __init__(self, n: int = 2, cache_size: int = 4096):
+        super().__init__(cache_size)
+        self.n = n
+
+    def _tokenize(self, text: str) -> Tuple[str, ...]:
+        tokens = []
+        n = self.n
+        for token in TOKEN_PATTERN.findall(text):
+            if not CJK_PATTERN.match(token):
+                tokens.append(token.lower())
+            elif len(token) <= n:
+                tokens.append(token)
+            else:
+                tokens.extend(token[i:i + n] for i in range(len(token) - n + 1))
+        return tuple(tokens)
+
+
+class JiebaTokenizer(BaseTokenizer):
+    """jieba 分词（需要安装 jieba）"""
+
+    name = "jieba"
+
+    def __init__(self, cache_size: int = 4096):
+        if jieba is None:
+            raise ImportError("未安装 jieba，请先 pip install jieba 或使用 ngram 分词")
+        super().__init__(cache_size)
+
+    def _tokenize(self, text: str) -> Tuple[str, ...]:
+        return tuple(word.lower() for word in jieba.lcut(text) if WORD_PATTERN.search(word))
+
+
+TOKENIZERS = {
+    "ngram": NgramTokenizer,
+    "jieba": JiebaTokenizer,
+}
+
+
+def get_tokenizer(tokenizer: Union[str, BaseTokenizer] = "auto", **kwargs) -> BaseTokenizer:
+    """按名称创建分词器；auto 在安装了 jieba 时使用 jieba，否则使用字符 n-gram"""
+    if isinstance(tokenizer, BaseTokenizer):
+        return tokenizer
+    if tokenizer == "auto":
+        tokenizer = "jieba" if jieba is not None else "ngram"
+    if tokenizer not in TOKENIZERS:
+        raise ValueError(f"不支持的分词器: {tokenizer}，可选: auto, {', '.join(TOKENIZERS)}")
+    return TOKENIZERS[tokenizer](**kwargs)
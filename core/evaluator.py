@@ -8,13 +8,55 @@
 """
 
 import asyncio
+import contextvars
+import time
+import uuid
 from typing import Dict, List, Any, Optional, Callable
 from datetime import datetime
 
 from .evaluation.evaluation_types import QuestionData, ModelResponse, ReferenceAnswer
 from .evaluation.programming_evaluator import ProgrammingEvaluator
-from .evaluation.score_calculator import ScoreCalculator
+from .evaluation.batch_judge import BatchJudge
+from .evaluation.budget import TaskBudget, calculate_items_cost
+from .evaluation.execution_grader import ExecutionGrader
+from .evaluation.grading_router import GradingRouter, calculate_grading_stats
+from .evaluation.judge_parser import calculate_parse_stats
+from .evaluation.judge_ensemble import JudgeEnsemble, calculate_ensemble_stats
+from .evaluation.reference_cache import ReferenceOutputCache
+from .evaluation.score_calculator import ScoreCalculator, DEFAULT_PASS_THRESHOLD
 from .evaluation.logger import EvaluationLogger
+from .task_control import TaskControl
+from models.fair_scheduler import SchedulingFlow, set_current_flow, reset_current_flow
+from utils.prompt_loader import is_mixed_dataset
+
+
+# 评估器自身使用的配置项，不会透传给模型的 generate 调用
+EVALUATOR_CONFIG_KEYS = {
+    "concurrency",       # 同时评估的问题数
+    "request_interval",  # 待评估模型相邻请求的间隔（秒）
+    "judge_interval",    # 评估模型请求前的等待（秒）
+    "grading_mode",      # 评分方式：judge（评估模型，默认）、execution（执行代码比较输出）或 hybrid（分层本地检查）
+    "grading",           # 混合评分设置，如 {"tiers": ["empty", "exact", "execution"], "similarity_high": 95}
+    "execution",         # 执行评分的资源限制，如 {"timeout": 10, "cpu_seconds": 10, "memory_mb": 512}
+    "judge_batch_size",  # 批量评估：评估规则相同的回答每 K 个合并为一个评估请求（默认 1，不合并）
+    "judge_batch_wait",  # 批量评估未攒满时最多等待的秒数（默认 0.5）
+    "judge_repair_retries",  # 评估结果无法解析或不符合结构时请求评估模型修正的次数（默认 1）
+    "budget",            # 任务预算，如 {"max_tokens": 200000, "max_cost": 5.0, "max_seconds": 3600}
+    "scheduling",        # 多任务共享端点时的调度，如 {"weight": 2, "fast_lane": "auto"}
+    "shards",            # 分片评估的工作进程数（默认 1，不分片），见 core/sharded_runner.py
+    "samples_per_question",  # 每题生成的候选回答数（默认 1），大于 1 时计算 pass@k
+    "pass_threshold",    # 候选回答 overall 分数达到该值视为通过（默认 60），用于 pass@k
+    "judge_ensemble",    # 多评估模型集成，如 {"judges": ["judge-b", "judge-c"], "aggregate": "median", "early_stop": true}
+    "dataset_file",      # 问题集文件名：决定日志名、结构化提示（混合数据集）和评估模板的查找
+}
+
+# 问题数不超过该值的任务在 fast_lane 为 auto（默认）时进入快速通道
+FAST_LANE_MAX_QUESTIONS = 20
+
+# 当前评估会话的批量评估器（每个 evaluate_model 调用独立，问题任务创建时继承）
+_current_batch_judge = contextvars.ContextVar("current_batch_judge", default=None)
+# 当前评估会话的评估模型集成（同上）
+_current_judge_ensemble = contextvars.ContextVar("current_judge_ensemble", default=None)
 
 
 class Evaluator:
@@ -24,14 +66,25 @@ class Evaluator:
         self.model_manager = model_manager
         self.prompt_loader = prompt_loader
         self.programming_evaluator = ProgrammingEvaluator(prompt_loader)
+        self.execution_grader = ExecutionGrader(reference_cache=ReferenceOutputCache())
+        self.grading_router = GradingRouter(self.execution_grader)
         self.score_calculator = ScoreCalculator()
         self.logger = EvaluationLogger()
         
     async def evaluate_model(self, target_model_name: str, evaluator_model_name: str, 
                            questions: List[Dict], answers: List[Dict], 
                            config: Dict[str, Any] = None,
-                           progress_callback: Optional[Callable] = None) -> Dict[str, Any]:
-        """评估单个模型"""
+                           progress_callback: Optional[Callable] = None,
+                           control: Optional[TaskControl] = None) -> Dict[str, Any]:
+        """评估单个模型
+
+        control 用于在运行中取消、暂停和恢复评估（见 core/task_control.py），取消时返回已完成部分的结果
+        """
+        if int((config or {}).get("shards", 1)) > 1:
+            from .sharded_runner import ShardedEvaluator
+            return await ShardedEvaluator(self).evaluate(
+                target_model_name, evaluator_model_name, questions, answers, config, progress_callback, control
+            )
         # 获取待评估模型和评估模型
         target_model = self.model_manager.get_model(target_model_name)
         evaluator_model = self.model_manager.get_model(evaluator_model_name)
@@ -42,11 +95,12 @@ class Evaluator:
             raise ValueError(f"评估模型 {evaluator_model_name} 不存在")
         
         config = config or {}
+        judge_ensemble = self._build_judge_ensemble(config, evaluator_model_name, evaluator_model)
         results = self._initialize_results(target_model_name, evaluator_model_name, len(questions))
         
         # 启动日志会话
-        dataset_name = getattr(self.prompt_loader, '_current_dataset_file', 'unknown')
-        if dataset_name and dataset_name != 'unknown':
+        dataset_name = config.get("dataset_file") or 'unknown'
+        if dataset_name != 'unknown':
             # 提取数据集文件名
             dataset_name = dataset_name.split('/')[-1].replace('.json', '')
         log_file = self.logger.start_evaluation_session(target_model_name, evaluator_model_name, dataset_name)
@@ -59,53 +113,118 @@ class Evaluator:
         model_start_time = datetime.now()
         results["model_generation_start_time"] = model_start_time.isoformat()
         
-        # 逐一评估问题
-        for i, question in enumerate(questions):
-            # 获取问题ID和参考答案
-            question_id = question.get('id') or question.get('question_id') or (i+1)
-            reference_answer = self._get_reference_answer(question_id, question, answer_map)
-            
-            # 记录问题开始
-            question_text = question.get('content') or question.get('question', '')
-            self.logger.log_question_start(question_id, question_text, question)
-            
-            # 计算当前问题的进度范围 (30%-90%，总共60%的进度空间)
-            base_progress = 30  # 起始进度30%
-            total_progress_range = 60  # 总进度范围60% (30%-90%)
-            question_progress_range = total_progress_range / len(questions)  # 每个问题占的进度范围
-            
-            # 更新进度 - 生成回答阶段（当前问题的前50%）
-            generation_progress = int(base_progress + i * question_progress_range + question_progress_range * 0.5)
-            if progress_callback:
-                progress_callback(generation_progress, i + 1, len(questions))
-            self.logger.log_progress(i + 1, len(questions), "生成回答")
-            
-            # 生成模型回答
-            model_response = await self._generate_model_response(
-                question, target_model, config, i
-            )
-            
-            # 更新进度 - 评估回答阶段（当前问题的后50%）
-            evaluation_progress = int(base_progress + (i + 1) * question_progress_range)
-            if progress_callback:
-                progress_callback(evaluation_progress, i + 1, len(questions))
-            self.logger.log_progress(i + 1, len(questions), "评估回答")
-            
-            # 评估回答
-            evaluation = await self.evaluate_response(
-                question, model_response, reference_answer, evaluator_model
+        # 执行评分：先统一运行（或从缓存读取）所有标准答案，评分时只需运行候选代码
+        grading_mode = config.get("grading_mode", "judge")
+        if grading_mode in ("execution", "hybrid") and \
+                "execution" in self.grading_router.resolve_settings(config)["tiers"]:
+            execution_limits = {k: v for k, v in (config.get("execution") or {}).items() if k != "match_threshold"}
+            results["reference_precompute"] = await self.execution_grader.precompute_references(
+                questions, answers, execution_limits
             )
-            
-            # 记录评估结果
-            self.logger.log_evaluation_result(question_id, evaluation)
-            
-            # 构建结果项
-            result_item = self._build_result_item(
-                question_id, question, model_response, reference_answer, evaluation
+            print(f"标准答案预计算完成: {results['reference_precompute']}")
+        
+        # 按并发度评估问题（concurrency=1 时与逐题顺序评估一致），结果按原始顺序返回
+        concurrency = max(1, int(config.get("concurrency", 1)))
+        
+        # 批量评估：并发评估的问题把评估请求提交给同一个批处理器合并发送
+        batch_judge = None
+        judge_batch_size = int(config.get("judge_batch_size", 1))
+        if judge_batch_size > 1:
+            batch_judge = BatchJudge(
+                self.programming_evaluator, evaluator_model, judge_batch_size,
+                max_wait=config.get("judge_batch_wait", 0.5),
+                request_interval=config.get("judge_interval", 1), logger=self.logger,
+                repair_retries=config.get("judge_repair_retries", 1),
+                dataset_file=config.get("dataset_file")
             )
+            if concurrency < judge_batch_size:
+                print(f"⚠️ 并发度 {concurrency} 小于批量评估大小 {judge_batch_size}，批次无法攒满，将按等待时间发送")
+        batch_token = _current_batch_judge.set(batch_judge)
+        ensemble_token = _current_judge_ensemble.set(judge_ensemble)
+        flow = self._scheduling_flow(config, len(questions), control)
+        flow_token = set_current_flow(flow)
+        semaphore = asyncio.Semaphore(concurrency)
+        progress_state = {"completed": 0, "reported": 0}
+        
+        async def run_question(index: int, question: Dict) -> Optional[Dict[str, Any]]:
+            if control is None:
+                async with semaphore:
+                    return await self._evaluate_question(
+                        index, question, len(questions), answer_map, target_model,
+                        evaluator_model, config, progress_state, progress_callback
+                    )
             
+            # 受控运行：暂停时让出并发槽位，被中断的问题在恢复后重新执行；任务取消后返回 None
+            while await control.wait_until_runnable():
+                async with semaphore:
+                    # 等待槽位期间任务被暂停或取消
+                    if not control.running:
+                        continue
+                    work = asyncio.create_task(self._evaluate_question(
+                        index, question, len(questions), answer_map, target_model,
+                        evaluator_model, config, progress_state, progress_callback
+                    ))
+                    control.track(work)
+                    try:
+                        return await work
+                    except asyncio.CancelledError:
+                        if not control.was_preempted(work):
+                            raise
+                        print(f"问题 {question.get('id', index + 1)} 因任务{'暂停' if control.paused else '取消'}被中断")
+            return None
+        
+        # 任务预算：每个问题完成时检查，超出后取消未完成的问题，只汇总已完成的部分
+        budget_settings = config.get("budget")
+        budget = TaskBudget(
+            budget_settings,
+            self.model_manager.get_model_pricing(target_model_name) if budget_settings else None,
+            self.model_manager.get_model_pricing(evaluator_model_name) if budget_settings else None
+        )
+        
+        question_tasks = [
+            asyncio.create_task(run_question(i, question))
+            for i, question in enumerate(questions)
+        ]
+        _current_batch_judge.reset(batch_token)
+        _current_judge_ensemble.reset(ensemble_token)
+        reset_current_flow(flow_token)
+        try:
+            await self._wait_questions(question_tasks, budget)
+        except BaseException:
+            for task in question_tasks:
+                task.cancel()
+            raise
+        finally:
+            if batch_judge is not None:
+                batch_judge.close()
+        result_items = [
+            task.result() for task in question_tasks
+            if not task.cancelled() and task.result() is not None
+        ]
+        
+        if control is not None and control.cancelled:
+            results["cancelled"] = True
+            results["completed_questions"] = len(result_items)
+            print(f"评估已取消，返回已完成的 {len(result_items)}/{len(questions)} 个问题的结果")
+        if budget.enabled:
+            results["budget"] = budget.snapshot()
+            results["budget_exceeded"] = budget.exceeded is not None
+            results["completed_questions"] = len(result_items)
+        if batch_judge is not None:
+            results["judge_batching"] = batch_judge.get_stats()
+        results["scheduling"] = {"flow": flow.name, "weight": flow.weight, "fast_lane": flow.fast_lane}
+        for result_item in result_items:
             results["results"].append(result_item)
             results["total_tokens"] += result_item["tokens_used"]
+        results["concurrency"] = concurrency
+        results["grading_stats"] = calculate_grading_stats(results["results"])
+        results["judge_parse_stats"] = calculate_parse_stats(results["results"])
+        if judge_ensemble is not None:
+            results["judge_ensemble"] = calculate_ensemble_stats(results["results"])
+        # 评估模型请求中命中提供商前缀缓存的输入 token 总数
+        results["judge_cached_tokens"] = sum(
+            item["evaluation"].get("evaluation_cached_tokens", 0) for item in results["results"]
+        )
         
         # 记录待评估模型回答完成时间并计算总耗时
         model_end_time = datetime.now()
@@ -125,7 +244,7 @@ class Evaluator:
         results["summary"]["total_duration_seconds"] = total_duration
         results["summary"]["total_duration_formatted"] = self._format_duration(total_duration)
         
-        results["total_cost"] = self.score_calculator.estimate_cost(results["total_tokens"], target_model_name)
+        results["total_cost"] = self.estimate_cost(results["results"], target_model_name, evaluator_model_name)
         results["end_time"] = datetime.now().isoformat()
         
         # 记录会话总结并结束
@@ -134,9 +253,171 @@ class Evaluator:
         
         return results
     
+    def estimate_cost(self, result_items: List[Dict[str, Any]], target_model_name: str,
+                      evaluator_model_name: str) -> float:
+        """按 config/models.json 中的模型价格计算结果项的费用（与任务预算使用同一价格来源）"""
+        return round(calculate_items_cost(
+            result_items,
+            self.model_manager.get_model_pricing(target_model_name),
+            self.model_manager.get_model_pricing(evaluator_model_name)
+        ), 6)
+    
+    def _build_judge_ensemble(self, config: Dict[str, Any], evaluator_model_name: str,
+                              evaluator_model) -> Optional[JudgeEnsemble]:
+        """按 judge_ensemble 配置组建评估模型集成：任务的评估模型加上追加的评估模型"""
+        settings = config.get("judge_ensemble")
+        if not settings:
+            return None
+        judges = [(evaluator_model_name, evaluator_model)]
+        for name in settings.get("judges", []):
+            if name in (judge_name for judge_name, _ in judges):
+                continue
+            model = self.model_manager.get_model(name)
+            if not model:
+                raise ValueError(f"集成评估模型 {name} 不存在")
+            judges.append((name, model))
+        if int(config.get("judge_batch_size", 1)) > 1:
+            print("⚠️ 集成评估时不使用批量评估，每个回答分别请求各评估模型")
+        print(f"🧑‍⚖️ 集成评估: {[name for name, _ in judges]}（{settings.get('aggregate', 'mean')}）")
+        return JudgeEnsemble(judges, settings)
+    
+    def _scheduling_flow(self, config: Dict[str, Any], question_count: int,
+                         control: Optional[TaskControl]) -> SchedulingFlow:
+        """根据任务配置创建调度流：权重决定共享端点时的请求份额，小任务默认走快速通道"""
+        scheduling = config.get("scheduling") or {}
+        fast_lane = scheduling.get("fast_lane", "auto")
+        if fast_lane == "auto":
+            fast_lane = question_count <= FAST_LANE_MAX_QUESTIONS
+        name = scheduling.get("name") or (control.task_id if control is not None and control.task_id else None) \
+            or f"evaluation-{uuid.uuid4().hex[:8]}"
+        return SchedulingFlow(name, scheduling.get("weight", 1.0), bool(fast_lane))
+    
+    async def _wait_questions(self, question_tasks: List[asyncio.Task], budget: TaskBudget):
+        """等待所有问题完成；超出预算时取消其余问题并等待它们退出，问题出错时抛出异常"""
+        pending = set(question_tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, timeout=budget.remaining_seconds(), return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                result_item = task.result()
+                if result_item is not None and budget.enabled:
+                    budget.record(result_item)
+            if budget.enabled and budget.check():
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+                print(f"已取消 {len(pending)} 个未完成的问题，返回部分结果")
+                return
+    
+    async def _evaluate_question(self, index: int, question: Dict, total: int,
+                               answer_map: Dict[Any, Dict], target_model, evaluator_model,
+                               config: Dict[str, Any], progress_state: Dict[str, int],
+                               progress_callback: Optional[Callable]) -> Dict[str, Any]:
+        """生成并评估单个问题，返回结果项"""
+        # 获取问题ID和参考答案
+        question_id = question.get('id') or question.get('question_id') or (index + 1)
+        reference_answer = self._get_reference_answer(question_id, question, answer_map)
+        
+        # 记录问题开始
+        question_text = question.get('content') or question.get('question', '')
+        self.logger.log_question_start(question_id, question_text, question)
+        
+        # 更新进度 - 生成回答阶段（当前问题的前50%）
+        self._report_progress(progress_state, total, 0.5, progress_callback)
+        self.logger.log_progress(index + 1, total, "生成回答")
+        
+        # 生成模型回答（samples_per_question > 1 时生成多个候选回答）
+        samples = max(1, int(config.get("samples_per_question", 1)))
+        generation_start = time.perf_counter()
+        if samples > 1:
+            model_responses = await self._generate_model_samples(
+                question, target_model, config, index, samples
+            )
+        else:
+            model_responses = [await self._generate_model_response(
+                question, target_model, config, index
+            )]
+        model_response = model_responses[0]
+        generation_seconds = time.perf_counter() - generation_start
+        
+        self.logger.log_progress(index + 1, total, "评估回答")
+        
+        # 评估回答：多个候选回答并行评估（开启批量评估时合并到同一批次）
+        evaluation_start = time.perf_counter()
+        if samples > 1:
+            evaluations = await asyncio.gather(*(
+                self.evaluate_response(question, response, reference_answer, evaluator_model, config)
+                for response in model_responses
+            ))
+        else:
+            evaluations = [await self.evaluate_response(
+                question, model_response, reference_answer, evaluator_model, config
+            )]
+        evaluation = evaluations[0]
+        evaluation_seconds = time.perf_counter() - evaluation_start
+        
+        # 记录评估结果
+        self.logger.log_evaluation_result(question_id, evaluation)
+        
+        # 更新进度 - 评估回答阶段（当前问题的后50%）
+        progress_state["completed"] += 1
+        self._report_progress(progress_state, total, 0.0, progress_callback)
+        
+        # 构建结果项
+        result_item = self._build_result_item(
+            question_id, question, model_response, reference_answer, evaluation
+        )
+        if samples > 1:
+            self._attach_samples(result_item, model_responses, evaluations, config)
+        result_item["generation_seconds"] = round(generation_seconds, 4)
+        result_item["evaluation_seconds"] = round(evaluation_seconds, 4)
+        return result_item
+    
+    def _attach_samples(self, result_item: Dict[str, Any], model_responses: List[Dict],
+                        evaluations: List[Dict], config: Dict[str, Any]):
+        """记录每个候选回答的分数和是否通过；结果项的主回答和评估取第一个候选，tokens_used 计入全部候选"""
+        pass_threshold = config.get("pass_threshold", DEFAULT_PASS_THRESHOLD)
+        result_item["samples"] = []
+        for response, evaluation in zip(model_responses, evaluations):
+            overall = evaluation.get("scores", {}).get("overall", 0)
+            result_item["samples"].append({
+                "model_response": response["content"],
+                "overall": overall,
+                "passed": overall >= pass_threshold,
+                "tokens_used": response.get("tokens_used", 0),
+                "prompt_tokens": response.get("prompt_tokens", 0),
+                "evaluation_tokens": evaluation.get("evaluation_tokens", 0),
+                "evaluation_prompt_tokens": evaluation.get("evaluation_prompt_tokens", 0),
+                "feedback": evaluation.get("feedback", "")
+            })
+        result_item["tokens_used"] = sum(
+            sample["tokens_used"] + sample["evaluation_tokens"] for sample in result_item["samples"]
+        )
+        result_item["prompt_tokens"] = sum(sample["prompt_tokens"] for sample in result_item["samples"])
+    
+    def _report_progress(self, progress_state: Dict[str, int], total: int,
+                         partial: float, progress_callback: Optional[Callable]):
+        """按已完成问题数上报进度 (30%-90%)，保证进度单调递增"""
+        if not progress_callback or total <= 0:
+            return
+        
+        base_progress = 30  # 起始进度30%
+        total_progress_range = 60  # 总进度范围60% (30%-90%)
+        question_progress_range = total_progress_range / total  # 每个问题占的进度范围
+        
+        completed = progress_state["completed"]
+        progress = int(base_progress + (completed + partial) * question_progress_range)
+        if progress < progress_state["reported"]:
+            return
+        progress_state["reported"] = progress
+        progress_callback(progress, min(completed + 1, total), total)
+    
     async def evaluate_response(self, question: Dict, model_response: Dict, 
-                              reference_answer: Dict, evaluator_model) -> Dict[str, Any]:
+                              reference_answer: Dict, evaluator_model,
+                              config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """评估单个回答"""
+        config = config or {}
         # 如果模型生成失败，返回零分
         if model_response.get('error'):
             return self._create_error_evaluation(model_response['error'])
@@ -146,12 +427,12 @@ class Evaluator:
         
         # 所有问题都使用编程评估
         return await self._evaluate_programming_response(
-            question, model_answer, reference, reference_answer, evaluator_model
+            question, model_answer, reference, reference_answer, evaluator_model, config
         )
     
     async def _evaluate_programming_response(self, question: Dict, model_answer: str,
                                            reference: str, reference_answer: Dict, 
-                                           evaluator_model) -> Dict[str, Any]:
+                                           evaluator_model, config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """评估编程类型的回答"""
         print(f"检测到编程类型问题，使用专门的编程评估...")
         print(f"问题类型: {question.get('type')}")
@@ -165,24 +446,56 @@ class Evaluator:
             # 获取标准答案
             standard_answer = reference_answer.get('standard_answer', reference)
             
-            # 使用编程评估方法
-            programming_eval = await self.programming_evaluator.evaluate_programming_response(
-                question, extracted_answer, standard_answer, evaluator_model, self.logger
-            )
+            # 本地评分：能够通过确定性检查得出结论时不再调用评估模型
+            if (config or {}).get("grading_mode", "judge") in ("execution", "hybrid"):
+                decision = await self.grading_router.route(
+                    question, extracted_answer, reference_answer, reference, config
+                )
+                if decision:
+                    return self._create_local_evaluation(question, decision, model_answer, reference)
+                print(f"本地评分无法得出结论，交给评估模型评分")
+            
+            # 使用编程评估方法（集成评估时同时请求多个评估模型，开启批量评估时与其他问题合并请求）
+            judge_ensemble = _current_judge_ensemble.get()
+            batch_judge = _current_batch_judge.get()
+            if judge_ensemble is not None:
+                programming_eval = await judge_ensemble.evaluate(
+                    lambda judge_model: self.programming_evaluator.evaluate_programming_response(
+                        question, extracted_answer, standard_answer, judge_model, self.logger,
+                        request_interval=(config or {}).get("judge_interval", 1),
+                        repair_retries=(config or {}).get("judge_repair_retries", 1),
+                        dataset_file=(config or {}).get("dataset_file")
+                    )
+                )
+            elif batch_judge is not None:
+                programming_eval = await batch_judge.evaluate(question, extracted_answer, standard_answer)
+            else:
+                programming_eval = await self.programming_evaluator.evaluate_programming_response(
+                    question, extracted_answer, standard_answer, evaluator_model, self.logger,
+                    request_interval=(config or {}).get("judge_interval", 1),
+                    repair_retries=(config or {}).get("judge_repair_retries", 1),
+                    dataset_file=(config or {}).get("dataset_file")
+                )
             
             # 添加编程评估特有的字段
             evaluation = {
                 "scores": programming_eval["scores"],
                 "feedback": programming_eval["feedback"],
                 "evaluation_tokens": programming_eval["tokens_used"],
+                "evaluation_prompt_tokens": programming_eval.get("prompt_tokens", 0),
+                "evaluation_cached_tokens": programming_eval.get("cached_tokens", 0),
                 "requirement_completed": programming_eval.get("requirement_completed", False),
                 "sub_question_scores": programming_eval.get("sub_question_scores", []),
                 "details": {
                     "answer_length": len(model_answer),
                     "reference_length": len(reference),
-                    "evaluation_type": "programming"
+                    "evaluation_type": "programming",
+                    "grading_tier": "judge",
+                    "judge_parse_path": programming_eval.get("parse_path")
                 }
             }
+            if "ensemble" in programming_eval:
+                evaluation["details"]["ensemble"] = programming_eval["ensemble"]
             
             return evaluation
             
@@ -191,6 +504,39 @@ class Evaluator:
             # 使用备用评估逻辑
             return self._create_fallback_evaluation(model_answer, reference, str(e))
     
+    def _create_local_evaluation(self, question: Dict, decision: Dict[str, Any],
+                                 model_answer: str, reference: str) -> Dict[str, Any]:
+        """根据本地评分决定构建评估结果"""
+        sub_scores = decision["sub_question_scores"]
+        ratio_score = decision["score_ratio"] * 100
+        overall = self.score_calculator.calculate_programming_score(question, {
+            "sub_question_scores": sub_scores,
+            "accuracy": ratio_score,
+            "completeness": ratio_score,
+            "clarity": ratio_score
+        })
+        
+        details = {
+            "answer_length": len(model_answer),
+            "reference_length": len(reference),
+            "evaluation_type": decision["tier"],
+            "grading_tier": decision["tier"]
+        }
+        details.update(decision.get("details", {}))
+        return {
+            "scores": {
+                "accuracy": round(overall, 2),
+                "completeness": round(ratio_score, 2),
+                "clarity": round(overall, 2),
+                "overall": round(overall, 2)
+            },
+            "feedback": decision["feedback"],
+            "evaluation_tokens": 0,
+            "requirement_completed": decision["score_ratio"] == 1.0,
+            "sub_question_scores": sub_scores,
+            "details": details
+        }
+    
     def _create_fallback_evaluation(self, model_answer: str, reference: str, error_message: str) -> Dict[str, Any]:
         """创建备用评估结果"""
         print(f"使用备用评估逻辑...")
@@ -215,7 +561,8 @@ class Evaluator:
             "details": {
                 "answer_length": len(model_answer),
                 "reference_length": len(reference),
-                "evaluation_type": "fallback"
+                "evaluation_type": "fallback",
+                "grading_tier": "fallback"
             }
         }
     
@@ -288,27 +635,22 @@ class Evaluator:
         print(f"正在为问题 {question_id} 生成回答")
         print(f"问题内容: {question_text[:100]}...")
         
-        # 检查是否使用结构化提示
-        use_structured_prompt = (hasattr(self.prompt_loader, '_current_dataset_file') and 
-                               self.prompt_loader._current_dataset_file and 
-                               'mixed' in self.prompt_loader._current_dataset_file.lower())
-        
-        if use_structured_prompt:
-            structured_prompt = self.prompt_loader.create_model_prompt_with_answer_format(question)
-            print(f"使用结构化提示格式")
-        else:
-            structured_prompt = question_text
+        structured_prompt = self.build_target_prompt(question, config.get("dataset_file"))
         
         # 添加请求间隔，避免API限制
-        if question_index > 0:
-            print(f"等待2秒后继续下一个请求...")
-            await asyncio.sleep(2)
+        request_interval = config.get("request_interval", 2)
+        if question_index > 0 and request_interval > 0:
+            print(f"等待{request_interval}秒后继续下一个请求...")
+            await asyncio.sleep(request_interval)
+        
+        # 评估器自身的配置项不透传给模型
+        generation_config = self._generation_config(config)
         
         try:
             # 记录模型请求
-            self.logger.log_model_request(target_model.__class__.__name__, structured_prompt, config)
+            self.logger.log_model_request(target_model.__class__.__name__, structured_prompt, generation_config)
             
-            model_response = await target_model.generate(structured_prompt, **config)
+            model_response = await target_model.generate(structured_prompt, **generation_config)
             
             # 记录模型回答
             self.logger.log_model_response(target_model.__class__.__name__, model_response, "待评估模型回答")
@@ -328,6 +670,51 @@ class Evaluator:
         
         return model_response
     
+    async def _generate_model_samples(self, question: Dict, target_model, config: Dict,
+                                      question_index: int, samples: int) -> List[Dict]:
+        """生成多个候选回答：支持 n 参数的模型一次请求返回全部候选（完整提示只发送一次），否则并发请求"""
+        question_id = question.get('id', question_index + 1)
+        print(f"正在为问题 {question_id} 生成 {samples} 个候选回答")
+        
+        structured_prompt = self.build_target_prompt(question, config.get("dataset_file"))
+        
+        request_interval = config.get("request_interval", 2)
+        if question_index > 0 and request_interval > 0:
+            print(f"等待{request_interval}秒后继续下一个请求...")
+            await asyncio.sleep(request_interval)
+        
+        generation_config = self._generation_config(config)
+        try:
+            self.logger.log_model_request(target_model.__class__.__name__, structured_prompt, generation_config)
+            model_responses = await target_model.generate_samples(structured_prompt, samples, **generation_config)
+            for model_response in model_responses:
+                self.logger.log_model_response(target_model.__class__.__name__, model_response, "待评估模型候选回答")
+        except Exception as e:
+            print(f"待评估模型生成失败: {str(e)}")
+            model_responses = [{
+                'content': f'生成失败: {str(e)}',
+                'tokens_used': 0,
+                'error': str(e),
+                'timestamp': datetime.now().isoformat()
+            } for _ in range(samples)]
+            self.logger.log_error(f"待评估模型生成失败", e)
+        
+        return model_responses
+    
+    def build_target_prompt(self, question: Dict, dataset_file: Optional[str] = None) -> str:
+        """构造发给待评估模型的提示（混合数据集使用带答案格式要求的结构化提示）"""
+        question_text = question.get('content') or question.get('question', '')
+        
+        # 检查是否使用结构化提示
+        if is_mixed_dataset(dataset_file):
+            print(f"使用结构化提示格式")
+            return self.prompt_loader.create_model_prompt_with_answer_format(question)
+        return question_text
+    
+    def _generation_config(self, config: Dict[str, Any]) -> Dict[str, Any]:
+        """过滤掉评估器自身的配置项，只保留模型生成参数"""
+        return {k: v for k, v in config.items() if k not in EVALUATOR_CONFIG_KEYS}
+    
     def _extract_reference_content(self, reference_answer: Dict) -> str:
         """提取参考答案内容"""
         return (reference_answer.get('standard_answer') or 
@@ -344,7 +731,7 @@ class Evaluator:
                 "overall": 0
             },
             "feedback": f"模型回答生成失败: {error_message}",
-            "details": {},
+            "details": {"grading_tier": "generation_error"},
             "evaluation_tokens": 0
         }
     
@@ -370,6 +757,7 @@ class Evaluator:
             "reference_answer": display_reference,
             "evaluation": evaluation,
             "tokens_used": model_response.get('tokens_used', 0) + evaluation.get('evaluation_tokens', 0),
+            "prompt_tokens": model_response.get('prompt_tokens', 0),
             "timestamp": model_response.get('timestamp')
         }
     
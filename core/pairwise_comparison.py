@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+成对比较模块
+功能：在已完成的评估任务结果上比较多个模型（A vs B），用 comparison_prompt 让评估模型判定同一道题哪个回答更好，
+      由胜负拟合 Bradley-Terry 强度并换算为 Elo 分数。
+      比较采用主动调度：每一轮只挑选当前结果最不确定、比较次数最少的模型对，
+      在 max_comparisons 的预算内完成排名，不需要对每对模型的每道题都调用评估模型
+"""
+
+import asyncio
+import random
+import re
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from .evaluation.rating import bradley_terry, pair_information, rating_table
+from models.model_manager import BaseModel
+from utils.prompt_loader import PromptLoader
+
+# 每轮并发比较的模型对数量
+DEFAULT_BATCH_SIZE = 4
+# 评估模型回复中的总体评价，例如 "总体评价：A更好"
+VERDICT_PATTERN = re.compile(r'总体评价\s*[：:]\s*(?:回答)?\s*([AB])\s*(?:更好|胜|较好|更优)')
+TIE_PATTERN = re.compile(r'总体评价\s*[：:].*?(相当|持平|平局|一样|不分)')
+
+
+def parse_comparison_verdict(content: str) -> Optional[str]:
+    """解析比较结果，返回 "A"、"B"、"tie"；无法解析时返回 None"""
+    match = VERDICT_PATTERN.search(content or "")
+    if match:
+        return match.group(1)
+    if TIE_PATTERN.search(content or ""):
+        return "tie"
+    return None
+
+
+def collect_task_answers(tasks: List[Dict[str, Any]]) -> Dict[str, Dict[Any, Dict[str, Any]]]:
+    """按模型整理已完成任务的结果项：{模型名: {question_id: 结果项}}；同一模型的多个任务用任务ID区分"""
+    entries = {}
+    for task in tasks:
+        task_id = task.get("task_id")
+        results = (task.get("results") or {}).get("results")
+        if task.get("status") != "completed" or not results:
+            raise ValueError(f"任务 {task_id} 尚未完成或没有评估结果")
+        name = task.get("target_model_name") or task_id
+        if name in entries:
+            name = f"{name} ({task_id})"
+        entries[name] = {
+            item["question_id"]: item for item in results
+            if item.get("model_response") and not str(item["model_response"]).startswith("生成失败")
+        }
+    return entries
+
+
+class PairwiseComparator:
+    """成对比较引擎
+
+    settings 可包含 max_comparisons（评估模型调用预算，默认 模型数 × 题目数）、
+    batch_size（每轮并发比较的模型对数）、seed（题目顺序和 A/B 位置的随机种子）
+    以及 swap_positions（随机交换 A/B 位置以抵消位置偏好，默认开启）
+    """
+
+    def __init__(self, judge_model: BaseModel, prompt_loader: PromptLoader,
+                 settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.judge_model = judge_model
+        self.prompt_loader = prompt_loader
+        self.max_comparisons = settings.get("max_comparisons")
+        self.batch_size = max(1, int(settings.get("batch_size", DEFAULT_BATCH_SIZE)))
+        self.swap_positions = bool(settings.get("swap_positions", True))
+        self.rng = random.Random(settings.get("seed", 0))
+
+    async def compare(self, entries: Dict[str, Dict[Any, Dict[str, Any]]]) -> Dict[str, Any]:
+        """对各模型在共同题目上的回答做成对比较，返回评分表和比较记录"""
+        names = list(entries)
+        if len(names) < 2:
+            raise ValueError("成对比较至少需要两个模型的评估结果")
+        question_ids = [qid for qid in entries[names[0]] if all(qid in entries[name] for name in names[1:])]
+        if not question_ids:
+            raise ValueError("所选任务没有共同的已回答题目")
+
+        count = len(names)
+        pairs = [(i, j) for i in range(count) for j in range(i + 1, count)]
+        # 每对模型各自按随机顺序消耗题目，主动调度只决定比较哪一对
+        pending = {pair: self.rng.sample(question_ids, len(question_ids)) for pair in pairs}
+        possible = len(pairs) * len(question_ids)
+        budget = min(possible, int(self.max_comparisons or count * len(question_ids)))
+
+        wins = np.zeros((count, count))
+        ties = np.zeros((count, count))
+        strengths = np.ones(count)
+        matches, failed, tokens_used = [], 0, 0
+        position_wins = {"A": 0, "B": 0, "tie": 0}
+
+        while len(matches) + failed < budget:
+            selected = self._select_pairs(pairs, pending, strengths, wins + wins.T + ties,
+                                          min(self.batch_size, budget - len(matches) - failed))
+            if not selected:
+                break
+            outcomes = await asyncio.gather(*(
+                self._judge(entries, names, pair, pending[pair].pop()) for pair in selected
+            ))
+            for outcome in outcomes:
+                tokens_used += outcome.pop("tokens_used", 0)
+                if outcome.get("error"):
+                    failed += 1
+                    continue
+                i, j = outcome.pop("indices")
+                if outcome["winner"] is None:
+                    ties[i, j] += 1
+                    ties[j, i] += 1
+                elif outcome["winner"] == names[i]:
+                    wins[i, j] += 1
+                else:
+                    wins[j, i] += 1
+                position_wins[outcome["verdict"]] += 1
+                matches.append(outcome)
+            strengths = bradley_terry(wins + ties / 2.0)
+
+        table = rating_table(names, wins, ties)
+        print(f"成对比较完成: {count} 个模型，{len(question_ids)} 道题，"
+              f"调用评估模型 {len(matches) + failed} 次（全量比较需 {possible} 次）")
+        return {
+            "models": names,
+            "questions": len(question_ids),
+            "comparisons": len(matches),
+            "failed_comparisons": failed,
+            "possible_comparisons": possible,
+            "saved_ratio": round(1 - (len(matches) + failed) / possible, 4),
+            "tokens_used": tokens_used,
+            "position_verdicts": position_wins,
+            **table,
+            "matches": matches
+        }
+
+    def _select_pairs(self, pairs: List[Tuple[int, int]], pending: Dict[Tuple[int, int], List[Any]],
+                      strengths: np.ndarray, games: np.ndarray, limit: int) -> List[Tuple[int, int]]:
+        """按信息量从高到低挑选还有未比较题目的模型对"""
+        rows, cols = np.array(pairs).T
+        information = pair_information(strengths, games)[rows, cols]
+        available = np.array([bool(pending[pair]) for pair in pairs])
+        information = np.where(available, information, -1.0)
+        order = np.argsort(-information, kind="stable")[:limit]
+        return [pairs[index] for index in order if available[index]]
+
+    async def _judge(self, entries: Dict[str, Dict[Any, Dict[str, Any]]], names: List[str],
+                     pair: Tuple[int, int], question_id: Any) -> Dict[str, Any]:
+        """让评估模型比较一对模型在一道题上的回答"""
+        i, j = pair
+        if self.swap_positions and self.rng.random() < 0.5:
+            i, j = j, i
+        item_a, item_b = entries[names[i]][question_id], entries[names[j]][question_id]
+        prompt = self.prompt_loader.create_comparison_prompt(
+            question=item_a.get("question", ""),
+            answer_a=item_a["model_response"],
+            answer_b=item_b["model_response"],
+            reference=item_a.get("reference_answer") or "无"
+        )
+        response = await self.judge_model.generate(prompt)
+        record = {
+            "question_id": question_id,
+            "model_a": names[i],
+            "model_b": names[j],
+            "tokens_used": response.get("tokens_used", 0)
+        }
+        if response.get("error"):
+            print(f"成对比较失败（题目 {question_id}）: {response['error']}")
+            return dict(record, error=response["error"])
+
+        verdict = parse_comparison_verdict(response.get("content", ""))
+        if verdict is None:
+            print(f"无法解析比较结果（题目 {question_id}），不计入胜负")
+            return dict(record, error="无法解析比较结果")
+        winner = {"A": names[i], "B": names[j]}.get(verdict)
+        return dict(record, indices=(i, j), verdict=verdict, winner=winner)
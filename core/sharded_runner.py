@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片评估模块
+功能：把一个数据集的问题交错分配给 N 个工作进程，每个进程运行自己的事件循环和 Evaluator，
+      协调进程按原始顺序合并结果项并重新计算汇总；模型的并发上限和每分钟请求数通过
+      进程间共享的信号量和请求节拍在所有工作进程间统一生效；任务的暂停、恢复和取消通过共享的控制状态
+      同步到每个工作进程的 TaskControl
+"""
+
+import asyncio
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Callable
+
+from .evaluation.grading_router import calculate_grading_stats
+from .evaluation.judge_parser import calculate_parse_stats
+from .evaluation.judge_ensemble import calculate_ensemble_stats
+from .task_control import TaskControl
+from models.shared_limits import build_shared_limits, install_shared_limits
+
+# 按分片数均分的预算项（运行时间上限对每个分片保持不变）
+SPLIT_BUDGET_KEYS = ("max_tokens", "max_cost")
+# 进程间共享的任务控制状态
+CONTROL_STATES = ("running", "paused", "cancelled")
+# 协调进程和工作进程同步控制状态的间隔（秒）
+CONTROL_POLL_SECONDS = 0.05
+
+# 工作进程中的共享控制状态（由 _init_worker 安装）
+_shared_control_state = None
+
+
+def _init_worker(shared_limits, control_state=None):
+    """工作进程初始化：安装协调进程创建的共享限制和控制状态"""
+    global _shared_control_state
+    install_shared_limits(shared_limits)
+    _shared_control_state = control_state
+
+
+async def _follow_control(control, control_state):
+    """工作进程中把共享控制状态同步到本进程的 TaskControl，直到任务取消"""
+    while not control.cancelled:
+        state = CONTROL_STATES[control_state.value]
+        if state == "cancelled":
+            control.cancel()
+        elif state == "paused":
+            control.pause()
+        else:
+            control.resume()
+        await asyncio.sleep(CONTROL_POLL_SECONDS)
+
+
+async def _publish_control(control, control_state):
+    """协调进程中把任务的 TaskControl 状态发布给所有工作进程"""
+    while True:
+        control_state.value = CONTROL_STATES.index(control.state)
+        if control.cancelled:
+            return
+        await asyncio.sleep(CONTROL_POLL_SECONDS)
+
+
+def _run_shard(model_config_file: str, log_dir: Optional[str],
+               target_model_name: str, evaluator_model_name: str,
+               questions: List[Dict], answers: List[Dict], config: Dict[str, Any]) -> Dict[str, Any]:
+    """在工作进程中评估一个分片"""
+    from models.model_manager import ModelManager
+    from utils.prompt_loader import PromptLoader
+    from .evaluator import Evaluator
+    from .evaluation.logger import EvaluationLogger
+
+    evaluator = Evaluator(ModelManager(model_config_file), PromptLoader())
+    if log_dir:
+        evaluator.logger = EvaluationLogger(log_dir=log_dir)
+
+    async def evaluate_shard():
+        if _shared_control_state is None:
+            return await evaluator.evaluate_model(
+                target_model_name, evaluator_model_name, questions, answers, config
+            )
+        control = TaskControl()
+        follower = asyncio.create_task(_follow_control(control, _shared_control_state))
+        try:
+            return await evaluator.evaluate_model(
+                target_model_name, evaluator_model_name, questions, answers, config, control=control
+            )
+        finally:
+            follower.cancel()
+
+    start = time.perf_counter()
+    results = asyncio.run(evaluate_shard())
+    results["shard_seconds"] = round(time.perf_counter() - start, 4)
+    results["pid"] = os.getpid()
+    return results
+
+
+class ShardedEvaluator:
+    """多进程分片评估的协调器"""
+
+    def __init__(self, evaluator):
+        self.evaluator = evaluator
+        self.model_manager = evaluator.model_manager
+
+    async def evaluate(self, target_model_name: str, evaluator_model_name: str,
+                       questions: List[Dict], answers: List[Dict], config: Dict[str, Any],
+                       progress_callback: Optional[Callable] = None,
+                       control: Optional[TaskControl] = None) -> Dict[str, Any]:
+        """分片评估，返回与 Evaluator.evaluate_model 结构相同的结果（另含 shards 字段）
+
+        control 的暂停、恢复和取消同步到所有工作进程，取消时各分片返回已完成部分的结果
+        """
+        target_model = self.model_manager.get_model(target_model_name)
+        evaluator_model = self.model_manager.get_model(evaluator_model_name)
+        if not target_model:
+            raise ValueError(f"待评估模型 {target_model_name} 不存在")
+        if not evaluator_model:
+            raise ValueError(f"评估模型 {evaluator_model_name} 不存在")
+
+        # 没有ID的问题按全局序号补上，避免各分片内的序号重复
+        questions = [
+            question if question.get('id') or question.get('question_id') else dict(question, id=index + 1)
+            for index, question in enumerate(questions)
+        ]
+        shard_count = max(1, min(int(config.get("shards", 1)), len(questions)))
+        shard_indices = [list(range(k, len(questions), shard_count)) for k in range(shard_count)]
+        shard_config = self._shard_config(config, shard_count)
+
+        mp_context = multiprocessing.get_context("spawn")
+        shared_limits = build_shared_limits(mp_context, {
+            target_model_name: target_model.config,
+            evaluator_model_name: evaluator_model.config
+        })
+        log_dir = str(self.evaluator.logger.log_dir)
+        print(f"🧩 分片评估：{len(questions)} 个问题分为 {shard_count} 个进程，共享限制: {list(shared_limits)}")
+
+        control_state = mp_context.Value('b', 0) if control is not None else None
+        start_time = datetime.now()
+        loop = asyncio.get_running_loop()
+        completed_questions = 0
+        with ProcessPoolExecutor(max_workers=shard_count, mp_context=mp_context,
+                                 initializer=_init_worker, initargs=(shared_limits, control_state)) as executor:
+            async def run_shard(indices: List[int]) -> Dict[str, Any]:
+                nonlocal completed_questions
+                shard_results = await loop.run_in_executor(
+                    executor, _run_shard, self.model_manager.config_file, log_dir,
+                    target_model_name, evaluator_model_name,
+                    [questions[i] for i in indices], answers, shard_config
+                )
+                # 进度按已结束分片的问题数上报 (30%-90%)
+                completed_questions += len(indices)
+                if progress_callback:
+                    progress_callback(int(30 + 60 * completed_questions / len(questions)),
+                                      completed_questions, len(questions))
+                return shard_results
+
+            # 每个分片独占一个工作进程，提交后立即开始，取消由各进程内的 TaskControl 完成
+            publisher = asyncio.create_task(_publish_control(control, control_state)) if control else None
+            try:
+                shard_results = await asyncio.gather(*(run_shard(indices) for indices in shard_indices))
+            finally:
+                if publisher is not None:
+                    publisher.cancel()
+
+        results = self._merge(target_model_name, evaluator_model_name, questions,
+                              shard_indices, shard_results, start_time)
+        if progress_callback:
+            progress_callback(100)
+        return results
+
+    @staticmethod
+    def _shard_config(config: Dict[str, Any], shard_count: int) -> Dict[str, Any]:
+        """工作进程使用的配置：并发度和 token/费用预算按分片数均分"""
+        shard_config = {k: v for k, v in config.items() if k != "shards"}
+        shard_config["concurrency"] = max(1, math.ceil(int(config.get("concurrency", 1)) / shard_count))
+        if config.get("budget"):
+            shard_config["budget"] = {
+                key: (value / shard_count if key in SPLIT_BUDGET_KEYS else value)
+                for key, value in config["budget"].items()
+            }
+        return shard_config
+
+    def _merge(self, target_model_name: str, evaluator_model_name: str, questions: List[Dict],
+               shard_indices: List[List[int]], shard_results: List[Dict[str, Any]],
+               start_time: datetime) -> Dict[str, Any]:
+        """按原始问题顺序合并各分片的结果项，并由合并后的结果项重新计算汇总"""
+        position = {
+            str(question.get('id') or question.get('question_id')): index
+            for index, question in enumerate(questions)
+        }
+        items = [
+            item for shard in shard_results for item in shard["results"]
+        ]
+        items.sort(key=lambda item: position.get(str(item.get("question_id")), len(questions)))
+
+        results = summarize_result_items(self.evaluator, target_model_name, evaluator_model_name,
+                                         len(questions), items, start_time)
+        results["judge_cached_tokens"] = sum(shard.get("judge_cached_tokens", 0) for shard in shard_results)
+        results["concurrency"] = sum(shard.get("concurrency", 1) for shard in shard_results)
+        results["log_files"] = [shard.get("log_file") for shard in shard_results]
+        results["log_file"] = results["log_files"][0] if results["log_files"] else None
+        if any(shard.get("budget_exceeded") for shard in shard_results):
+            results["budget_exceeded"] = True
+            results["completed_questions"] = len(items)
+        if any(shard.get("cancelled") for shard in shard_results):
+            results["cancelled"] = True
+            results["completed_questions"] = len(items)
+        results["shards"] = [
+            {
+                "questions": len(indices),
+                "completed": len(shard["results"]),
+                "seconds": shard.get("shard_seconds"),
+                "pid": shard.get("pid")
+            }
+            for indices, shard in zip(shard_indices, shard_results)
+        ]
+        return results
+
+
+def summarize_result_items(evaluator, target_model_name: str, evaluator_model_name: str,
+                           questions_count: int, items: List[Dict[str, Any]],
+                           start_time: datetime) -> Dict[str, Any]:
+    """由已按原始顺序排列的结果项构造与 Evaluator.evaluate_model 相同结构的结果（分片和分布式评估共用）"""
+    results = evaluator._initialize_results(target_model_name, evaluator_model_name, questions_count)
+    results["start_time"] = start_time.isoformat()
+    results["results"] = items
+    results["total_tokens"] = sum(item["tokens_used"] for item in items)
+    results["grading_stats"] = calculate_grading_stats(items)
+    results["judge_parse_stats"] = calculate_parse_stats(items)
+    ensemble_stats = calculate_ensemble_stats(items)
+    if ensemble_stats:
+        results["judge_ensemble"] = ensemble_stats
+    results["judge_cached_tokens"] = sum(
+        item["evaluation"].get("evaluation_cached_tokens", 0) for item in items
+    )
+
+    end_time = datetime.now()
+    total_duration = (end_time - start_time).total_seconds()
+    results["model_generation_start_time"] = start_time.isoformat()
+    results["model_generation_end_time"] = end_time.isoformat()
+    results["total_duration_seconds"] = total_duration
+    results["summary"] = evaluator.score_calculator.calculate_summary_statistics(items)
+    results["summary"]["total_duration_seconds"] = total_duration
+    results["summary"]["total_duration_formatted"] = evaluator._format_duration(total_duration)
+    results["total_cost"] = evaluator.estimate_cost(items, target_model_name, evaluator_model_name)
+    results["end_time"] = end_time.isoformat()
+    return results
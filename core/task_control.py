@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务控制模块
+功能：为运行中的评估任务提供协作式的取消、暂停和恢复。评估器在每个问题开始前检查控制状态，
+      暂停或取消时中断进行中的问题（取消其中的模型请求，释放并发槽位），恢复后被中断的问题重新执行
+"""
+
+import asyncio
+from typing import Dict, Any, Optional, Set
+
+
+class TaskControl:
+    """单个评估任务的控制状态：running、paused 或 cancelled"""
+
+    def __init__(self, task_id: Optional[str] = None):
+        self.task_id = task_id
+        self.state = "running"
+        self._resume_event = asyncio.Event()
+        self._resume_event.set()
+        self._in_flight: Set[asyncio.Task] = set()
+        self._preempted: Set[asyncio.Task] = set()
+        self.preemptions = 0  # 因暂停或取消被中断的问题次数
+
+    @property
+    def running(self) -> bool:
+        return self.state == "running"
+
+    @property
+    def paused(self) -> bool:
+        return self.state == "paused"
+
+    @property
+    def cancelled(self) -> bool:
+        return self.state == "cancelled"
+
+    async def wait_until_runnable(self) -> bool:
+        """暂停时等待恢复；返回 False 表示任务已取消，不应再开始新的问题"""
+        while self.paused:
+            await self._resume_event.wait()
+        return not self.cancelled
+
+    def track(self, work: asyncio.Task):
+        """登记一个进行中的问题"""
+        self._in_flight.add(work)
+        work.add_done_callback(self._in_flight.discard)
+
+    def was_preempted(self, work: asyncio.Task) -> bool:
+        """问题是否因暂停或取消被中断（而不是整个评估被取消）"""
+        if work in self._preempted:
+            self._preempted.discard(work)
+            return True
+        return False
+
+    def pause(self) -> bool:
+        """暂停：中断进行中的问题，恢复前不再开始新问题"""
+        if self.state != "running":
+            return False
+        self.state = "paused"
+        self._resume_event.clear()
+        self._preempt_in_flight()
+        return True
+
+    def resume(self) -> bool:
+        """恢复暂停的任务"""
+        if self.state != "paused":
+            return False
+        self.state = "running"
+        self._resume_event.set()
+        return True
+
+    def cancel(self) -> bool:
+        """取消：中断进行中的问题，评估器返回已完成部分的结果"""
+        if self.cancelled:
+            return False
+        self.state = "cancelled"
+        self._resume_event.set()
+        self._preempt_in_flight()
+        return True
+
+    def _preempt_in_flight(self):
+        for work in list(self._in_flight):
+            if not work.done():
+                self._preempted.add(work)
+                self.preemptions += 1
+                work.cancel()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "in_flight": len(self._in_flight),
+            "preemptions": self.preemptions
+        }
+
+
+# 运行中任务的控制对象
+_task_controls: Dict[str, TaskControl] = {}
+
+
+def register_task_control(task_id: str) -> TaskControl:
+    """为开始运行的任务创建控制对象"""
+    control = TaskControl(task_id)
+    _task_controls[task_id] = control
+    return control
+
+
+def get_task_control(task_id: str) -> Optional[TaskControl]:
+    """获取运行中任务的控制对象，任务未在运行时返回 None"""
+    return _task_controls.get(task_id)
+
+
+def remove_task_control(task_id: str):
+    """任务结束后移除控制对象"""
+    _task_controls.pop(task_id, None)
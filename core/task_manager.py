@@ -60,7 +60,7 @@ class TaskManager:
             self.save_task(task_id)
             
             # 如果任务完成或失败，触发清理
-            if status in ['completed', 'failed']:
+            if status in ['completed', 'failed', 'cancelled', 'budget_exceeded']:
                 self.cleanup_old_tasks(max_tasks=5)
             
             return True
@@ -151,6 +151,21 @@ class TaskManager:
                 except Exception as e:
                     print(f"加载任务失败 {task_id}: {e}")
     
+    def fail_orphaned_distributed_tasks(self) -> List[str]:
+        """把未结束的分布式任务标记为失败（分片进度只保存在协调节点内存中，重启后无法继续）"""
+        with self.lock:
+            orphaned = [
+                task_id for task_id, task in self.tasks.items()
+                if task.get("distributed") and task.get("status") in ("pending", "running", "paused")
+            ]
+            for task_id in orphaned:
+                self.tasks[task_id]["status"] = "failed"
+                self.tasks[task_id]["error"] = "协调节点重启，分布式任务的分片进度已丢失"
+                self.tasks[task_id]["updated_at"] = datetime.now().isoformat()
+                self.save_task(task_id)
+                print(f"分布式任务 {task_id} 在协调节点重启前未完成，已标记为失败")
+            return orphaned
+    
     def get_task_statistics(self) -> Dict[str, Any]:
         """获取任务统计信息"""
         with self.lock:
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务预估模块
+功能：在不调用模型的情况下预估一次评估任务的 token 消耗、费用和耗时。
+      用与实际运行相同的方式渲染待评估模型和评估模型的提示，批量计数 token，
+      结合 config/models.json 中的价格（cost_estimation）、吞吐（throughput）和限流（rate_limit）配置，
+      按所选并发度模拟问题的调度得到预计耗时
+"""
+
+import heapq
+import math
+from typing import Dict, List, Any
+
+from .evaluator import Evaluator
+
+# 没有标准答案可参考时，假设待评估模型每题输出的 token 数
+DEFAULT_ANSWER_TOKENS = 500
+# 评估模型每次输出的 token 数（评估JSON和简短反馈）
+JUDGE_OUTPUT_TOKENS = 300
+
+
+def simulate_makespan(durations: List[float], concurrency: int) -> float:
+    """按原始顺序把问题分配给最早空闲的并发槽位，返回全部完成的时间"""
+    slots = [0.0] * max(1, concurrency)
+    for duration in durations:
+        heapq.heappush(slots, heapq.heappop(slots) + duration)
+    return max(slots) if durations else 0.0
+
+
+class TaskPlanner:
+    """评估任务的运行前预估（dry run）"""
+
+    def __init__(self, evaluator: Evaluator):
+        self.evaluator = evaluator
+        self.model_manager = evaluator.model_manager
+        self.prompt_loader = evaluator.prompt_loader
+
+    def plan(self, target_model_name: str, evaluator_model_name: str,
+             questions: List[Dict], answers: List[Dict],
+             config: Dict[str, Any] = None) -> Dict[str, Any]:
+        """预估评估任务的 token、费用和耗时，参数与 Evaluator.evaluate_model 相同"""
+        target_model = self.model_manager.get_model(target_model_name)
+        evaluator_model = self.model_manager.get_model(evaluator_model_name)
+        if not target_model:
+            raise ValueError(f"待评估模型 {target_model_name} 不存在")
+        if not evaluator_model:
+            raise ValueError(f"评估模型 {evaluator_model_name} 不存在")
+
+        config = config or {}
+        answer_map = self.evaluator._create_answer_mapping(answers)
+        max_answer_tokens = config.get("max_tokens") or target_model.config.get("max_tokens")
+
+        # 渲染提示：评估提示中的模型回答先留空，回答长度按标准答案估算后单独加上
+        target_prompts, references, judge_prompts = [], [], []
+        for index, question in enumerate(questions):
+            question_id = question.get('id') or question.get('question_id') or (index + 1)
+            reference_answer = self.evaluator._get_reference_answer(question_id, question, answer_map)
+            reference = self.evaluator._extract_reference_content(reference_answer)
+            standard_answer = reference_answer.get('standard_answer', reference)
+
+            target_prompts.append(self.evaluator.build_target_prompt(question, config.get("dataset_file")))
+            references.append(reference)
+            judge_prompts.append(self.prompt_loader.create_programming_evaluation_prompt(
+                question, "", standard_answer, question.get('type', 'standard_answer'), config.get("dataset_file")
+            ))
+
+        target_input = target_model.count_tokens_batch(target_prompts)
+        answer_tokens = [
+            min(count or DEFAULT_ANSWER_TOKENS, max_answer_tokens or math.inf)
+            for count in target_model.count_tokens_batch(references)
+        ]
+        judge_input = [
+            prompt_tokens + answer for prompt_tokens, answer in
+            zip(evaluator_model.count_tokens_batch(judge_prompts), answer_tokens)
+        ]
+
+        # 多候选回答：支持 n 参数的模型每题一次请求（提示只计一次），否则每个候选单独请求；每个候选都要评估
+        question_count = len(questions)
+        samples = max(1, int(config.get("samples_per_question", 1)))
+        prompt_copies = 1 if target_model.supports_multi_sample else samples
+        # 集成评估：每个回答分别请求各评估模型（不合并批量请求），按评估模型的价格估算
+        ensemble = config.get("judge_ensemble") or {}
+        judge_count = len({evaluator_model_name, *ensemble.get("judges", [])}) if ensemble else 1
+        judge_batch_size = 1 if ensemble else max(1, int(config.get("judge_batch_size", 1)))
+        judge_requests = math.ceil(question_count * samples / judge_batch_size) * judge_count
+        target = self._model_usage(target_model_name, target_model, question_count * prompt_copies,
+                                   sum(target_input) * prompt_copies, int(sum(answer_tokens)) * samples)
+        judge = self._model_usage(evaluator_model_name, evaluator_model, judge_requests,
+                                  sum(judge_input) * samples * judge_count,
+                                  JUDGE_OUTPUT_TOKENS * question_count * samples * judge_count)
+
+        # 每题耗时：请求间隔 + 生成回答 + 评估间隔 + 评估（与 Evaluator 的默认间隔一致）
+        request_interval = config.get("request_interval", 2)
+        judge_interval = config.get("judge_interval", 1)
+        judge_seconds = evaluator_model.estimate_request_seconds(JUDGE_OUTPUT_TOKENS)
+        durations = [
+            (request_interval if index > 0 else 0) + target_model.estimate_request_seconds(answer)
+            + judge_interval + judge_seconds
+            for index, answer in enumerate(answer_tokens)
+        ]
+
+        concurrency = max(1, int(config.get("concurrency", 1)))
+        effective_concurrency = min(
+            [concurrency] + [self._concurrency_cap(model) for model in (target_model, evaluator_model)]
+        )
+        bounds = {"concurrency": simulate_makespan(durations, effective_concurrency)}
+        for role, usage in (("target", target), ("judge", judge)):
+            bounds.update({f"{role}_{key}": seconds for key, seconds in usage.pop("rate_limit_seconds").items()})
+        bottleneck = max(bounds, key=bounds.get)
+        estimated_seconds = bounds[bottleneck]
+
+        notes = []
+        if config.get("grading_mode", "judge") in ("execution", "hybrid"):
+            notes.append("本地评分能判定的问题不会调用评估模型，评估模型的消耗是上限")
+        if judge_count > 1:
+            notes.append(f"集成评估共 {judge_count} 个评估模型，费用按 {evaluator_model_name} 的价格估算"
+                         + ("；开启 early_stop 时实际请求更少，评估消耗是上限" if ensemble.get("early_stop") else ""))
+        if samples > 1:
+            notes.append(f"每题生成 {samples} 个候选回答并分别评估，耗时按候选并行估算")
+        if effective_concurrency < concurrency:
+            notes.append(f"模型配置的 concurrency_limit 把有效并发度限制为 {effective_concurrency}")
+
+        return {
+            "target_model_name": target_model_name,
+            "evaluator_model_name": evaluator_model_name,
+            "questions_count": question_count,
+            "concurrency": concurrency,
+            "effective_concurrency": effective_concurrency,
+            "target": target,
+            "judge": judge,
+            "total_tokens": target["total_tokens"] + judge["total_tokens"],
+            "total_cost": round(target["cost"] + judge["cost"], 6),
+            "estimated_seconds": round(estimated_seconds, 2),
+            "estimated_duration_formatted": self.evaluator._format_duration(estimated_seconds),
+            "time_bounds": {key: round(seconds, 2) for key, seconds in bounds.items()},
+            "bottleneck": bottleneck,
+            "notes": notes
+        }
+
+    def _model_usage(self, name: str, model, requests: int,
+                     input_tokens: int, output_tokens: int) -> Dict[str, Any]:
+        """汇总单个模型的请求数、token 和费用，以及按限流配置至少需要的时间"""
+        pricing = self.model_manager.get_model_pricing(name)
+        cost = input_tokens * pricing.get("input_cost_per_token", 0) + \
+            output_tokens * pricing.get("output_cost_per_token", 0)
+
+        # rate_limit 对应模型配置中的 {"requests_per_minute": 60, "tokens_per_minute": 90000}
+        rate_limit = model.config.get("rate_limit") or {}
+        rate_limit_seconds = {}
+        if rate_limit.get("requests_per_minute"):
+            rate_limit_seconds["requests_per_minute"] = requests / rate_limit["requests_per_minute"] * 60
+        if rate_limit.get("tokens_per_minute"):
+            rate_limit_seconds["tokens_per_minute"] = \
+                (input_tokens + output_tokens) / rate_limit["tokens_per_minute"] * 60
+
+        return {
+            "model": name,
+            "requests": requests,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "cost": round(cost, 6),
+            "pricing": pricing,
+            "token_counter": model.token_counter.encoder.name,
+            "rate_limit_seconds": rate_limit_seconds
+        }
+
+    @staticmethod
+    def _concurrency_cap(model) -> float:
+        """模型配置的自适应并发上限（未配置时不限制）"""
+        limit = (model.config.get("concurrency_limit") or {}).get("max")
+        return max(1, int(limit)) if limit else math.inf
@@ -15,7 +15,7 @@ from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
 
 # 导入API路由模块
-from api import models_router, tasks_router, datasets_router, evaluations_router
+from api import models_router, tasks_router, datasets_router, evaluations_router, distributed_router
 from api.dependencies import init_dependencies
 
 # 创建FastAPI应用实例
@@ -50,6 +50,7 @@ app.include_router(models_router)
 app.include_router(tasks_router)
 app.include_router(datasets_router)
 app.include_router(evaluations_router)
+app.include_router(distributed_router)
 
 @app.get("/")
 async def home(request: Request):
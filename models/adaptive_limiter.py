@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应并发限制器
+功能：按模型端点限制同时进行的请求数，成功时加性增大并发上限，
+      遇到 429/503/超时时乘性减小（AIMD），并遵守 Retry-After 头
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Any, Optional
+
+from .fair_scheduler import FairQueue
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 头（秒数或HTTP日期），返回需要等待的秒数"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        now = datetime.now(retry_at.tzinfo) if retry_at.tzinfo else datetime.now()
+        return max(0.0, (retry_at - now).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveConcurrencyLimiter:
+    """基于AIMD的端点并发限制器"""
+
+    def __init__(self, name: str, initial: float = 4, min_limit: float = 1, max_limit: float = 64,
+                 increase_step: float = 1.0, decrease_factor: float = 0.5,
+                 decrease_cooldown: float = 1.0):
+        self.name = name
+        self.min_limit = max(1.0, float(min_limit))
+        self.max_limit = max(self.min_limit, float(max_limit))
+        self.limit = min(self.max_limit, max(self.min_limit, float(initial)))
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self.decrease_cooldown = decrease_cooldown
+
+        self.in_flight = 0
+        # 排队的请求按所属任务加权公平出队（见 fair_scheduler.py）
+        self.waiters = FairQueue()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+
+        self.successes = 0
+        self.overloads = 0
+        self.retry_after_hits = 0
+
+    @property
+    def current_limit(self) -> int:
+        """当前允许的并发请求数"""
+        return max(1, int(self.limit))
+
+    async def acquire(self):
+        """获取一个请求槽位，必要时排队等待"""
+        while True:
+            # 遵守 Retry-After：端点被限流期间所有请求都等待
+            delay = self.blocked_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            if self.in_flight < self.current_limit and not self.waiters:
+                self.in_flight += 1
+                return
+
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # 已经分配到槽位但调用方被取消，归还槽位
+                    self.release()
+                else:
+                    self._remove_waiter(waiter)
+                raise
+            # 被唤醒时槽位已经由 release 计入 in_flight
+            if time.monotonic() < self.blocked_until:
+                self.release()
+                continue
+            return
+
+    def release(self):
+        """归还请求槽位并唤醒排队的请求"""
+        self.in_flight = max(0, self.in_flight - 1)
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        """在并发上限内按顺序唤醒等待的请求"""
+        while self.waiters and self.in_flight < self.current_limit:
+            waiter = self.waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(True)
+
+    def _remove_waiter(self, waiter):
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def on_success(self):
+        """请求成功：加性增大并发上限（每个完整窗口约 +increase_step）"""
+        self.successes += 1
+        self.limit = min(self.max_limit, self.limit + self.increase_step / max(self.limit, 1.0))
+        self._wake_waiters()
+
+    def on_overload(self, retry_after: Optional[float] = None):
+        """请求被限流（429/503）或超时：乘性减小并发上限"""
+        self.overloads += 1
+        now = time.monotonic()
+        # 同一批并发请求的连续失败只减一次，避免上限瞬间塌缩
+        if now - self.last_decrease >= self.decrease_cooldown:
+            self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+            self.last_decrease = now
+        if retry_after:
+            self.retry_after_hits += 1
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    @asynccontextmanager
+    async def slot(self):
+        """以上下文管理器形式占用一个请求槽位"""
+        await self.acquire()
+        try:
+            yield self
+        finally:
+            self.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取限制器的当前指标"""
+        return {
+            "endpoint": self.name,
+            "limit": self.current_limit,
+            "limit_raw": round(self.limit, 3),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "queued": len(self.waiters),
+            "scheduling": self.waiters.snapshot(),
+            "successes": self.successes,
+            "overloads": self.overloads,
+            "retry_after_hits": self.retry_after_hits,
+            "blocked_seconds_remaining": round(max(0.0, self.blocked_until - time.monotonic()), 3)
+        }
+
+
+# 按端点共享的限制器（同一端点的多个模型配置共用一个并发上限）
+_endpoint_limiters: Dict[str, AdaptiveConcurrencyLimiter] = {}
+
+
+def get_endpoint_limiter(endpoint: str, settings: Optional[Dict[str, Any]] = None) -> AdaptiveConcurrencyLimiter:
+    """获取（或创建）端点对应的限制器
+
+    settings 对应模型配置中的 concurrency_limit 字段，例如
+    {"initial": 4, "min": 1, "max": 32, "increase_step": 1, "decrease_factor": 0.5}
+    """
+    limiter = _endpoint_limiters.get(endpoint)
+    if limiter is None:
+        settings = settings or {}
+        limiter = AdaptiveConcurrencyLimiter(
+            endpoint,
+            initial=settings.get("initial", 4),
+            min_limit=settings.get("min", 1),
+            max_limit=settings.get("max", 64),
+            increase_step=settings.get("increase_step", 1.0),
+            decrease_factor=settings.get("decrease_factor", 0.5),
+            decrease_cooldown=settings.get("decrease_cooldown", 1.0)
+        )
+        _endpoint_limiters[endpoint] = limiter
+    return limiter
+
+
+def list_limiter_metrics() -> List[Dict[str, Any]]:
+    """列出所有端点限制器的指标"""
+    return [limiter.snapshot() for limiter in _endpoint_limiters.values()]
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公平调度模块
+功能：多个评估任务同时访问同一模型端点时，端点限制器按加权公平排队（WFQ）分配请求槽位：
+      每个任务是一个调度流（flow），排队请求按虚拟完成时间出队，权重越大分到的槽位越多；
+      快速通道中的小任务（如冒烟测试）严格优先，不必排在大规模评估之后
+"""
+
+import contextvars
+import heapq
+import itertools
+from typing import Dict, Any, Optional
+
+
+class SchedulingFlow:
+    """调度流：一个评估任务的所有模型请求"""
+
+    def __init__(self, name: str, weight: float = 1.0, fast_lane: bool = False):
+        self.name = name
+        self.weight = max(0.01, float(weight))
+        self.fast_lane = fast_lane
+
+    def __repr__(self):
+        return f"SchedulingFlow({self.name!r}, weight={self.weight}, fast_lane={self.fast_lane})"
+
+
+DEFAULT_FLOW = SchedulingFlow("default")
+
+# 当前请求所属的调度流（评估器在创建问题任务前设置，问题任务和其中的批量评估任务继承）
+_current_flow = contextvars.ContextVar("current_scheduling_flow", default=None)
+
+
+def get_current_flow() -> SchedulingFlow:
+    return _current_flow.get() or DEFAULT_FLOW
+
+
+def set_current_flow(flow: Optional[SchedulingFlow]) -> contextvars.Token:
+    return _current_flow.set(flow)
+
+
+def reset_current_flow(token: contextvars.Token):
+    _current_flow.reset(token)
+
+
+class FairQueue:
+    """加权公平队列，接口与限制器原来使用的 deque 相同（append / popleft / remove）
+
+    入队时为请求计算虚拟完成时间：max(系统虚拟时间, 该流上一个请求的完成时间) + 1/权重，
+    出队时取完成时间最小的请求并把系统虚拟时间推进到它的开始时间；快速通道的请求总是先于普通请求出队
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._sequence = itertools.count()
+        self._entries: Dict[int, list] = {}     # id(waiter) -> 堆中的条目，用于删除
+        self._last_finish: Dict[str, float] = {}
+        self._queued_by_flow: Dict[str, int] = {}
+        self.virtual_time = 0.0
+        self.fast_lane_served = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def append(self, waiter, flow: Optional[SchedulingFlow] = None):
+        flow = flow or get_current_flow()
+        start = max(self.virtual_time, self._last_finish.get(flow.name, 0.0))
+        finish = start + 1.0 / flow.weight
+        self._last_finish[flow.name] = finish
+        # 条目：[车道（0 为快速通道）, 完成时间, 序号, 开始时间, 流名称, 等待对象]
+        entry = [0 if flow.fast_lane else 1, finish, next(self._sequence), start, flow.name, waiter]
+        self._entries[id(waiter)] = entry
+        self._queued_by_flow[flow.name] = self._queued_by_flow.get(flow.name, 0) + 1
+        heapq.heappush(self._heap, entry)
+
+    def popleft(self):
+        while self._heap:
+            lane, _, _, start, flow_name, waiter = entry = heapq.heappop(self._heap)
+            if self._entries.get(id(waiter)) is not entry:
+                continue  # 已删除
+            self._discard(entry)
+            if lane == 0:
+                self.fast_lane_served += 1
+            else:
+                self.virtual_time = max(self.virtual_time, start)
+            self._prune()
+            return waiter
+        raise IndexError("pop from an empty FairQueue")
+
+    def remove(self, waiter):
+        entry = self._entries.get(id(waiter))
+        if entry is None or entry[-1] is not waiter:
+            raise ValueError("waiter not in queue")
+        self._discard(entry)  # 堆中的条目在出队时跳过
+
+    def _discard(self, entry):
+        del self._entries[id(entry[-1])]
+        flow_name = entry[4]
+        self._queued_by_flow[flow_name] -= 1
+        if not self._queued_by_flow[flow_name]:
+            del self._queued_by_flow[flow_name]
+
+    def _prune(self):
+        """清理没有排队请求且完成时间已落后于系统虚拟时间的流"""
+        if len(self._last_finish) > 2 * len(self._queued_by_flow) + 16:
+            self._last_finish = {
+                name: finish for name, finish in self._last_finish.items()
+                if name in self._queued_by_flow or finish > self.virtual_time
+            }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "queued_by_flow": dict(self._queued_by_flow),
+            "virtual_time": round(self.virtual_time, 3),
+            "fast_lane_served": self.fast_lane_served
+        }
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模拟大模型行为
+功能：为离线压测提供确定性的模拟回答、可配置的延迟分布、生成速率以及错误/429注入，
+      供内置 mock 提供商和本地 OpenAI 兼容模拟服务共同使用
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+from typing import Dict, List, Any, Optional, AsyncIterator
+
+
+# 评估提示中子问题示例分数的格式，例如 "sub_question_scores": [0, 0, 0]
+SUB_SCORES_PATTERN = re.compile(r'"sub_question_scores"\s*:\s*\[([^\]]*)\]')
+# 默认评估模板中的子问题条目，例如 "- 描述 (权重: 30.0%)"
+SUB_QUESTION_LINE_PATTERN = re.compile(r'^- .*\(权重: [\d.]+%\)\s*$', re.MULTILINE)
+# 批量评估提示中的条目分隔行，例如 "=== 条目 0 ==="
+BATCH_ITEM_PATTERN = re.compile(r'^=== 条目 (\d+) ===\s*$', re.MULTILINE)
+CHINESE_CHAR_PATTERN = re.compile(r'[\u4e00-\u9fff]')
+
+
+class MockAPIError(Exception):
+    """模拟服务端错误"""
+
+    def __init__(self, message: str, status_code: int = 500, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class MockRateLimitError(MockAPIError):
+    """模拟速率限制（HTTP 429）"""
+
+    def __init__(self, message: str = "mock rate limit exceeded", retry_after: Optional[float] = None):
+        super().__init__(message, status_code=429, retry_after=retry_after)
+
+
+class MockBehavior:
+    """模拟模型行为配置
+
+    配置示例::
+
+        {
+            "seed": 42,
+            "latency": {"distribution": "lognormal", "mean": 0.8, "sigma": 0.3},
+            "tokens_per_second": 50,
+            "error_rate": 0.01,
+            "rate_limit_rate": 0.02,
+            "retry_after": 1.0,
+            "response_text": null,
+            "judge_scores": null
+        }
+    """
+
+    DISTRIBUTIONS = ("fixed", "uniform", "normal", "lognormal", "exponential")
+
+    def __init__(self, seed: int = 0, latency: Optional[Dict[str, Any]] = None,
+                 tokens_per_second: Optional[float] = None, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: Optional[float] = 1.0,
+                 response_text: Optional[str] = None, judge_scores: Optional[Dict[str, Any]] = None,
+                 stream_chunk_chars: int = 16):
+        self.seed = seed
+        self.latency = latency or {"distribution": "fixed", "mean": 0.0}
+        self.tokens_per_second = tokens_per_second
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.response_text = response_text
+        self.judge_scores = judge_scores
+        self.stream_chunk_chars = max(1, stream_chunk_chars)
+        self.request_counter = 0
+
+        distribution = self.latency.get("distribution", "fixed")
+        if distribution not in self.DISTRIBUTIONS:
+            raise ValueError(f"不支持的延迟分布: {distribution}")
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> "MockBehavior":
+        """从配置字典创建"""
+        config = dict(config or {})
+        accepted = {
+            "seed", "latency", "tokens_per_second", "error_rate", "rate_limit_rate",
+            "retry_after", "response_text", "judge_scores", "stream_chunk_chars"
+        }
+        return cls(**{k: v for k, v in config.items() if k in accepted})
+
+    def _digest(self, *parts: Any) -> int:
+        """计算稳定的哈希值（不受 PYTHONHASHSEED 影响）"""
+        payload = "\x1f".join(str(p) for p in (self.seed,) + parts)
+        return int.from_bytes(hashlib.blake2b(payload.encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def next_request_rng(self) -> random.Random:
+        """为下一次请求创建随机数生成器（按请求序号确定，可复现）"""
+        self.request_counter += 1
+        return random.Random(self._digest("request", self.request_counter))
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """按配置的分布采样首字延迟（秒）"""
+        cfg = self.latency
+        distribution = cfg.get("distribution", "fixed")
+        mean = float(cfg.get("mean", 0.0))
+
+        if distribution == "fixed":
+            value = mean
+        elif distribution == "uniform":
+            value = rng.uniform(float(cfg.get("min", 0.0)), float(cfg.get("max", mean * 2)))
+        elif distribution == "normal":
+            value = rng.gauss(mean, float(cfg.get("std", mean * 0.1)))
+        elif distribution == "lognormal":
+            sigma = float(cfg.get("sigma", 0.25))
+            # 以 mean 作为分布均值，换算对数正态的 mu
+            mu = math.log(max(mean, 1e-9)) - sigma ** 2 / 2
+            value = rng.lognormvariate(mu, sigma)
+        else:
+            value = rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+
+        if "max" in cfg and distribution != "uniform":
+            value = min(value, float(cfg["max"]))
+        return max(0.0, value)
+
+    def check_failure(self, rng: random.Random):
+        """按注入比例抛出模拟错误"""
+        roll = rng.random()
+        if roll < self.rate_limit_rate:
+            raise MockRateLimitError(retry_after=self.retry_after)
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise MockAPIError("mock internal server error", status_code=500)
+
+    def generation_seconds(self, completion_tokens: int) -> float:
+        """按生成速率计算输出耗时"""
+        if not self.tokens_per_second:
+            return 0.0
+        return completion_tokens / float(self.tokens_per_second)
+
+    def is_judge_prompt(self, prompt: str) -> bool:
+        """判断是否为评估（裁判）提示"""
+        return "requirement_completed" in prompt
+
+    def build_content(self, prompt: str) -> str:
+        """生成确定性的回答内容（相同提示总是得到相同回答）"""
+        if self.is_judge_prompt(prompt):
+            batch_items = self._split_batch_items(prompt)
+            if batch_items:
+                return json.dumps([
+                    dict(self.build_judge_result(segment), index=index)
+                    for index, segment in batch_items
+                ], ensure_ascii=False)
+            return json.dumps(self.build_judge_result(prompt), ensure_ascii=False)
+
+        if self.response_text is not None:
+            return self.response_text
+
+        marker = self._digest("answer", prompt) % 100000
+        return f"<answer>\n# mock answer {marker}\nprint({marker})\n</answer>"
+
+    def build_judge_result(self, prompt: str) -> Dict[str, Any]:
+        """生成确定性的裁判评估JSON"""
+        sub_count = self._count_sub_questions(prompt)
+        value = self._digest("judge", prompt)
+
+        if self.judge_scores:
+            result = dict(self.judge_scores)
+            result.setdefault("sub_question_scores", [1] * sub_count)
+            return result
+
+        accuracy = 60 + value % 41
+        completeness = 60 + (value // 41) % 41
+        clarity = 60 + (value // 1681) % 41
+        sub_scores = [((value >> (i + 8)) & 1) for i in range(sub_count)]
+        return {
+            "sub_question_scores": sub_scores,
+            "requirement_completed": accuracy >= 80,
+            "accuracy": accuracy,
+            "completeness": completeness,
+            "clarity": clarity,
+            "feedback": f"模拟评估结果（{accuracy}/{completeness}/{clarity}）"
+        }
+
+    def _split_batch_items(self, prompt: str) -> List[tuple]:
+        """把批量评估提示拆分为 (条目序号, 条目内容) 列表，非批量提示返回空列表"""
+        matches = list(BATCH_ITEM_PATTERN.finditer(prompt))
+        items = []
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(prompt)
+            items.append((int(match.group(1)), prompt[match.start():end]))
+        return items
+
+    def _count_sub_questions(self, prompt: str) -> int:
+        """从评估提示中推断子问题数量"""
+        listed = len(SUB_QUESTION_LINE_PATTERN.findall(prompt))
+        if listed:
+            return listed
+        match = SUB_SCORES_PATTERN.search(prompt)
+        if match:
+            return len([x for x in match.group(1).split(',') if x.strip()])
+        return 0
+
+    def count_tokens(self, text: str) -> int:
+        """简单的token计数估算"""
+        chinese_chars = len(CHINESE_CHAR_PATTERN.findall(text))
+        english_words = len(text.replace('，', ' ').replace('。', ' ').split())
+        return chinese_chars + english_words
+
+    def build_usage(self, prompt: str, content: str) -> Dict[str, int]:
+        """构造 OpenAI 风格的 usage 字段"""
+        prompt_tokens = self.count_tokens(prompt)
+        completion_tokens = max(1, self.count_tokens(content))
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    def build_choices_usage(self, prompt: str, contents: List[str]) -> Dict[str, int]:
+        """一次请求返回多个候选回答时的 usage：输入 token 只计一次，输出 token 为各候选之和"""
+        prompt_tokens = self.count_tokens(prompt)
+        completion_tokens = sum(max(1, self.count_tokens(content)) for content in contents)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+
+    def apply_response_format(self, content: str, response_format: Optional[Dict[str, Any]]) -> str:
+        """按请求的 response_format 调整回答：json_object / json_schema 时返回JSON对象
+
+        数组（批量评估结果）放入 evaluations 字段，非JSON回答放入 content 字段；
+        json_schema 中 additionalProperties 为 false 的对象只保留声明的字段
+        """
+        if not response_format or response_format.get("type") not in ("json_object", "json_schema"):
+            return content
+        try:
+            value = json.loads(content)
+        except ValueError:
+            value = None
+        if isinstance(value, list):
+            value = {"evaluations": value}
+        elif not isinstance(value, dict):
+            value = {"content": content}
+        schema = (response_format.get("json_schema") or {}).get("schema")
+        if schema:
+            value = self._fit_schema(value, schema)
+        return json.dumps(value, ensure_ascii=False)
+
+    def _fit_schema(self, value: Any, schema: Dict[str, Any]) -> Any:
+        """去掉严格 JSON Schema 不允许的额外字段"""
+        if isinstance(value, dict) and "properties" in schema:
+            properties = schema["properties"]
+            return {
+                key: self._fit_schema(item, properties.get(key, {}))
+                for key, item in value.items()
+                if key in properties or schema.get("additionalProperties", True)
+            }
+        if isinstance(value, list) and "items" in schema:
+            return [self._fit_schema(item, schema["items"]) for item in value]
+        return value
+
+    def split_chunks(self, content: str) -> List[str]:
+        """把回答切分为流式输出的片段"""
+        size = self.stream_chunk_chars
+        return [content[i:i + size] for i in range(0, len(content), size)] or [""]
+
+    async def stream_chunks(self, content: str, completion_tokens: int) -> AsyncIterator[str]:
+        """按生成速率逐段输出回答"""
+        chunks = self.split_chunks(content)
+        per_chunk = self.generation_seconds(completion_tokens) / len(chunks)
+        for chunk in chunks:
+            if per_chunk > 0:
+                await asyncio.sleep(per_chunk)
+            yield chunk
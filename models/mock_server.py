@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模拟大模型服务
+功能：提供 OpenAI 兼容的 /v1/chat/completions 接口，可作为 CustomAPIModel 的 base_url，
+      支持可配置延迟分布、生成速率、错误/429注入、流式输出、确定性的裁判JSON，
+      以及 n 参数（一次请求返回多个候选回答）和 response_format（JSON 模式 / JSON Schema）
+
+启动示例：
+    python -m models.mock_server --port 9000 --latency-mean 0.5 --tokens-per-second 80 --rate-limit-rate 0.05
+
+对应的模型配置：
+    {"name": "mock-remote", "provider": "custom", "model_id": "mock-1",
+     "api_key": "mock", "base_url": "http://127.0.0.1:9000/v1"}
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Dict, Any, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# 添加项目根目录到Python路径
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.mock_llm import MockBehavior, MockAPIError
+
+
+def _extract_prompt(payload: Dict[str, Any]) -> str:
+    """把消息列表拼接为提示文本"""
+    parts = []
+    for message in payload.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, list):
+            content = "".join(item.get("text", "") for item in content if isinstance(item, dict))
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+def create_mock_app(behavior: Optional[MockBehavior] = None) -> FastAPI:
+    """创建模拟服务应用"""
+    behavior = behavior or MockBehavior()
+    app = FastAPI(title="模拟大模型服务", version="1.0.0")
+    app.state.behavior = behavior
+    app.state.stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+
+    @app.get("/v1/models")
+    async def list_models() -> Dict[str, Any]:
+        return {"object": "list", "data": [{"id": "mock-1", "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/stats")
+    async def get_stats() -> Dict[str, Any]:
+        return app.state.stats
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        payload = await request.json()
+        prompt = _extract_prompt(payload)
+        model_id = payload.get("model", "mock-1")
+        app.state.stats["requests"] += 1
+
+        rng = behavior.next_request_rng()
+        await asyncio.sleep(behavior.sample_latency(rng))
+        try:
+            behavior.check_failure(rng)
+        except MockAPIError as e:
+            headers = {}
+            if e.status_code == 429:
+                app.state.stats["rate_limited"] += 1
+                if e.retry_after is not None:
+                    headers["Retry-After"] = str(e.retry_after)
+            else:
+                app.state.stats["errors"] += 1
+            return JSONResponse(
+                status_code=e.status_code,
+                content={"error": {"message": str(e), "type": "mock_error", "code": e.status_code}},
+                headers=headers
+            )
+
+        # n 个候选回答共用一次请求的延迟，usage 覆盖全部候选（流式输出只返回第一个候选）
+        n = 1 if payload.get("stream") else max(1, int(payload.get("n") or 1))
+        contents = [
+            behavior.apply_response_format(behavior.build_content(prompt), payload.get("response_format"))
+            for _ in range(n)
+        ]
+        content = contents[0]
+        usage = behavior.build_choices_usage(prompt, contents)
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if payload.get("stream"):
+            async def event_stream():
+                async for chunk in behavior.stream_chunks(content, usage["completion_tokens"]):
+                    data = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model_id,
+                        "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+                final = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model_id,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "usage": usage
+                }
+                yield f"data: {json.dumps(final, ensure_ascii=False)}\n\n"
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+        # 多个候选并行生成，耗时按最长的候选计算
+        longest = max(max(1, behavior.count_tokens(choice)) for choice in contents)
+        generation_time = behavior.generation_seconds(longest)
+        if generation_time > 0:
+            await asyncio.sleep(generation_time)
+
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model_id,
+            "choices": [
+                {
+                    "index": index,
+                    "message": {"role": "assistant", "content": choice},
+                    "finish_reason": "stop"
+                }
+                for index, choice in enumerate(contents)
+            ],
+            "usage": usage
+        }
+
+    return app
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="本地 OpenAI 兼容模拟大模型服务")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--config", help="MockBehavior 配置JSON文件路径")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency-distribution", default="fixed", choices=MockBehavior.DISTRIBUTIONS)
+    parser.add_argument("--latency-mean", type=float, default=0.0)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    args = parser.parse_args()
+
+    if args.config:
+        with open(args.config, 'r', encoding='utf-8') as f:
+            behavior = MockBehavior.from_config(json.load(f))
+    else:
+        behavior = MockBehavior(
+            seed=args.seed,
+            latency={"distribution": args.latency_distribution, "mean": args.latency_mean},
+            tokens_per_second=args.tokens_per_second,
+            error_rate=args.error_rate,
+            rate_limit_rate=args.rate_limit_rate,
+            retry_after=args.retry_after
+        )
+
+    import uvicorn
+    uvicorn.run(create_mock_app(behavior), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,48 @@ import openai
 import httpx
 from datetime import datetime
 
+from .mock_llm import MockBehavior, MockAPIError
+from .adaptive_limiter import get_endpoint_limiter
+from .resilience import get_endpoint_resilience, classify_error, extract_retry_after, CircuitOpenError
+from .token_counter import get_token_counter
+from .shared_limits import shared_request_slot
+
+# 会让自适应并发限制器降低并发上限的错误类别
+OVERLOAD_ERROR_CLASSES = {"rate_limit", "unavailable", "timeout"}
+
+# 运行前估算请求耗时的默认值（模型配置中没有 throughput 时使用）
+DEFAULT_REQUEST_LATENCY = 1.0
+DEFAULT_TOKENS_PER_SECOND = 50.0
+# 配置文件中没有 cost_estimation 时使用的价格（美元/token）
+DEFAULT_PRICING = {"input_cost_per_token": 1e-05, "output_cost_per_token": 2e-05}
+
+# 结构化输出支持程度：json_schema（严格JSON结构）兼容 json_object（JSON模式）
+STRUCTURED_OUTPUT_LEVELS = {"json_object": 1, "json_schema": 2}
+
+
+def usage_to_dict(usage: Any) -> Dict[str, Any]:
+    """把 SDK 返回的 usage 对象转换为普通字典（包含嵌套的 prompt_tokens_details）"""
+    if not usage:
+        return {}
+    if isinstance(usage, dict):
+        return dict(usage)
+    dumped = usage.model_dump(exclude_none=True) if hasattr(usage, "model_dump") else None
+    if isinstance(dumped, dict):
+        return dumped
+    return {k: v for k, v in vars(usage).items() if not k.startswith('_')}
+
+
+def extract_cached_tokens(usage: Dict[str, Any]) -> int:
+    """提取命中提供商前缀缓存的输入 token 数
+
+    支持 OpenAI 风格的 prompt_tokens_details.cached_tokens 和 DeepSeek 风格的 prompt_cache_hit_tokens
+    """
+    details = usage.get("prompt_tokens_details")
+    cached = details.get("cached_tokens") if isinstance(details, dict) else None
+    if cached is None:
+        cached = usage.get("prompt_cache_hit_tokens")
+    return cached if isinstance(cached, int) else 0
+
 class BaseModel(ABC):
     """模型基类，定义统一接口"""
     
@@ -28,36 +70,201 @@ class BaseModel(ABC):
         self.config = kwargs
         self.token_count = 0
         self.request_count = 0
+        # 输入 token 数及其中命中提供商前缀缓存的部分
+        self.prompt_token_count = 0
+        self.cached_token_count = 0
+        # 提供商支持的结构化输出（模型配置 structured_output: json_schema / json_object，默认不支持）
+        self.structured_output = kwargs.get('structured_output')
+        # 端点级自适应并发限制器和弹性层（重试/熔断），远程API模型使用
+        self.limiter = None
+        self.resilience = None
+        # 共享的 token 计数器（模型配置 tokenizer 指定本地 BPE 文件时精确计数，否则估算）
+        self.token_counter = get_token_counter(kwargs.get('tokenizer'))
+    
+    # 是否支持一次请求返回多个候选回答（OpenAI 的 n 参数），模型配置 supports_n 可覆盖
+    SUPPORTS_N = False
     
     @abstractmethod
     async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """生成回复"""
         pass
     
-    @abstractmethod
+    @property
+    def supports_multi_sample(self) -> bool:
+        return bool(self.config.get('supports_n', self.SUPPORTS_N))
+    
+    async def generate_samples(self, prompt: str, n: int, **kwargs) -> List[Dict[str, Any]]:
+        """生成 n 个候选回答；不支持 n 参数的模型并发发送 n 个相同的请求"""
+        if n <= 1:
+            return [await self.generate(prompt, **kwargs)]
+        return list(await asyncio.gather(*(self.generate(prompt, **kwargs) for _ in range(n))))
+    
+    def _prompt_tokens(self, prompt: str, usage: Dict[str, Any], tokens_used: int) -> int:
+        """本次请求的输入 token：优先取 usage 中的 prompt_tokens，没有时按提示计数（不超过总 token）"""
+        prompt_tokens = usage.get("prompt_tokens") if usage else None
+        if not isinstance(prompt_tokens, int):
+            prompt_tokens = self.count_tokens(prompt)
+        return min(prompt_tokens, tokens_used)
+    
+    def _split_choices(self, prompt: str, contents: List[str], usage: Dict[str, Any],
+                       cached_tokens: int = 0) -> List[Dict[str, Any]]:
+        """把一次请求返回的多个候选回答拆成单独的响应
+
+        每个候选按自身内容计数 token（按 usage 的输出 token 数等比缩放），
+        输入 token（以及与 usage 总数的差额）计入第一个候选，合计等于本次请求的消耗；
+        prompt_tokens 同样只计入第一个候选
+        """
+        choice_tokens = [self.count_tokens(content) for content in contents]
+        total_tokens = usage.get("total_tokens") or self.count_tokens(prompt) + sum(choice_tokens)
+        completion_tokens = usage.get("completion_tokens") or min(sum(choice_tokens), total_tokens)
+        if sum(choice_tokens):
+            scale = completion_tokens / sum(choice_tokens)
+            choice_tokens = [int(tokens * scale) for tokens in choice_tokens]
+        self.token_count += total_tokens
+        first_extra = max(0, total_tokens - sum(choice_tokens))
+        timestamp = datetime.now().isoformat()
+        return [
+            {
+                "content": content,
+                "tokens_used": tokens + (first_extra if index == 0 else 0),
+                "prompt_tokens": self._prompt_tokens(prompt, usage, first_extra) if index == 0 else 0,
+                "cached_tokens": cached_tokens if index == 0 else 0,
+                "model": self.model_id,
+                "timestamp": timestamp,
+                "usage": usage if index == 0 else {},
+                "sample_index": index
+            }
+            for index, (content, tokens) in enumerate(zip(contents, choice_tokens))
+        ]
+    
+    def _failed_samples(self, n: int, error_msg: str) -> List[Dict[str, Any]]:
+        """多候选请求失败时每个候选返回相同的错误响应"""
+        timestamp = datetime.now().isoformat()
+        return [
+            {
+                "content": f"生成失败: {error_msg}",
+                "tokens_used": 0,
+                "model": self.model_id,
+                "error": error_msg,
+                "timestamp": timestamp,
+                "sample_index": index
+            }
+            for index in range(n)
+        ]
+    
     def count_tokens(self, text: str) -> int:
         """计算token数量"""
-        pass
+        return self.token_counter.count(text)
+    
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """批量计算token数量（用于运行前预估整个数据集的消耗）"""
+        return self.token_counter.count_batch(texts)
+    
+    def estimate_request_seconds(self, output_tokens: int) -> float:
+        """估算一次请求的耗时：首字延迟 + 输出 token / 生成速率
+
+        取自模型配置 throughput 字段，例如 {"latency": 1.0, "tokens_per_second": 50}
+        """
+        throughput = self.config.get('throughput') or {}
+        latency = float(throughput.get('latency', DEFAULT_REQUEST_LATENCY))
+        tokens_per_second = float(throughput.get('tokens_per_second', DEFAULT_TOKENS_PER_SECOND))
+        return latency + (output_tokens / tokens_per_second if tokens_per_second > 0 else 0.0)
     
     def get_stats(self) -> Dict[str, Any]:
         """获取使用统计"""
-        return {
+        stats = {
             "name": self.name,
             "model_id": self.model_id,
             "token_count": self.token_count,
             "request_count": self.request_count
         }
+        if self.prompt_token_count:
+            stats["prompt_tokens"] = self.prompt_token_count
+            stats["cached_tokens"] = self.cached_token_count
+            stats["cache_hit_ratio"] = round(self.cached_token_count / self.prompt_token_count, 4)
+        if self.limiter is not None:
+            stats["concurrency"] = self.limiter.snapshot()
+        if self.resilience is not None:
+            stats["resilience"] = self.resilience.snapshot()
+        return stats
+    
+    def resolve_response_format(self, response_format: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """按模型支持的结构化输出调整 response_format
+
+        请求 json_schema 但只支持 json_object 时降级为 JSON 模式；不支持时返回 None（不发送该参数）
+        """
+        if not response_format:
+            return None
+        supported = STRUCTURED_OUTPUT_LEVELS.get(self.structured_output, 0)
+        requested = STRUCTURED_OUTPUT_LEVELS.get(response_format.get("type"), 0)
+        if not supported or not requested:
+            return None
+        if requested > supported:
+            return {"type": "json_object"}
+        return response_format
+    
+    def _response_format_kwargs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        """生成请求参数中的 response_format 部分"""
+        response_format = self.resolve_response_format(kwargs.get('response_format'))
+        return {"response_format": response_format} if response_format else {}
+    
+    def _record_usage(self, usage: Dict[str, Any]) -> int:
+        """累计输入 token 和缓存命中 token，返回本次请求命中缓存的 token 数"""
+        cached_tokens = extract_cached_tokens(usage)
+        prompt_tokens = usage.get("prompt_tokens")
+        if isinstance(prompt_tokens, int):
+            self.prompt_token_count += prompt_tokens
+            self.cached_token_count += cached_tokens
+        return cached_tokens
+    
+    def _setup_endpoint(self, endpoint: str, **kwargs):
+        """按端点创建共享的并发限制器和弹性层"""
+        self.limiter = get_endpoint_limiter(f"{endpoint}|{self.model_id}", kwargs.get('concurrency_limit'))
+        self.resilience = get_endpoint_resilience(endpoint, kwargs.get('resilience'))
+    
+    async def _send_request(self, request_func):
+        """通过弹性层（重试/熔断）和并发限制器发送一次模型请求
+
+        request_func 执行单次请求，失败时直接抛出提供商的原始异常；
+        分片评估的工作进程中还会先占用跨进程共享的请求槽位
+        """
+        async def local_request():
+            if self.limiter is None:
+                return await request_func()
+            async with self.limiter.slot():
+                try:
+                    result = await request_func()
+                except Exception as e:
+                    error_class = classify_error(e)
+                    if error_class in OVERLOAD_ERROR_CLASSES:
+                        self.limiter.on_overload(extract_retry_after(e))
+                    raise
+                self.limiter.on_success()
+                return result
+        
+        async def limited_request():
+            async with shared_request_slot(self.name):
+                return await local_request()
+        
+        if self.resilience is None:
+            return await limited_request()
+        return await self.resilience.call(limited_request)
 
 class OpenAIModel(BaseModel):
     """OpenAI模型实现"""
     
+    SUPPORTS_N = True
+    
     def __init__(self, name: str, model_id: str, api_key: str, 
                  base_url: Optional[str] = None, **kwargs):
         super().__init__(name, model_id, api_key, base_url, **kwargs)
+        # 重试由统一的弹性层负责，关闭客户端自带的重试
         self.client = openai.AsyncOpenAI(
             api_key=api_key,
-            base_url=base_url
+            base_url=base_url,
+            max_retries=0
         )
+        self._setup_endpoint(base_url or "https://api.openai.com/v1", **kwargs)
     
     async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """使用OpenAI API生成回复"""
@@ -80,13 +287,14 @@ class OpenAIModel(BaseModel):
             }, ensure_ascii=False, indent=2))
             print(f"🔧 请求参数: model={self.model_id}, max_tokens={kwargs.get('max_tokens', self.config.get('max_tokens', 4000))}, temperature={kwargs.get('temperature', self.config.get('temperature', 0.7))}")
             
-            response = await self.client.chat.completions.create(
+            response = await self._send_request(lambda: self.client.chat.completions.create(
                 model=self.model_id,
                 messages=messages,
                 max_tokens=kwargs.get('max_tokens', self.config.get('max_tokens', 4000)),
                 temperature=kwargs.get('temperature', self.config.get('temperature', 0.7)),
-                **{k: v for k, v in kwargs.items() if k not in ['max_tokens', 'temperature']}
-            )
+                **{k: v for k, v in kwargs.items() if k not in ['max_tokens', 'temperature', 'response_format']},
+                **self._response_format_kwargs(kwargs)
+            ))
             
             content = response.choices[0].message.content
             print(f"✅ OpenAI响应成功: {len(content)} 字符")
@@ -99,12 +307,20 @@ class OpenAIModel(BaseModel):
                 tokens_used = self.count_tokens(prompt + content)
                 self.token_count += tokens_used
             
+            # 统计命中提供商前缀缓存的输入 token
+            usage = usage_to_dict(getattr(response, 'usage', None))
+            cached_tokens = self._record_usage(usage)
+            if cached_tokens:
+                print(f"♻️ 前缀缓存命中 {cached_tokens}/{usage.get('prompt_tokens')} 输入token")
+            
             return {
                 "content": content,
                 "tokens_used": tokens_used,
+                "prompt_tokens": self._prompt_tokens(prompt, usage, tokens_used),
+                "cached_tokens": cached_tokens,
                 "model": self.model_id,
                 "timestamp": datetime.now().isoformat(),
-                "usage": response.usage.__dict__ if hasattr(response, 'usage') and response.usage else {}
+                "usage": usage
             }
             
         except Exception as e:
@@ -117,12 +333,29 @@ class OpenAIModel(BaseModel):
                 "timestamp": datetime.now().isoformat()
             }
     
-    def count_tokens(self, text: str) -> int:
-        """简单的token计数估算"""
-        # 粗略估算：中文字符算1个token，英文单词按空格分割
-        chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
-        english_words = len(text.replace('，', ' ').replace('。', ' ').split())
-        return chinese_chars + english_words
+    async def generate_samples(self, prompt: str, n: int, **kwargs) -> List[Dict[str, Any]]:
+        """用一次请求（n 参数）生成 n 个候选回答，完整提示只发送一次"""
+        if n <= 1 or not self.supports_multi_sample:
+            return await super().generate_samples(prompt, n, **kwargs)
+        try:
+            self.request_count += 1
+            print(f"📡 调用OpenAI API: {self.model_id}（n={n}）")
+            response = await self._send_request(lambda: self.client.chat.completions.create(
+                model=self.model_id,
+                messages=[{"role": "user", "content": prompt}],
+                n=n,
+                max_tokens=kwargs.get('max_tokens', self.config.get('max_tokens', 4000)),
+                temperature=kwargs.get('temperature', self.config.get('temperature', 0.7)),
+                **{k: v for k, v in kwargs.items() if k not in ['max_tokens', 'temperature', 'response_format', 'n']},
+                **self._response_format_kwargs(kwargs)
+            ))
+            contents = [choice.message.content or "" for choice in response.choices]
+            usage = usage_to_dict(getattr(response, 'usage', None))
+            print(f"✅ OpenAI响应成功: {len(contents)} 个候选回答")
+            return self._split_choices(prompt, contents, usage, self._record_usage(usage))
+        except Exception as e:
+            print(f"❌ OpenAI请求失败: {str(e)}")
+            return self._failed_samples(n, str(e))
 
 class CustomAPIModel(BaseModel):
     """自定义API模型实现（如通义千问、DeepSeek等）"""
@@ -134,6 +367,7 @@ class CustomAPIModel(BaseModel):
             "Authorization": f"Bearer {api_key}",
             "Content-Type": "application/json"
         }
+        self._setup_endpoint(base_url, **kwargs)
     
     async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """使用自定义API生成回复"""
@@ -145,7 +379,8 @@ class CustomAPIModel(BaseModel):
                 "model": self.model_id,
                 "messages": [{"role": "user", "content": prompt}],
                 "max_tokens": kwargs.get('max_tokens', self.config.get('max_tokens', 4000)),
-                "temperature": kwargs.get('temperature', self.config.get('temperature', 0.7))
+                "temperature": kwargs.get('temperature', self.config.get('temperature', 0.7)),
+                **self._response_format_kwargs(kwargs)
             }
             
             print(f"📡 调用自定义API: {self.base_url}/chat/completions")
@@ -161,52 +396,7 @@ class CustomAPIModel(BaseModel):
             }, ensure_ascii=False, indent=2))
             print(f"🔧 请求参数: model={self.model_id}, max_tokens={data['max_tokens']}, temperature={data['temperature']}")
             
-            # 设置更长的超时时间
-            timeout_config = httpx.Timeout(
-                connect=30.0,  # 连接超时
-                read=120.0,    # 读取超时
-                write=30.0,    # 写入超时
-                pool=30.0      # 连接池超时
-            )
-            
-            async with httpx.AsyncClient(timeout=timeout_config) as client:
-                # 添加重试机制
-                max_retries = 3
-                for attempt in range(max_retries):
-                    try:
-                        print(f"尝试第 {attempt + 1} 次请求...")
-                        response = await client.post(
-                            f"{self.base_url}/chat/completions",
-                            headers=self.headers,
-                            json=data
-                        )
-                        print(f"响应状态码: {response.status_code}")
-                        response.raise_for_status()
-                        break
-                    except httpx.TimeoutException as e:
-                        if attempt == max_retries - 1:
-                            raise e
-                        wait_time = (attempt + 1) * 5  # 递增等待时间
-                        print(f"请求超时，{wait_time}秒后重试: {str(e)}")
-                        await asyncio.sleep(wait_time)
-                    except httpx.HTTPStatusError as e:
-                        if e.response.status_code in [429, 503]:  # 速率限制或服务不可用
-                            if attempt == max_retries - 1:
-                                raise e
-                            wait_time = (attempt + 1) * 10  # 更长的等待时间
-                            print(f"API限制或服务不可用，{wait_time}秒后重试: {str(e)}")
-                            await asyncio.sleep(wait_time)
-                        else:
-                            raise e
-                    except Exception as e:
-                        if attempt == max_retries - 1:
-                            raise e
-                        wait_time = (attempt + 1) * 3
-                        print(f"请求失败，{wait_time}秒后重试: {str(e)}")
-                        await asyncio.sleep(wait_time)
-                
-                result = response.json()
-                print(f"✅ 响应成功: {len(result.get('choices', []))} 个回答")
+            result = await self._post_completion(data)
             
             content = result["choices"][0]["message"]["content"]
             
@@ -218,12 +408,15 @@ class CustomAPIModel(BaseModel):
                 tokens_used = self.count_tokens(prompt + content)
                 self.token_count += tokens_used
             
+            usage = result.get("usage") or {}
             return {
                 "content": content,
                 "tokens_used": tokens_used,
+                "prompt_tokens": self._prompt_tokens(prompt, usage, tokens_used),
+                "cached_tokens": self._record_usage(usage),
                 "model": self.model_id,
                 "timestamp": datetime.now().isoformat(),
-                "usage": result.get("usage", {})
+                "usage": usage
             }
             
         except httpx.HTTPStatusError as e:
@@ -266,12 +459,63 @@ class CustomAPIModel(BaseModel):
                 "error": error_msg,
                 "timestamp": datetime.now().isoformat()
             }
+
+    async def generate_samples(self, prompt: str, n: int, **kwargs) -> List[Dict[str, Any]]:
+        """模型配置 supports_n 为 true 时用一次请求（n 参数）生成 n 个候选回答"""
+        if n <= 1 or not self.supports_multi_sample:
+            return await super().generate_samples(prompt, n, **kwargs)
+        try:
+            self.request_count += 1
+            print(f"📡 调用自定义API: {self.base_url}/chat/completions（n={n}）")
+            result = await self._post_completion({
+                "model": self.model_id,
+                "messages": [{"role": "user", "content": prompt}],
+                "n": n,
+                "max_tokens": kwargs.get('max_tokens', self.config.get('max_tokens', 4000)),
+                "temperature": kwargs.get('temperature', self.config.get('temperature', 0.7)),
+                **self._response_format_kwargs(kwargs)
+            })
+            contents = [choice["message"]["content"] or "" for choice in result["choices"]]
+            usage = result.get("usage") or {}
+            return self._split_choices(prompt, contents, usage, self._record_usage(usage))
+        except httpx.HTTPStatusError as e:
+            error_msg = f"HTTP错误 {e.response.status_code}: {e.response.text}"
+            print(f"模型 {self.name} API调用失败: {error_msg}")
+            return self._failed_samples(n, error_msg)
+        except httpx.TimeoutException:
+            print(f"模型 {self.name} 请求超时")
+            return self._failed_samples(n, "请求超时")
+        except Exception as e:
+            print(f"模型 {self.name} 生成失败: {str(e)}")
+            return self._failed_samples(n, str(e))
     
-    def count_tokens(self, text: str) -> int:
-        """简单的token计数估算"""
-        chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
-        english_words = len(text.replace('，', ' ').replace('。', ' ').split())
-        return chinese_chars + english_words
+    async def _post_completion(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """发送 chat/completions 请求并返回响应JSON"""
+        # 设置更长的超时时间
+        timeout_config = httpx.Timeout(
+            connect=30.0,  # 连接超时
+            read=120.0,    # 读取超时
+            write=30.0,    # 写入超时
+            pool=30.0      # 连接池超时
+        )
+        
+        async with httpx.AsyncClient(timeout=timeout_config) as client:
+            async def send_once():
+                response = await client.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=self.headers,
+                    json=data
+                )
+                print(f"响应状态码: {response.status_code}")
+                response.raise_for_status()
+                return response
+            
+            # 重试、退避和熔断由统一的弹性层处理，并发由端点限制器控制
+            response = await self._send_request(send_once)
+            
+            result = response.json()
+            print(f"✅ 响应成功: {len(result.get('choices', []))} 个回答")
+            return result
 
 class AgentModel(BaseModel):
     """Agent模型实现，支持工具调用"""
@@ -280,10 +524,13 @@ class AgentModel(BaseModel):
                  base_url: Optional[str] = None, tools: Optional[List[Dict]] = None, **kwargs):
         super().__init__(name, model_id, api_key, base_url, **kwargs)
         self.tools = tools or []
+        # 重试由统一的弹性层负责，关闭客户端自带的重试
         self.client = openai.AsyncOpenAI(
             api_key=api_key,
-            base_url=base_url
+            base_url=base_url,
+            max_retries=0
         )
+        self._setup_endpoint(base_url or "https://api.openai.com/v1", **kwargs)
     
     async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
         """使用Agent模型生成回复，支持工具调用"""
@@ -294,20 +541,22 @@ class AgentModel(BaseModel):
             
             # 如果有工具，添加工具调用
             if self.tools:
-                response = await self.client.chat.completions.create(
+                response = await self._send_request(lambda: self.client.chat.completions.create(
                     model=self.model_id,
                     messages=messages,
                     tools=self.tools,
                     max_tokens=kwargs.get('max_tokens', self.config.get('max_tokens', 4000)),
-                    temperature=kwargs.get('temperature', self.config.get('temperature', 0.7))
-                )
+                    temperature=kwargs.get('temperature', self.config.get('temperature', 0.7)),
+                    **self._response_format_kwargs(kwargs)
+                ))
             else:
-                response = await self.client.chat.completions.create(
+                response = await self._send_request(lambda: self.client.chat.completions.create(
                     model=self.model_id,
                     messages=messages,
                     max_tokens=kwargs.get('max_tokens', self.config.get('max_tokens', 4000)),
-                    temperature=kwargs.get('temperature', self.config.get('temperature', 0.7))
-                )
+                    temperature=kwargs.get('temperature', self.config.get('temperature', 0.7)),
+                    **self._response_format_kwargs(kwargs)
+                ))
             
             content = response.choices[0].message.content
             tool_calls = None
@@ -334,6 +583,9 @@ class AgentModel(BaseModel):
                 "content": content,
                 "tool_calls": tool_calls,
                 "tokens_used": tokens_used,
+                "prompt_tokens": self._prompt_tokens(
+                    prompt, usage_to_dict(getattr(response, 'usage', None)), tokens_used
+                ),
                 "model": self.model_id,
                 "timestamp": datetime.now().isoformat()
             }
@@ -347,12 +599,110 @@ class AgentModel(BaseModel):
                 "error": str(e),
                 "timestamp": datetime.now().isoformat()
             }
+
+class MockModel(BaseModel):
+    """模拟模型实现，不访问网络，用于离线压测和评估流程自身开销的测量"""
+    
+    def __init__(self, name: str, model_id: str, api_key: Optional[str] = None,
+                 base_url: Optional[str] = None, mock: Optional[Dict[str, Any]] = None, **kwargs):
+        super().__init__(name, model_id, api_key, base_url, **kwargs)
+        self.behavior = MockBehavior.from_config(mock)
+        # 模拟模型默认直接暴露注入的错误；配置了 resilience 时按远程端点同样的策略重试和熔断
+        if kwargs.get('resilience') is not None:
+            self.resilience = get_endpoint_resilience(f"mock://{name}", kwargs['resilience'])
+        # 配置了 concurrency_limit 时同样经过端点限制器（可用于离线验证多任务的公平调度）
+        if kwargs.get('concurrency_limit') is not None:
+            self.limiter = get_endpoint_limiter(f"mock://{name}", kwargs['concurrency_limit'])
+    
+    async def _simulate_request(self):
+        """模拟一次请求的延迟和错误注入"""
+        rng = self.behavior.next_request_rng()
+        await asyncio.sleep(self.behavior.sample_latency(rng))
+        self.behavior.check_failure(rng)
+    
+    async def generate(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """生成确定性的模拟回复"""
+        try:
+            self.request_count += 1
+            await self._send_request(self._simulate_request)
+            
+            content = self.behavior.build_content(prompt)
+            usage = self.behavior.build_usage(prompt, content)
+            generation_time = self.behavior.generation_seconds(usage["completion_tokens"])
+            if generation_time > 0:
+                await asyncio.sleep(generation_time)
+            
+            self.token_count += usage["total_tokens"]
+            return {
+                "content": content,
+                "tokens_used": usage["total_tokens"],
+                "prompt_tokens": usage["prompt_tokens"],
+                "model": self.model_id,
+                "timestamp": datetime.now().isoformat(),
+                "usage": usage
+            }
+            
+        except MockAPIError as e:
+            error_msg = f"HTTP错误 {e.status_code}: {str(e)}"
+            return {
+                "content": f"生成失败: {error_msg}",
+                "tokens_used": 0,
+                "model": self.model_id,
+                "error": error_msg,
+                "timestamp": datetime.now().isoformat()
+            }
+        except CircuitOpenError as e:
+            return {
+                "content": f"生成失败: {str(e)}",
+                "tokens_used": 0,
+                "model": self.model_id,
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }
+
+    async def generate_samples(self, prompt: str, n: int, **kwargs) -> List[Dict[str, Any]]:
+        """配置了 supports_n 时模拟一次请求返回 n 个候选回答（输入 token 只计一次）"""
+        if n <= 1 or not self.supports_multi_sample:
+            return await super().generate_samples(prompt, n, **kwargs)
+        try:
+            self.request_count += 1
+            await self._send_request(self._simulate_request)
+
+            contents = [self.behavior.build_content(prompt) for _ in range(n)]
+            longest = max(max(1, self.behavior.count_tokens(content)) for content in contents)
+            generation_time = self.behavior.generation_seconds(longest)
+            if generation_time > 0:
+                await asyncio.sleep(generation_time)
+            return self._split_choices(prompt, contents, self.behavior.build_choices_usage(prompt, contents))
+        except (MockAPIError, CircuitOpenError) as e:
+            error_msg = f"HTTP错误 {e.status_code}: {str(e)}" if isinstance(e, MockAPIError) else str(e)
+            return self._failed_samples(n, error_msg)
+
+    async def stream(self, prompt: str, **kwargs) -> AsyncIterator[str]:
+        """流式生成模拟回复"""
+        self.request_count += 1
+        rng = self.behavior.next_request_rng()
+        
+        await asyncio.sleep(self.behavior.sample_latency(rng))
+        self.behavior.check_failure(rng)
+        
+        content = self.behavior.build_content(prompt)
+        usage = self.behavior.build_usage(prompt, content)
+        self.token_count += usage["total_tokens"]
+        async for chunk in self.behavior.stream_chunks(content, usage["completion_tokens"]):
+            yield chunk
     
     def count_tokens(self, text: str) -> int:
         """简单的token计数估算"""
-        chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
-        english_words = len(text.replace('，', ' ').replace('。', ' ').split())
-        return chinese_chars + english_words
+        return self.behavior.count_tokens(text)
+    
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """与模拟用量（usage）一致的批量计数"""
+        return [self.behavior.count_tokens(text) for text in texts]
+    
+    def estimate_request_seconds(self, output_tokens: int) -> float:
+        """按模拟配置的平均延迟和生成速率估算请求耗时"""
+        return float(self.behavior.latency.get("mean", 0.0)) + self.behavior.generation_seconds(output_tokens)
 
 class ModelManager:
     """模型管理器，统一管理所有模型"""
@@ -360,6 +710,8 @@ class ModelManager:
     def __init__(self, config_file: str = "config/models.json"):
         self.models: Dict[str, BaseModel] = {}
         self.config_file = config_file
+        # 配置文件中的 cost_estimation：按模型名称（或 model_id）给出每 token 的输入/输出价格
+        self.cost_estimation: Dict[str, Dict[str, float]] = {}
         self.load_models_from_config()
     
     def load_models_from_config(self):
@@ -369,6 +721,7 @@ class ModelManager:
                 with open(self.config_file, 'r', encoding='utf-8') as f:
                     config = json.load(f)
                 
+                self.cost_estimation = config.get('cost_estimation', {})
                 for model_config in config.get('models', []):
                     self.add_model_from_config(model_config)
                     
@@ -382,8 +735,8 @@ class ModelManager:
             name = config.get('name', 'unknown')
             api_key = config.get('api_key', '')
             
-            # 检查API密钥
-            if not api_key:
+            # 检查API密钥（模拟模型不需要）
+            if not api_key and provider != 'mock':
                 print(f"警告: 模型 {name} 缺少API密钥，将跳过加载")
                 return
             
@@ -393,6 +746,8 @@ class ModelManager:
                 model = CustomAPIModel(**config)
             elif provider == 'agent':
                 model = AgentModel(**config)
+            elif provider == 'mock':
+                model = MockModel(**config)
             else:
                 print(f"不支持的模型提供商: {provider}")
                 return
@@ -416,6 +771,8 @@ class ModelManager:
             model = CustomAPIModel(name, model_id, api_key, base_url, **kwargs)
         elif provider == 'agent':
             model = AgentModel(name, model_id, api_key, base_url, **kwargs)
+        elif provider == 'mock':
+            model = MockModel(name, model_id, api_key, base_url, **kwargs)
         else:
             raise ValueError(f"不支持的模型提供商: {provider}")
         
@@ -429,6 +786,14 @@ class ModelManager:
         """获取模型实例"""
         return self.models.get(name)
     
+    def get_model_pricing(self, name: str) -> Dict[str, float]:
+        """获取模型的每 token 价格，依次按模型名称、model_id 和 default 查找"""
+        model = self.models.get(name)
+        for key in (name, model.model_id if model else None, "default"):
+            if key and key in self.cost_estimation:
+                return self.cost_estimation[key]
+        return dict(DEFAULT_PRICING)
+    
     def has_model(self, name: str) -> bool:
         """检查模型是否存在"""
         return name in self.models
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型调用弹性层
+功能：为所有模型提供统一的重试策略（指数退避 + 全抖动）、按错误类别的重试策略、
+      重试预算以及按端点的熔断器，端点故障时快速失败而不是逐题等待超时
+"""
+
+import asyncio
+import random
+import time
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+import httpx
+import openai
+
+from .mock_llm import MockAPIError
+from .adaptive_limiter import parse_retry_after
+
+
+class CircuitOpenError(Exception):
+    """端点熔断中，请求被直接拒绝"""
+
+    def __init__(self, endpoint: str, retry_in: float):
+        super().__init__(f"端点 {endpoint} 熔断中，{retry_in:.1f}秒后再试")
+        self.endpoint = endpoint
+        self.retry_in = retry_in
+
+
+def _classify_status(status_code: int) -> str:
+    """按HTTP状态码划分错误类别"""
+    if status_code == 429:
+        return "rate_limit"
+    if status_code in (502, 503, 504):
+        return "unavailable"
+    if status_code >= 500:
+        return "server_error"
+    return "client_error"
+
+
+def classify_error(error: BaseException) -> str:
+    """把各提供商的异常归类为统一的错误类别"""
+    if isinstance(error, CircuitOpenError):
+        return "circuit_open"
+    if isinstance(error, (httpx.TimeoutException, asyncio.TimeoutError, openai.APITimeoutError)):
+        return "timeout"
+    if isinstance(error, httpx.HTTPStatusError):
+        return _classify_status(error.response.status_code)
+    if isinstance(error, openai.APIStatusError):
+        return _classify_status(error.status_code)
+    if isinstance(error, MockAPIError):
+        return _classify_status(error.status_code)
+    if isinstance(error, (openai.APIConnectionError, httpx.TransportError)):
+        return "connection"
+    return "other"
+
+
+def extract_retry_after(error: BaseException) -> Optional[float]:
+    """从异常中提取 Retry-After（秒）"""
+    retry_after = getattr(error, "retry_after", None)
+    if retry_after is not None:
+        return float(retry_after)
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers is not None:
+        return parse_retry_after(headers.get("retry-after"))
+    return None
+
+
+class RetryPolicy:
+    """指数退避 + 全抖动的重试策略"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 1.0,
+                 max_delay: float = 20.0, multiplier: float = 2.0):
+        self.max_attempts = max(1, int(max_attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+
+    def compute_delay(self, attempt: int, retry_after: Optional[float] = None,
+                      rng: Optional[random.Random] = None) -> float:
+        """计算第 attempt 次失败（从0开始）后的等待时间
+
+        全抖动：在 [0, min(max_delay, base * multiplier^attempt)] 内均匀取值，
+        避免大量并发请求在同一时刻重试；服务端给出 Retry-After 时以其为下限
+        """
+        ceiling = min(self.max_delay, self.base_delay * (self.multiplier ** attempt))
+        delay = (rng or random).uniform(0, ceiling)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any], default: Optional["RetryPolicy"] = None) -> "RetryPolicy":
+        """从配置字典创建，未给出的字段沿用默认策略"""
+        default = default or cls()
+        return cls(
+            max_attempts=config.get("max_attempts", default.max_attempts),
+            base_delay=config.get("base_delay", default.base_delay),
+            max_delay=config.get("max_delay", default.max_delay),
+            multiplier=config.get("multiplier", default.multiplier)
+        )
+
+
+# 各错误类别的默认重试策略；未列出的类别（客户端错误、未知错误、熔断）不重试
+DEFAULT_RETRY_POLICIES = {
+    "rate_limit": RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=30.0),
+    "unavailable": RetryPolicy(max_attempts=4, base_delay=1.0, max_delay=20.0),
+    "server_error": RetryPolicy(max_attempts=3, base_delay=1.0, max_delay=10.0),
+    "timeout": RetryPolicy(max_attempts=3, base_delay=2.0, max_delay=20.0),
+    "connection": RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=10.0),
+}
+
+# 计入熔断器的错误类别（限流由自适应并发限制器处理，不视为端点故障）
+BREAKER_FAILURE_CLASSES = {"unavailable", "server_error", "timeout", "connection"}
+
+
+class RetryBudget:
+    """重试预算：重试次数不超过请求数的一定比例，防止故障时重试放大流量"""
+
+    def __init__(self, ratio: float = 0.2, min_retries: float = 10, capacity: Optional[float] = None):
+        self.ratio = ratio
+        self.capacity = capacity if capacity is not None else max(min_retries, 100 * ratio)
+        self.tokens = float(min_retries)
+        self.exhausted = 0
+
+    def record_request(self):
+        """每个新请求为预算存入 ratio 个令牌"""
+        self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """尝试消耗一次重试机会"""
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.exhausted += 1
+        return False
+
+
+class CircuitBreaker:
+    """按端点的熔断器（closed -> open -> half_open -> closed）"""
+
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.recovery_timeout = recovery_timeout
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.opened_count = 0
+        self.probe_in_flight = False
+        self.rejected = 0
+
+    def before_call(self, endpoint: str):
+        """请求前检查，熔断中直接抛出 CircuitOpenError"""
+        if self.state == "closed":
+            return
+        elapsed = time.monotonic() - self.opened_at
+        if self.state == "open" and elapsed >= self.recovery_timeout:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.probe_in_flight:
+            # 半开状态只放行一个探测请求
+            self.probe_in_flight = True
+            return
+        self.rejected += 1
+        raise CircuitOpenError(endpoint, max(0.0, self.recovery_timeout - elapsed))
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self.state = "closed"
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self.probe_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opened_count += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def record_neutral(self):
+        """与端点健康无关的结果（如客户端错误），只释放探测名额"""
+        self.probe_in_flight = False
+
+
+class EndpointResilience:
+    """单个端点的弹性策略：重试策略 + 重试预算 + 熔断器"""
+
+    def __init__(self, endpoint: str, settings: Optional[Dict[str, Any]] = None):
+        settings = settings or {}
+        self.endpoint = endpoint
+        self.policies = dict(DEFAULT_RETRY_POLICIES)
+        for error_class, policy_config in (settings.get("retry") or {}).items():
+            self.policies[error_class] = RetryPolicy.from_config(
+                policy_config, DEFAULT_RETRY_POLICIES.get(error_class)
+            )
+        budget_config = settings.get("budget") or {}
+        self.budget = RetryBudget(
+            ratio=budget_config.get("ratio", 0.2),
+            min_retries=budget_config.get("min_retries", 10),
+            capacity=budget_config.get("capacity")
+        )
+        breaker_config = settings.get("circuit_breaker") or {}
+        self.breaker = CircuitBreaker(
+            failure_threshold=breaker_config.get("failure_threshold", 5),
+            recovery_timeout=breaker_config.get("recovery_timeout", 30.0)
+        )
+        self.rng = random.Random(settings.get("seed"))
+        self.retries = 0
+        self.errors_by_class: Dict[str, int] = {}
+
+    async def call(self, request_func: Callable[[], Awaitable[Any]]) -> Any:
+        """执行请求，按错误类别重试；重试用尽或不可重试时抛出最后一个异常"""
+        self.budget.record_request()
+        attempt = 0
+        while True:
+            self.breaker.before_call(self.endpoint)
+            try:
+                result = await request_func()
+            except asyncio.CancelledError:
+                self.breaker.record_neutral()
+                raise
+            except Exception as e:
+                error_class = classify_error(e)
+                self.errors_by_class[error_class] = self.errors_by_class.get(error_class, 0) + 1
+                if error_class in BREAKER_FAILURE_CLASSES:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_neutral()
+
+                policy = self.policies.get(error_class)
+                if policy is None or attempt + 1 >= policy.max_attempts:
+                    raise
+                if not self.budget.try_spend():
+                    print(f"端点 {self.endpoint} 重试预算耗尽，放弃重试: {str(e)}")
+                    raise
+                delay = policy.compute_delay(attempt, extract_retry_after(e), self.rng)
+                print(f"请求失败（{error_class}），{delay:.2f}秒后进行第 {attempt + 2} 次尝试: {str(e)}")
+                self.retries += 1
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.breaker.record_success()
+            return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        """获取弹性层的当前指标"""
+        return {
+            "endpoint": self.endpoint,
+            "circuit_state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "opened_count": self.breaker.opened_count,
+            "rejected": self.breaker.rejected,
+            "retries": self.retries,
+            "retry_budget_tokens": round(self.budget.tokens, 3),
+            "budget_exhausted": self.budget.exhausted,
+            "errors_by_class": dict(self.errors_by_class)
+        }
+
+
+# 按端点共享的弹性策略（同一端点的多个模型共用熔断状态）
+_endpoint_resilience: Dict[str, EndpointResilience] = {}
+
+
+def get_endpoint_resilience(endpoint: str, settings: Optional[Dict[str, Any]] = None) -> EndpointResilience:
+    """获取（或创建）端点对应的弹性策略
+
+    settings 对应模型配置中的 resilience 字段，例如
+    {"retry": {"timeout": {"max_attempts": 2}}, "budget": {"ratio": 0.2},
+     "circuit_breaker": {"failure_threshold": 5, "recovery_timeout": 30}}
+    """
+    resilience = _endpoint_resilience.get(endpoint)
+    if resilience is None:
+        resilience = EndpointResilience(endpoint, settings)
+        _endpoint_resilience[endpoint] = resilience
+    return resilience
+
+
+def list_resilience_metrics() -> List[Dict[str, Any]]:
+    """列出所有端点的弹性层指标"""
+    return [resilience.snapshot() for resilience in _endpoint_resilience.values()]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨进程共享限流模块
+功能：分片评估时多个工作进程访问同一模型，由协调进程创建进程间共享的并发槽位（信号量）
+      和请求节拍（每分钟请求数），工作进程的每次模型请求都先经过它们，保证全局限制仍然成立
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
+
+# 等待共享槽位时的轮询间隔（秒），由短到长退避
+SLOT_POLL_MIN = 0.002
+SLOT_POLL_MAX = 0.05
+
+
+class SharedModelLimit:
+    """单个模型的跨进程限制：max_concurrency 个并发槽位，两次请求的开始时间至少间隔 60/requests_per_minute 秒"""
+
+    def __init__(self, mp_context, max_concurrency: Optional[int] = None,
+                 requests_per_minute: Optional[float] = None):
+        self.max_concurrency = max_concurrency
+        self.slots = mp_context.BoundedSemaphore(max_concurrency) if max_concurrency else None
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.next_start = mp_context.Value('d', 0.0)
+
+    async def _wait_turn(self):
+        """按请求节拍预约开始时间（锁只在预约时短暂持有）"""
+        if self.interval <= 0:
+            return
+        with self.next_start.get_lock():
+            now = time.monotonic()
+            start = max(now, self.next_start.value)
+            self.next_start.value = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+    async def _acquire_slot(self):
+        delay = SLOT_POLL_MIN
+        while not self.slots.acquire(block=False):
+            await asyncio.sleep(delay)
+            delay = min(SLOT_POLL_MAX, delay * 2)
+
+    @asynccontextmanager
+    async def request(self):
+        await self._wait_turn()
+        if self.slots is None:
+            yield
+            return
+        await self._acquire_slot()
+        try:
+            yield
+        finally:
+            self.slots.release()
+
+
+def build_shared_limits(mp_context, model_configs: Dict[str, Dict[str, Any]]) -> Dict[str, SharedModelLimit]:
+    """按模型配置中的 concurrency_limit.max 和 rate_limit.requests_per_minute 创建共享限制（需在启动工作进程前创建）"""
+    limits = {}
+    for name, config in model_configs.items():
+        max_concurrency = (config.get("concurrency_limit") or {}).get("max")
+        requests_per_minute = (config.get("rate_limit") or {}).get("requests_per_minute")
+        if max_concurrency or requests_per_minute:
+            limits[name] = SharedModelLimit(mp_context, max_concurrency, requests_per_minute)
+    return limits
+
+
+# 当前进程安装的共享限制（只在分片评估的工作进程中设置）
+_shared_limits: Dict[str, SharedModelLimit] = {}
+
+
+def install_shared_limits(limits: Optional[Dict[str, SharedModelLimit]]):
+    """在工作进程中安装协调进程传来的共享限制"""
+    _shared_limits.clear()
+    _shared_limits.update(limits or {})
+
+
+@asynccontextmanager
+async def shared_request_slot(model_name: str):
+    """占用模型的共享请求槽位；没有安装共享限制时不做任何事"""
+    limit = _shared_limits.get(model_name)
+    if limit is None:
+        yield
+        return
+    async with limit.request():
+        yield
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token 计数模块
+功能：为所有模型提供共享的 token 计数服务。配置了本地 BPE 文件（tiktoken 格式）且安装了 tiktoken 时
+      精确计数，否则使用基于 NumPy 的向量化估算；计数结果按文本哈希做 LRU 缓存，
+      count_batch 可一次计算整个数据集，用于运行前预估费用和 token 预算
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+try:
+    import tiktoken
+    from tiktoken.load import load_tiktoken_bpe
+except ImportError:  # 未安装 tiktoken 时只能使用估算
+    tiktoken = None
+    load_tiktoken_bpe = None
+
+
+# cl100k_base 的预分词正则，加载本地 BPE 文件时未指定 pattern 则使用它
+DEFAULT_BPE_PATTERN = (
+    r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)|[^\r\n\p{L}\p{N}]?\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+
+# 估算规则：英文单词约 4 个字符一个 token，数字约 3 位一个 token，
+# 中日韩字符、标点和其他符号每个字符一个 token，空白不单独计数
+WORD_CHARS_PER_TOKEN = 4
+DIGITS_PER_TOKEN = 3
+WHITESPACE_CODES = np.array([9, 10, 11, 12, 13, 32], dtype=np.uint32)
+
+
+def _run_tokens(mask: np.ndarray, chars_per_token: int) -> np.ndarray:
+    """把 mask 中每段连续为真的字符折算为 token 数，记在该段的起始位置上"""
+    tokens = np.zeros(len(mask), dtype=np.int64)
+    if not mask.any():
+        return tokens
+    starts = np.flatnonzero(mask & ~np.concatenate(([False], mask[:-1])))
+    ends = np.flatnonzero(mask & ~np.concatenate((mask[1:], [False]))) + 1
+    tokens[starts] = np.maximum(1, (ends - starts + chars_per_token // 2) // chars_per_token)
+    return tokens
+
+
+class HeuristicEncoder:
+    """向量化的 token 估算：把文本转成 Unicode 码点数组后按字符类别统计"""
+
+    name = "heuristic"
+
+    def count(self, text: str) -> int:
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """把所有文本用换行拼接后一次计算，再按各自的区间求和"""
+        if not texts:
+            return []
+        joined = "\n".join(texts)
+        codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32)
+
+        lower = codes | 0x20
+        is_letter = (lower >= ord('a')) & (lower <= ord('z'))
+        is_digit = (codes >= ord('0')) & (codes <= ord('9'))
+        is_space = np.isin(codes, WHITESPACE_CODES)
+        tokens = _run_tokens(is_letter, WORD_CHARS_PER_TOKEN) + _run_tokens(is_digit, DIGITS_PER_TOKEN)
+        tokens += ~(is_letter | is_digit | is_space)
+
+        cumulative = np.concatenate(([0], np.cumsum(tokens)))
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        starts = np.concatenate(([0], np.cumsum(lengths + 1)[:-1]))
+        return (cumulative[starts + lengths] - cumulative[starts]).tolist()
+
+
+class TiktokenEncoder:
+    """基于 tiktoken 的精确计数（BPE 文件从本地磁盘加载，不访问网络）"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.name = encoding.name
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "TiktokenEncoder":
+        """bpe_file 为本地 .tiktoken 文件；只给 encoding 时使用 tiktoken 自带（已缓存）的编码"""
+        if tiktoken is None:
+            raise ImportError("未安装 tiktoken")
+        bpe_file = settings.get("bpe_file")
+        if bpe_file:
+            encoding = tiktoken.Encoding(
+                name=settings.get("encoding") or bpe_file,
+                pat_str=settings.get("pattern") or DEFAULT_BPE_PATTERN,
+                mergeable_ranks=load_tiktoken_bpe(bpe_file),
+                special_tokens=settings.get("special_tokens", {})
+            )
+        else:
+            encoding = tiktoken.get_encoding(settings["encoding"])
+        return cls(encoding)
+
+    def count(self, text: str) -> int:
+        return len(self.encoding.encode_ordinary(text))
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(texts)]
+
+
+class TokenCounter:
+    """带 LRU 缓存的 token 计数器（以文本哈希为键，不保留原文）"""
+
+    def __init__(self, encoder=None, cache_size: int = 8192):
+        self.encoder = encoder or HeuristicEncoder()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+    def _store(self, key: bytes, count: int):
+        self._cache[key] = count
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def count(self, text: str) -> int:
+        """计算单个文本的 token 数"""
+        if not text:
+            return 0
+        key = self._key(text)
+        count = self._cache.get(key)
+        if count is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return count
+        self.misses += 1
+        count = self.encoder.count(text)
+        self._store(key, count)
+        return count
+
+    def count_batch(self, texts: List[str]) -> List[int]:
+        """批量计算 token 数，未命中缓存的文本一起交给编码器"""
+        counts: List[Optional[int]] = [0] * len(texts)
+        missing: Dict[bytes, List[int]] = {}
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            key = self._key(text)
+            count = self._cache.get(key)
+            if count is not None:
+                self.hits += 1
+                self._cache.move_to_end(key)
+                counts[i] = count
+            else:
+                missing.setdefault(key, []).append(i)
+
+        if missing:
+            self.misses += len(missing)
+            keys = list(missing)
+            computed = self.encoder.count_batch([texts[missing[key][0]] for key in keys])
+            for key, count in zip(keys, computed):
+                self._store(key, count)
+                for i in missing[key]:
+                    counts[i] = count
+        return counts
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取计数器统计"""
+        lookups = self.hits + self.misses
+        return {
+            "encoder": self.encoder.name,
+            "cached_texts": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+# 按分词配置共享的计数器
+_token_counters: Dict[str, TokenCounter] = {}
+
+
+def get_token_counter(settings: Optional[Dict[str, Any]] = None) -> TokenCounter:
+    """获取（或创建）分词配置对应的计数器
+
+    settings 对应模型配置中的 tokenizer 字段，例如
+    {"bpe_file": "config/tokenizers/cl100k_base.tiktoken", "encoding": "cl100k_base"}；
+    未配置或无法加载时使用估算
+    """
+    settings = settings or {}
+    key = json.dumps(settings, sort_keys=True, ensure_ascii=False)
+    counter = _token_counters.get(key)
+    if counter is None:
+        encoder = None
+        if settings.get("bpe_file") or settings.get("encoding"):
+            try:
+                encoder = TiktokenEncoder.from_settings(settings)
+            except Exception as e:
+                print(f"加载分词器失败，改用估算计数: {e}")
+        counter = TokenCounter(encoder, cache_size=settings.get("cache_size", 8192))
+        _token_counters[key] = counter
+    return counter
+
+
+def list_token_counter_stats() -> List[Dict[str, Any]]:
+    """列出所有计数器的统计"""
+    return [counter.get_stats() for counter in _token_counters.values()]
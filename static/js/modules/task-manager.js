@@ -107,7 +107,7 @@ class TaskManager {
                     const task = data.data;
                     this.updateProgress(task);
                     
-                    if (task.status === 'completed' || task.status === 'failed') {
+                    if (['completed', 'failed', 'cancelled', 'budget_exceeded'].includes(task.status)) {
                         this.stopProgressMonitoring();
                         this.handleTaskCompletion(task);
                     }
@@ -227,6 +227,18 @@ class TaskManager {
             this.notificationManager.error('评估任务失败: ' + (task.error || '未知错误'));
             
             // 3秒后自动隐藏进度条
+            setTimeout(() => {
+                this.hideProgress();
+            }, 3000);
+        } else if (task.status === 'cancelled') {
+            this.notificationManager.warning('评估任务已取消，已保存完成部分的结果');
+
+            setTimeout(() => {
+                this.hideProgress();
+            }, 3000);
+        } else if (task.status === 'budget_exceeded') {
+            this.notificationManager.warning('评估任务超出预算，已保存完成部分的结果');
+
             setTimeout(() => {
                 this.hideProgress();
             }, 3000);
@@ -10,14 +10,22 @@ class UIComponents {
             'pending': 'bg-warning',
             'running': 'bg-primary',
             'completed': 'bg-success',
-            'failed': 'bg-danger'
+            'failed': 'bg-danger',
+            'paused': 'bg-secondary',
+            'cancelling': 'bg-secondary',
+            'cancelled': 'bg-dark',
+            'budget_exceeded': 'bg-info'
         };
 
         this.statusTexts = {
             'pending': '等待中',
             'running': '运行中',
             'completed': '已完成',
-            'failed': '已失败'
+            'failed': '已失败',
+            'paused': '已暂停',
+            'cancelling': '取消中',
+            'cancelled': '已取消',
+            'budget_exceeded': '超出预算'
         };
         
         // 初始化工具提示管理器
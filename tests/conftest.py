@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+测试公共夹具
+功能：提供使用模拟模型的评估器和简单编程数据集的构造函数
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.logger import EvaluationLogger
+from core.evaluator import Evaluator
+from models.model_manager import ModelManager, MockModel
+from utils.prompt_loader import PromptLoader
+
+
+@pytest.fixture
+def make_evaluator(tmp_path):
+    """构造评估器：make_evaluator(models=("target", "judge"), latency=0.0, name="logs", model_manager=None,
+    model_options=None)
+
+    models 中的每个名称注册一个固定延迟的模拟模型；model_options 按模型名给出 MockModel 的额外参数
+    （如 {"judge": {"mock": {"judge_scores": {...}}, "supports_n": True}}，mock 与默认的延迟配置合并）；
+    传入 model_manager 时直接使用（多个评估器共享模型），
+    name 是日志目录名，同一测试中的多个评估器应使用不同的 name
+    """
+    def factory(models=("target", "judge"), latency=0.0, name="logs", model_manager=None, model_options=None):
+        if model_manager is None:
+            model_manager = ModelManager(str(tmp_path / "models.json"))
+            for model_name in models:
+                options = dict((model_options or {}).get(model_name, {}))
+                mock = {"latency": {"distribution": "fixed", "mean": latency}}
+                mock.update(options.pop("mock", {}))
+                model_manager.models[model_name] = MockModel(model_name, "mock-1", mock=mock, **options)
+        evaluator = Evaluator(model_manager, PromptLoader())
+        evaluator.logger = EvaluationLogger(log_dir=str(tmp_path / name))
+        return evaluator
+    return factory
+
+
+@pytest.fixture
+def make_dataset():
+    """构造 count 道有标准答案的编程题：make_dataset(count) -> (questions, answers)"""
+    def factory(count):
+        questions = [{"id": i, "type": "standard_answer", "question": f"输出数字 {i}"} for i in range(1, count + 1)]
+        answers = [{"question_id": i, "standard_answer": f"print({i})"} for i in range(1, count + 1)]
+        return questions, answers
+    return factory
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量评估测试
+功能：测试评估请求的合并、按 index 拆分结果以及解析失败时的逐题回退
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.batch_judge import BatchJudge
+from core.evaluation.programming_evaluator import ProgrammingEvaluator
+from models.model_manager import MockModel
+from utils.prompt_loader import PromptLoader
+
+
+def make_questions(count):
+    return [
+        {
+            "id": i + 1,
+            "type": "standard_answer",
+            "question": f"输出数字 {i + 1}",
+            "sub_questions": [
+                {"id": f"{i + 1}.1", "description": "输出结果", "weight": 0.5},
+                {"id": f"{i + 1}.2", "description": "代码规范", "weight": 0.5}
+            ]
+        }
+        for i in range(count)
+    ]
+
+
+class BrokenBatchModel(MockModel):
+    """批量评估时只返回部分条目的模拟评估模型"""
+
+    async def generate(self, prompt, **kwargs):
+        response = await super().generate(prompt, **kwargs)
+        if "=== 条目" in prompt:
+            response["content"] = '[{"index": 1, "sub_question_scores": [1], "accuracy": 90}]'
+        return response
+
+
+class TestBatchJudge:
+    """批量评估测试"""
+
+    @pytest.mark.asyncio
+    async def test_evaluator_batches_judge_requests(self, make_evaluator):
+        """5 个问题、批大小 2：两个满批加一个单独请求"""
+        evaluator = make_evaluator()
+        judge = evaluator.model_manager.get_model("judge")
+        questions = make_questions(5)
+        answers = [{"question_id": q["id"], "standard_answer": f"print({q['id']})"} for q in questions]
+        results = await evaluator.evaluate_model(
+            "target", "judge", questions, answers,
+            {"concurrency": 5, "judge_batch_size": 2, "judge_batch_wait": 0.05,
+             "request_interval": 0, "judge_interval": 0}
+        )
+
+        stats = results["judge_batching"]
+        assert stats["batches"] == 2 and stats["batched_items"] == 4
+        assert stats["single_requests"] == 1 and stats["fallback_items"] == 0
+        assert judge.request_count == 3
+        for item in results["results"]:
+            assert len(item["evaluation"]["sub_question_scores"]) == 2
+            assert item["evaluation"]["details"]["grading_tier"] == "judge"
+
+    @pytest.mark.asyncio
+    async def test_fallback_for_invalid_items(self):
+        """子问题分数个数不符或缺失的条目回退为逐题评估"""
+        judge = BrokenBatchModel("judge", "mock-1")
+        batch_judge = BatchJudge(ProgrammingEvaluator(PromptLoader()), judge, batch_size=3, max_wait=0.05)
+        questions = make_questions(3)
+
+        evaluations = await asyncio.gather(*(
+            batch_judge.evaluate(q, f"print({q['id']})", f"print({q['id']})") for q in questions
+        ))
+
+        stats = batch_judge.get_stats()
+        assert stats["batches"] == 1 and stats["batched_items"] == 0
+        assert stats["fallback_items"] == 3 and stats["single_requests"] == 3
+        assert judge.request_count == 4
+        assert all(len(e["sub_question_scores"]) == 2 for e in evaluations)
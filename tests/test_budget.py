@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务预算测试
+功能：测试超出 token/时间预算时取消未完成的问题并返回部分结果
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+class TestTaskBudget:
+    """任务预算测试"""
+
+    @pytest.mark.asyncio
+    async def test_token_budget_returns_partial_result(self, make_evaluator, make_dataset):
+        """逐题评估时超出 token 预算后不再开始新问题"""
+        evaluator = make_evaluator()
+        questions, answers = make_dataset(10)
+        config = {"concurrency": 1, "request_interval": 0, "judge_interval": 0, "budget": {"max_tokens": 1}}
+
+        results = await evaluator.evaluate_model("target", "judge", questions, answers, config)
+
+        assert results["budget_exceeded"] is True
+        assert results["budget"]["exceeded"] == "max_tokens"
+        assert results["completed_questions"] == len(results["results"]) == 1
+        assert results["questions_count"] == 10
+        # 报告的费用与预算检查使用同一价格来源
+        assert results["total_cost"] == results["budget"]["used"]["cost"] > 0
+        # 已完成问题之后最多还有一个问题开始了生成，随即被取消
+        assert evaluator.model_manager.get_model("target").request_count <= 2
+
+    @pytest.mark.asyncio
+    async def test_cost_prices_prompt_and_completion_separately(self, make_evaluator, make_dataset):
+        """输入 token 按输入单价、输出 token 按输出单价计价，报告费用与预算一致"""
+        evaluator = make_evaluator()
+        questions, answers = make_dataset(3)
+        config = {"concurrency": 1, "request_interval": 0, "judge_interval": 0, "budget": {"max_tokens": 10 ** 9}}
+
+        results = await evaluator.evaluate_model("target", "judge", questions, answers, config)
+
+        pricing = evaluator.model_manager.get_model_pricing("target")
+        assert pricing["input_cost_per_token"] != pricing["output_cost_per_token"]
+        expected = 0.0
+        for item in results["results"]:
+            evaluation = item["evaluation"]
+            judge_prompt = evaluation["evaluation_prompt_tokens"]
+            target_tokens = item["tokens_used"] - evaluation["evaluation_tokens"]
+            assert 0 < item["prompt_tokens"] < target_tokens
+            assert 0 < judge_prompt < evaluation["evaluation_tokens"]
+            prompt_tokens = item["prompt_tokens"] + judge_prompt
+            expected += (prompt_tokens * pricing["input_cost_per_token"]
+                         + (item["tokens_used"] - prompt_tokens) * pricing["output_cost_per_token"])
+
+        assert results["total_cost"] == pytest.approx(expected)
+        assert results["budget"]["used"]["cost"] == round(results["total_cost"], 6)
+
+    @pytest.mark.asyncio
+    async def test_time_budget_cancels_in_flight_requests(self, make_evaluator, make_dataset):
+        """运行时间超出预算时取消进行中的请求，不等待它们完成"""
+        evaluator = make_evaluator(latency=5.0)
+        questions, answers = make_dataset(4)
+        config = {"concurrency": 4, "request_interval": 0, "judge_interval": 0, "budget": {"max_seconds": 0.2}}
+
+        results = await evaluator.evaluate_model("target", "judge", questions, answers, config)
+
+        assert results["budget"]["exceeded"] == "max_seconds"
+        assert results["results"] == []
+        assert results["total_duration_seconds"] < 2.0
+
+    @pytest.mark.asyncio
+    async def test_no_budget(self, make_evaluator, make_dataset):
+        """未设置预算时结果中没有预算字段"""
+        evaluator = make_evaluator()
+        questions, answers = make_dataset(3)
+        results = await evaluator.evaluate_model(
+            "target", "judge", questions, answers,
+            {"concurrency": 2, "request_interval": 0, "judge_interval": 0}
+        )
+        assert len(results["results"]) == 3 and "budget" not in results
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分布式评估测试
+功能：测试分片租约的到期回收、任务的暂停和取消，以及多个工作节点通过 HTTP 完成一个分布式任务
+"""
+
+import asyncio
+import json
+import os
+import sys
+import time
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api import distributed_router, tasks_router
+from api.dependencies import (
+    get_task_manager, get_evaluator, get_evaluation_history, get_data_loader, get_distributed_coordinator
+)
+from core.distributed import DistributedCoordinator
+from core.distributed_worker import DistributedWorker
+from core.task_manager import TaskManager
+from utils.data_loader import DataLoader
+from utils.model_evaluation_history import ModelEvaluationHistory
+
+
+def build_coordinator(tmp_path, evaluator, task_manager, coordinator):
+    """构造协调节点应用，返回创建进程内 HTTP 客户端的函数"""
+    app = FastAPI()
+    app.include_router(distributed_router)
+    app.include_router(tasks_router)
+    app.dependency_overrides.update({
+        get_task_manager: lambda: task_manager,
+        get_evaluator: lambda: evaluator,
+        get_data_loader: lambda: DataLoader(str(tmp_path / "questions"), str(tmp_path / "answers")),
+        get_evaluation_history: lambda: ModelEvaluationHistory(str(tmp_path / "history.json")),
+        get_distributed_coordinator: lambda: coordinator
+    })
+
+    def make_client():
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://coordinator")
+
+    return make_client
+
+
+def write_dataset(tmp_path, questions, answers):
+    (tmp_path / "questions").mkdir()
+    (tmp_path / "answers").mkdir()
+    (tmp_path / "questions" / "dist_questions.json").write_text(json.dumps(questions), encoding="utf-8")
+    (tmp_path / "answers" / "dist_answers.json").write_text(json.dumps(answers), encoding="utf-8")
+
+
+class TestDistributedCoordinator:
+    """协调器租约测试"""
+
+    def test_expired_lease_is_requeued(self, tmp_path, make_evaluator, make_dataset):
+        """租约到期后分片重新分配，原节点心跳失败，分片完成后原节点迟到的结果被忽略"""
+        coordinator = DistributedCoordinator(
+            make_evaluator(("dist-mock",), latency=0.01), shard_size=2, lease_seconds=0.05
+        )
+        questions, answers = make_dataset(2)
+        completed = []
+        coordinator.create_task("t1", "dist-mock", "dist-mock", questions, answers,
+                                on_complete=completed.append)
+
+        slow = coordinator.lease("slow")
+        assert coordinator.lease("fast") is None
+        time.sleep(0.06)
+        fast = coordinator.lease("fast")
+        assert fast["shard_index"] == slow["shard_index"]
+        assert coordinator.heartbeat(slow["lease_id"], "slow") is None
+
+        items = [
+            {"index": entry["index"], "item": {"question_id": entry["question"]["id"], "tokens_used": 1,
+                                               "evaluation": {"scores": {"overall": 80}}}}
+            for entry in fast["questions"]
+        ]
+        progress = coordinator.submit(fast["lease_id"], "fast", items)
+        assert progress["completed"] and progress["requeued"] == 1
+        assert coordinator.submit(slow["lease_id"], "slow", items)["accepted"] == 0
+        assert len(completed) == 1
+        assert [item["question_id"] for item in completed[0]["results"]] == [1, 2]
+
+    def test_pause_and_cancel(self, tmp_path, make_evaluator, make_dataset):
+        """暂停后不再分配分片；取消后租约失效并返回已完成问题的结果"""
+        coordinator = DistributedCoordinator(make_evaluator(("dist-mock",)), shard_size=1)
+        questions, answers = make_dataset(3)
+        coordinator.create_task("t1", "dist-mock", "dist-mock", questions, answers)
+
+        first = coordinator.lease("w1")
+        assert coordinator.pause_task("t1") and not coordinator.pause_task("t1")
+        assert coordinator.lease("w1") is None
+        assert coordinator.resume_task("t1")
+        second = coordinator.lease("w1")
+        assert second is not None
+
+        item = {"question_id": first["questions"][0]["question"]["id"], "tokens_used": 1,
+                "evaluation": {"scores": {"overall": 80}}}
+        coordinator.submit(first["lease_id"], "w1", [{"index": first["questions"][0]["index"], "item": item}])
+        results = coordinator.cancel_task("t1")
+        assert results["cancelled"] and results["completed_questions"] == 1
+        assert [entry["question_id"] for entry in results["results"]] == [1]
+        assert coordinator.heartbeat(second["lease_id"], "w1") is None
+        assert coordinator.lease("w1") is None
+        assert coordinator.cancel_task("t1") is None
+
+    def test_orphaned_tasks_fail_on_restart(self, tmp_path):
+        """协调节点重启后，未结束的分布式任务标记为失败"""
+        task_manager = TaskManager(data_dir=str(tmp_path / "tasks"))
+        task_manager.create_task("d1", {"distributed": True, "status": "running", "created_at": "1"})
+        task_manager.create_task("d2", {"distributed": True, "status": "completed", "created_at": "2"})
+        task_manager.create_task("l1", {"status": "running", "created_at": "3"})
+
+        restarted = TaskManager(data_dir=str(tmp_path / "tasks"))
+        assert restarted.fail_orphaned_distributed_tasks() == ["d1"]
+        assert restarted.get_task("d1")["status"] == "failed"
+        assert [restarted.get_task(t)["status"] for t in ("d2", "l1")] == ["completed", "running"]
+
+
+class TestDistributedEvaluation:
+    """多个工作节点通过 HTTP 完成分布式任务"""
+
+    @pytest.mark.asyncio
+    async def test_workers_complete_task(self, tmp_path, make_evaluator, make_dataset):
+        questions, answers = make_dataset(7)
+        write_dataset(tmp_path, questions, answers)
+
+        evaluator = make_evaluator(("dist-mock",), latency=0.01)
+        task_manager = TaskManager(data_dir=str(tmp_path / "tasks"))
+        coordinator = DistributedCoordinator(evaluator)
+        make_client = build_coordinator(tmp_path, evaluator, task_manager, coordinator)
+
+        async with make_client() as client:
+            response = await client.post("/api/distributed/tasks", json={
+                "target_model_name": "dist-mock", "evaluator_model_name": "dist-mock",
+                "question_file": "dist_questions.json", "shard_size": 2,
+                "config": {"request_interval": 0, "judge_interval": 0, "concurrency": 2}
+            })
+        assert response.status_code == 200
+        task_id = response.json()["data"]["task_id"]
+        assert response.json()["data"]["total_shards"] == 4
+
+        workers = [
+            DistributedWorker(make_evaluator(("dist-mock",), latency=0.01, name=f"logs-worker{i}"),
+                              worker_id=f"worker{i}", client=make_client())
+            for i in range(2)
+        ]
+        stats = await asyncio.gather(*(worker.run(task_id) for worker in workers))
+        for worker in workers:
+            await worker.close()
+
+        assert sum(s["shards"] for s in stats) == 4
+        task = task_manager.get_task(task_id)
+        assert task["status"] == "completed"
+        results = task["results"]
+        assert [item["question_id"] for item in results["results"]] == list(range(1, 8))
+        assert results["summary"]["total_questions"] == 7
+        assert sum(results["distributed"]["workers"].values()) == 4
+        assert coordinator.get_progress(task_id) is None
+
+    @pytest.mark.asyncio
+    async def test_control_and_failing_worker(self, tmp_path, make_evaluator, make_dataset):
+        """分布式任务可通过任务接口暂停、恢复和取消；评估出错的工作节点继续轮询而不退出"""
+        questions, answers = make_dataset(4)
+        write_dataset(tmp_path, questions, answers)
+        evaluator = make_evaluator(("dist-mock",))
+        task_manager = TaskManager(data_dir=str(tmp_path / "tasks"))
+        coordinator = DistributedCoordinator(evaluator, lease_seconds=0.3)
+        make_client = build_coordinator(tmp_path, evaluator, task_manager, coordinator)
+
+        async with make_client() as client:
+            response = await client.post("/api/distributed/tasks", json={
+                "target_model_name": "dist-mock", "evaluator_model_name": "dist-mock",
+                "question_file": "dist_questions.json", "shard_size": 2
+            })
+            task_id = response.json()["data"]["task_id"]
+
+            # 本机没有该模型的工作节点：两个分片都评估失败，租约到期后重新排队
+            broken = DistributedWorker(make_evaluator(("other",), name="logs-broken"),
+                                       worker_id="broken", client=make_client(), poll_interval=0.01)
+            stats = await broken.run(task_id)
+            await broken.close()
+            assert stats["failed_shards"] == 2 and stats["shards"] == 0
+
+            assert (await client.post(f"/api/tasks/{task_id}/pause")).status_code == 200
+            assert task_manager.get_task(task_id)["status"] == "paused"
+            await asyncio.sleep(0.35)
+            assert coordinator.lease("w1", task_id) is None
+            assert (await client.post(f"/api/tasks/{task_id}/resume")).status_code == 200
+            assert coordinator.lease("w1", task_id) is not None
+
+            response = await client.post(f"/api/tasks/{task_id}/cancel")
+            assert response.status_code == 200
+            assert (await client.post(f"/api/tasks/{task_id}/cancel")).status_code == 409
+        task = task_manager.get_task(task_id)
+        assert task["status"] == "cancelled"
+        assert task["results"]["cancelled"] and task["results"]["completed_questions"] == 0
+        assert coordinator.get_progress(task_id) is None
+
+    @pytest.mark.asyncio
+    async def test_budget_stops_task(self, tmp_path, make_evaluator, make_dataset):
+        """协调节点按回收的结果项累计预算，超出后停止分配分片并以部分结果结束任务"""
+        questions, answers = make_dataset(6)
+        write_dataset(tmp_path, questions, answers)
+        evaluator = make_evaluator(("dist-mock",))
+        task_manager = TaskManager(data_dir=str(tmp_path / "tasks"))
+        coordinator = DistributedCoordinator(evaluator)
+        make_client = build_coordinator(tmp_path, evaluator, task_manager, coordinator)
+
+        async with make_client() as client:
+            response = await client.post("/api/distributed/tasks", json={
+                "target_model_name": "dist-mock", "evaluator_model_name": "dist-mock",
+                "question_file": "dist_questions.json", "shard_size": 2,
+                "config": {"request_interval": 0, "judge_interval": 0, "budget": {"max_tokens": 1}}
+            })
+            task_id = response.json()["data"]["task_id"]
+
+        worker = DistributedWorker(make_evaluator(("dist-mock",), name="logs-worker"),
+                                   worker_id="w1", client=make_client())
+        stats = await worker.run(task_id)
+        await worker.close()
+
+        assert stats["shards"] == 1
+        task = task_manager.get_task(task_id)
+        assert task["status"] == "budget_exceeded"
+        results = task["results"]
+        assert results["budget_exceeded"] and results["budget"]["exceeded"] == "max_tokens"
+        assert results["completed_questions"] == len(results["results"]) == 2
+        assert results["budget"]["used"]["cost"] == round(results["total_cost"], 6) > 0
+        assert coordinator.get_progress(task_id) is None
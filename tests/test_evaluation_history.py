@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估历史存储测试
+功能：测试只追加的评估历史时序存储和最新记录视图
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.evaluation_history_store import EvaluationHistoryStore
+from utils.model_evaluation_history import ModelEvaluationHistory
+
+
+def make_task(task_id, model_name, created_at, overall_scores, duration=10.0, dataset="programming_questions.json"):
+    """构造一个已完成任务的数据"""
+    return {
+        "task_id": task_id,
+        "target_model_name": model_name,
+        "evaluator_model_name": "judge",
+        "question_file": dataset,
+        "created_at": created_at,
+        "results": {
+            "results": [
+                {"evaluation": {"scores": {"overall": score}}, "tokens_used": 100}
+                for score in overall_scores
+            ],
+            "summary": {"score_statistics": {"accuracy": {"mean": 70.0}}},
+            "total_duration_seconds": duration,
+            "total_cost": 0.01
+        }
+    }
+
+
+class TestEvaluationHistoryStore:
+    """评估历史时序存储测试"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        return EvaluationHistoryStore(str(tmp_path / "history.db"))
+
+    def test_append_keeps_every_run(self, store):
+        """同一模型的多次运行都应保留"""
+        assert store.append_run(make_task("t1", "model-a", "2024-01-01T10:00:00", [80, 60]))
+        assert store.append_run(make_task("t2", "model-a", "2024-01-02T10:00:00", [90, 90]))
+        # 同一任务重复写入被忽略
+        assert not store.append_run(make_task("t2", "model-a", "2024-01-02T10:00:00", [90, 90]))
+
+        runs = store.query_runs(model_name="model-a")
+        assert [r["task_id"] for r in runs] == ["t2", "t1"]
+        assert runs[0]["average_score"] == 90
+        assert runs[1]["avg_seconds_per_question"] == 5.0
+        assert runs[1]["accuracy"] == 70.0
+
+    def test_range_query_and_filters(self, store):
+        """时间范围和维度过滤"""
+        store.append_run(make_task("t1", "model-a", "2024-01-01T10:00:00", [50]))
+        store.append_run(make_task("t2", "model-a", "2024-02-01T10:00:00", [60], dataset="other.json"))
+        store.append_run(make_task("t3", "model-b", "2024-03-01T10:00:00", [70]))
+
+        runs = store.query_runs(start="2024-01-15T00:00:00", end="2024-03-15T00:00:00")
+        assert {r["task_id"] for r in runs} == {"t2", "t3"}
+        assert [r["task_id"] for r in store.query_runs(dataset="other.json")] == ["t2"]
+
+    def test_trend_downsampling(self, store):
+        """趋势数据按时间桶聚合"""
+        store.append_run(make_task("t1", "model-a", "2024-01-01T10:00:00", [40]))
+        store.append_run(make_task("t2", "model-a", "2024-01-01T12:00:00", [80]))
+        store.append_run(make_task("t3", "model-a", "2024-01-05T10:00:00", [100]))
+
+        trend = store.get_trend(model_name="model-a", bucket="day")
+        assert [p["runs"] for p in trend["points"]] == [2, 1]
+        assert trend["points"][0]["average_score"]["avg"] == 60
+
+        auto = store.get_trend(model_name="model-a", max_points=2)
+        assert len(auto["points"]) <= 2
+
+        with pytest.raises(ValueError):
+            store.get_trend(bucket="decade")
+
+
+class TestModelEvaluationHistory:
+    """最新记录视图与时序存储的联动测试"""
+
+    def test_update_appends_to_store(self, tmp_path):
+        history = ModelEvaluationHistory(str(tmp_path / "history.json"))
+        history.update_model_evaluation(make_task("t1", "model-a", "2024-01-01T10:00:00", [80]))
+        history.update_model_evaluation(make_task("t2", "model-a", "2024-01-02T10:00:00", [60]))
+
+        # 最新记录视图只保留最新一次
+        assert history.get_model_evaluation("model-a")["task_id"] == "t2"
+        # 时序存储保留全部运行
+        assert len(history.get_evaluation_runs(model_name="model-a")) == 2
+
+        history.cleanup_old_evaluations(max_records=0)
+        assert len(history.get_evaluation_runs(model_name="model-a")) == 2
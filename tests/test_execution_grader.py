@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+执行评分测试
+功能：测试沙箱执行、输出比较和评估引擎的执行评分模式
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.execution_grader import (
+    ExecutionGrader, run_code_sandboxed, instrument_reference, split_reference_output, compare_outputs,
+    network_namespace_available, SEGMENT_SENTINEL
+)
+from core.evaluation.reference_cache import ReferenceOutputCache
+
+
+QUESTION = {
+    "id": 1,
+    "type": "standard_answer",
+    "sub_questions": [
+        {"id": "1.1", "description": "求和", "weight": 0.5},
+        {"id": "1.2", "description": "求积", "weight": 0.5}
+    ]
+}
+
+REFERENCE = """
+numbers = [1, 2, 3, 4]
+
+# 任务1：求和
+print("和:", sum(numbers))
+
+# 任务2：求积
+product = 1
+for n in numbers:
+    product *= n
+print("积:", product)
+"""
+
+
+class TestSandbox:
+    """沙箱执行测试"""
+
+    def test_limits_and_network(self):
+        """超时终止、禁止网络、错误状态"""
+        assert run_code_sandboxed("print('hi')")["stdout"].strip() == "hi"
+        assert run_code_sandboxed("while True: pass", {"timeout": 0.5})["status"] == "timeout"
+
+        blocked = run_code_sandboxed("import socket\nsocket.create_connection(('127.0.0.1', 80))")
+        assert blocked["status"] == "error"
+        assert "禁止网络" in blocked["stderr"]
+
+    @pytest.mark.parametrize("code", [
+        "import _socket\n_socket.socket()",
+        "import socket\nsocket.SocketType()",
+        "import _socket\n_socket.getaddrinfo('localhost', 80)",
+    ])
+    def test_low_level_socket_blocked(self, code):
+        """绕过 socket 模块直接使用 _socket 同样被拒绝"""
+        blocked = run_code_sandboxed(code)
+        assert blocked["status"] == "error"
+        assert "禁止网络" in blocked["stderr"]
+
+    @pytest.mark.skipif(not network_namespace_available(), reason="系统不支持网络命名空间")
+    def test_network_namespace(self):
+        """子进程所在的网络命名空间只有回环接口"""
+        result = run_code_sandboxed(
+            "for line in open('/proc/net/dev').readlines()[2:]:\n    print(line.split(':')[0].strip())"
+        )
+        assert result["stdout"].split() == ["lo"]
+
+    def test_segment_reference_output(self):
+        """按子任务标记划分标准答案的输出"""
+        instrumented = instrument_reference(REFERENCE, 2)
+        assert instrumented is not None
+        assert instrument_reference(REFERENCE, 3) is None
+
+        groups = split_reference_output(run_code_sandboxed(instrumented)["stdout"], 2)
+        assert groups == [["和: 10"], ["积: 24"]]
+
+        # 候选行没有标签时只比较值
+        comparison = compare_outputs(groups, "sum = 9\n24\n")
+        assert comparison["sub_question_scores"] == [0, 1]
+
+    def test_wrong_label_or_order_not_matched(self):
+        """值出现在错误的标签下或子问题顺序颠倒时不得分"""
+        assert compare_outputs([["sum: 10"], ["max: 7"]], "total: 7\nx: 10")["sub_question_scores"] == [0, 0]
+        assert compare_outputs([["sum: 10"], ["max: 7"]], "SUM: 10\nmax：7")["sub_question_scores"] == [1, 1]
+        assert compare_outputs([["True"], ["False"]], "False\nTrue")["sub_question_scores"] == [1, 0]
+
+        # 带分段标记的候选输出按子问题分别比较
+        swapped = f"{SEGMENT_SENTINEL}1\nFalse\n{SEGMENT_SENTINEL}2\nTrue\n"
+        assert compare_outputs([["True"], ["False"]], swapped)["sub_question_scores"] == [0, 0]
+        ordered = f"{SEGMENT_SENTINEL}1\nTrue\n{SEGMENT_SENTINEL}2\nFalse\n"
+        assert compare_outputs([["True"], ["False"]], ordered)["sub_question_scores"] == [1, 1]
+
+
+class TestExecutionGrading:
+    """执行评分集成测试"""
+
+    @pytest.mark.asyncio
+    async def test_grade(self):
+        """正确、部分正确和无输出的候选代码"""
+        grader = ExecutionGrader(max_workers=2)
+        try:
+            correct = await grader.grade(QUESTION, REFERENCE, REFERENCE)
+            assert correct["sub_question_scores"] == [1, 1]
+
+            partial = await grader.grade(QUESTION, "print('和: 10')\nraise SystemExit(1)", REFERENCE)
+            assert partial["sub_question_scores"] == [1, 0]
+            assert partial["candidate_status"] == "error"
+
+            # 候选代码的子任务标记下输出了对方的结果
+            swapped = REFERENCE.replace('print("和:", sum(numbers))', 'print("和:", 24)').replace(
+                'print("积:", product)', 'print("积:", 10)')
+            assert (await grader.grade(QUESTION, swapped, REFERENCE))["sub_question_scores"] == [0, 0]
+
+            # 只定义函数、没有输出时无法判定
+            assert await grader.grade(QUESTION, "def f():\n    return 1\n", REFERENCE) is None
+        finally:
+            grader.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_evaluator_execution_mode(self, tmp_path, make_evaluator):
+        """执行评分模式下不调用评估模型"""
+        evaluator = make_evaluator(model_options={
+            "target": {"mock": {"response_text": f"<answer>\n```python\n{REFERENCE}```\n</answer>"}}
+        })
+        judge = evaluator.model_manager.get_model("judge")
+        evaluator.execution_grader.reference_cache = ReferenceOutputCache(str(tmp_path / "cache"))
+        try:
+            results = await evaluator.evaluate_model(
+                "target", "judge", [dict(QUESTION, question="计算和与积")],
+                [{"question_id": 1, "type": "standard_answer", "standard_answer": REFERENCE}],
+                {"grading_mode": "execution", "request_interval": 0, "judge_interval": 0}
+            )
+        finally:
+            evaluator.execution_grader.shutdown()
+
+        evaluation = results["results"][0]["evaluation"]
+        assert evaluation["details"]["evaluation_type"] == "execution"
+        assert evaluation["sub_question_scores"] == [1, 1]
+        assert evaluation["scores"]["overall"] == 100
+        assert evaluation["details"]["reference_cached"] is True
+        assert results["reference_precompute"]["executed"] == 1
+        assert judge.request_count == 0
+
+    @pytest.mark.asyncio
+    async def test_reference_output_cache(self, tmp_path):
+        """标准答案按内容哈希只运行一次，缓存跨评分器实例复用"""
+        answers = [{"question_id": 1, "standard_answer": REFERENCE}]
+        cache = ReferenceOutputCache(str(tmp_path))
+        grader = ExecutionGrader(max_workers=2, reference_cache=cache)
+        try:
+            first = await grader.precompute_references([QUESTION], answers)
+            assert first["executed"] == 1
+
+            result = await grader.grade(QUESTION, REFERENCE, REFERENCE)
+            assert result["reference_cached"] is True
+            assert grader.reference_executions == 1
+        finally:
+            grader.shutdown()
+
+        # 新的评分器实例直接读取磁盘缓存
+        other = ExecutionGrader(max_workers=1, reference_cache=ReferenceOutputCache(str(tmp_path)))
+        try:
+            second = await other.precompute_references([QUESTION], answers)
+            assert second["cached"] == 1 and second["executed"] == 0
+            # 修改标准答案后缓存键变化，需要重新运行
+            changed = await other.precompute_references([QUESTION], [{"question_id": 1, "standard_answer": REFERENCE + "\n"}])
+            assert changed["executed"] == 1
+        finally:
+            other.shutdown()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+公平调度测试
+功能：测试加权公平队列、快速通道以及多个评估任务共享端点时的调度
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.fair_scheduler import FairQueue, SchedulingFlow
+
+
+class TestFairQueue:
+    """加权公平队列测试"""
+
+    def test_weighted_shares_and_fast_lane(self):
+        """权重 2:1 的两个流按 2:1 出队，快速通道的请求插队到最前"""
+        queue = FairQueue()
+        heavy, light = SchedulingFlow("heavy", weight=2), SchedulingFlow("light")
+        light_waiters = []
+        for i in range(6):
+            queue.append(("heavy", i), heavy)
+            light_waiters.append(("light", i))
+            queue.append(light_waiters[-1], light)
+        queue.append(("smoke", 0), SchedulingFlow("smoke", fast_lane=True))
+        removed = light_waiters[-1]
+        queue.remove(removed)
+
+        assert queue.popleft() == ("smoke", 0)
+        first = [queue.popleft()[0] for _ in range(6)]
+        assert first.count("heavy") == 4 and first.count("light") == 2
+        assert len(queue) == 5
+        assert removed not in [queue.popleft() for _ in range(5)]
+        assert not queue
+        assert queue.snapshot()["fast_lane_served"] == 1
+
+
+class TestSharedEndpointScheduling:
+    """多任务共享端点测试"""
+
+    @pytest.mark.asyncio
+    async def test_smoke_test_not_starved_by_large_task(self, make_evaluator, make_dataset):
+        """并发上限为 1 的端点上，后提交的 3 题冒烟测试不必等大任务跑完"""
+        limit = {"initial": 1, "min": 1, "max": 1}
+        model_manager = make_evaluator(
+            ("fair-shared",), latency=0.01, model_options={"fair-shared": {"concurrency_limit": limit}}
+        ).model_manager
+
+        config = {"concurrency": 8, "request_interval": 0, "judge_interval": 0}
+        large_questions, large_answers = make_dataset(40)
+        small_questions, small_answers = make_dataset(3)
+        finished = {}
+
+        async def run(name, questions, answers):
+            results = await make_evaluator(name=name, model_manager=model_manager).evaluate_model(
+                "fair-shared", "fair-shared", questions, answers, config
+            )
+            finished[name] = time.perf_counter()
+            return results
+
+        start = time.perf_counter()
+        large = asyncio.create_task(run("large", large_questions, large_answers))
+        await asyncio.sleep(0.1)
+        small_results = await run("small", small_questions, small_answers)
+        await large
+
+        assert small_results["scheduling"]["fast_lane"] is True
+        assert len(small_results["results"]) == 3
+        assert finished["small"] - start < (finished["large"] - start) / 2
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分层评分路由测试
+功能：测试本地确定性检查的判定顺序和避免评估模型调用的统计
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.grading_router import GradingRouter, calculate_grading_stats, normalize_answer
+
+
+QUESTION = {
+    "id": 1,
+    "type": "standard_answer",
+    "sub_questions": [
+        {"id": "1.1", "description": "输出结果", "weight": 1.0}
+    ]
+}
+
+
+class TestGradingRouter:
+    """评分路由测试"""
+
+    @pytest.mark.asyncio
+    async def test_tiers(self):
+        """空回答、规范化匹配、正则和相似度检查"""
+        router = GradingRouter()
+        config = {"grading_mode": "hybrid", "grading": {"tiers": ["empty", "exact", "regex", "similarity"]}}
+        reference = "print('hello world from the grader')"
+
+        empty = await router.route(QUESTION, "  ", {}, reference, config)
+        assert empty["tier"] == "empty" and empty["sub_question_scores"] == [0]
+
+        exact = await router.route(QUESTION, "```python\nPRINT('hello world from the grader')\n```", {}, reference, config)
+        assert exact["tier"] == "exact" and exact["score_ratio"] == 1.0
+        assert normalize_answer("a \n\n b") == "a b"
+
+        rejected = await router.route(QUESTION, "import os\nos.system('rm')", {"reject_patterns": [r"os\.system"]},
+                                      reference, config)
+        assert rejected["tier"] == "regex" and rejected["score_ratio"] == 0.0
+
+        similar = await router.route(QUESTION, "print('hello world from the grader!')", {}, reference, config)
+        assert similar["tier"] == "similarity"
+
+        # 无法确定时返回 None，交给评估模型
+        assert await router.route(QUESTION, "def main(): pass", {}, reference, config) is None
+
+    def test_grading_stats(self):
+        """统计避免的评估模型调用比例，生成失败的问题单独计数"""
+        items = [
+            {"evaluation": {"details": {"grading_tier": "exact"}}},
+            {"evaluation": {"details": {"grading_tier": "judge"}}},
+            {"evaluation": {"details": {"grading_tier": "fallback"}}},
+            {"evaluation": {"details": {"grading_tier": "generation_error"}}}
+        ]
+        stats = calculate_grading_stats(items)
+        assert stats["judged"] == 2
+        assert stats["local"] == 1 and stats["generation_errors"] == 1
+        assert stats["judge_avoided_ratio"] == round(1 / 3, 4)
+        assert stats["by_tier"]["exact"] == 1
+
+        assert calculate_grading_stats([{"evaluation": {"details": {"grading_tier": "generation_error"}}}]) == {
+            "total": 1, "judged": 0, "local": 0, "generation_errors": 1,
+            "by_tier": {"generation_error": 1}, "judge_avoided_ratio": 0.0
+        }
+
+    @pytest.mark.asyncio
+    async def test_invalid_regex_falls_through(self):
+        """答案集中的正则无效时跳过正则检查，由下一层判定"""
+        router = GradingRouter()
+        config = {"grading_mode": "hybrid", "grading": {"tiers": ["regex", "exact"]}}
+        answer = {"reject_patterns": ["os.system("], "accept_patterns": [r"print\("]}
+
+        decision = await router.route(QUESTION, "print(1)", answer, "print(1)", config)
+        assert decision["tier"] == "exact" and decision["score_ratio"] == 1.0
+        assert await router.route(QUESTION, "print(2)", answer, "print(1)", config) is None
+        assert router._pattern_cache[(("os.system(",), (r"print\(",))] is None
+
+    @pytest.mark.asyncio
+    async def test_evaluator_hybrid_mode(self, make_evaluator):
+        """混合评分只把无法确定的问题交给评估模型"""
+        evaluator = make_evaluator(model_options={
+            "target": {"mock": {"response_text": "<answer>\nprint(1)\n</answer>"}}
+        })
+        judge = evaluator.model_manager.get_model("judge")
+        questions = [dict(QUESTION, id=1, question="输出1"), dict(QUESTION, id=2, question="输出2")]
+        answers = [
+            {"question_id": 1, "standard_answer": "print(1)"},
+            {"question_id": 2, "standard_answer": "for i in range(2):\n    print(i + 1)"}
+        ]
+        results = await evaluator.evaluate_model(
+            "target", "judge", questions, answers,
+            {"grading_mode": "hybrid", "grading": {"tiers": ["empty", "exact"]},
+             "request_interval": 0, "judge_interval": 0}
+        )
+
+        stats = results["grading_stats"]
+        assert stats["by_tier"] == {"exact": 1, "judge": 1}
+        assert stats["judge_avoided_ratio"] == 0.5
+        assert judge.request_count == 1
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多评估模型集成测试
+功能：测试集成分数的合并、提前停止以及评估流程中的集成评估
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.judge_ensemble import JudgeEnsemble
+
+
+def make_verdict(overall, completed):
+    return {
+        "scores": {"accuracy": overall, "completeness": overall, "clarity": overall, "overall": overall},
+        "feedback": f"{overall}", "tokens_used": 100, "requirement_completed": completed,
+        "sub_question_scores": [1 if completed else 0]
+    }
+
+
+class TestJudgeEnsemble:
+    """集成合并和提前停止测试"""
+
+    @pytest.mark.asyncio
+    async def test_median_and_majority(self):
+        verdicts = {"a": make_verdict(80, True), "b": make_verdict(84, True), "c": make_verdict(20, False)}
+        ensemble = JudgeEnsemble([(name, name) for name in verdicts], {"aggregate": "median"})
+
+        async def judge_call(model):
+            return verdicts[model]
+
+        result = await ensemble.evaluate(judge_call)
+        assert result["scores"]["overall"] == 80
+        assert result["requirement_completed"] is True
+        assert result["tokens_used"] == 300
+        assert result["ensemble"]["overall_spread"] == 64
+        assert result["ensemble"]["requirement_agreement"] == 0.6667
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("second_overall, expected_calls", [(85, ["a", "b"]), (50, ["a", "b", "c"])])
+    async def test_early_stop_when_first_two_agree(self, second_overall, expected_calls):
+        verdicts = {"a": make_verdict(80, True), "b": make_verdict(second_overall, True), "c": make_verdict(70, True)}
+        ensemble = JudgeEnsemble([(name, name) for name in verdicts], {"early_stop": True, "tolerance": 10})
+        calls = []
+
+        async def judge_call(model):
+            calls.append(model)
+            return verdicts[model]
+
+        result = await ensemble.evaluate(judge_call)
+        assert sorted(calls) == expected_calls
+        assert result["ensemble"]["early_stopped"] is (len(expected_calls) == 2)
+
+
+class TestEnsembleEvaluation:
+    """评估流程中的集成评估测试"""
+
+    @pytest.mark.asyncio
+    async def test_evaluate_model_with_ensemble(self, make_evaluator):
+        judges = {"judge-a": 90, "judge-b": 86, "judge-c": 30}
+        evaluator = make_evaluator(("target", *judges), model_options={
+            name: {"mock": {"judge_scores": {
+                "accuracy": overall, "completeness": overall, "clarity": overall, "feedback": name
+            }}}
+            for name, overall in judges.items()
+        })
+        model_manager = evaluator.model_manager
+
+        questions = [{"id": i, "type": "no_standard_answer", "question": f"实现功能 {i}"} for i in range(1, 4)]
+        results = await evaluator.evaluate_model("target", "judge-a", questions, [], {
+            "concurrency": 3, "request_interval": 0, "judge_interval": 0,
+            "judge_ensemble": {"judges": ["judge-b", "judge-c"], "early_stop": True}
+        })
+
+        assert model_manager.models["judge-c"].request_count == 0
+        assert results["judge_ensemble"]["skipped_requests"] == 3
+        assert results["judge_ensemble"]["early_stop_ratio"] == 1.0
+        assert results["results"][0]["evaluation"]["scores"]["overall"] == 88
+
+        with pytest.raises(ValueError):
+            await evaluator.evaluate_model("target", "judge-a", questions, [], {
+                "judge_ensemble": {"judges": ["missing-judge"]}
+            })
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估模型输出解析测试
+功能：测试代码块优先、raw_decode 扫描、修复解析、结构校验、解析路径统计以及结构化输出与修正重试
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.judge_parser import (
+    JudgeOutputParser, validate_evaluation, repair_json_text, build_evaluation_response_format
+)
+from core.evaluation.programming_evaluator import ProgrammingEvaluator
+from models.model_manager import MockModel
+from utils.prompt_loader import PromptLoader
+
+
+QUESTION = {
+    "id": 1,
+    "type": "standard_answer",
+    "question": "输出和与积",
+    "sub_questions": [
+        {"id": "1.1", "description": "求和", "weight": 0.5},
+        {"id": "1.2", "description": "求积", "weight": 0.5}
+    ]
+}
+
+
+class ScriptedJudge(MockModel):
+    """按顺序返回预设内容并记录请求参数的模拟评估模型"""
+
+    def __init__(self, contents, **kwargs):
+        super().__init__("judge", "mock-1", **kwargs)
+        self.contents = list(contents)
+        self.calls = []
+
+    async def generate(self, prompt, **kwargs):
+        response = await super().generate(prompt, **kwargs)
+        self.calls.append({"prompt": prompt, "kwargs": kwargs})
+        response["content"] = self.contents.pop(0)
+        return response
+
+
+class TestJudgeOutputParser:
+    """评估输出解析测试"""
+
+    def test_parse_paths(self):
+        """代码块优先，其次正文JSON，再次修复后解析"""
+        parser = JudgeOutputParser()
+
+        fenced = '示例 {"accuracy": 1}\n```json\n{"accuracy": 90, "sub_question_scores": [1, 0]}\n```'
+        value, path = parser.parse_object(fenced)
+        assert path == "fenced" and value["accuracy"] == 90
+
+        # 正文中的无关对象（不符合评估结构）会被跳过
+        prose = '说明 {"note": "x"} 结果：{"requirement_completed": true, "accuracy": 80} 完'
+        value, path = parser.parse_object(prose)
+        assert path == "raw_decode" and value["accuracy"] == 80
+
+        commented = '{\n  "sub_question_scores": [1, 1],  // 两个子问题\n  "requirement_completed": True,\n  "feedback": "a // b",\n}'
+        value, path = parser.parse_object(commented)
+        assert path == "repaired"
+        assert value["requirement_completed"] is True and value["feedback"] == "a // b"
+
+        value, path = parser.parse_object("准确性：80，整体完成")
+        assert value is None and path == "unparsed"
+
+        stats = parser.get_stats()
+        assert stats["by_path"] == {"fenced": 1, "raw_decode": 1, "repaired": 1, "unparsed": 1}
+        assert stats["json_ratio"] == 0.75
+
+    def test_array_and_validation(self):
+        """批量结果数组提取和结构校验"""
+        parser = JudgeOutputParser()
+        text = '分数 [1, 0] 之后是结果 [{"index": 0, "accuracy": 70}, {"index": 1, "accuracy": 60}]'
+        entries, path = parser.parse_array(text)
+        assert path == "raw_decode" and [e["index"] for e in entries] == [0, 1]
+
+        assert validate_evaluation({"accuracy": 120}) is not None
+        assert validate_evaluation({"requirement_completed": "yes"}) is not None
+        assert validate_evaluation({"sub_question_scores": [1]}, sub_question_count=2) is not None
+        assert validate_evaluation({"sub_question_scores": [1, 0], "accuracy": 85.5}, 2) is None
+        assert repair_json_text('{"a": [1, 2,], "b": None}') == '{"a": [1, 2], "b": null}'
+
+    def test_long_output_single_pass(self):
+        """大量无关括号的长输出也只扫描一遍"""
+        noise = '{"step": [1, 2, 3], "note": "分析中"} ' * 20000
+        text = noise + '{"accuracy": 95, "requirement_completed": true}'
+        start = time.perf_counter()
+        value, path = JudgeOutputParser().parse_object(text)
+        assert value["accuracy"] == 95 and path == "raw_decode"
+        assert time.perf_counter() - start < 2.0
+
+    @pytest.mark.parametrize("unit", ['{"b": "', '{x} ', '```\n{x\n'])
+    def test_failed_decodes_stay_linear(self, unit):
+        """大量解码失败的起始位置不会让扫描退化为平方级"""
+        text = unit * 30000 + '{"accuracy": 95}'
+        start = time.perf_counter()
+        value, _ = JudgeOutputParser().parse_object(text)
+        assert value["accuracy"] == 95
+        assert time.perf_counter() - start < 2.0
+
+    def test_deep_nesting_does_not_raise(self):
+        """嵌套过深的括号按解码失败处理"""
+        value, path = JudgeOutputParser().parse_object('{"b": ' * 1500 + '? 结果 {"accuracy": 70}')
+        assert value["accuracy"] == 70 and path == "raw_decode"
+
+
+class TestStructuredJudging:
+    """结构化输出和修正重试测试"""
+
+    @pytest.mark.asyncio
+    async def test_repair_retry(self):
+        """子问题分数个数不符时把错误反馈给评估模型重试一次"""
+        judge = ScriptedJudge([
+            '{"sub_question_scores": [1], "accuracy": 80, "requirement_completed": false}',
+            '```json\n{"sub_question_scores": [1, 1], "accuracy": 95, "requirement_completed": true}\n```'
+        ], structured_output="json_schema")
+        evaluator = ProgrammingEvaluator(PromptLoader())
+        result = await evaluator.evaluate_programming_response(
+            QUESTION, "print(10)\nprint(24)", "print(10)\nprint(24)", judge, request_interval=0
+        )
+
+        assert result["parse_path"] == "repair_retry"
+        assert result["sub_question_scores"] == [1, 1]
+        assert len(judge.calls) == 2
+        assert "sub_question_scores 应有 2 项" in judge.calls[1]["prompt"]
+        schema = judge.calls[0]["kwargs"]["response_format"]["json_schema"]["schema"]
+        assert schema["additionalProperties"] is False and "sub_question_scores" in schema["required"]
+
+    @pytest.mark.asyncio
+    async def test_no_structured_output_by_default(self):
+        """未声明结构化输出的评估模型不发送 response_format，修正失败时保留原结果"""
+        judge = ScriptedJudge(['准确性：80', '仍然不是JSON'])
+        evaluator = ProgrammingEvaluator(PromptLoader())
+        result = await evaluator.evaluate_programming_response(
+            QUESTION, "print(1)", "print(1)", judge, request_interval=0
+        )
+        assert "response_format" not in judge.calls[0]["kwargs"]
+        assert result["parse_path"] == "unparsed"
+        assert result["scores"]["accuracy"] == 80
+
+    def test_response_format_downgrade(self):
+        """只支持 JSON 模式的模型把 json_schema 降级为 json_object"""
+        response_format = build_evaluation_response_format(2)
+        assert MockModel("a", "m", structured_output="json_object").resolve_response_format(response_format) == \
+            {"type": "json_object"}
+        assert MockModel("b", "m", structured_output="json_schema").resolve_response_format(response_format) == \
+            response_format
+        assert MockModel("c", "m").resolve_response_format(response_format) is None
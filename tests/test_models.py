@@ -9,14 +9,20 @@
 
 import pytest
 import asyncio
+import json
 import os
 import sys
+import httpx
 from unittest.mock import Mock, AsyncMock, patch
 
 # 添加项目根目录到路径
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 
-from models.model_manager import ModelManager, OpenAIModel, CustomAPIModel, AgentModel
+from models.model_manager import ModelManager, OpenAIModel, CustomAPIModel, AgentModel, MockModel
+from models.mock_llm import MockBehavior
+from models.mock_server import create_mock_app
+from models.adaptive_limiter import AdaptiveConcurrencyLimiter, parse_retry_after
+from models.resilience import RetryPolicy, RetryBudget, CircuitBreaker, CircuitOpenError, classify_error
 
 
 class TestBaseModel:
@@ -111,6 +117,29 @@ class TestOpenAIModel:
             assert result["tokens_used"] == 0
             assert result["error"] == "API Error"
     
+    @pytest.mark.asyncio
+    async def test_openai_cached_tokens(self, openai_model):
+        """测试从 usage.prompt_tokens_details 统计前缀缓存命中"""
+        from openai.types.completion_usage import CompletionUsage, PromptTokensDetails
+        mock_response = Mock()
+        mock_response.choices = [Mock()]
+        mock_response.choices[0].message.content = "Cached response"
+        mock_response.usage = CompletionUsage(
+            prompt_tokens=2000, completion_tokens=100, total_tokens=2100,
+            prompt_tokens_details=PromptTokensDetails(cached_tokens=1536)
+        )
+        
+        with patch.object(openai_model.client.chat.completions, 'create',
+                         new=AsyncMock(return_value=mock_response)):
+            result = await openai_model.generate("Test prompt")
+        
+        assert result["cached_tokens"] == 1536
+        assert result["usage"]["prompt_tokens_details"]["cached_tokens"] == 1536
+        json.dumps(result["usage"])
+        stats = openai_model.get_stats()
+        assert stats["cached_tokens"] == 1536
+        assert stats["cache_hit_ratio"] == 0.768
+    
     def test_count_tokens(self, openai_model):
         """测试token计数"""
         text = "这是一个测试 hello world"
@@ -355,6 +384,291 @@ class TestModelManager:
         assert result["success"] is False
 
 
+class TestMockModel:
+    """模拟模型测试"""
+    
+    @pytest.fixture
+    def mock_model(self):
+        """创建模拟模型实例"""
+        return MockModel("mock", "mock-1", mock={"seed": 7})
+    
+    @pytest.mark.asyncio
+    async def test_mock_generate_is_deterministic(self, mock_model):
+        """相同提示得到相同回答"""
+        first = await mock_model.generate("写一个快速排序")
+        second = await mock_model.generate("写一个快速排序")
+        
+        assert first["content"] == second["content"]
+        assert "<answer>" in first["content"]
+        assert first["tokens_used"] > 0
+        assert mock_model.request_count == 2
+    
+    @pytest.mark.asyncio
+    async def test_mock_judge_json(self, mock_model):
+        """裁判提示返回可解析的评估JSON，子问题数量与提示一致"""
+        prompt = '请按以下JSON格式返回评估结果：{"sub_question_scores": [0, 0, 0], "requirement_completed": false}'
+        result = await mock_model.generate(prompt)
+        
+        evaluation = json.loads(result["content"])
+        assert len(evaluation["sub_question_scores"]) == 3
+        assert 60 <= evaluation["accuracy"] <= 100
+    
+    @pytest.mark.asyncio
+    async def test_mock_rate_limit_injection(self):
+        """429注入返回错误结果"""
+        model = MockModel("mock", "mock-1", mock={"rate_limit_rate": 1.0})
+        result = await model.generate("你好")
+        
+        assert "429" in result["error"]
+        assert result["tokens_used"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_mock_stream(self, mock_model):
+        """流式输出拼接后与非流式结果一致"""
+        chunks = [chunk async for chunk in mock_model.stream("你好")]
+        result = await mock_model.generate("你好")
+        assert "".join(chunks) == result["content"]
+    
+    def test_latency_distributions(self):
+        """延迟分布采样非负"""
+        for distribution in MockBehavior.DISTRIBUTIONS:
+            behavior = MockBehavior(latency={"distribution": distribution, "mean": 0.2, "max": 1.0})
+            rng = behavior.next_request_rng()
+            assert 0 <= behavior.sample_latency(rng) <= 1.0
+        
+        with pytest.raises(ValueError):
+            MockBehavior(latency={"distribution": "pareto"})
+    
+    @pytest.mark.asyncio
+    async def test_mock_server_chat_completions(self):
+        """模拟服务提供 OpenAI 兼容接口和 Retry-After"""
+        app = create_mock_app(MockBehavior(seed=1))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://mock") as client:
+            response = await client.post("/v1/chat/completions", json={
+                "model": "mock-1", "messages": [{"role": "user", "content": "你好"}]
+            })
+            assert response.status_code == 200
+            data = response.json()
+            assert data["choices"][0]["message"]["content"]
+            assert data["usage"]["total_tokens"] > 0
+        
+        limited_app = create_mock_app(MockBehavior(rate_limit_rate=1.0, retry_after=2))
+        transport = httpx.ASGITransport(app=limited_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://mock") as client:
+            response = await client.post("/chat/completions", json={"messages": []})
+            assert response.status_code == 429
+            assert response.headers["Retry-After"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_mock_server_multi_sample_and_response_format(self):
+        """模拟服务按 n 参数一次返回多个候选（usage 覆盖全部候选），并按 response_format 返回JSON对象"""
+        app = create_mock_app(MockBehavior(seed=1))
+        real_client = httpx.AsyncClient
+
+        def client_factory(**kwargs):
+            return real_client(transport=httpx.ASGITransport(app=app), **kwargs)
+
+        model = CustomAPIModel("mock-remote", "mock-1", "mock", "http://mock-server.test/v1", supports_n=True)
+        with patch('models.model_manager.httpx.AsyncClient', side_effect=client_factory):
+            samples = await model.generate_samples("输出数字 1", 3)
+
+        assert app.state.stats["requests"] == 1
+        assert len(samples) == 3 and all(sample["content"] and "error" not in sample for sample in samples)
+        behavior = MockBehavior()
+        expected_usage = behavior.build_choices_usage("输出数字 1", [sample["content"] for sample in samples])
+        assert samples[0]["usage"] == expected_usage
+        assert sum(sample["tokens_used"] for sample in samples) == expected_usage["total_tokens"]
+
+        transport = httpx.ASGITransport(app=app)
+        schema = {"type": "object", "properties": {"accuracy": {"type": "integer"}}, "additionalProperties": False}
+        async with httpx.AsyncClient(transport=transport, base_url="http://mock") as client:
+            response = await client.post("/v1/chat/completions", json={
+                "messages": [{"role": "user", "content": "按JSON返回 requirement_completed 和分数"}],
+                "response_format": {"type": "json_schema", "json_schema": {"name": "e", "schema": schema}}
+            })
+            judged = json.loads(response.json()["choices"][0]["message"]["content"])
+            assert list(judged) == ["accuracy"]
+
+            response = await client.post("/v1/chat/completions", json={
+                "messages": [{"role": "user", "content": "你好"}], "response_format": {"type": "json_object"}
+            })
+            assert "content" in json.loads(response.json()["choices"][0]["message"]["content"])
+
+
+class TestAdaptiveConcurrencyLimiter:
+    """自适应并发限制器测试"""
+    
+    def test_additive_increase_multiplicative_decrease(self):
+        """成功时加性增大，限流时乘性减小"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial=4, min_limit=1, max_limit=8, decrease_cooldown=0)
+        for _ in range(5):
+            limiter.on_success()
+        assert limiter.current_limit == 5
+        
+        limiter.on_overload()
+        assert limiter.current_limit == 2
+        limiter.on_overload()
+        limiter.on_overload()
+        assert limiter.current_limit == 1
+        
+        for _ in range(200):
+            limiter.on_success()
+        assert limiter.current_limit == 8
+    
+    @pytest.mark.asyncio
+    async def test_limits_in_flight_requests(self):
+        """同时进行的请求数不超过当前上限"""
+        limiter = AdaptiveConcurrencyLimiter("test", initial=2, max_limit=2)
+        active = 0
+        peak = 0
+        
+        async def worker():
+            nonlocal active, peak
+            async with limiter.slot():
+                active += 1
+                peak = max(peak, active)
+                await asyncio.sleep(0.01)
+                active -= 1
+        
+        await asyncio.gather(*(worker() for _ in range(6)))
+        assert peak == 2
+        assert limiter.snapshot()["in_flight"] == 0
+    
+    @pytest.mark.asyncio
+    async def test_retry_after_blocks_endpoint(self):
+        """Retry-After 期间新请求等待"""
+        limiter = AdaptiveConcurrencyLimiter("test")
+        limiter.on_overload(retry_after=0.1)
+        assert limiter.snapshot()["blocked_seconds_remaining"] > 0
+        
+        start = asyncio.get_running_loop().time()
+        async with limiter.slot():
+            pass
+        assert asyncio.get_running_loop().time() - start >= 0.09
+        
+        assert parse_retry_after("3") == 3.0
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert parse_retry_after("soon") is None
+    
+    @pytest.mark.asyncio
+    async def test_custom_model_honors_retry_after(self):
+        """自定义API模型遇到429时降低并发上限并按 Retry-After 重试"""
+        from fastapi import FastAPI
+        from fastapi.responses import JSONResponse
+        
+        app = FastAPI()
+        calls = {"count": 0}
+        
+        @app.post("/v1/chat/completions")
+        async def chat_completions():
+            calls["count"] += 1
+            if calls["count"] == 1:
+                return JSONResponse(status_code=429, content={"error": "limited"}, headers={"Retry-After": "0.05"})
+            return {"choices": [{"message": {"content": "ok"}}], "usage": {"total_tokens": 3}}
+        
+        real_client = httpx.AsyncClient
+        
+        def client_factory(**kwargs):
+            return real_client(transport=httpx.ASGITransport(app=app), **kwargs)
+        
+        model = CustomAPIModel("limited", "limited-1", "key", "http://retry-after.test/v1",
+                               concurrency_limit={"initial": 8},
+                               resilience={"retry": {"rate_limit": {"base_delay": 0.01}}})
+        with patch('models.model_manager.httpx.AsyncClient', side_effect=client_factory):
+            result = await model.generate("你好")
+        
+        assert result["content"] == "ok"
+        assert calls["count"] == 2
+        stats = model.get_stats()["concurrency"]
+        assert stats["limit"] == 4
+        assert stats["retry_after_hits"] == 1
+
+
+class TestResilience:
+    """重试策略与熔断器测试"""
+    
+    def test_full_jitter_backoff(self):
+        """退避时间在指数上限内均匀抖动，并以 Retry-After 为下限"""
+        policy = RetryPolicy(max_attempts=5, base_delay=1.0, max_delay=8.0)
+        for attempt in range(6):
+            delay = policy.compute_delay(attempt)
+            assert 0 <= delay <= min(8.0, 2 ** attempt)
+        assert policy.compute_delay(0, retry_after=3.0) >= 3.0
+    
+    def test_classify_error(self):
+        """不同提供商的异常归入统一类别"""
+        request = httpx.Request("POST", "http://example.com")
+        limited = httpx.HTTPStatusError("429", request=request, response=httpx.Response(429, request=request))
+        down = httpx.HTTPStatusError("503", request=request, response=httpx.Response(503, request=request))
+        bad = httpx.HTTPStatusError("400", request=request, response=httpx.Response(400, request=request))
+        
+        assert classify_error(limited) == "rate_limit"
+        assert classify_error(down) == "unavailable"
+        assert classify_error(bad) == "client_error"
+        assert classify_error(httpx.ReadTimeout("timeout")) == "timeout"
+        assert classify_error(httpx.ConnectError("refused")) == "connection"
+        assert classify_error(Exception("API Error")) == "other"
+    
+    def test_breaker_and_budget(self):
+        """连续失败后熔断，恢复期后半开放行一个探测请求"""
+        breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0)
+        breaker.record_failure()
+        breaker.before_call("ep")
+        breaker.record_failure()
+        assert breaker.state == "open"
+        
+        breaker.before_call("ep")  # 恢复期已过，放行探测
+        assert breaker.state == "half_open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call("ep")
+        breaker.record_success()
+        assert breaker.state == "closed"
+        
+        budget = RetryBudget(ratio=0.5, min_retries=1)
+        assert budget.try_spend()
+        assert not budget.try_spend()
+        budget.record_request()
+        budget.record_request()
+        assert budget.try_spend()
+    
+    @pytest.mark.asyncio
+    async def test_dead_endpoint_fast_fails(self):
+        """端点持续不可用时熔断，后续请求不再访问端点"""
+        from fastapi import FastAPI
+        from fastapi.responses import JSONResponse
+        
+        app = FastAPI()
+        calls = {"count": 0}
+        
+        @app.post("/v1/chat/completions")
+        async def chat_completions():
+            calls["count"] += 1
+            return JSONResponse(status_code=503, content={"error": "down"})
+        
+        real_client = httpx.AsyncClient
+        
+        def client_factory(**kwargs):
+            return real_client(transport=httpx.ASGITransport(app=app), **kwargs)
+        
+        model = CustomAPIModel("dead", "dead-1", "key", "http://dead-endpoint.test/v1", resilience={
+            "retry": {"unavailable": {"max_attempts": 3, "base_delay": 0.001}},
+            "circuit_breaker": {"failure_threshold": 3, "recovery_timeout": 60}
+        })
+        with patch('models.model_manager.httpx.AsyncClient', side_effect=client_factory):
+            first = await model.generate("你好")
+            assert "503" in first["error"]
+            assert calls["count"] == 3
+            
+            second = await model.generate("你好")
+            assert "熔断" in second["error"]
+            assert calls["count"] == 3
+        
+        stats = model.get_stats()["resilience"]
+        assert stats["circuit_state"] == "open"
+        assert stats["rejected"] == 1
+
+
 class TestModelIntegration:
     """模型集成测试"""
     
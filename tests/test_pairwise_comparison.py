@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+成对比较测试
+功能：测试 Bradley-Terry 拟合、比较结果解析以及主动调度的成对比较流程
+"""
+
+import os
+import re
+import sys
+
+import numpy as np
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.rating import bradley_terry, win_probabilities, rating_table
+from core.pairwise_comparison import PairwiseComparator, collect_task_answers, parse_comparison_verdict
+from models.model_manager import MockModel
+from utils.prompt_loader import PromptLoader
+
+
+class QualityJudge(MockModel):
+    """按回答中的 quality 数值判定胜负的模拟评估模型"""
+
+    async def generate(self, prompt, **kwargs):
+        self.request_count += 1
+        answer_a = int(re.search(r'回答A：quality=(\d+)', prompt).group(1))
+        answer_b = int(re.search(r'回答B：quality=(\d+)', prompt).group(1))
+        verdict = "A" if answer_a > answer_b else "B"
+        return {"content": f"准确性：{verdict}更好\n总体评价：{verdict}更好", "tokens_used": 10}
+
+
+def make_task(task_id, model_name, quality, question_count):
+    return {
+        "task_id": task_id, "target_model_name": model_name, "status": "completed",
+        "results": {"results": [
+            {"question_id": q, "question": f"题目 {q}", "model_response": f"quality={quality}", "reference_answer": "无"}
+            for q in range(1, question_count + 1)
+        ]}
+    }
+
+
+class TestRating:
+    """评分拟合和结果解析测试"""
+
+    def test_bradley_terry_recovers_strengths(self):
+        true_strengths = np.array([4.0, 2.0, 1.0])
+        games = 1000 * (1 - np.eye(3))
+        wins = games * win_probabilities(true_strengths)
+        strengths = bradley_terry(wins, prior=0)
+        assert strengths / strengths[2] == pytest.approx(true_strengths, rel=1e-4)
+
+    def test_rating_table_orders_by_elo(self):
+        wins = np.array([[0, 1, 0], [5, 0, 4], [3, 2, 0]])
+        table = rating_table(["a", "b", "c"], wins, np.zeros((3, 3)))
+        assert [row["model"] for row in table["ratings"]] == ["b", "c", "a"]
+        assert table["ratings"][0]["wins"] == 9
+        assert table["win_probability"]["b"]["a"] > 0.5
+
+    @pytest.mark.parametrize("content, expected", [
+        ("准确性：B更好\n总体评价：A更好", "A"),
+        ("总体评价: 回答B更好，因为更完整", "B"),
+        ("总体评价：两者相当", "tie"),
+        ("无法判断", None)
+    ])
+    def test_parse_verdict(self, content, expected):
+        assert parse_comparison_verdict(content) == expected
+
+
+class TestPairwiseComparator:
+    """主动调度的成对比较测试"""
+
+    @pytest.mark.asyncio
+    async def test_active_tournament_ranks_with_fewer_calls(self):
+        questions = 6
+        qualities = {"m1": 10, "m2": 50, "m3": 30, "m4": 90, "m5": 70}
+        tasks = [make_task(f"t{i}", name, quality, questions) for i, (name, quality) in enumerate(qualities.items())]
+        judge = QualityJudge("quality-judge", "mock-1")
+
+        comparator = PairwiseComparator(judge, PromptLoader(), {"seed": 3})
+        result = await comparator.compare(collect_task_answers(tasks))
+
+        assert [row["model"] for row in result["ratings"]] == ["m4", "m5", "m2", "m3", "m1"]
+        assert judge.request_count == result["comparisons"] == len(qualities) * questions
+        assert result["possible_comparisons"] == 10 * questions
+        assert judge.request_count < len(qualities) ** 2 * questions
+        # 随机交换 A/B 位置，胜方不会总出现在同一位置
+        assert result["position_verdicts"]["A"] > 0 and result["position_verdicts"]["B"] > 0
+
+    @pytest.mark.asyncio
+    async def test_unparsed_verdict_counts_as_failed(self):
+        judge = MockModel("vague-judge", "mock-1", mock={"response_text": "两个回答各有优劣"})
+        tasks = [make_task("t1", "m1", 10, 3), make_task("t2", "m2", 20, 3)]
+        result = await PairwiseComparator(judge, PromptLoader()).compare(collect_task_answers(tasks))
+
+        assert result["failed_comparisons"] == 3
+        assert result["comparisons"] == 0
+        assert all(row["ties"] == 0 and row["wins"] == 0 for row in result["ratings"])
+
+    @pytest.mark.asyncio
+    async def test_rejects_incomplete_or_single_task(self):
+        with pytest.raises(ValueError):
+            collect_task_answers([{"task_id": "t1", "status": "running"}])
+        comparator = PairwiseComparator(QualityJudge("quality-judge", "mock-1"), PromptLoader())
+        with pytest.raises(ValueError):
+            await comparator.compare(collect_task_answers([make_task("t1", "m1", 10, 2)]))
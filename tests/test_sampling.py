@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多候选回答测试
+功能：测试无偏 pass@k 估计，以及每题多个候选回答的生成、并行评估和汇总
+"""
+
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.score_calculator import ScoreCalculator
+
+
+class TestPassAtK:
+    """pass@k 估计测试"""
+
+    def test_unbiased_estimator(self):
+        assert ScoreCalculator.pass_at_k(5, 1, 1) == pytest.approx(0.2)
+        # 1 - C(7,5) / C(10,5) = 1 - 21/252
+        assert ScoreCalculator.pass_at_k(10, 3, 5) == pytest.approx(1 - 21 / 252)
+        assert ScoreCalculator.pass_at_k(10, 0, 5) == 0.0
+        assert ScoreCalculator.pass_at_k(10, 8, 5) == 1.0
+
+    def test_sampling_statistics(self):
+        results = [
+            {"samples": [{"overall": 80, "passed": True}, {"overall": 40, "passed": False}]},
+            {"samples": [{"overall": 70, "passed": True}, {"overall": 70, "passed": True}]}
+        ]
+        sampling = ScoreCalculator().calculate_sampling_statistics(results)
+        assert sampling["pass_at_k"] == {"pass@1": pytest.approx(0.75), "pass@2": pytest.approx(1.0)}
+        assert sampling["score_variance"]["max"] == pytest.approx(800)
+
+
+class TestMultiSampleEvaluation:
+    """多候选回答的评估流程测试"""
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("supports_n, expected_requests", [(True, 3), (False, 12)])
+    async def test_samples_generated_and_graded(self, make_evaluator, supports_n, expected_requests):
+        """支持 n 参数时每题一次请求，否则每个候选一次请求；每个候选都被评估"""
+        evaluator = make_evaluator(model_options={
+            "target": {"supports_n": supports_n},
+            "judge": {"mock": {"judge_scores": {"accuracy": 90, "completeness": 80, "clarity": 70, "feedback": "ok"}}}
+        })
+        target = evaluator.model_manager.get_model("target")
+        judge = evaluator.model_manager.get_model("judge")
+
+        questions = [{"id": i, "type": "no_standard_answer", "question": f"输出数字 {i}"} for i in range(1, 4)]
+        answers = [{"question_id": i, "standard_answer": f"print({i})"} for i in range(1, 4)]
+        results = await evaluator.evaluate_model("target", "judge", questions, answers, {
+            "samples_per_question": 4, "concurrency": 3, "request_interval": 0, "judge_interval": 0
+        })
+
+        assert target.request_count == expected_requests
+        assert judge.request_count == 12
+        for item in results["results"]:
+            assert len(item["samples"]) == 4
+            assert item["tokens_used"] == sum(s["tokens_used"] + s["evaluation_tokens"] for s in item["samples"])
+        sampling = results["summary"]["sampling"]
+        assert sampling["samples_per_question"] == 4
+        assert sampling["pass_at_k"] == {"pass@1": 1.0, "pass@4": 1.0}
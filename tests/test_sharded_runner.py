@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分片评估测试
+功能：测试多进程分片评估的结果合并以及跨进程共享的并发限制
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.task_control import TaskControl
+from models.model_manager import ModelManager
+from models.shared_limits import SharedModelLimit, build_shared_limits
+
+
+class TestSharedModelLimit:
+    """跨进程共享限制测试"""
+
+    @pytest.mark.asyncio
+    async def test_slots_bound_concurrency(self):
+        """共享槽位为 2 时同时进行的请求不超过 2 个"""
+        limit = SharedModelLimit(multiprocessing.get_context("spawn"), max_concurrency=2)
+        state = {"active": 0, "peak": 0}
+
+        async def request():
+            async with limit.request():
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+                await asyncio.sleep(0.01)
+                state["active"] -= 1
+
+        await asyncio.gather(*(request() for _ in range(6)))
+        assert state["peak"] == 2
+
+    def test_build_only_for_limited_models(self):
+        limits = build_shared_limits(multiprocessing.get_context("spawn"), {
+            "limited": {"concurrency_limit": {"max": 4}},
+            "paced": {"rate_limit": {"requests_per_minute": 120}},
+            "free": {}
+        })
+        assert set(limits) == {"limited", "paced"}
+        assert limits["paced"].interval == 0.5
+
+
+class TestShardedEvaluation:
+    """分片评估测试"""
+
+    @pytest.mark.asyncio
+    async def test_results_merged_in_order_under_shared_limit(self, tmp_path, make_evaluator):
+        """两个分片的结果按原始顺序合并；共享上限为 1 时所有请求在两个进程间串行"""
+        config_file = tmp_path / "models.json"
+        config_file.write_text(json.dumps({"models": [{
+            "name": "shard-mock", "provider": "mock", "model_id": "mock-1",
+            "mock": {"latency": {"distribution": "fixed", "mean": 0.05}},
+            "concurrency_limit": {"initial": 1, "min": 1, "max": 1}
+        }]}), encoding="utf-8")
+        # 工作进程按配置文件重新加载模型，因此模型写入配置文件而不是直接注册
+        evaluator = make_evaluator(model_manager=ModelManager(str(config_file)))
+
+        questions = [{"type": "standard_answer", "question": f"输出数字 {i}"} for i in range(1, 9)]
+        answers = [{"question_id": i, "standard_answer": f"print({i})"} for i in range(1, 9)]
+        results = await evaluator.evaluate_model(
+            "shard-mock", "shard-mock", questions, answers,
+            {"shards": 2, "concurrency": 4, "request_interval": 0, "judge_interval": 0}
+        )
+
+        assert [item["question_id"] for item in results["results"]] == list(range(1, 9))
+        assert [shard["questions"] for shard in results["shards"]] == [4, 4]
+        assert len({shard["pid"] for shard in results["shards"]}) == 2
+        assert results["summary"]["total_questions"] == 8
+        # 8 个问题各有一次回答和一次评估请求，共享上限为 1 时至少需要 16 × 0.05 秒
+        assert results["total_duration_seconds"] >= 16 * 0.05
+
+    @pytest.mark.asyncio
+    async def test_cancel_reaches_worker_processes(self, tmp_path, make_evaluator):
+        """取消传递到各工作进程，结果只包含已完成的问题"""
+        config_file = tmp_path / "models.json"
+        config_file.write_text(json.dumps({"models": [{
+            "name": "shard-mock", "provider": "mock", "model_id": "mock-1",
+            "mock": {"latency": {"distribution": "fixed", "mean": 0.2}}
+        }]}), encoding="utf-8")
+        evaluator = make_evaluator(model_manager=ModelManager(str(config_file)))
+
+        questions = [{"type": "standard_answer", "question": f"输出数字 {i}"} for i in range(1, 41)]
+        answers = [{"question_id": i, "standard_answer": f"print({i})"} for i in range(1, 41)]
+        control = TaskControl()
+
+        async def cancel_later():
+            await asyncio.sleep(3)
+            control.cancel()
+
+        canceller = asyncio.create_task(cancel_later())
+        results = await evaluator.evaluate_model(
+            "shard-mock", "shard-mock", questions, answers,
+            {"shards": 2, "concurrency": 2, "request_interval": 0, "judge_interval": 0},
+            control=control
+        )
+        await canceller
+
+        assert results["cancelled"] is True
+        assert results["completed_questions"] == len(results["results"]) < 40
+        assert all(shard["completed"] < shard["questions"] for shard in results["shards"])
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务控制测试
+功能：测试评估任务的取消、暂停和恢复
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.task_control import TaskControl
+
+
+CONFIG = {"concurrency": 2, "request_interval": 0, "judge_interval": 0}
+
+
+class TestTaskControl:
+    """任务控制测试"""
+
+    @pytest.mark.asyncio
+    async def test_cancel_interrupts_in_flight_requests(self, make_evaluator, make_dataset):
+        """取消后进行中的请求被中断，返回部分结果"""
+        evaluator = make_evaluator(latency=0.1)
+        questions, answers = make_dataset(6)
+        control = TaskControl("t1")
+
+        evaluation = asyncio.create_task(
+            evaluator.evaluate_model("target", "judge", questions, answers, CONFIG, control=control)
+        )
+        await asyncio.sleep(0.5)
+        assert control.cancel()
+        results = await asyncio.wait_for(evaluation, timeout=1.0)
+
+        assert results["cancelled"] is True
+        assert 0 < results["completed_questions"] < 6
+        assert len(results["results"]) == results["completed_questions"]
+        assert control.preemptions > 0
+
+    @pytest.mark.asyncio
+    async def test_pause_releases_slots_and_resume_completes(self, make_evaluator, make_dataset):
+        """暂停期间不再发出请求，恢复后被中断的问题重新执行并完成全部问题"""
+        evaluator = make_evaluator(latency=0.1)
+        target = evaluator.model_manager.get_model("target")
+        questions, answers = make_dataset(4)
+        control = TaskControl("t2")
+
+        evaluation = asyncio.create_task(
+            evaluator.evaluate_model("target", "judge", questions, answers, CONFIG, control=control)
+        )
+        await asyncio.sleep(0.15)
+        assert control.pause()
+        assert not control.pause()
+        await asyncio.sleep(0.01)
+        assert control.snapshot()["in_flight"] == 0
+        requests_when_paused = target.request_count
+        await asyncio.sleep(0.3)
+        assert target.request_count == requests_when_paused
+
+        assert control.resume()
+        results = await asyncio.wait_for(evaluation, timeout=3.0)
+        assert "cancelled" not in results
+        assert [item["question_id"] for item in results["results"]] == [1, 2, 3, 4]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+任务预估测试
+功能：测试运行前的 token、费用和耗时预估
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluator import Evaluator
+from core.task_planner import TaskPlanner, simulate_makespan, JUDGE_OUTPUT_TOKENS
+from models.model_manager import ModelManager
+from utils.prompt_loader import PromptLoader
+
+
+def make_model_manager(tmp_path, rate_limit=None):
+    """两个模拟模型：固定 1 秒延迟、不计生成耗时；judge 配置了价格"""
+    mock = {"latency": {"distribution": "fixed", "mean": 1.0}, "tokens_per_second": 0}
+    judge_config = {"name": "judge", "provider": "mock", "model_id": "mock-judge", "mock": mock}
+    if rate_limit:
+        judge_config["rate_limit"] = rate_limit
+    config_file = tmp_path / "models.json"
+    config_file.write_text(json.dumps({
+        "models": [
+            {"name": "target", "provider": "mock", "model_id": "mock-1", "mock": mock},
+            judge_config
+        ],
+        "cost_estimation": {
+            "judge": {"input_cost_per_token": 0.001, "output_cost_per_token": 0.002},
+            "default": {"input_cost_per_token": 0, "output_cost_per_token": 0}
+        }
+    }), encoding="utf-8")
+    return ModelManager(str(config_file))
+
+
+class TestTaskPlanner:
+    """任务预估测试"""
+
+    def test_simulate_makespan(self):
+        """按最早空闲槽位调度"""
+        assert simulate_makespan([3, 1, 1, 1], 2) == 3
+        assert simulate_makespan([1] * 10, 4) == 3
+        assert simulate_makespan([], 4) == 0
+
+    def test_plan_tokens_cost_and_time(self, tmp_path):
+        """token 与实际渲染的提示一致，费用按 cost_estimation 计算，耗时受并发度和限流约束"""
+        model_manager = make_model_manager(tmp_path)
+        evaluator = Evaluator(model_manager, PromptLoader())
+        questions = [{"id": i, "type": "standard_answer", "question": f"输出数字 {i}"} for i in range(1, 9)]
+        answers = [{"question_id": q["id"], "standard_answer": f"print({q['id']})"} for q in questions]
+        config = {"concurrency": 4, "request_interval": 0, "judge_interval": 0}
+
+        plan = TaskPlanner(evaluator).plan("target", "judge", questions, answers, config)
+        target_model = model_manager.get_model("target")
+        assert plan["target"]["input_tokens"] == sum(target_model.count_tokens(q["question"]) for q in questions)
+        assert plan["target"]["output_tokens"] == sum(target_model.count_tokens(a["standard_answer"]) for a in answers)
+        assert plan["judge"]["output_tokens"] == JUDGE_OUTPUT_TOKENS * 8
+        assert plan["target"]["cost"] == 0
+        assert plan["judge"]["cost"] == pytest.approx(
+            plan["judge"]["input_tokens"] * 0.001 + plan["judge"]["output_tokens"] * 0.002, abs=1e-6)
+        # 每题 2 秒（生成 1 秒 + 评估 1 秒），8 题 4 并发
+        assert plan["estimated_seconds"] == pytest.approx(4.0)
+        assert plan["bottleneck"] == "concurrency"
+        assert model_manager.get_model("judge").request_count == 0
+
+        # 每分钟 60 个请求的限流下，8 次评估请求至少需要 8 秒
+        limited = make_model_manager(tmp_path, rate_limit={"requests_per_minute": 60})
+        plan = TaskPlanner(Evaluator(limited, PromptLoader())).plan("target", "judge", questions, answers, config)
+        assert plan["estimated_seconds"] == pytest.approx(8.0)
+        assert plan["bottleneck"] == "judge_requests_per_minute"
+
+        with pytest.raises(ValueError):
+            TaskPlanner(evaluator).plan("missing", "judge", questions, answers, config)
+
+    def test_dataset_file_from_config(self, tmp_path):
+        """问题集文件名随配置传入：混合数据集使用结构化提示，预估不修改共享的提示加载器"""
+        evaluator = Evaluator(make_model_manager(tmp_path), PromptLoader())
+        questions = [{"id": 1, "type": "standard_answer", "question": "输出数字 1"}]
+        answers = [{"question_id": 1, "standard_answer": "print(1)"}]
+
+        mixed = TaskPlanner(evaluator).plan("target", "judge", questions, answers,
+                                            {"dataset_file": "programming_questions_mixed.json"})
+        plain = TaskPlanner(evaluator).plan("target", "judge", questions, answers, {})
+        assert mixed["target"]["input_tokens"] > plain["target"]["input_tokens"]
+        assert evaluator.build_target_prompt(questions[0]) == "输出数字 1"
+        assert "<answer>" in evaluator.build_target_prompt(questions[0], "programming_questions_mixed.json")
+        assert not hasattr(evaluator.prompt_loader, "_current_dataset_file")
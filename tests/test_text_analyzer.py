@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+文本分析器测试
+功能：测试位并行 LCS、近似相似度算法、长文本截断、中文分词和批量分析接口
+"""
+
+import os
+import random
+import sys
+import time
+
+import pytest
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from core.evaluation.text_analyzer import TextAnalyzer, lcs_length
+from core.evaluation.tokenizer import NgramTokenizer, get_tokenizer
+
+
+def dp_lcs_length(s1, s2):
+    """朴素动态规划（两行）作为对照"""
+    previous = [0] * (len(s2) + 1)
+    for ch in s1:
+        current = [0]
+        for j, other in enumerate(s2):
+            current.append(previous[j] + 1 if ch == other else max(previous[j + 1], current[j]))
+        previous = current
+    return previous[-1]
+
+
+class TestSimilarity:
+    """相似度算法测试"""
+
+    def test_bit_parallel_lcs(self):
+        """位并行 LCS 与动态规划结果一致"""
+        rng = random.Random(7)
+        for _ in range(200):
+            a = ''.join(rng.choice('ab中文x') for _ in range(rng.randint(0, 30)))
+            b = ''.join(rng.choice('ab中文x') for _ in range(rng.randint(0, 30)))
+            assert lcs_length(a, b) == dp_lcs_length(a, b)
+
+    def test_methods(self):
+        """各算法对相同文本给满分、对无关文本给低分"""
+        analyzer = TextAnalyzer()
+        code = "def add(a, b):\n    return a + b\n\nprint(add(1, 2))"
+        for method in ("lcs", "jaccard", "minhash", "ngram_cosine"):
+            assert analyzer.calculate_semantic_similarity(code, code, method) == pytest.approx(100.0)
+            assert analyzer.calculate_semantic_similarity(code, "完全不同的中文内容", method) < 20
+        assert analyzer.calculate_semantic_similarity("", code) == 0.0
+
+        with pytest.raises(ValueError):
+            TextAnalyzer(similarity_method="edit_distance")
+
+    def test_long_texts(self):
+        """20k 字符的代码回答可以快速比较，超过上限时改用 n-gram 余弦"""
+        rng = random.Random(3)
+        alphabet = 'abcdefghij(){}=+ \n'
+        a = ''.join(rng.choice(alphabet) for _ in range(20000))
+        b = a[:15000] + ''.join(rng.choice(alphabet) for _ in range(5000))
+
+        start = time.perf_counter()
+        similarity = TextAnalyzer().calculate_semantic_similarity(a, b)
+        assert time.perf_counter() - start < 5.0
+        assert similarity > 75
+
+        limited = TextAnalyzer(max_lcs_chars=1000)
+        assert limited.calculate_semantic_similarity(a, b) == \
+            pytest.approx(limited.calculate_semantic_similarity(a, b, "ngram_cosine"))
+
+
+class TestTokenizer:
+    """分词与中文关键词测试"""
+
+    def test_ngram_tokenizer(self):
+        """英文按词、中文按二元组切分，重复文本命中 LRU 缓存"""
+        tokenizer = NgramTokenizer()
+        assert tokenizer.tokenize("快速排序 QuickSort(arr)") == ("快速", "速排", "排序", "quicksort", "arr")
+        tokenizer.tokenize("快速排序 QuickSort(arr)")
+        assert tokenizer.cache_info().hits == 1
+
+        with pytest.raises(ValueError):
+            get_tokenizer("whitespace")
+
+    def test_chinese_keyword_and_coverage(self):
+        """没有空格的中文回答也能得到有区分度的关键词匹配度和覆盖度"""
+        analyzer = TextAnalyzer(tokenizer="ngram")
+        reference = "快速排序首先选择一个基准元素。然后把小于基准的元素放在左边，大于基准的元素放在右边。最后递归地排序左右两个子数组。"
+        good = "选择基准元素，把较小的元素放到左边、较大的放到右边，再递归排序两个子数组"
+        bad = "使用冒泡排序逐个交换相邻元素"
+
+        assert analyzer.calculate_keyword_match(good, reference) > 3 * analyzer.calculate_keyword_match(bad, reference)
+        assert analyzer.calculate_coverage(good, reference) == pytest.approx(1.0)
+        assert analyzer.calculate_coverage(bad, reference) == pytest.approx(0.0)
+
+
+class TestReferenceCache:
+    """参考答案特征缓存测试"""
+
+    def test_cached_similarity_matches_single_calls(self):
+        """缓存结果与逐个调用一致，参考答案特征按问题ID只计算一次"""
+        analyzer = TextAnalyzer()
+        references = {
+            1: "快速排序 选择 pivot 元素。把 小于 pivot 的元素 放在 左边，其余 放在 右边。递归 排序 两个 子数组。",
+            2: "二分查找 要求 数组 有序。比较 中间 元素 与 目标值 并缩小 范围。找不到 时 返回 -1 即可。"
+        }
+        model_answers = {
+            "model_a": {1: "选择 pivot 元素，递归 排序 左右 子数组", 2: "数组 必须 有序，比较 中间 元素"},
+            "model_b": {1: "使用冒泡排序", 2: "二分查找 返回 -1"}
+        }
+
+        for answers in model_answers.values():
+            for qid, reference in references.items():
+                assert analyzer.calculate_reference_similarity(qid, answers[qid], reference) == pytest.approx(
+                    analyzer.calculate_semantic_similarity(answers[qid], reference))
+
+        stats = analyzer.get_reference_cache_stats()
+        assert stats["misses"] == 2 and stats["hits"] == 2
+
+        # 参考答案内容变化时重新计算
+        analyzer.calculate_reference_similarity(1, "x", "新的参考答案")
+        assert analyzer.get_reference_cache_stats()["misses"] == 3
+
+    def test_batch_scores_references_once(self):
+        """多个模型的回答批量评分：每个问题的参考答案特征只计算一次，结果与逐个调用一致"""
+        analyzer = TextAnalyzer()
+        references = {
+            1: "快速排序 选择 pivot 元素。把 小于 pivot 的元素 放在 左边，其余 放在 右边。递归 排序 两个 子数组。",
+            2: "二分查找 要求 数组 有序。比较 中间 元素 与 目标值 并缩小 范围。找不到 时 返回 -1 即可。",
+            3: "哈希表 通过 哈希函数 定位 桶。冲突 时 使用 链表 或 开放寻址。"
+        }
+        models = ["选择 pivot 元素，递归 排序 左右 子数组", "使用冒泡排序", "数组 必须 有序", "链表 解决 冲突"]
+        pairs = [
+            {"question_id": qid, "answer": f"{answer} {qid}", "reference": reference}
+            for answer in models for qid, reference in references.items()
+        ]
+
+        results = analyzer.analyze_batch(pairs)
+        stats = analyzer.get_reference_cache_stats()
+        assert stats["misses"] == len(references) and stats["hits"] == 0
+
+        single = TextAnalyzer()
+        for pair, result in zip(pairs, results):
+            assert result["question_id"] == pair["question_id"]
+            assert result["keyword_match"] == pytest.approx(single.calculate_keyword_match(pair["answer"], pair["reference"]))
+            assert result["coverage"] == pytest.approx(single.calculate_coverage(pair["answer"], pair["reference"]))
+            assert result["similarity"] == pytest.approx(single.calculate_semantic_similarity(pair["answer"], pair["reference"]))
+
+        # 同一参考答案的关键词和覆盖度计算也复用缓存的特征
+        analyzer.calculate_keyword_match(pairs[0]["answer"], pairs[0]["reference"], question_id=1)
+        analyzer.calculate_coverage(pairs[0]["answer"], pairs[0]["reference"], question_id=1)
+        assert analyzer.get_reference_cache_stats()["misses"] == len(references)
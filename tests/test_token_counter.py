@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Token 计数测试
+功能：测试向量化估算、批量计数与逐个计数一致、LRU 缓存和模型共享计数器
+"""
+
+import os
+import sys
+
+# 添加项目根目录到路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models.model_manager import CustomAPIModel, OpenAIModel
+from models.token_counter import HeuristicEncoder, TokenCounter, get_token_counter
+
+
+class TestTokenCounter:
+    """Token 计数测试"""
+
+    def test_heuristic_estimate(self):
+        """中文按字、英文按词、代码符号逐个计数，批量结果与逐个计算一致"""
+        encoder = HeuristicEncoder()
+        assert encoder.count("") == 0
+        assert encoder.count("hello world") == 2
+        assert encoder.count("快速排序") == 4
+        # 代码中的括号、运算符都会单独成为 token
+        assert encoder.count("x=f(a,b)") > len("x f a b".split())
+
+        texts = ["这是一个测试 hello world", "", "def add(a, b):\n    return a + b", "12345678"]
+        assert encoder.count_batch(texts) == [encoder.count(text) for text in texts]
+
+    def test_cache_and_shared_counter(self):
+        """重复文本命中缓存，同一分词配置的模型共享计数器"""
+        counter = TokenCounter(cache_size=2)
+        counts = counter.count_batch(["a b c", "a b c", "第一题"])
+        assert counts == [3, 3, 3]
+        assert counter.misses == 2
+        counter.count("a b c")
+        counter.count("新的文本")
+        assert counter.hits == 1 and counter.get_stats()["cached_texts"] == 2
+
+        openai_model = OpenAIModel("gpt", "gpt-4", "key")
+        custom_model = CustomAPIModel("qwen", "qwen-turbo", "key", "https://example.com/v1")
+        assert openai_model.token_counter is custom_model.token_counter is get_token_counter()
+        assert openai_model.count_tokens_batch(["你好", "hello"]) == [2, 1]
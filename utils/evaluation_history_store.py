@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+评估历史时序存储
+基于SQLite的只追加存储，保存每一次评估运行的汇总指标，
+支持按模型、数据集、评估模型和时间范围查询，以及降采样的趋势统计
+"""
+
+import json
+import os
+import sqlite3
+import statistics
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Any, Optional
+
+
+# 趋势统计支持的时间粒度（秒）
+BUCKET_SECONDS = {
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+    "month": 30 * 86400
+}
+
+# 趋势统计支持的指标列
+TREND_METRICS = (
+    "average_score",
+    "accuracy",
+    "completeness",
+    "clarity",
+    "avg_seconds_per_question",
+    "total_duration_seconds",
+    "total_tokens",
+    "total_cost"
+)
+
+
+class EvaluationHistoryStore:
+    """评估历史时序存储（只追加）"""
+
+    def __init__(self, db_file: str = "data/evaluation_history.db"):
+        self.db_file = db_file
+        self.lock = threading.Lock()
+
+        # 确保目录存在
+        db_dir = os.path.dirname(db_file)
+        if db_dir:
+            os.makedirs(db_dir, exist_ok=True)
+
+        self._init_schema()
+
+    @contextmanager
+    def _connect(self):
+        """获取数据库连接（每次操作独立连接，保证线程安全）"""
+        conn = sqlite3.connect(self.db_file, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _init_schema(self):
+        """初始化表结构和索引"""
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS evaluation_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    task_id TEXT UNIQUE,
+                    model_name TEXT NOT NULL,
+                    dataset TEXT,
+                    evaluator_model TEXT,
+                    created_at TEXT NOT NULL,
+                    created_ts REAL NOT NULL,
+                    average_score REAL,
+                    accuracy REAL,
+                    completeness REAL,
+                    clarity REAL,
+                    total_questions INTEGER,
+                    fully_met_requirements INTEGER,
+                    partially_met_requirements INTEGER,
+                    unmet_requirements INTEGER,
+                    total_tokens INTEGER,
+                    total_cost REAL,
+                    total_duration_seconds REAL,
+                    avg_seconds_per_question REAL,
+                    extra TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_model_time ON evaluation_runs (model_name, created_ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_dataset_time ON evaluation_runs (dataset, created_ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_evaluator_time ON evaluation_runs (evaluator_model, created_ts)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_time ON evaluation_runs (created_ts)")
+
+    def append_run(self, task_data: Dict[str, Any]) -> bool:
+        """追加一次评估运行的汇总记录，同一任务只记录一次"""
+        record = self._build_record(task_data)
+        if not record:
+            return False
+
+        columns = list(record.keys())
+        placeholders = ", ".join("?" for _ in columns)
+        with self.lock, self._connect() as conn:
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO evaluation_runs ({', '.join(columns)}) VALUES ({placeholders})",
+                [record[c] for c in columns]
+            )
+            return cursor.rowcount > 0
+
+    def import_legacy_record(self, record: Dict[str, Any]) -> bool:
+        """导入旧版JSON历史文件中的单条最新记录"""
+        task_data = {
+            "task_id": record.get("task_id"),
+            "target_model_name": record.get("model_name"),
+            "evaluator_model_name": record.get("evaluator_model"),
+            "question_file": record.get("dataset"),
+            "created_at": record.get("created_at"),
+            "_legacy_record": record
+        }
+        return self.append_run(task_data)
+
+    def count_runs(self) -> int:
+        """获取记录总数"""
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM evaluation_runs").fetchone()[0]
+
+    def query_runs(self, model_name: Optional[str] = None, dataset: Optional[str] = None,
+                   evaluator_model: Optional[str] = None, start: Optional[str] = None,
+                   end: Optional[str] = None, limit: int = 500, offset: int = 0) -> List[Dict[str, Any]]:
+        """按条件和时间范围查询评估运行记录（按时间倒序）"""
+        where, params = self._build_filters(model_name, dataset, evaluator_model, start, end)
+        sql = f"SELECT * FROM evaluation_runs {where} ORDER BY created_ts DESC LIMIT ? OFFSET ?"
+        params.extend([int(limit), int(offset)])
+
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._row_to_dict(row) for row in rows]
+
+    def get_trend(self, model_name: Optional[str] = None, dataset: Optional[str] = None,
+                  evaluator_model: Optional[str] = None, start: Optional[str] = None,
+                  end: Optional[str] = None, bucket: str = "day",
+                  max_points: Optional[int] = None) -> Dict[str, Any]:
+        """获取降采样的趋势数据
+
+        bucket 为固定时间粒度（hour/day/week/month）；
+        指定 max_points 时根据时间跨度自动选择粒度，保证返回点数不超过该值
+        """
+        where, params = self._build_filters(model_name, dataset, evaluator_model, start, end)
+
+        if max_points:
+            bucket_seconds = self._auto_bucket_seconds(where, params, int(max_points))
+            bucket = "auto"
+        else:
+            if bucket not in BUCKET_SECONDS:
+                raise ValueError(f"不支持的时间粒度: {bucket}")
+            bucket_seconds = BUCKET_SECONDS[bucket]
+
+        metric_columns = ", ".join(
+            f"AVG({m}) AS {m}_avg, MIN({m}) AS {m}_min, MAX({m}) AS {m}_max" for m in TREND_METRICS
+        )
+        sql = f"""
+            SELECT CAST(created_ts / ? AS INTEGER) AS bucket_index,
+                   COUNT(*) AS runs,
+                   MIN(created_ts) AS first_ts,
+                   MAX(created_ts) AS last_ts,
+                   {metric_columns}
+            FROM evaluation_runs {where}
+            GROUP BY bucket_index
+            ORDER BY bucket_index
+        """
+        with self._connect() as conn:
+            rows = conn.execute(sql, [bucket_seconds] + params).fetchall()
+
+        points = []
+        for row in rows:
+            point = {
+                "bucket_start": datetime.fromtimestamp(row["bucket_index"] * bucket_seconds).isoformat(),
+                "runs": row["runs"],
+                "first_run_at": datetime.fromtimestamp(row["first_ts"]).isoformat(),
+                "last_run_at": datetime.fromtimestamp(row["last_ts"]).isoformat()
+            }
+            for metric in TREND_METRICS:
+                point[metric] = {
+                    "avg": row[f"{metric}_avg"],
+                    "min": row[f"{metric}_min"],
+                    "max": row[f"{metric}_max"]
+                }
+            points.append(point)
+
+        return {
+            "bucket": bucket,
+            "bucket_seconds": bucket_seconds,
+            "points": points
+        }
+
+    def _auto_bucket_seconds(self, where: str, params: List[Any], max_points: int) -> int:
+        """根据时间跨度自动计算桶大小"""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT MIN(created_ts), MAX(created_ts) FROM evaluation_runs {where}", params
+            ).fetchone()
+        if not row or row[0] is None:
+            return BUCKET_SECONDS["day"]
+
+        span = max(row[1] - row[0], 1)
+        # 跨度按桶大小划分后最多产生 span/size + 1 个桶
+        return max(1, int(span // max(max_points - 1, 1)) + 1)
+
+    def _build_filters(self, model_name: Optional[str], dataset: Optional[str],
+                       evaluator_model: Optional[str], start: Optional[str],
+                       end: Optional[str]):
+        """构建查询条件"""
+        clauses = []
+        params: List[Any] = []
+        if model_name:
+            clauses.append("model_name = ?")
+            params.append(model_name)
+        if dataset:
+            clauses.append("dataset = ?")
+            params.append(dataset)
+        if evaluator_model:
+            clauses.append("evaluator_model = ?")
+            params.append(evaluator_model)
+        if start:
+            clauses.append("created_ts >= ?")
+            params.append(self._to_timestamp(start))
+        if end:
+            clauses.append("created_ts <= ?")
+            params.append(self._to_timestamp(end))
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params
+
+    def _build_record(self, task_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """从任务数据中提取需要持久化的汇总指标"""
+        model_name = task_data.get('target_model_name')
+        if not model_name:
+            return None
+
+        created_at = task_data.get('created_at') or datetime.now().isoformat()
+        legacy = task_data.get('_legacy_record')
+
+        if legacy:
+            stats = {
+                "average_score": legacy.get("average_score"),
+                "total_questions": legacy.get("total_questions"),
+                "fully_met_requirements": legacy.get("fully_met_requirements"),
+                "partially_met_requirements": legacy.get("partially_met_requirements"),
+                "unmet_requirements": legacy.get("unmet_requirements"),
+                "total_tokens": legacy.get("total_tokens"),
+                "total_duration_seconds": legacy.get("total_duration_seconds")
+            }
+            dimension_means = {}
+            total_cost = None
+        else:
+            results = task_data.get('results') or {}
+            stats = self._summarize_results(results)
+            if not stats:
+                return None
+            dimension_means = self._dimension_means(results)
+            total_cost = results.get('total_cost')
+
+        total_questions = stats.get("total_questions") or 0
+        duration = stats.get("total_duration_seconds")
+
+        return {
+            "task_id": task_data.get('task_id'),
+            "model_name": model_name,
+            "dataset": task_data.get('question_file'),
+            "evaluator_model": task_data.get('evaluator_model_name'),
+            "created_at": created_at,
+            "created_ts": self._to_timestamp(created_at),
+            "average_score": stats.get("average_score"),
+            "accuracy": dimension_means.get("accuracy"),
+            "completeness": dimension_means.get("completeness"),
+            "clarity": dimension_means.get("clarity"),
+            "total_questions": total_questions,
+            "fully_met_requirements": stats.get("fully_met_requirements"),
+            "partially_met_requirements": stats.get("partially_met_requirements"),
+            "unmet_requirements": stats.get("unmet_requirements"),
+            "total_tokens": stats.get("total_tokens"),
+            "total_cost": total_cost,
+            "total_duration_seconds": duration,
+            "avg_seconds_per_question": (duration / total_questions) if duration and total_questions else None,
+            "extra": json.dumps({"config": task_data.get('config', {})}, ensure_ascii=False)
+        }
+
+    def _summarize_results(self, results: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """汇总单次运行的结果（与最新记录视图使用相同的口径）"""
+        results_list = results.get('results', [])
+        if not results_list:
+            return None
+
+        scores = []
+        fully_met = partially_met = unmet = 0
+        total_tokens = 0
+        for result in results_list:
+            scores_dict = result.get('evaluation', {}).get('scores', {})
+            if 'overall' in scores_dict:
+                scores.append(scores_dict['overall'])
+            total_tokens += result.get('tokens_used', 0)
+
+            overall_score = scores_dict.get('overall', 0)
+            if overall_score >= 80:
+                fully_met += 1
+            elif overall_score >= 40:
+                partially_met += 1
+            else:
+                unmet += 1
+
+        return {
+            "average_score": round(statistics.mean(scores), 2) if scores else 0,
+            "total_questions": len(results_list),
+            "fully_met_requirements": fully_met,
+            "partially_met_requirements": partially_met,
+            "unmet_requirements": unmet,
+            "total_tokens": total_tokens,
+            "total_duration_seconds": results.get('total_duration_seconds')
+        }
+
+    def _dimension_means(self, results: Dict[str, Any]) -> Dict[str, float]:
+        """提取各维度平均分"""
+        score_statistics = results.get('summary', {}).get('score_statistics', {})
+        return {
+            metric: score_statistics[metric].get('mean')
+            for metric in ("accuracy", "completeness", "clarity")
+            if metric in score_statistics
+        }
+
+    def _row_to_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        """数据库行转字典"""
+        record = dict(row)
+        extra = record.pop("extra", None)
+        record.pop("created_ts", None)
+        try:
+            record.update(json.loads(extra) if extra else {})
+        except json.JSONDecodeError:
+            pass
+        return record
+
+    @staticmethod
+    def _to_timestamp(value: Any) -> float:
+        """ISO时间字符串或时间戳转为Unix时间戳"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        return datetime.fromisoformat(str(value)).timestamp()
@@ -11,12 +11,23 @@ from datetime import datetime
 from typing import Dict, List, Any, Optional
 import statistics
 
+from .evaluation_history_store import EvaluationHistoryStore
+
 class ModelEvaluationHistory:
-    """模型评估历史管理器"""
+    """模型评估历史管理器
+    
+    JSON文件只保存每个模型的最新记录（供前端展示），
+    每次运行的完整汇总记录追加写入 EvaluationHistoryStore
+    """
     
-    def __init__(self, history_file: str = "data/model_evaluation_history.json"):
+    def __init__(self, history_file: str = "data/model_evaluation_history.json",
+                 store: Optional[EvaluationHistoryStore] = None):
         self.history_file = history_file
         self.history_data = self._load_history()
+        self.store = store or EvaluationHistoryStore(
+            os.path.join(os.path.dirname(history_file) or ".", "evaluation_history.db")
+        )
+        self._import_legacy_records()
     
     def _load_history(self) -> Dict[str, Any]:
         """加载历史数据"""
@@ -37,6 +48,16 @@ class ModelEvaluationHistory:
                 "version": "1.0"
             }
     
+    def _import_legacy_records(self):
+        """首次创建时序存储时，导入JSON文件中已有的最新记录"""
+        try:
+            if self.store.count_runs() > 0:
+                return
+            for record in self.history_data.get("model_evaluations", {}).values():
+                self.store.import_legacy_record(record)
+        except Exception as e:
+            print(f"导入历史评估记录失败: {e}")
+    
     def _save_history(self):
         """保存历史数据"""
         try:
@@ -62,6 +83,12 @@ class ModelEvaluationHistory:
             if not model_name or not results:
                 return
             
+            # 追加到时序存储（保留每一次运行）
+            try:
+                self.store.append_run(task_data)
+            except Exception as e:
+                print(f"写入评估历史存储失败: {e}")
+            
             # 解析评估结果
             evaluation_stats = self._parse_evaluation_results(results)
             if not evaluation_stats:
@@ -189,8 +216,16 @@ class ModelEvaluationHistory:
         }
         self._save_history()
     
+    def get_evaluation_runs(self, **filters) -> List[Dict[str, Any]]:
+        """查询每次运行的历史记录（时间范围查询）"""
+        return self.store.query_runs(**filters)
+    
+    def get_evaluation_trend(self, **filters) -> Dict[str, Any]:
+        """获取降采样后的分数和耗时趋势"""
+        return self.store.get_trend(**filters)
+    
     def cleanup_old_evaluations(self, max_records: int = 5):
-        """清理旧的评估记录，只保留最近的N个"""
+        """清理最新记录视图中的旧模型，只保留最近的N个（时序存储中的运行记录不受影响）"""
         try:
             if len(self.history_data["model_evaluations"]) <= max_records:
                 return  # 记录数量未超过限制，无需清理
@@ -11,6 +11,10 @@ import os
 import json
 from typing import Dict, List, Any, Optional
 
+def is_mixed_dataset(dataset_file: Optional[str]) -> bool:
+    """问题集文件名包含 mixed 时为混合数据集（待评估模型使用带答案格式要求的结构化提示）"""
+    return bool(dataset_file) and 'mixed' in dataset_file.lower()
+
 class PromptLoader:
     """提示词加载器"""
     
@@ -268,10 +272,15 @@ class PromptLoader:
                                  question=question, answer=answer, reference=reference)
     
     def create_programming_evaluation_prompt(self, question_data: dict, model_answer: str, 
-                                           standard_answer: str = None, question_type: str = "standard_answer") -> str:
-        """创建编程类型的评估提示词"""
+                                           standard_answer: str = None, question_type: str = "standard_answer",
+                                           dataset_file: Optional[str] = None) -> str:
+        """创建编程类型的评估提示词（dataset_file 为问题集文件名，决定查找评估模板的数据集类型）
+
+        评分规则、返回格式、问题和参考答案等同一问题不变的内容放在前面，待评估的模型回答放在最后，
+        使同一问题的多次评估共享相同的提示前缀，便于提供商的前缀缓存（cached input tokens）命中
+        """
         # 首先尝试查找专门的评估提示文件
-        prompt_file = self._find_evaluation_prompt_file(question_data)
+        prompt_file = self._find_evaluation_prompt_file(question_data, dataset_file)
         print(f"🔍 查找评估提示文件: {prompt_file}")
         print(f"📁 文件存在: {os.path.exists(prompt_file) if prompt_file else False}")
         
@@ -281,8 +290,8 @@ class PromptLoader:
                     template = f.read()
                 print(f"✅ 成功读取专门的评估模板: {os.path.basename(prompt_file)}")
                 
-                # 动态替换模板中的占位符
-                prompt = template.replace("{model_answer}", model_answer)
+                # 把模板中的模型回答段落移到末尾，保证前缀稳定
+                prompt = self._move_model_answer_last(template)
                 
                 # 如果有标准答案，尝试替换标准答案占位符
                 if standard_answer and standard_answer.strip():
@@ -302,12 +311,15 @@ class PromptLoader:
                         replacement = f'标准答案预期输出：\n{standard_answer}'
                         prompt = re.sub(pattern, replacement, prompt, flags=re.DOTALL)
                     else:
-                        # 如果没有找到特定的标准答案位置，在模型回答后添加
+                        # 如果没有找到特定的标准答案位置，在模型回答前添加
                         prompt = prompt.replace(
                             "模型回答：\n{model_answer}",
-                            f"模型回答：\n{model_answer}\n\n参考答案：\n{standard_answer}"
+                            f"参考答案：\n{standard_answer}\n\n模型回答：\n{{model_answer}}"
                         )
                 
+                # 最后替换模型回答，避免回答中恰好包含的占位符被再次替换
+                prompt = prompt.replace("{model_answer}", model_answer)
+                
                 print(f"🎯 成功使用专门的评估模板: {os.path.basename(prompt_file)}")
                 return prompt
             except Exception as e:
@@ -320,39 +332,16 @@ class PromptLoader:
         print(f"📝 使用默认编程评估模板生成逻辑")
         # 获取问题信息
         question_text = question_data.get('question') or question_data.get('content', '')
-        question_id = question_data.get('id', '')
-        actual_question_type = question_data.get('type', '')
         
         # 根据实际的问题类型和是否有标准答案来决定评估方式
         has_standard_answer = standard_answer and standard_answer.strip()
         has_sub_questions = len(question_data.get('sub_questions', [])) > 0
         
-        # 创建基础评估提示
+        # 创建基础评估提示：固定的评分规则和返回格式在最前面
         if has_sub_questions:
             # 有子问题的情况 - 使用结构化评估
-            prompt = f"""请评估以下编程回答的正确性和质量：
-
-问题：{question_text}
-
-模型回答：
-{model_answer}
-"""
-            if has_standard_answer:
-                prompt += f"""
-参考答案：
-{standard_answer}
-"""
-            
-            prompt += f"""
-评估要求：
-{question_data.get('evaluation_prompt', '请评估回答的正确性、完整性和清晰度')}
+            prompt = """请评估下方编程回答的正确性和质量。
 
-子问题评估：
-"""
-            for sub_q in question_data.get('sub_questions', []):
-                prompt += f"- {sub_q.get('description', sub_q.get('content', ''))} (权重: {sub_q['weight']*100}%)\n"
-            
-            prompt += """
 请对每个子问题进行评估：
 1. 如果子问题完成，给出1分；如果未完成，给出0分
 2. 对准确性、完整性、清晰度分别评分（0-100分）
@@ -366,45 +355,154 @@ class PromptLoader:
     "completeness": 90,                // 完整性分数
     "clarity": 80,                     // 清晰度分数
     "feedback": "详细的中文评估反馈，请使用中文描述回答的优缺点和改进建议"
-}"""
-        else:
-            # 没有子问题的情况 - 使用通用编程评估
-            prompt = f"""请评估以下编程回答的质量：
-
+}
+"""
+            prompt += f"""
 问题：{question_text}
 
-模型回答：
-{model_answer}
-"""
-            if has_standard_answer:
-                prompt += f"""
-参考答案：
-{standard_answer}
+评估要求：
+{question_data.get('evaluation_prompt', '请评估回答的正确性、完整性和清晰度')}
 
-请对比模型回答与参考答案，评估回答的质量。
+子问题评估：
 """
-            
-            prompt += f"""
+            for sub_q in question_data.get('sub_questions', []):
+                prompt += f"- {sub_q.get('description', sub_q.get('content', ''))} (权重: {sub_q['weight']*100}%)\n"
+        else:
+            # 没有子问题的情况 - 使用通用编程评估
+            prompt = """请评估下方编程回答的质量。
+
 评估维度：
 1. 准确性：回答是否正确解决了问题，逻辑是否正确
 2. 完整性：是否包含了题目要求的所有内容
 3. 清晰度：表达是否清楚，代码结构是否清晰（如适用）
 
 请按以下JSON格式返回评估结果，所有反馈必须使用中文：
-{{
+{
     "requirement_completed": true,     // 是否完成需求（由评估模型判断）
     "accuracy": 85,                    // 准确性分数
     "completeness": 90,                // 完整性分数
     "clarity": 80,                     // 清晰度分数
     "feedback": "详细的中文评估反馈，请使用中文描述回答的优缺点和改进建议"
-}}"""
+}
+"""
+            prompt += f"""
+问题：{question_text}
+"""
+        
+        if has_standard_answer:
+            prompt += f"""
+参考答案：
+{standard_answer}
+"""
+            if not has_sub_questions:
+                prompt += """
+请对比模型回答与参考答案，评估回答的质量。
+"""
         
+        # 待评估的模型回答放在最后
+        prompt += f"""
+模型回答：
+{model_answer}
+"""
+        return prompt
+    
+    @staticmethod
+    def _move_model_answer_last(template: str) -> str:
+        """把模板中包含 {model_answer} 的段落（标题加占位符）移到模板末尾
+
+        只移动以占位符结尾的独立段落；占位符嵌在其他内容中时保持原样
+        """
+        blocks = template.rstrip().split("\n\n")
+        for index, block in enumerate(blocks):
+            if "{model_answer}" in block and block.strip().endswith("{model_answer}") \
+                    and block.count("\n") <= 1:
+                if index == len(blocks) - 1:
+                    return template
+                moved = blocks.pop(index)
+                return "\n\n".join(blocks) + "\n\n" + moved.strip("\n") + "\n"
+        return template
+    
+    def get_evaluation_rubric_key(self, question_data: dict, dataset_file: Optional[str] = None) -> Optional[str]:
+        """获取问题使用的评估规则标识，相同标识的问题可以合并到一个批量评估请求中
+
+        使用专门评估模板的问题各自有独立的规则，返回 None（不参与批量评估）
+        """
+        prompt_file = self._find_evaluation_prompt_file(question_data, dataset_file)
+        if prompt_file and os.path.exists(prompt_file):
+            return None
+        return "structured" if question_data.get('sub_questions') else "general"
+    
+    def create_batch_programming_evaluation_prompt(self, items: List[Dict[str, Any]]) -> str:
+        """创建批量编程评估提示词
+
+        items 中每项包含 question_data、model_answer、standard_answer，且评估规则标识相同；
+        公共的评分规则和返回格式放在前面，各条目的问题和回答依次放在后面，
+        要求评估模型返回带 index 字段的JSON数组
+        """
+        structured = bool(items[0]['question_data'].get('sub_questions'))
+        prompt = f"""请依次评估以下 {len(items)} 个编程回答的正确性和质量。各条目相互独立，请分别依据各自的问题、评估要求和参考答案评分，不要相互比较。
+
+评分规则：
+"""
+        if structured:
+            prompt += """1. 对条目中的每个子问题进行评估：完成给1分，未完成给0分（sub_question_scores 的长度与该条目的子问题数量一致）
+2. 对准确性、完整性、清晰度分别评分（0-100分）
+3. 判断是否完成整体需求（True/False）
+"""
+        else:
+            prompt += """1. 准确性：回答是否正确解决了问题，逻辑是否正确
+2. 完整性：是否包含了题目要求的所有内容
+3. 清晰度：表达是否清楚，代码结构是否清晰（如适用）
+"""
+        prompt += """
+请返回一个JSON数组，每个条目对应一个元素，并用 "index" 字段标明条目编号，所有反馈必须使用中文：
+[
+    {
+        "index": 0,                        // 条目编号"""
+        if structured:
+            prompt += """
+        "sub_question_scores": [1, 0, 1],  // 每个子问题的完成情况"""
+        prompt += """
+        "requirement_completed": true,     // 是否完成需求
+        "accuracy": 85,                    // 准确性分数
+        "completeness": 90,                // 完整性分数
+        "clarity": 80,                     // 清晰度分数
+        "feedback": "详细的中文评估反馈"
+    }
+]
+"""
+        for index, item in enumerate(items):
+            question_data = item['question_data']
+            standard_answer = item.get('standard_answer')
+            question_text = question_data.get('question') or question_data.get('content', '')
+            prompt += f"""
+=== 条目 {index} ===
+问题：{question_text}
+"""
+            if structured:
+                prompt += f"""
+评估要求：
+{question_data.get('evaluation_prompt', '请评估回答的正确性、完整性和清晰度')}
+
+子问题评估：
+"""
+                for sub_q in question_data.get('sub_questions', []):
+                    prompt += f"- {sub_q.get('description', sub_q.get('content', ''))} (权重: {sub_q['weight']*100}%)\n"
+            if standard_answer and standard_answer.strip():
+                prompt += f"""
+参考答案：
+{standard_answer}
+"""
+            prompt += f"""
+模型回答：
+{item['model_answer']}
+"""
         return prompt
     
-    def _find_evaluation_prompt_file(self, question_data: dict) -> str:
-        """根据问题数据查找对应的评估提示文件"""
+    def _find_evaluation_prompt_file(self, question_data: dict, dataset_file: Optional[str] = None) -> str:
+        """根据问题数据和问题集文件名查找对应的评估提示文件"""
         # 确定数据集类型
-        dataset_type = self._determine_dataset_type(question_data)
+        dataset_type = self._determine_dataset_type(question_data, dataset_file)
         
         # 构建映射文件路径
         mapping_file = os.path.join("data/evaluation_prompts", dataset_type, "prompt_mapping.json")
@@ -462,21 +560,21 @@ class PromptLoader:
         print(f"⚠️ 未找到匹配的提示文件，使用默认路径: {default_path}")
         return default_path
     
-    def _determine_dataset_type(self, question_data: dict) -> str:
-        """根据问题数据确定数据集类型"""
+    def _determine_dataset_type(self, question_data: dict, dataset_file: Optional[str] = None) -> str:
+        """根据问题数据和问题集文件名确定数据集类型"""
         question_type = question_data.get('type', '')
         category = question_data.get('category', '').lower()
         
         # 检查是否来自混合数据集
-        if hasattr(self, '_current_dataset_file'):
-            print(f"🔍 当前数据集文件: '{self._current_dataset_file}'")
-            if 'mixed' in self._current_dataset_file.lower():
+        if dataset_file:
+            print(f"🔍 当前数据集文件: '{dataset_file}'")
+            if is_mixed_dataset(dataset_file):
                 print(f"✅ 识别为混合数据集: programming_mixed")
                 return 'programming_mixed'
             else:
                 print(f"❌ 未识别为混合数据集，文件名不包含'mixed'")
         else:
-            print(f"⚠️ _current_dataset_file 未设置")
+            print(f"⚠️ 未指定数据集文件")
         
         if question_type == 'no_standard_answer' and category == '编程':
             return 'programming_no_standard'